@@ -0,0 +1,101 @@
+"""Benchmark for the time taken by ``import tables``.
+
+Every measure is done in a fresh interpreter, so that no module is
+cached.  Besides the times, the script checks that the modules which
+are meant to be imported on demand (Numexpr, the condition compiler and
+the indexing machinery) are not loaded by ``import tables`` or by
+reading an array, and exits with an error otherwise, so that it can be
+used to keep the import time from regressing.
+"""
+
+import sys
+import subprocess
+import argparse
+import tempfile
+import os
+
+import numpy
+import tables
+
+# Modules that ``import tables`` should not load
+lazy_modules = [
+    'numexpr', 'tables.conditions', 'tables.index', 'tables.indexes',
+    'tables.bitmapindex', 'tables.compositeindex', 'tables.nodes',
+]
+
+import_code = """
+import time
+tref = time.time()
+import %(baseline)s
+tbase = time.time() - tref
+import tables
+print time.time() - tref - tbase
+"""
+
+read_code = """
+import sys, time
+tref = time.time()
+import tables
+h5file = tables.open_file(%(filename)r)
+h5file.root.array[:]
+h5file.close()
+print time.time() - tref
+print ' '.join(m for m in %(lazy)r if sys.modules.get(m) is not None)
+"""
+
+
+def run(code):
+    """Run `code` in a fresh interpreter and return its output lines."""
+
+    output = subprocess.check_output([sys.executable, '-c', code])
+    return output.split('\n')
+
+
+def measure(code, niter):
+    """Get the best time out of `niter` runs of `code`, and its output."""
+
+    times = []
+    for i in range(niter):
+        lines = run(code)
+        times.append(float(lines[0]))
+    return min(times), lines[1:]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-n', '--niter', type=int, default=10,
+                        help='number of runs of every measure')
+    parser.add_argument('-m', '--max-time', type=float, default=None,
+                        help='fail if importing tables takes longer than '
+                        'this (in seconds, NumPy not included)')
+    args = parser.parse_args()
+
+    filename = tempfile.mktemp(".h5")
+    h5file = tables.open_file(filename, "w")
+    h5file.create_array('/', 'array', numpy.arange(1000))
+    h5file.close()
+
+    try:
+        tnumpy, _ = measure(import_code % {'baseline': 'sys'}, args.niter)
+        timport, _ = measure(import_code % {'baseline': 'numpy'},
+                             args.niter)
+        tread, loaded = measure(
+            read_code % {'filename': filename, 'lazy': lazy_modules},
+            args.niter)
+    finally:
+        os.remove(filename)
+
+    print "PyTables version:       %s" % tables.__version__
+    print "import tables:          %.4f s" % tnumpy
+    print "import tables (-numpy): %.4f s" % timport
+    print "import + read an array: %.4f s" % tread
+
+    failed = False
+    loaded = loaded[0].split()
+    if loaded:
+        print "Modules loaded before they are needed: %s" % ", ".join(loaded)
+        failed = True
+    if args.max_time is not None and timport > args.max_time:
+        print "Importing tables takes longer than %s s" % args.max_time
+        failed = True
+    sys.exit(1 if failed else 0)
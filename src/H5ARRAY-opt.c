@@ -75,6 +75,102 @@ out:
 }
 
 
+/* Maximum number of ranges in a single hyperslab union.  Building large
+   unions in HDF5 is not linear with the number of hyperslabs. */
+#define MAX_SLICES_IN_SELECTION 128
+
+/*-------------------------------------------------------------------------
+ * Function: H5ARRAYOread_readSlices
+ *
+ * Purpose: Read a range of columns from several rows of an opened Array
+ *          using hyperslab unions
+ *
+ * Return: Success: 0, Failure: -1
+ *
+ * Comments:
+ *   - The selected ranges are stored contiguously in data, in the
+ *     same order than irows (which must be strictly increasing).
+ *
+ * Modifications:
+ *
+ *
+ *-------------------------------------------------------------------------
+ */
+
+herr_t H5ARRAYOread_readSlices( hid_t dataset_id,
+                                hid_t type_id,
+                                hsize_t nslices,
+                                hsize_t *irows,
+                                hsize_t *starts,
+                                hsize_t *stops,
+                                void *data )
+{
+ hid_t    space_id;
+ hid_t    mem_space_id;
+ hsize_t  count[2];
+ hsize_t  offset[2];
+ hsize_t  stride[2] = {1, 1};
+ hsize_t  nelements;
+ hsize_t  i = 0, nsel;
+ size_t   type_size;
+ char     *buf = (char *)data;
+ H5S_seloper_t op;
+
+
+ type_size = H5Tget_size( type_id );
+
+ /* Get the dataspace handle */
+ if ( (space_id = H5Dget_space( dataset_id )) < 0 )
+  goto out;
+
+ count[0] = 1;
+ while ( i < nslices ) {
+   /* Select the union of the next (non-empty) ranges */
+   op = H5S_SELECT_SET;
+   nelements = 0;
+   for ( nsel = 0; i < nslices && nsel < MAX_SLICES_IN_SELECTION; i++ ) {
+     if ( stops[i] <= starts[i] )
+       continue;
+     count[1] = stops[i] - starts[i];
+     offset[0] = irows[i];
+     offset[1] = starts[i];
+     if ( H5Sselect_hyperslab(space_id, op, offset, stride, count, NULL) < 0 )
+       goto out;
+     op = H5S_SELECT_OR;
+     nelements += count[1];
+     nsel++;
+   }
+   if ( nelements == 0 )
+     break;
+
+   /* Create a (flat) memory dataspace handle */
+   if ( (mem_space_id = H5Screate_simple( 1, &nelements, NULL )) < 0 )
+     goto out;
+
+   /* Read */
+   if ( H5Dread( dataset_id, type_id, mem_space_id, space_id, H5P_DEFAULT,
+                 buf ) < 0 )
+     goto out;
+   buf += nelements * type_size;
+
+   /* Terminate access to the memory dataspace */
+   if ( H5Sclose( mem_space_id ) < 0 )
+     goto out;
+ }
+
+ /* Terminate access to the dataspace */
+ if ( H5Sclose( space_id ) < 0 )
+  goto out;
+
+return 0;
+
+out:
+ H5Dclose( dataset_id );
+ return -1;
+
+}
+
+
 /*-------------------------------------------------------------------------
  * Function: H5ARRAYOinit_readSlice
  *
@@ -11,6 +11,14 @@ herr_t H5ARRAYOread_readSlice( hid_t dataset_id,
                                hsize_t stop,
                                void *data );
 
+herr_t H5ARRAYOread_readSlices( hid_t dataset_id,
+                                hid_t type_id,
+                                hsize_t nslices,
+                                hsize_t *irows,
+                                hsize_t *starts,
+                                hsize_t *stops,
+                                void *data );
+
 herr_t H5ARRAYOread_readSortedSlice( hid_t dataset_id,
                                      hid_t mem_space_id,
                                      hid_t type_id,
@@ -269,6 +269,68 @@ out:
 
 }
 
+/*-------------------------------------------------------------------------
+ * Function: H5TBOread_records_step
+ *
+ * Purpose: Read strided records from an opened table
+ *
+ * Return: Success: 0, Failure: -1
+ *
+ * Comments: Like H5TBOread_records, but reading every step-th record.
+ *           With a memory type holding only some of the fields, only
+ *           those are converted and copied to data.
+ *
+ *-------------------------------------------------------------------------
+ */
+
+herr_t H5TBOread_records_step( hid_t dataset_id,
+                               hid_t mem_type_id,
+                               hsize_t start,
+                               hsize_t nrecords,
+                               hsize_t step,
+                               void *data )
+{
+
+ hid_t    space_id;
+ hid_t    mem_space_id;
+ hsize_t  count[1];
+ hsize_t  stride[1];
+ hsize_t  offset[1];
+
+ /* Get the dataspace handle */
+ if ( (space_id = H5Dget_space( dataset_id )) < 0 )
+  goto out;
+
+ /* Define a hyperslab in the dataset of the size of the records */
+ offset[0] = start;
+ stride[0] = step;
+ count[0]  = nrecords;
+ if ( H5Sselect_hyperslab(space_id, H5S_SELECT_SET, offset, stride, count, NULL) < 0 )
+  goto out;
+
+ /* Create a memory dataspace handle */
+ if ( (mem_space_id = H5Screate_simple( 1, count, NULL )) < 0 )
+  goto out;
+
+ if ( H5Dread(dataset_id, mem_type_id, mem_space_id, space_id, H5P_DEFAULT, data ) < 0 )
+  goto out;
+
+ /* Terminate access to the memory dataspace */
+ if ( H5Sclose( mem_space_id ) < 0 )
+  goto out;
+
+ /* Terminate access to the dataspace */
+ if ( H5Sclose( space_id ) < 0 )
+  goto out;
+
+return 0;
+
+out:
+ return -1;
+
+}
+
+
 /*-------------------------------------------------------------------------
  * Function: H5TBOread_elements
  *
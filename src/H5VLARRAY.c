@@ -240,6 +240,71 @@ out:
 }
 
 
+/*-------------------------------------------------------------------------
+ * Function: H5VLARRAYappend_many_records
+ *
+ * Purpose: Append several records to an array at once
+ *
+ * Return: Success: 1, Failure: -1
+ *
+ * Comments: The dataset is extended just once, and all the records
+ *           (described in `wdata`) are written in a single operation
+ *
+ *-------------------------------------------------------------------------
+ */
+
+herr_t H5VLARRAYappend_many_records( hid_t dataset_id,
+                                     hid_t type_id,
+                                     hsize_t nrows,
+                                     hsize_t nrecords,
+                                     const hvl_t *wdata )
+{
+
+ hid_t    space_id;
+ hid_t    mem_space_id;
+ hsize_t  start[1];
+ hsize_t  dataset_dims[1];
+ hsize_t  dims_new[1];
+
+ /* Dimension for the new dataset */
+ dims_new[0] = nrows;
+ dataset_dims[0] = nrecords + nrows;
+
+ /* Extend the dataset */
+ if ( H5Dset_extent( dataset_id, dataset_dims ) < 0 )
+  goto out;
+
+ /* Create a simple memory data space */
+ if ( (mem_space_id = H5Screate_simple( 1, dims_new, NULL )) < 0 )
+  return -1;
+
+ /* Get the file data space */
+ if ( (space_id = H5Dget_space( dataset_id )) < 0 )
+  return -1;
+
+ /* Define a hyperslab in the dataset */
+ start[0] = nrecords;
+ if ( H5Sselect_hyperslab( space_id, H5S_SELECT_SET, start, NULL, dims_new, NULL) < 0 )
+   goto out;
+
+ if ( H5Dwrite( dataset_id, type_id, mem_space_id, space_id, H5P_DEFAULT, wdata ) < 0 )
+     goto out;
+
+ /* Terminate access to the dataspace */
+ if ( H5Sclose( space_id ) < 0 )
+  goto out;
+
+ if ( H5Sclose( mem_space_id ) < 0 )
+  goto out;
+
+return 1;
+
+out:
+ return -1;
+
+}
+
+
 /*-------------------------------------------------------------------------
  * Function: H5ARRAYmodify_records
  *
@@ -27,6 +27,12 @@ herr_t H5VLARRAYappend_records( hid_t dataset_id,
                                 hsize_t nrecords,
                                 const void *data );
 
+herr_t H5VLARRAYappend_many_records( hid_t dataset_id,
+                                     hid_t type_id,
+                                     hsize_t nrows,
+                                     hsize_t nrecords,
+                                     const hvl_t *wdata );
+
 herr_t H5VLARRAYmodify_records( hid_t dataset_id,
                                 hid_t type_id,
                                 hsize_t nrow,
@@ -363,6 +363,100 @@ PyObject *Giterate(hid_t parent_id, hid_t loc_id, const char *name) {
   return t;
 }
 
+/****************************************************************
+**
+**  lnamecb(): Link name iteration callback routine.
+**
+****************************************************************/
+static herr_t lnamecb(hid_t loc_id, const char *name, const H5L_info_t *info,
+                      void *data) {
+  PyObject *strname;
+
+  strname = PyString_FromString(name);
+  if (strname == NULL)
+    return -1;
+  /* Return the name of the link on data */
+  PyList_Append((PyObject *)data, strname);
+  Py_DECREF(strname);
+  return 0;    /* Loop until no more links remain in group */
+}
+
+
+/****************************************************************
+**
+**  Gnames(): Get the names of the links in a group.
+**
+**  Unlike Giterate(), the type of the linked objects is not looked
+**  up, so the object headers of the children are not read.
+**
+****************************************************************/
+PyObject *Gnames(hid_t loc_id) {
+  hsize_t i = 0;
+  PyObject *namelist;                  /* List where the names are put */
+
+  namelist = PyList_New(0);
+  if (H5Literate(loc_id, H5_INDEX_NAME, H5_ITER_NATIVE, &i, lnamecb,
+                 (void *)namelist) < 0) {
+    Py_DECREF(namelist);
+    PyErr_SetString(PyExc_RuntimeError, "Problems listing the group links.");
+    return NULL;
+  }
+
+  return namelist;
+}
+
+
+/****************************************************************
+**
+**  lvisitcb(): Link visit callback routine.
+**
+****************************************************************/
+static herr_t lvisitcb(hid_t loc_id, const char *name, const H5L_info_t *info,
+                       void *data) {
+  PyObject *t;
+  H5O_info_t oinfo;
+  int otype = H5O_TYPE_UNKNOWN;
+
+  if (info->type == H5L_TYPE_HARD) {
+    /* Get type of the linked object */
+    if (H5Oget_info_by_name(loc_id, name, &oinfo, H5P_DEFAULT) >= 0)
+      otype = oinfo.type;
+  }
+
+  /* Return a (name, link type, object type) tuple on data */
+  t = Py_BuildValue("(sii)", name, (int)info->type, otype);
+  if (t == NULL)
+    return -1;
+  PyList_Append((PyObject *)data, t);
+  Py_DECREF(t);
+  return 0;    /* Loop until no more links remain */
+}
+
+
+/****************************************************************
+**
+**  Gvisit(): Recursively visit the links hanging from a group.
+**
+**  Links are visited in a single pass, in preorder and sorted by
+**  name.  For every link, a tuple with its relative path, its type
+**  and the type of the linked object (hard links only) is returned.
+**
+****************************************************************/
+PyObject *Gvisit(hid_t loc_id) {
+  PyObject *visitlist;                 /* List where the links are put */
+
+  visitlist = PyList_New(0);
+  if (H5Lvisit(loc_id, H5_INDEX_NAME, H5_ITER_INC, lvisitcb,
+               (void *)visitlist) < 0) {
+    Py_DECREF(visitlist);
+    PyErr_SetString(PyExc_RuntimeError, "Problems visiting the group links.");
+    return NULL;
+  }
+
+  return visitlist;
+}
+
+
 /****************************************************************
 **
 **  aitercb(): Custom attribute iteration callback routine.
@@ -121,7 +121,7 @@ from tables.file import File, open_file, copy_file, openFile, copyFile
 from tables.node import Node
 from tables.group import Group
 from tables.leaf import Leaf
-from tables.table import Table, Cols, Column
+from tables.table import Table, Cols, Column, IndexBuild
 from tables.array import Array
 from tables.carray import CArray
 from tables.earray import EArray
@@ -147,7 +147,7 @@ __all__ = [
     'split_type', 'restrict_flavors', 'set_blosc_max_threads',
     'silence_hdf5_messages',
     # Helper classes:
-    'IsDescription', 'Description', 'Filters', 'Cols', 'Column',
+    'IsDescription', 'Description', 'Filters', 'Cols', 'Column', 'IndexBuild',
     # Types:
     'Enum',
     # Atom types:
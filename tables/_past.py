@@ -12,7 +12,7 @@
 
 """A module with no PyTables dependencies that helps with deprecation warnings.
 """
-from inspect import getmembers, ismethod, isfunction
+from inspect import ismethod, isfunction
 from warnings import warn
 
 
@@ -21,10 +21,7 @@ def previous_api(obj):
     if not (ismethod(obj) or isfunction(obj)):
         # punt if not a function or method
         return obj
-    for key, value in getmembers(obj):
-        if key == '__name__':
-            newname = value
-            break
+    newname = obj.__name__
     oldname = new2oldnames[newname]
     warnmsg = ("{0}() is pending deprecation, use {1}() instead. "
                "You may use the pt2to3 tool to update your source code.")
@@ -0,0 +1,355 @@
+# -*- coding: utf-8 -*-
+
+########################################################################
+#
+# License: BSD
+# Created: October 17, 2026
+#
+# $Id$
+#
+########################################################################
+
+"""Here is defined the BitmapIndex class."""
+
+import operator
+
+import numpy
+
+from tables.node import NotLoggedMixin
+from tables.atom import Atom, Int32Atom, Int64Atom, UInt8Atom
+from tables.earray import EArray
+from tables.group import Group
+from tables.index import Index
+from tables.utils import timed_phase
+
+from tables._past import previous_api_property
+
+
+# The default number of rows covered by every bitmap.  Like the containers
+# of roaring bitmaps, bitmaps are kept for slices of 2**16 rows, and only
+# for the values that actually appear in each slice.
+default_bitmap_slicesize = 2**16
+
+# The approximate size of the chunks for the bitmaps dataset (in bytes)
+bitmap_chunksize = 8 * 1024
+
+# The comparisons supported in bitmap lookups (the operator versions also
+# work for arrays of strings)
+_cmpfuncs = {
+    'lt': operator.lt,
+    'le': operator.le,
+    'eq': operator.eq,
+    'ne': operator.ne,
+    'ge': operator.ge,
+    'gt': operator.gt,
+}
+
+
+class BitmapIndex(NotLoggedMixin, Group):
+    """Represents a bitmap index of a column in a table.
+
+    Bitmap indexes are meant for columns with few distinct values (like
+    enumerated types, status flags or codes).  For every slice of
+    `slicesize` rows in the table, and every value appearing in that
+    slice, a compressed bitmap of the rows holding the value is kept.
+    Conditions over bitmap indexed columns can then be combined with
+    bitwise operations, giving the exact set of matching rows without
+    reading the table.
+
+    This class is mainly intended for internal use.  It honours the
+    same interface than :class:`Index` for maintaining the index, but
+    lookups are done with the :meth:`get_bitmap` method.
+
+    Parameters
+    ----------
+    parentnode
+        The parent :class:`Group` object.
+    name : str
+        The name of this node in its parent group.
+    atom : Atom
+        An Atom object representing the type of the indexed column.
+    title
+        Sets a TITLE attribute of the BitmapIndex entity.
+    optlevel
+        The optimization level for this index (it is just kept for
+        compatibility with other kinds of indexes).
+    filters : Filters
+        An instance of the Filters class that provides information about the
+        desired I/O filters to be applied during the life of this object.
+    expectedrows
+        An user estimate about the number of rows to be indexed.
+    byteorder
+        The byteorder of the index datasets *on-disk*.
+    blocksizes
+        The four main sizes of the compound blocks in index datasets.  Only
+        the third one (the slice size) is used, rounded up to a multiple
+        of 8 (a low level parameter).
+
+    """
+
+    _c_classid = 'BITMAPINDEX'
+
+    _c_classId = previous_api_property('_c_classid')
+
+    # <properties>
+    kind = property(
+        lambda self: 'bitmap', None, None,
+        "The kind of this index.")
+
+    filters = property(
+        lambda self: self._v_filters, None, None,
+        """Filter properties for this index - see Filters in
+        :ref:`FiltersClassDescr`.""")
+
+    _v_background = Index._v_background
+    dirty = Index.dirty
+    column = Index.column
+    table = Index.table
+
+    is_csi = property(
+        lambda self: False, None, None,
+        "Bitmap indexes are never completely sorted.")
+
+    nslices = property(
+        lambda self: self.nelements // self.slicesize, None, None,
+        "The number of complete slices in index.")
+
+    nbytes = property(
+        lambda self: self.slicesize // 8, None, None,
+        "The size of the bitmap of a slice (in bytes).")
+
+    cardinality = property(
+        lambda self: self.values.nrows, None, None,
+        "The number of distinct values in the indexed rows.")
+
+    # </properties>
+
+    def __init__(self, parentnode, name,
+                 atom=None, title="",
+                 optlevel=None,
+                 filters=None,
+                 expectedrows=0,
+                 byteorder=None,
+                 blocksizes=None,
+                 new=True):
+
+        self.optlevel = optlevel
+        """The optimization level for this index."""
+        self.expectedrows = expectedrows
+        """The expected number of rows to be indexed."""
+        self.byteorder = byteorder
+        """The byteorder of the index datasets."""
+        if atom is not None:
+            self.dtype = atom.dtype.base
+            """The datatype of the indexed values."""
+        self.slicesize = None
+        """The number of rows covered by every bitmap."""
+        if blocksizes is not None:
+            self.slicesize = -(-blocksizes[2] // 8) * 8
+        self.nelements = None
+        """The number of currently indexed rows for this column."""
+        self._lookups = None
+        """Cache for the distinct values and bitmap keys."""
+
+        super(BitmapIndex, self).__init__(parentnode, name, title, new,
+                                          filters)
+
+    def _g_post_init_hook(self):
+        super(BitmapIndex, self)._g_post_init_hook()
+
+        attrs = self._v_attrs
+        if not self._v_new:
+            self.slicesize = int(attrs.slicesize)
+            self.optlevel = int(attrs.optlevel)
+            self.nelements = long(attrs.nelements)
+            self.dtype = self.values.atom.dtype
+            return
+
+        # The index is new.  Initialize the values and save them on disk.
+        if self.slicesize is None:
+            self.slicesize = default_bitmap_slicesize
+        self.nelements = 0
+        attrs.slicesize = numpy.uint32(self.slicesize)
+        attrs.optlevel = self.optlevel
+        attrs.nelements = numpy.uint64(0)
+        # The first bitmap belonging to the last (incomplete) slice
+        attrs.lrstart = numpy.uint64(0)
+
+        filters = self.filters
+        nslices = max(self.expectedrows // self.slicesize, 1)
+        # The distinct values, in order of appearance.  The position of
+        # a value in this array is its code.
+        EArray(self, 'values', Atom.from_dtype(self.dtype), (0,),
+               "Distinct values", filters, byteorder=self.byteorder,
+               _log=False)
+        # The slice and the code of every bitmap
+        EArray(self, 'slices', Int64Atom(), (0,), "Slice of bitmaps",
+               filters, nslices, byteorder=self.byteorder, _log=False)
+        EArray(self, 'codes', Int32Atom(), (0,), "Value code of bitmaps",
+               filters, nslices, byteorder=self.byteorder, _log=False)
+        # The bitmaps themselves, packed in bytes
+        nbytes = self.nbytes
+        chunkshape = (max(bitmap_chunksize // nbytes, 1), nbytes)
+        EArray(self, 'bitmaps', UInt8Atom(), (0, nbytes), "Row bitmaps",
+               filters, nslices, chunkshape, _log=False)
+
+    def _encode(self, arr):
+        """Get the codes of the values in `arr`, adding the new ones."""
+
+        values = self._get_lookups()[0]
+        uniq = numpy.unique(arr)
+        new = uniq[~numpy.in1d(uniq, values)]
+        if len(new) > 0:
+            self.values.append(new)
+            values = numpy.concatenate((values, new))
+            self._lookups = None
+        order = values.argsort(kind='mergesort')
+        return order[values[order].searchsorted(arr)]
+
+    def _truncate_last_row(self):
+        """Remove the bitmaps of the last (incomplete) slice."""
+
+        lrstart = long(self._v_attrs.lrstart)
+        if self.bitmaps.nrows > lrstart:
+            self.slices.truncate(lrstart)
+            self.codes.truncate(lrstart)
+            self.bitmaps.truncate(lrstart)
+            self._lookups = None
+
+    def _append_slice(self, xarr, nslice):
+        """Add the bitmaps for the values in `xarr` as slice `nslice`."""
+
+        arr = numpy.concatenate(xarr) if len(xarr) > 1 else xarr[0]
+        self._truncate_last_row()
+        rowcodes = self._encode(arr)
+        codes = numpy.unique(rowcodes)
+        # Build the bitmaps by groups of values so as to limit memory usage
+        step = max(self._v_file.params['IO_BUFFER_SIZE'] // len(arr), 1)
+        bitmaps = self.bitmaps
+        for i in xrange(0, len(codes), step):
+            gcodes = codes[i:i + step]
+            selected = rowcodes == gcodes[:, numpy.newaxis]
+            packed = numpy.packbits(selected, axis=1)
+            if packed.shape[1] < self.nbytes:
+                padded = numpy.zeros((len(gcodes), self.nbytes), 'uint8')
+                padded[:, :packed.shape[1]] = packed
+                packed = padded
+            bitmaps.append(packed)
+        self.slices.append(numpy.repeat(nslice, len(codes)))
+        self.codes.append(codes)
+        self._lookups = None
+        return len(arr)
+
+    def append(self, xarr, update=False):
+        """Append the array to the index objects"""
+
+        nslice = self.nslices
+        self._append_slice(xarr, nslice)
+        self._v_attrs.lrstart = numpy.uint64(self.bitmaps.nrows)
+        self.nelements = (nslice + 1) * self.slicesize
+        self._v_attrs.nelements = numpy.uint64(self.nelements)
+
+    def append_last_row(self, xarr, update=False):
+        """Append the array to the last row index objects"""
+
+        nslice = self.nslices
+        nelementsLR = self._append_slice(xarr, nslice)
+        self.nelements = nslice * self.slicesize + nelementsLR
+        self._v_attrs.nelements = numpy.uint64(self.nelements)
+
+    def optimize(self, verbose=False):
+        """Bitmap indexes do not need any optimization."""
+
+        pass
+
+    def _get_lookups(self):
+        """Get the distinct values and the slices and codes of bitmaps."""
+
+        if self._lookups is None:
+            self._lookups = (self.values[:], self.slices[:], self.codes[:])
+        return self._lookups
+
+    @timed_phase('search')
+    def get_bitmap(self, ops, limits):
+        """Get the bitmap of the indexed rows fulfilling a comparison.
+
+        Every value in the indexed column is compared with the `limits`
+        using the operators in `ops` (any of 'lt', 'le', 'eq', 'ne', 'ge'
+        or 'gt').  The result is an array of bytes with the bits of
+        matching rows set (the most significant bit first), covering
+        all the indexed rows.
+
+        """
+
+        values, slices, codes = self._get_lookups()
+        selected = numpy.ones(len(values), dtype=bool)
+        for op, limit in zip(ops, limits):
+            selected &= _cmpfuncs[op](values, limit)
+        nbytes = self.nbytes
+        nslices = -(-self.nelements // self.slicesize)
+        result = numpy.zeros((nslices, nbytes), dtype='uint8')
+        rows = numpy.in1d(codes, selected.nonzero()[0]).nonzero()[0]
+        if len(rows) == 0:
+            return result.ravel()[:-(-self.nelements // 8)]
+        # Read runs of consecutive bitmaps (point selections are much
+        # slower) in blocks fitting in the I/O buffer
+        breaks = (numpy.diff(rows) != 1).nonzero()[0] + 1
+        rstarts = rows[numpy.concatenate(([0], breaks))]
+        rstops = rows[numpy.concatenate((breaks - 1, [-1]))] + 1
+        step = max(self._v_file.params['IO_BUFFER_SIZE'] // nbytes, 1)
+        for rstart, rstop in zip(rstarts, rstops):
+            for start in xrange(rstart, rstop, step):
+                stop = min(start + step, rstop)
+                bitmaps = self.bitmaps.read(start, stop)
+                if stop - start == 1:
+                    result[slices[start]] |= bitmaps[0]
+                    continue
+                # Bitmaps come sorted by slice: merge the ones of every slice
+                bslices = slices[start:stop]
+                firsts = numpy.concatenate(
+                    ([0], (numpy.diff(bslices) != 0).nonzero()[0] + 1))
+                merged = numpy.bitwise_or.reduceat(bitmaps, firsts, axis=0)
+                result[bslices[firsts]] |= merged
+        return result.ravel()[:-(-self.nelements // 8)]
+
+    def _f_remove(self, recursive=False):
+        """Remove this BitmapIndex object"""
+
+        # Index removal is always recursive,
+        # no matter what `recursive` says.
+        super(BitmapIndex, self)._f_remove(True)
+
+    def __str__(self):
+        """This provides a more compact representation than __repr__"""
+
+        # The filters
+        filters = ""
+        if self.filters.complevel:
+            if self.filters.shuffle:
+                filters += ", shuffle"
+            filters += ", %s(%s)" % (self.filters.complib,
+                                     self.filters.complevel)
+        return "Index(%s, %s%s).is_csi=%s" % \
+               (self.optlevel, self.kind, filters, self.is_csi)
+
+    def __repr__(self):
+        """This provides more metainfo than standard __repr__"""
+
+        cpathname = self.table._v_pathname + ".cols." + self.column.pathname
+        retstr = """%s (Index for column %s)
+  optlevel := %s
+  kind := %s
+  filters := %s
+  nelements := %s
+  slicesize := %s
+  cardinality := %s
+  dirty := %s""" % (self._v_pathname, cpathname,
+                    self.optlevel, self.kind,
+                    self.filters, self.nelements,
+                    self.slicesize, self.cardinality,
+                    self.dirty)
+        retstr += "\n  values := %s" % self.values
+        retstr += "\n  slices := %s" % self.slices
+        retstr += "\n  codes := %s" % self.codes
+        retstr += "\n  bitmaps := %s" % self.bitmaps
+        return retstr
@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+
+########################################################################
+#
+# License: BSD
+# Created: October 17, 2026
+#
+# $Id$
+#
+########################################################################
+
+"""Here is defined the CompositeIndex class."""
+
+import math
+
+import numpy
+
+from tables.atom import StringAtom
+from tables.index import Index
+
+from tables._past import previous_api_property
+
+
+def _encode_column(arr):
+    """Encode the values in `arr` as big-endian, order-preserving bytes.
+
+    The result is an array of ``uint8`` with a row of bytes per value,
+    so that comparing rows as unsigned strings gives the same order
+    than comparing the original values.
+
+    """
+
+    dtype = arr.dtype
+    kind, size = dtype.kind, dtype.itemsize
+    if kind == 'S':
+        raw = numpy.ascontiguousarray(arr)
+    elif kind == 'b':
+        raw = arr.astype('u1')
+    elif kind == 'u':
+        raw = arr.astype('>u%d' % size)
+    elif kind == 'i':
+        # Flip the sign bit, so that negative values come first
+        bits = arr.astype('i%d' % size).view('u%d' % size)
+        signbit = numpy.array(1 << (8 * size - 1), dtype=bits.dtype)
+        raw = (bits ^ signbit).astype('>u%d' % size)
+    elif kind == 'f':
+        # Flip the sign bit of positive values, and all the bits of
+        # negative ones (their order is reversed).  Adding a zero turns
+        # negative zeros into positive ones.
+        arr = arr.astype('f%d' % size) + dtype.type(0)
+        bits = arr.view('u%d' % size)
+        signbit = numpy.array(1 << (8 * size - 1), dtype=bits.dtype)
+        mask = numpy.where(bits & signbit, ~numpy.zeros_like(bits), signbit)
+        raw = (bits ^ mask).astype('>u%d' % size)
+    else:
+        raise TypeError("columns of type ``%s`` are not supported in "
+                        "composite indexes" % dtype)
+    return raw.view('u1').reshape(len(arr), size)
+
+
+def _encode_value(value, dtype):
+    """Encode a single `value` of `dtype` as order-preserving bytes."""
+
+    return _encode_column(numpy.array([value], dtype=dtype))[0].tostring()
+
+
+def _component_bound(dtype, op, limit):
+    """Get the bound of a component in a comparison with `limit`.
+
+    `op` is one of 'lt', 'le', 'eq', 'ge' or 'gt'.  A tuple of (value,
+    inclusive) is returned, where `value` is representable in `dtype`
+    and `inclusive` tells whether `value` itself fulfills the
+    comparison.  `None` is returned if no value fulfills it.
+
+    """
+
+    lower = op in ('gt', 'ge')
+    if dtype.kind == 'S':
+        limit = limit[:dtype.itemsize + 1]
+        if len(limit) > dtype.itemsize:
+            # Values are shorter than `limit`, so they can not be equal
+            if op == 'eq':
+                return None
+            return (limit[:-1], not lower)
+        return (limit, op in ('ge', 'le', 'eq'))
+
+    if limit != limit:  # NaN
+        return None
+    if dtype.kind == 'f':
+        value = dtype.type(limit)
+    else:
+        if dtype.kind == 'b':
+            dtype = numpy.dtype('u1')
+        iinfo = numpy.iinfo(dtype)
+        if limit > iinfo.max:
+            return None if op in ('gt', 'ge', 'eq') else (iinfo.max, True)
+        if limit < iinfo.min:
+            return None if op in ('lt', 'le', 'eq') else (iinfo.min, True)
+        if lower:
+            value = int(math.ceil(limit))
+        else:
+            value = int(math.floor(limit))
+    if value == limit:
+        return (value, op in ('ge', 'le', 'eq'))
+    if op == 'eq':
+        return None
+    # The limit was rounded: the value is inside the range if it has
+    # been rounded in the direction of the range
+    return (value, (value > limit) == lower)
+
+
+def _next_key(key, direction):
+    """Get the key right after (or before if `direction` < 0) `key`.
+
+    `None` is returned when there is no such key.
+
+    """
+
+    keys = numpy.array([key]).view('u1')[::-1]
+    limit = 0xff if direction > 0 else 0x00
+    if (keys == limit).all():
+        return None
+    # Propagate the carry through the trailing limit bytes
+    ncarry = (keys != limit).argmax()
+    keys[:ncarry] = 0xff - limit
+    keys[ncarry] += 1 if direction > 0 else -1
+    return keys[::-1].tostring()
+
+
+class CompositeIndex(Index):
+    """Represents an index over the values of several columns of a table.
+
+    The values of the indexed columns in every row are packed in a
+    single key, in such a way that the order of keys is the
+    lexicographic order of the column values.  Keys are then indexed
+    like the values of a string column.  Composite indexes are used in
+    queries comparing the leading columns with equalities, and
+    optionally the next one with a range, like ``(sym == b"X") & (ts >
+    t0)`` for an index over the ``sym`` and ``ts`` columns.
+
+    This class is mainly intended for internal use, see
+    :meth:`Table.create_composite_index`.
+
+    """
+
+    _c_classid = 'COMPOSITEINDEX'
+
+    _c_classId = previous_api_property('_c_classid')
+
+    # <properties>
+    columns = property(
+        lambda self: tuple(self._v_attrs.COLUMNS), None, None,
+        "The path names of the indexed columns, in key order.")
+
+    column = property(
+        lambda self: None, None, None,
+        "Composite indexes do not belong to a single column.")
+
+    # </properties>
+
+    def __init__(self, parentnode, name, columns=None, dtypes=None,
+                 title="", new=True, **kwargs):
+        atom = None
+        if dtypes is not None:
+            atom = StringAtom(itemsize=sum(dtype.itemsize
+                                           for dtype in dtypes))
+        self._columns = columns
+        super(CompositeIndex, self).__init__(
+            parentnode, name, atom=atom, title=title, new=new, **kwargs)
+
+    def _g_post_init_hook(self):
+        if self._v_new:
+            self._v_attrs.COLUMNS = list(self._columns)
+        super(CompositeIndex, self)._g_post_init_hook()
+
+    @property
+    def dtypes(self):
+        """The data types of the indexed columns."""
+
+        table = self.table
+        return [table.coldtypes[colname] for colname in self.columns]
+
+    def pack_keys(self, arrays):
+        """Pack the values in `arrays` (one per column) in an array of keys.
+        """
+
+        keysize = self.dtype.itemsize
+        keys = numpy.empty((len(arrays[0]), keysize), dtype='u1')
+        pos = 0
+        for arr in arrays:
+            encoded = _encode_column(arr)
+            keys[:, pos:pos + encoded.shape[1]] = encoded
+            pos += encoded.shape[1]
+        return keys.view('S%d' % keysize).ravel()
+
+    def get_lookup_range(self, cmps, limits):
+        """Get the range of keys fulfilling some comparisons.
+
+        Every comparison in `cmps` is a tuple of (ncol, op), where `ncol`
+        is the position of the column in the index and `op` is one of
+        'lt', 'le', 'eq', 'ge' or 'gt', and `limits` has the value to
+        compare with for every comparison.  Columns are compared for
+        equality, except the last one which may be compared with a
+        range.  An empty tuple is returned if no key is in the range.
+
+        """
+
+        dtypes = self.dtypes
+        keysize = self.dtype.itemsize
+        lower = upper = b""
+        for (ncol, dtype) in enumerate(dtypes):
+            bounds = [_component_bound(dtype, op, limit)
+                      for ((n, op), limit) in zip(cmps, limits)
+                      if n == ncol]
+            if None in bounds:
+                return ()
+            ops = [op for (n, op) in cmps if n == ncol]
+            if ops == ['eq']:
+                value = _encode_value(bounds[0][0], dtype)
+                lower += value
+                upper += value
+                continue
+            if ops:
+                # A range in this column, the rest of columns can take
+                # any value
+                lbound = ubound = None
+                for (op, bound) in zip(ops, bounds):
+                    if op in ('gt', 'ge'):
+                        lbound = bound
+                    else:
+                        ubound = bound
+                if lbound is None and dtype.kind == 'f':
+                    lbound = (-numpy.inf, True)  # leave NaNs out
+                if ubound is None and dtype.kind == 'f':
+                    ubound = (numpy.inf, True)
+                restsize = keysize - len(lower) - dtype.itemsize
+                if lbound is not None:
+                    value, inclusive = lbound
+                    lower += _encode_value(value, dtype)
+                    if inclusive:
+                        lower += b"\x00" * restsize
+                    else:
+                        lower = _next_key(lower + b"\xff" * restsize, +1)
+                if ubound is not None:
+                    value, inclusive = ubound
+                    upper += _encode_value(value, dtype)
+                    if inclusive:
+                        upper += b"\xff" * restsize
+                    else:
+                        upper = _next_key(upper + b"\x00" * restsize, -1)
+                if lower is None or upper is None:
+                    return ()
+            break
+        # Keys are stored as strings, which lose their trailing NUL
+        # bytes, so bounds are stripped the same way to compare alike
+        lower = lower.ljust(keysize, b"\x00").rstrip(b"\x00")
+        upper = upper.ljust(keysize, b"\xff").rstrip(b"\x00")
+        if lower > upper:
+            return ()
+        return (lower, upper)
+
+    def __repr__(self):
+        """This provides more metainfo than standard __repr__"""
+
+        return """%s (Composite index for columns %s)
+  optlevel := %s
+  kind := %s
+  filters := %s
+  is_csi := %s
+  nelements := %s
+  dirty := %s""" % (self._v_pathname, ", ".join(self.columns),
+                    self.optlevel, self.kind, self.filters, self.is_csi,
+                    self.nelements, self.dirty)
@@ -27,9 +27,13 @@ Functions:
     Compile a condition and extract usable index conditions.
 `call_on_recarr`
     Evaluate a function over a structured array.
+`combine_bitwise`
+    Combine arrays with a bitwise expression.
 """
 
 import re
+from functools import reduce as _reduce
+import numpy
 from numexpr.necompiler import typecode_to_kind
 from numexpr.necompiler import expressionToAST, typeCompileAst
 from numexpr.necompiler import stringToExpression, NumExpr
@@ -304,6 +308,246 @@ def _get_idx_expr(expr, indexedcols):
     return _get_idx_expr_recurse(expr, indexedcols, [], [''])
 
 
+def _get_conjuncts(exprnode):
+    """Get the operands of the top-level ``&`` operators in `exprnode`."""
+
+    if exprnode.astType == 'op' and exprnode.value == 'and':
+        left, right = exprnode.children
+        return _get_conjuncts(left) + _get_conjuncts(right)
+    return [exprnode]
+
+
+def _get_bitmap_expr_recurse(exprnode, bitmapcols, bmexprs):
+    """Here lives the actual implementation of the get_bitmap_expr() wrapper.
+
+    Expressions in the form ``(var, (op,), (limit,))`` are appended to
+    the 'bmexprs' list for every comparison in 'exprnode', and the
+    bitwise operations combining them are returned in string format.
+    If 'exprnode' can not be fully computed from the bitmap indexes in
+    'bitmapcols', ``None`` is returned and 'bmexprs' is left untouched.
+    """
+
+    op_conv = {
+        'and': '&',
+        'or': '|',
+    }
+
+    nexprs = len(bmexprs)
+    if exprnode.astType == 'op' and exprnode.value in op_conv:
+        strexprs = []
+        for child in exprnode.children:
+            strexpr = _get_bitmap_expr_recurse(child, bitmapcols, bmexprs)
+            if strexpr is None:
+                del bmexprs[nexprs:]
+                return None
+            strexprs.append(strexpr)
+        return "(%s %s %s)" % (strexprs[0], op_conv[exprnode.value],
+                               strexprs[1])
+    if (exprnode.astType == 'op' and exprnode.value == 'invert'
+            and exprnode.children[0].astKind == 'bool'):
+        strexpr = _get_bitmap_expr_recurse(
+            exprnode.children[0], bitmapcols, bmexprs)
+        if strexpr is None:
+            return None
+        return "~%s" % strexpr
+
+    # Get the comparison, using an equality for ``!=``.
+    cmpnode, negate = exprnode, False
+    if exprnode.astType == 'op' and exprnode.value == 'ne':
+        left, right = exprnode.children
+        cmpnode, negate = (left == right), True
+    var, op, limit = _get_indexable_cmp(cmpnode, bitmapcols)
+    if var is None or op == 'invert':
+        return None
+    if negate:
+        op = 'ne'
+    bmexprs.append((var, (op,), (limit,)))
+    return "e%d" % nexprs
+
+
+def _get_bitmap_expr(expr, bitmapcols):
+    """Extract the part of `expr` computable from bitmap indexes.
+
+    The conjuncts of `expr` (the operands of its top-level ``&``
+    operators) which only involve comparisons over the bitmap indexed
+    columns in `bitmapcols`, combined with the ``&``, ``|`` and ``~``
+    operators, are selected.  Comparisons can use any of the ``<``,
+    ``<=``, ``==``, ``!=``, ``>=`` and ``>`` operators.
+
+    It returns a tuple of (bmexprs, strexpr, rest) where 'bmexprs' is a
+    list of expressions in the form ``(var, (op,), (limit,))``,
+    'strexpr' is the bitwise expression combining them in string format
+    and 'rest' is the expression node with the remaining conjuncts, or
+    ``None`` if the whole `expr` can be computed from bitmap indexes.
+    """
+
+    bmexprs, strexprs, rest = [], [], []
+    for exprnode in _get_conjuncts(expr):
+        strexpr = _get_bitmap_expr_recurse(exprnode, bitmapcols, bmexprs)
+        if strexpr is None:
+            rest.append(exprnode)
+        else:
+            strexprs.append(strexpr)
+    if not strexprs:
+        return ([], '', expr)
+    strexpr = _reduce(lambda x, y: "(%s & %s)" % (x, y), strexprs)
+    rest = _reduce(lambda x, y: x & y, rest) if rest else None
+    return (bmexprs, strexpr, rest)
+
+
+def _get_zonemap_expr_recurse(exprnode, zonemapcols, colnames, zmexprs):
+    """Here lives the actual implementation of the get_zonemap_expr() wrapper.
+
+    This works like `_get_bitmap_expr_recurse()`, but negations are not
+    supported, since zone maps only tell which chunks *may* have rows
+    fulfilling a comparison.  Comparisons with other columns are not
+    supported either, since their values change from row to row.
+    """
+
+    op_conv = {
+        'and': '&',
+        'or': '|',
+    }
+
+    nexprs = len(zmexprs)
+    if exprnode.astType == 'op' and exprnode.value in op_conv:
+        strexprs = []
+        for child in exprnode.children:
+            strexpr = _get_zonemap_expr_recurse(child, zonemapcols,
+                                                colnames, zmexprs)
+            if strexpr is None:
+                del zmexprs[nexprs:]
+                return None
+            strexprs.append(strexpr)
+        return "(%s %s %s)" % (strexprs[0], op_conv[exprnode.value],
+                               strexprs[1])
+
+    # Get the comparison, using an equality for ``!=``.
+    cmpnode, negate = exprnode, False
+    if exprnode.astType == 'op' and exprnode.value == 'ne':
+        left, right = exprnode.children
+        cmpnode, negate = (left == right), True
+    var, op, limit = _get_indexable_cmp(cmpnode, zonemapcols)
+    if var is None or op == 'invert':
+        return None
+    if isinstance(limit, tuple) and limit[0] in colnames:
+        return None
+    if negate:
+        op = 'ne'
+    zmexprs.append((var, (op,), (limit,)))
+    return "e%d" % nexprs
+
+
+def _get_zonemap_expr(expr, zonemapcols, colnames=frozenset()):
+    """Extract the part of `expr` usable for pruning with zone maps.
+
+    The conjuncts of `expr` (the operands of its top-level ``&``
+    operators) which only involve comparisons over the columns in
+    `zonemapcols`, combined with the ``&`` and ``|`` operators, are
+    selected.  Comparisons can use any of the ``<``, ``<=``, ``==``,
+    ``!=``, ``>=`` and ``>`` operators, and they are not selected when
+    the other operand is one of the columns in `colnames`.
+
+    It returns a tuple of (zmexprs, strexpr) where 'zmexprs' is a list
+    of expressions in the form ``(var, (op,), (limit,))`` and 'strexpr'
+    is the bitwise expression combining them in string format.  The
+    rows in the chunks selected by the expression are a superset of the
+    rows fulfilling `expr`.
+    """
+
+    zmexprs, strexprs = [], []
+    for exprnode in _get_conjuncts(expr):
+        strexpr = _get_zonemap_expr_recurse(exprnode, zonemapcols,
+                                            colnames, zmexprs)
+        if strexpr is not None:
+            strexprs.append(strexpr)
+    if not strexprs:
+        return ([], '')
+    strexpr = _reduce(lambda x, y: "(%s & %s)" % (x, y), strexprs)
+    return (zmexprs, strexpr)
+
+
+def _get_composite_expr(expr, composites, indexedcols):
+    """Extract the part of `expr` usable with a composite index.
+
+    `composites` is a sequence of (columns, varnames) tuples, where
+    'columns' identifies a composite index and 'varnames' has the
+    variable for every column in it (or ``None`` if the column is not
+    in `expr`).  The conjuncts of `expr` comparing the leading columns
+    of an index for equality, and optionally the next one with a range
+    (like ``(a == x) & (b > y) & (b <= z)``), are selected for the
+    index covering most conjuncts.
+
+    It returns a tuple of (compexprs, rest) where 'compexprs' is a list
+    with an expression in the form ``(columns, ((ncol, op), ...),
+    (limits), (vars))`` (or an empty list if no index can be used) and
+    'rest' is the expression node with the remaining conjuncts, or
+    ``None`` if the whole `expr` is covered by the index.
+    """
+
+    conjuncts = _get_conjuncts(expr)
+    compvars = frozenset(var for (columns, varnames) in composites
+                         for var in varnames if var is not None)
+    cmps = []
+    for exprnode in conjuncts:
+        var, op, limit = _get_indexable_cmp(exprnode, compvars)
+        if var is None or op == 'invert':
+            cmps.append(None)
+        else:
+            cmps.append((var, op, limit))
+
+    best = None
+    for (columns, varnames) in composites:
+        used = []  # (conjunct, column) pairs
+        for (ncol, var) in enumerate(varnames):
+            found = [i for (i, cmp_) in enumerate(cmps)
+                     if cmp_ is not None and cmp_[0] == var]
+            equals = [i for i in found if cmps[i][1] == 'eq']
+            if equals:
+                used.append((equals[0], ncol))
+                continue
+            for ops in (('gt', 'ge'), ('lt', 'le')):
+                bounds = [i for i in found if cmps[i][1] in ops]
+                if bounds:
+                    used.append((bounds[0], ncol))
+            break
+        # A single comparison is better served by the column index
+        if len(used) == 1 and cmps[used[0][0]][0] in indexedcols:
+            continue
+        if used and (best is None or len(used) > len(best[1])):
+            best = (columns, used)
+    if best is None:
+        return ([], expr)
+
+    columns, used = best
+    compexpr = (columns,
+                tuple((ncol, cmps[i][1]) for (i, ncol) in used),
+                tuple(cmps[i][2] for (i, ncol) in used),
+                tuple(cmps[i][0] for (i, ncol) in used))
+    positions = [i for (i, ncol) in used]
+    rest = [exprnode for (i, exprnode) in enumerate(conjuncts)
+            if i not in positions]
+    rest = _reduce(lambda x, y: x & y, rest) if rest else None
+    return ([compexpr], rest)
+
+
+def _replace_limit_vars(exprs, condvars):
+    """Replace the limit variables in `exprs` with their values."""
+
+    exprs2 = []
+    for expr in exprs:
+        idxlims = expr[2]  # the limits are in third place
+        limit_values = []
+        for idxlim in idxlims:
+            if isinstance(idxlim, tuple):  # variable
+                idxlim = condvars[idxlim[0]]  # look up value
+                idxlim = idxlim.tolist()  # convert back to Python
+            limit_values.append(idxlim)
+        # Add this replaced entry to the new exprs2
+        exprs2.append(expr[:2] + (tuple(limit_values),) + expr[3:])
+    return exprs2
+
+
 class CompiledCondition(object):
     """Container for a compiled condition."""
 
@@ -313,15 +557,19 @@ class CompiledCondition(object):
     def index_variables(self):
         """The columns participating in the index expression."""
 
-        idxexprs = self.index_expressions
+        idxexprs = self.index_expressions + self.bitmap_expressions
         idxvars = []
         for expr in idxexprs:
             idxvar = expr[0]
             if idxvar not in idxvars:
                 idxvars.append(idxvar)
+        for expr in self.composite_expressions:
+            idxvars.extend(expr[3])  # the variables are in fourth place
         return frozenset(idxvars)
 
-    def __init__(self, func, params, idxexprs, strexpr):
+    def __init__(self, func, params, idxexprs, strexpr,
+                 bmexprs=None, bmstrexpr='', compexprs=None, exact=False,
+                 zmexprs=None, zmstrexpr=''):
         self.function = func
         """The compiled function object corresponding to this condition."""
         self.parameters = params
@@ -330,11 +578,33 @@ class CompiledCondition(object):
         """A list of expressions in the form ``(var, (ops), (limits))``."""
         self.string_expression = strexpr
         """The indexable expression in string format."""
+        self.bitmap_expressions = bmexprs or []
+        """A list of expressions over bitmap indexes in the form
+        ``(var, (op,), (limit,))``."""
+        self.bitmap_string_expression = bmstrexpr
+        """The bitwise expression combining bitmap expressions in string
+        format."""
+        self.composite_expressions = compexprs or []
+        """A list of expressions over composite indexes in the form
+        ``(columns, ((ncol, op), ...), (limits), (vars))``, which are
+        and'ed with the rest of the condition."""
+        self.exact = exact
+        """Whether the index, bitmap and composite expressions are the
+        whole condition."""
+        self.zonemap_expressions = zmexprs or []
+        """A list of expressions over zone maps in the form ``(var,
+        (op,), (limit,))``."""
+        self.zonemap_string_expression = zmstrexpr
+        """The bitwise expression combining zone map expressions in
+        string format."""
 
     def __repr__(self):
-        return ("idxexprs: %s\nstrexpr: %s\nidxvars: %s"
+        return ("idxexprs: %s\nstrexpr: %s\nbmexprs: %s\nbmstrexpr: %s\n"
+                "compexprs: %s\nzmexprs: %s\nzmstrexpr: %s\nidxvars: %s"
                 % (self.index_expressions, self.string_expression,
-                   self.index_variables))
+                   self.bitmap_expressions, self.bitmap_string_expression,
+                   self.composite_expressions, self.zonemap_expressions,
+                   self.zonemap_string_expression, self.index_variables))
 
     def with_replaced_vars(self, condvars):
         """Replace index limit variables with their values in-place.
@@ -343,22 +613,16 @@ class CompiledCondition(object):
         the `condvars` mapping and converted to Python scalars.
         """
 
-        exprs = self.index_expressions
-        exprs2 = []
-        for expr in exprs:
-            idxlims = expr[2]  # the limits are in third place
-            limit_values = []
-            for idxlim in idxlims:
-                if isinstance(idxlim, tuple):  # variable
-                    idxlim = condvars[idxlim[0]]  # look up value
-                    idxlim = idxlim.tolist()  # convert back to Python
-                limit_values.append(idxlim)
-            # Add this replaced entry to the new exprs2
-            var, ops, _ = expr
-            exprs2.append((var, ops, tuple(limit_values)))
+        exprs2 = _replace_limit_vars(self.index_expressions, condvars)
+        bmexprs2 = _replace_limit_vars(self.bitmap_expressions, condvars)
+        compexprs2 = _replace_limit_vars(self.composite_expressions,
+                                         condvars)
+        zmexprs2 = _replace_limit_vars(self.zonemap_expressions, condvars)
         # Create a new container for the converted values
         newcc = CompiledCondition(
-            self.function, self.parameters, exprs2, self.string_expression)
+            self.function, self.parameters, exprs2, self.string_expression,
+            bmexprs2, self.bitmap_string_expression, compexprs2, self.exact,
+            zmexprs2, self.zonemap_string_expression)
         return newcc
 
 
@@ -376,13 +640,23 @@ def _get_variable_names(expression):
     return list(set(names))  # remove repeated names
 
 
-def compile_condition(condition, typemap, indexedcols):
+def compile_condition(condition, typemap, indexedcols,
+                      bitmapcols=frozenset(), composites=(),
+                      zonemapcols=frozenset(), colnames=frozenset()):
     """Compile a condition and extract usable index conditions.
 
     Looks for variable-constant comparisons in the `condition` string
     involving the indexed columns whose variable names appear in
     `indexedcols`.  The part of `condition` having usable indexes is
     returned as a compiled condition in a `CompiledCondition` container.
+    The conjuncts of `condition` that can be computed from the bitmap
+    indexes of the columns in `bitmapcols` are kept apart as bitmap
+    expressions, and so are the ones usable with one of the composite
+    indexes in `composites` (see `_get_composite_expr()`).  The
+    comparisons over the columns in `zonemapcols` are also extracted
+    from the whole `condition` as zone map expressions, leaving out the
+    comparisons with the columns in `colnames` (see
+    `_get_zonemap_expr()`).
 
     Expressions such as '0 < c1 <= 1' do not work as expected.  The
     Numexpr types of *all* variables must be given in the `typemap`
@@ -397,7 +671,23 @@ def compile_condition(condition, typemap, indexedcols):
     if expr.astKind != 'bool':
         raise TypeError("condition ``%s`` does not have a boolean type"
                         % condition)
-    idxexprs = _get_idx_expr(expr, indexedcols)
+    if composites:
+        compexprs, rest = _get_composite_expr(expr, composites, indexedcols)
+    else:
+        compexprs, rest = [], expr
+    bmexprs, bmstrexpr = [], ''
+    if bitmapcols:
+        if rest is not None:
+            bmexprs, bmstrexpr, rest = _get_bitmap_expr(rest, bitmapcols)
+        indexedcols = indexedcols - bitmapcols
+    if rest is not None:
+        idxexprs = _get_idx_expr(rest, indexedcols)
+    else:
+        idxexprs = ([], [''])
+    # The index expressions cover the whole condition when it is made
+    # of bitmap and composite expressions only, or of a single
+    # indexable comparison
+    exact = rest is None or (rest is expr and isinstance(idxexprs, list))
     # Post-process the answer
     if isinstance(idxexprs, list):
         # Simple expression
@@ -408,6 +698,12 @@ def compile_condition(condition, typemap, indexedcols):
     # Get rid of the unneccessary list wrapper for strexpr
     strexpr = strexpr[0]
 
+    if zonemapcols:
+        zmexprs, zmstrexpr = _get_zonemap_expr(expr, zonemapcols,
+                                               colnames)
+    else:
+        zmexprs, zmstrexpr = [], ''
+
     # Get the variable names used in the condition.
     # At the same time, build its signature.
     varnames = _get_variable_names(expr)
@@ -423,7 +719,9 @@ def compile_condition(condition, typemap, indexedcols):
     params = varnames
 
     # This is more comfortable to handle about than a tuple.
-    return CompiledCondition(func, params, idxexprs, strexpr)
+    return CompiledCondition(func, params, idxexprs, strexpr,
+                             bmexprs, bmstrexpr, compexprs, exact,
+                             zmexprs, zmstrexpr)
 
 
 def call_on_recarr(func, params, recarr, param2arg=None):
@@ -445,3 +743,28 @@ def call_on_recarr(func, params, recarr, param2arg=None):
             arg = get_nested_field(recarr, arg.pathname)
         args.append(arg)
     return func(*args)
+
+
+def combine_bitwise(strexpr, arrays):
+    """Combine `arrays` as told by the bitwise expression `strexpr`.
+
+    The expression is made of the names of the arrays in the `arrays`
+    mapping and the ``&``, ``|`` and ``~`` operators, like the bitwise
+    expressions of a `CompiledCondition`.  Unlike with Numexpr, the
+    arrays can be of any integer type (e.g. the bytes of bitmaps).
+    """
+
+    functions = {
+        'and': numpy.bitwise_and,
+        'or': numpy.bitwise_or,
+        'invert': numpy.invert,
+    }
+
+    def combine(node):
+        if node.astType == 'variable':
+            return arrays[node.value]
+        return functions[node.value](*[combine(child)
+                                       for child in node.children])
+
+    typemap = dict((name, bool) for name in arrays)
+    return combine(stringToExpression(strexpr, typemap, {}))
@@ -338,11 +338,13 @@ cdef extern from "hdf5.h" nogil:
 
   # Operations defined on string data types
   htri_t H5Tis_variable_str(hid_t dtype_id)
+  htri_t H5Tequal(hid_t type_id1, hid_t type_id2)
 
   # Operations for compound data types
   int    H5Tget_nmembers(hid_t type_id)
   char  *H5Tget_member_name(hid_t type_id, unsigned membno)
   hid_t  H5Tget_member_type(hid_t type_id, unsigned membno)
+  int    H5Tget_member_index(hid_t type_id, char *field_name)
   hid_t  H5Tget_native_type(hid_t type_id, H5T_direction_t direction)
   herr_t H5Tget_member_value(hid_t type_id, int membno, void *value)
   int    H5Tget_offset(hid_t type_id)
@@ -482,6 +484,8 @@ cdef extern from "utils.h" nogil:
 
 cdef extern from "utils.h":
   object Giterate(hid_t parent_id, hid_t loc_id, char *name)
+  object Gnames(hid_t loc_id)
+  object Gvisit(hid_t loc_id)
   object Aiterate(hid_t loc_id)
   object H5UIget_info(hid_t loc_id, char *name, char *byteorder)
 
@@ -17,8 +17,6 @@ import warnings
 
 import numpy as np
 import tables as tb
-from numexpr.necompiler import getContext, getExprNames, getType, NumExpr
-from numexpr.expressions import functions as numexpr_functions
 from tables.utilsextension import get_indices
 from tables.exceptions import PerformanceWarning
 from tables.parameters import IO_BUFFER_SIZE, BUFFER_TIMES
@@ -140,6 +138,9 @@ class Expr(object):
     """
 
     def __init__(self, expr, uservars=None, **kwargs):
+        # Numexpr is only imported when needed, since it takes a while
+        from numexpr.necompiler import (getContext, getExprNames, getType,
+                                        NumExpr)
 
         self.append_mode = False
         """The append mode for user-provided output containers."""
@@ -253,6 +254,8 @@ class Expr(object):
 
         """
 
+        from numexpr.expressions import functions as numexpr_functions
+
         # Get the names of variables used in the expression.
         exprvars_cache = self._exprvars_cache
         if not expression in exprvars_cache:
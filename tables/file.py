@@ -24,8 +24,8 @@ import sys
 import time
 import weakref
 import warnings
+import collections
 
-import numexpr
 import numpy
 
 import tables.misc.proxydict
@@ -35,7 +35,7 @@ from tables import parameters
 from tables.exceptions import (ClosedFileError, FileModeError, NodeError,
                                NoSuchNodeError, UndoRedoError,
                                PerformanceWarning)
-from tables.registry import get_class_by_name
+from tables.registry import get_class_by_name, class_id_dict
 from tables.path import join_path, split_path
 from tables import undoredo
 from tables.description import (IsDescription, UInt8Col, StringCol,
@@ -49,14 +49,15 @@ from tables.array import Array
 from tables.carray import CArray
 from tables.earray import EArray
 from tables.vlarray import VLArray
-from tables.table import Table
+from tables.table import Table, _close_query_pools
 from tables import linkextension
-from tables.utils import detect_number_of_cores
+from tables.utils import detect_number_of_cores, PhaseTimer
 from tables import lrucacheextension
 from tables.flavor import flavor_of, array_as_internal
 from tables.atom import Atom
 
 from tables.link import SoftLink, ExternalLink
+from tables.unimplemented import UnImplemented, Unknown
 
 from tables._past import previous_api, previous_api_property
 
@@ -84,6 +85,10 @@ compatible_formats = []  # Old format versions we can read
 # Dict of opened files (keys are filenames and values filehandlers)
 _open_files = {}
 
+NodeInfo = collections.namedtuple(
+    'NodeInfo', 'pathname classname shape dtype chunkshape filters')
+"""Metadata about a node, as returned by :meth:`File.walk_node_info`."""
+
 # Opcodes for do-undo actions
 _op_to_code = {
     "MARK": 0,
@@ -490,6 +495,15 @@ class File(hdf5extension.File, object):
         lambda self: self._open_count, None, None,
         "The number of times this file has been opened currently.")
 
+    node_cache_hits = property(
+        lambda self: self._node_cache_hits, None, None,
+        """The number of node lookups served by the node cache (i.e. with
+        the node alive or dead in memory).""")
+
+    node_cache_misses = property(
+        lambda self: self._node_cache_misses, None, None,
+        "The number of node lookups which had to load the node from disk.")
+
     ## </properties>
 
     def __init__(self, filename, mode="r", title="",
@@ -521,6 +535,9 @@ class File(hdf5extension.File, object):
         if params['MAX_BLOSC_THREADS'] is None:
             params['MAX_BLOSC_THREADS'] = detect_number_of_cores()
 
+        if params['MAX_INDEX_THREADS'] is None:
+            params['MAX_INDEX_THREADS'] = detect_number_of_cores()
+
         self.params = params
 
         # Now, it is time to initialize the File extension
@@ -533,6 +550,11 @@ class File(hdf5extension.File, object):
             self.format_version = format_version
             """The PyTables version number of this file."""
 
+        # Threads working on this file (see `IndexBuild`) hold this lock
+        # while they use the node cache or do I/O on tables.  It only
+        # becomes a real lock while some of those threads are running.
+        self._lock = utilsextension.NoLock()
+
         # Nodes referenced by a variable are kept in `_aliveNodes`.
         # When they are no longer referenced, they move themselves
         # to `_deadNodes`, where they are kept until they are referenced again
@@ -543,6 +565,12 @@ class File(hdf5extension.File, object):
             self._deadNodes = _DeadNodes(nodeCacheSlots)
         else:
             self._deadNodes = _NoDeadNodes()
+        self._node_cache_hits = 0
+        self._node_cache_misses = 0
+        # The timer of query phases (see `timing()`)
+        self._timer = None
+        # The indexes being built in the background (see `IndexBuild`)
+        self._index_builds = []
 
         # For the moment Undo/Redo is not enabled.
         self._undoEnabled = False
@@ -578,8 +606,12 @@ class File(hdf5extension.File, object):
             # It does. Enable the undo.
             self.enable_undo()
 
-        # Set the maximum number of threads for Numexpr
-        numexpr.set_vml_num_threads(params['MAX_NUMEXPR_THREADS'])
+        # Set the maximum number of threads for Numexpr.  It is only
+        # imported on demand, so if it is not loaded yet, this is done
+        # when compiling the first condition of a table in this file.
+        if 'numexpr' in sys.modules:
+            numexpr = sys.modules['numexpr']
+            numexpr.set_vml_num_threads(params['MAX_NUMEXPR_THREADS'])
 
     def __get_root_group(self, root_uep, title, filters):
         """Returns a Group instance which will act as the root group
@@ -1221,7 +1253,7 @@ class File(hdf5extension.File, object):
         parentnode = self._get_or_create_path(where, createparents)
         linkextension._g_create_hard_link(parentnode, name, targetnode)
         # Refresh children names in link's parent node
-        parentnode._g_add_children_names()
+        parentnode._g_reset_children()
         # Return the target node
         return self.get_node(parentnode, name)
 
@@ -1249,7 +1281,7 @@ class File(hdf5extension.File, object):
         parentnode = self._get_or_create_path(where, createparents)
         slink = SoftLink(parentnode, name, target)
         # Refresh children names in link's parent node
-        parentnode._g_add_children_names()
+        parentnode._g_reset_children()
         return slink
 
     createSoftLink = previous_api(create_soft_link)
@@ -1279,7 +1311,7 @@ class File(hdf5extension.File, object):
         parentnode = self._get_or_create_path(where, createparents)
         elink = ExternalLink(parentnode, name, target)
         # Refresh children names in link's parent node
-        parentnode._g_add_children_names()
+        parentnode._g_reset_children()
         return elink
 
     createExternalLink = previous_api(create_external_link)
@@ -1292,25 +1324,29 @@ class File(hdf5extension.File, object):
         if nodePath == '/':
             return self.root
 
-        aliveNodes = self._aliveNodes
-        deadNodes = self._deadNodes
-
-        if nodePath in aliveNodes:
-            # The parent node is in memory and alive, so get it.
-            node = aliveNodes[nodePath]
-            assert node is not None, \
-                "stale weak reference to dead node ``%s``" % nodePath
-            return node
-        if nodePath in deadNodes:
-            # The parent node is in memory but dead, so revive it.
-            node = self._revivenode(nodePath)
+        with self._lock:
+            aliveNodes = self._aliveNodes
+            deadNodes = self._deadNodes
+
+            if nodePath in aliveNodes:
+                # The parent node is in memory and alive, so get it.
+                node = aliveNodes[nodePath]
+                assert node is not None, \
+                    "stale weak reference to dead node ``%s``" % nodePath
+                self._node_cache_hits += 1
+                return node
+            if nodePath in deadNodes:
+                # The parent node is in memory but dead, so revive it.
+                node = self._revivenode(nodePath)
+                self._node_cache_hits += 1
+                return node
+
+            # The node has not been found in alive or dead nodes.
+            # Open it directly from disk.
+            self._node_cache_misses += 1
+            node = self.root._g_load_child(nodePath)
             return node
 
-        # The node has not been found in alive or dead nodes.
-        # Open it directly from disk.
-        node = self.root._g_load_child(nodePath)
-        return node
-
     _getNode = previous_api(_get_node)
 
     def get_node(self, where, name=None, classname=None):
@@ -1880,6 +1916,162 @@ class File(hdf5extension.File, object):
 
     walkGroups = previous_api(walk_groups)
 
+    def walk_node_info(self, where="/", classname=None):
+        """Recursively iterate over metadata about nodes hanging from where.
+
+        This works like :meth:`File.walk_nodes`, but instead of nodes, it
+        yields light records with the main metadata of every node, which
+        is read in a single pass over the HDF5 hierarchy.  Node objects
+        (and their attribute sets) are never built, so this is much faster
+        for scanning the contents of files.
+
+        The records are named tuples with the following fields:
+
+        * ``pathname``: the path name of the node.
+        * ``classname``: the name of the class that would be used for the
+          node (e.g. ``'Table'``, ``'EArray'`` or ``'Group'``).
+        * ``shape``, ``dtype`` and ``chunkshape``: the shape, NumPy data
+          type and chunkshape of the leaf.  The dtype is the one of rows
+          in tables and of the base atom in variable length arrays.
+        * ``filters``: the :class:`Filters` of the leaf.
+
+        The last four fields are ``None`` for groups and links, like the
+        chunkshape of leaves which are not chunked, or the dtype of leaves
+        with unsupported types.  The where group is listed first, and
+        then the rest of nodes in preorder, sorted by name.  If
+        classname is supplied, only the nodes of that class (or
+        subclasses of it) are listed.
+
+        .. versionadded:: 3.1
+
+        """
+
+        group = self.get_node(where)  # Does the parent exist?
+        self._check_group(group)  # Is it a group?
+        class_ = get_class_by_name(classname)
+        sysattrs = self.params['PYTABLES_SYS_ATTRS']
+
+        if isinstance(group, class_):
+            yield NodeInfo(group._v_pathname, group.__class__.__name__,
+                           None, None, None, None)
+        for (path, kind, classid, shape, dtype, chunkshape,
+             filters) in group._g_walk_info(sysattrs):
+            if kind == 'Group':
+                childclass = class_id_dict.get(classid, Group)
+            elif kind == 'Leaf':
+                childclass = class_id_dict.get(classid, UnImplemented)
+                filters = Filters._from_filter_names(filters)
+            elif kind == 'SoftLink':
+                childclass = SoftLink
+            elif kind == 'ExternalLink':
+                childclass = ExternalLink
+            else:
+                childclass = Unknown
+            if issubclass(childclass, class_):
+                yield NodeInfo(join_path(group._v_pathname, path),
+                               childclass.__name__, shape, dtype,
+                               chunkshape, filters)
+
+    def get_cache_stats(self):
+        """Get statistics about the caches used by this file.
+
+        The result is a dictionary with the following keys:
+
+        * ``'nodes'``: the statistics of the node cache, a dictionary
+          with the number of node lookups served from memory (``'hits'``)
+          and from disk (``'misses'``), the number of nodes alive
+          (``'nalive'``) and kept in the cache of unreferenced nodes
+          (``'ndead'``), and the size of the latter (``'nslots'``).
+        * ``'tables'``: a dictionary mapping the path of every table in
+          memory to the statistics of its caches of chunks
+          (``'chunks'``) and row sequences (``'sequences'``).
+        * ``'indexes'``: a dictionary mapping the path of every index in
+          memory to the statistics of its caches of bounds
+          (``'bounds'``), sorted values (``'sorted'``), query limits
+          (``'limbounds'``) and last row chunks (``'last row'``).
+        * ``'shared'``: the statistics of the cache shared by the whole
+          process (see :data:`parameters.GLOBAL_CACHE_SIZE`).
+
+        Statistics of tables and indexes are dictionaries with the name
+        of the cache (``'name'``), its number of slots (``'nslots'``) and
+        of entries (``'nentries'``), the bytes taken by its data
+        (``'size'``), the number of lookups that found (``'hits'``) or
+        missed (``'misses'``) the data, the number of entries replaced to
+        make room for others (``'evictions'``) and whether the cache is
+        disabled because of a low hit ratio (``'disabled'``).  Only the
+        nodes already in memory are reported, and only the caches that
+        some query has used.
+
+        .. versionadded:: 3.1
+
+        """
+
+        from tables.index import Index
+
+        self._check_open()
+        nodes = []
+        for path in self._aliveNodes:
+            node = self._aliveNodes[path]
+            if node is not None:
+                nodes.append(node)
+        nodes.extend(self._deadNodes[path] for path in self._deadNodes)
+
+        tables = {}
+        indexes = {}
+        for node in nodes:
+            if isinstance(node, Table):
+                stats = node._get_cache_stats()
+                if stats:
+                    tables[node._v_pathname] = stats
+            elif isinstance(node, Index):
+                stats = node._get_cache_stats()
+                if stats:
+                    indexes[node._v_pathname] = stats
+
+        return {
+            'nodes': {
+                'hits': self._node_cache_hits,
+                'misses': self._node_cache_misses,
+                'nalive': len(self._aliveNodes),
+                'ndead': len(self._deadNodes),
+                'nslots': self.params['NODE_CACHE_SLOTS'],
+            },
+            'tables': tables,
+            'indexes': indexes,
+            'shared': lrucacheextension.shared_cache.stats(),
+        }
+
+    def timing(self):
+        """Time the phases of the queries done inside a ``with`` block.
+
+        This returns a context manager, which is also the object
+        collecting the timings.  While active, the time spent in the
+        following phases of queries over the tables of this file is
+        accumulated:
+
+        * ``'compile'``: compiling the conditions.
+        * ``'search'``: looking up the query limits in indexes.
+        * ``'chunkmap'``: building the map of table chunks selected by
+          indexes.
+        * ``'iterate'``: iterating over the rows selected by queries
+          (including reading and checking the rows).
+
+        When the block ends, the ``times`` attribute of the manager is a
+        dictionary with the total time (in seconds) of every phase, and
+        ``counts`` has the number of times that every phase was entered
+        (or the number of rows produced, for ``'iterate'``).  For
+        instance::
+
+            with h5file.timing() as timer:
+                rows = table.read_where('(c1 > 0) & (c2 < 10)')
+            print(timer.times)
+
+        .. versionadded:: 3.1
+
+        """
+
+        return PhaseTimer(self)
+
     def _check_open(self):
         """Check the state of the file.
 
@@ -2477,6 +2669,10 @@ class File(hdf5extension.File, object):
 
         filename = self.filename
 
+        # Put in place the indexes being built in the background
+        for build in list(self._index_builds):
+            build._close()
+
         if self._undoEnabled and self._iswritable():
             # Save the current mark and current action
             self._actionlog.attrs._g__setattr("CURMARK", self._curmark)
@@ -2588,12 +2784,13 @@ class File(hdf5extension.File, object):
 
         if nodePath != '/':
             # The root group does not participate in alive/dead stuff.
-            aliveNodes = self._aliveNodes
-            assert nodePath not in aliveNodes, \
-                "file already has a node with path ``%s``" % nodePath
+            with self._lock:
+                aliveNodes = self._aliveNodes
+                assert nodePath not in aliveNodes, \
+                    "file already has a node with path ``%s``" % nodePath
 
-            # Add the node to the set of referenced ones.
-            aliveNodes[nodePath] = node
+                # Add the node to the set of referenced ones.
+                aliveNodes[nodePath] = node
 
     _refNode = previous_api(_refnode)
 
@@ -2602,12 +2799,13 @@ class File(hdf5extension.File, object):
 
         if nodePath != '/':
             # The root group does not participate in alive/dead stuff.
-            aliveNodes = self._aliveNodes
-            assert nodePath in aliveNodes, \
-                "file does not have a node with path ``%s``" % nodePath
+            with self._lock:
+                aliveNodes = self._aliveNodes
+                assert nodePath in aliveNodes, \
+                    "file does not have a node with path ``%s``" % nodePath
 
-            # Remove the node from the set of referenced ones.
-            del aliveNodes[nodePath]
+                # Remove the node from the set of referenced ones.
+                del aliveNodes[nodePath]
 
     _unrefNode = previous_api(_unrefnode)
 
@@ -2625,14 +2823,17 @@ class File(hdf5extension.File, object):
 
         node._g_pre_kill_hook()
 
-        # Remove all references to the node.
-        self._unrefnode(nodePath)
-        # Save the dead node in the limbo.
-        if self._aliveNodes.hasdeadnodes:
-            self._deadNodes[nodePath] = node
-        else:
+        with self._lock:
+            # Remove all references to the node.
+            self._unrefnode(nodePath)
+            # Save the dead node in the limbo.
+            hasdeadnodes = self._aliveNodes.hasdeadnodes
+            if hasdeadnodes:
+                self._deadNodes[nodePath] = node
+        if not hasdeadnodes:
             # We have not a cache for dead nodes,
-            # so follow the usual deletion procedure.
+            # so follow the usual deletion procedure (out of the lock,
+            # since closing a table may wait for other threads).
             node._v__deleting = True
             node._f_close()
 
@@ -2649,10 +2850,11 @@ class File(hdf5extension.File, object):
         assert nodePath in self._deadNodes, \
             "trying to revive non-dead node ``%s``" % nodePath
 
-        # Take the node out of the limbo.
-        node = self._deadNodes.pop(nodePath)
-        # Make references to the node.
-        self._refnode(node, nodePath)
+        with self._lock:
+            # Take the node out of the limbo.
+            node = self._deadNodes.pop(nodePath)
+            # Make references to the node.
+            self._refnode(node, nodePath)
 
         node._g_post_revive_hook()
 
@@ -2697,6 +2899,8 @@ def close_open_files():
 
 import atexit
 atexit.register(close_open_files)
+# Do not leave the worker processes of parallel queries behind.
+atexit.register(_close_query_pools)
 
 
 ## Local Variables:
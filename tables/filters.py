@@ -143,6 +143,11 @@ class Filters(object):
         parent = leaf._v_parent
         filtersDict = utilsextension.get_filters(parent._v_objectid,
                                                  leaf._v_name)
+        return class_._from_filter_names(filtersDict)
+
+    @classmethod
+    def _from_filter_names(class_, filtersDict):
+        # Build the instance from a dictionary with all the filters
         if filtersDict is None:
             filtersDict = {}  # not chunked
 
@@ -161,10 +161,12 @@ class Group(hdf5extension.Group, Node):
     _c_classId = previous_api_property('_c_classid')
 
     # Children containers that should be loaded only in a lazy way.
-    # These are documented in the ``Group._g_add_children_names`` method.
-    _c_lazy_children_attrs = (
-        '__members__', '_v_children', '_v_groups', '_v_leaves',
-        '_v_links', '_v_unknown', '_v_hidden')
+    # These are documented in the ``Group._g_add_children_names`` and
+    # ``Group._g_add_children_kinds`` methods.  Getting the kind of
+    # children is much more expensive than just listing their names.
+    _c_lazy_names_attrs = ('__members__', '_v_children', '_v_hidden')
+    _c_lazy_kinds_attrs = ('_v_groups', '_v_leaves', '_v_links', '_v_unknown')
+    _c_lazy_children_attrs = _c_lazy_names_attrs + _c_lazy_kinds_attrs
 
     # <properties>
 
@@ -279,12 +281,10 @@ class Group(hdf5extension.Group, Node):
             # (that Python cancelled just before calling this method) so
             # that they are still usable if the object is revived later.
             selfref = weakref.ref(self)
-            self._v_children.containerref = selfref
-            self._v_groups.containerref = selfref
-            self._v_leaves.containerref = selfref
-            self._v_links.containerref = selfref
-            self._v_unknown.containerref = selfref
-            self._v_hidden.containerref = selfref
+            mydict = self.__dict__
+            for attrname in self._c_lazy_children_attrs:
+                if attrname in mydict and attrname != '__members__':
+                    mydict[attrname].containerref = selfref
 
         super(Group, self).__del__()
 
@@ -348,7 +348,10 @@ class Group(hdf5extension.Group, Node):
 
     def _g_add_children_names(self):
         """Add children names to this group taking into account their
-        visibility and kind.
+        visibility.
+
+        Only the names of the children are listed, so this takes linear
+        time and does not need to read the children from disk.
 
         """
 
@@ -360,6 +363,27 @@ class Group(hdf5extension.Group, Node):
         """
         mydict['_v_children'] = children = _ChildrenDict(self)
         """The number of children hanging from this group."""
+        mydict['_v_hidden'] = hidden = _ChildrenDict(self)
+        """Dictionary with all hidden nodes hanging from this group."""
+
+        # Separate names into visible and hidden nodes.
+        # (Assigned values are entirely irrelevant.)
+        for childname in self._g_list_names():
+            # See whether the name implies that the node is hidden.
+            if isvisiblename(childname):
+                members.append(childname)
+            else:
+                hidden[childname] = None
+        children.update(dict.fromkeys(members))
+
+    _g_addChildrenNames = previous_api(_g_add_children_names)
+
+    def _g_add_children_kinds(self):
+        """Add visible children names to this group by their kind."""
+
+        mydict = self.__dict__
+
+        # The names of the lazy attributes
         mydict['_v_groups'] = groups = _ChildrenDict(self)
         """Dictionary with all groups hanging from this group."""
         mydict['_v_leaves'] = leaves = _ChildrenDict(self)
@@ -368,33 +392,25 @@ class Group(hdf5extension.Group, Node):
         """Dictionary with all links hanging from this group."""
         mydict['_v_unknown'] = unknown = _ChildrenDict(self)
         """Dictionary with all unknown nodes hanging from this group."""
-        mydict['_v_hidden'] = hidden = _ChildrenDict(self)
-        """Dictionary with all hidden nodes hanging from this group."""
 
         # Get the names of *all* child groups and leaves.
         (group_names, leaf_names, link_names, unknown_names) = \
             self._g_list_group(self._v_parent)
 
-        # Separate groups into visible groups and hidden nodes,
-        # and leaves into visible leaves and hidden nodes.
         for (childnames, childdict) in ((group_names, groups),
                                         (leaf_names, leaves),
                                         (link_names, links),
                                         (unknown_names, unknown)):
+            childdict.update(dict.fromkeys(
+                [childname for childname in childnames
+                 if isvisiblename(childname)]))
 
-            for childname in childnames:
-                # See whether the name implies that the node is hidden.
-                # (Assigned values are entirely irrelevant.)
-                if isvisiblename(childname):
-                    # Visible node.
-                    members.insert(0, childname)
-                    children[childname] = None
-                    childdict[childname] = None
-                else:
-                    # Hidden node.
-                    hidden[childname] = None
+    def _g_reset_children(self):
+        """Forget the names of children, so that they are listed again."""
 
-    _g_addChildrenNames = previous_api(_g_add_children_names)
+        mydict = self.__dict__
+        for attrname in self._c_lazy_children_attrs:
+            mydict.pop(attrname, None)
 
     def _g_check_has_child(self, name):
         """Check whether 'name' is a children of 'self' and return its type."""
@@ -548,16 +564,18 @@ be ready to see PyTables asking for *lots* of memory and possibly slow I/O."""
         # (Assigned values are entirely irrelevant.)
         if isvisiblename(childname):
             # Visible node.
-            self.__members__.insert(0, childname)  # enable completion
+            self.__members__.append(childname)  # enable completion
             self._v_children[childname] = None  # insert node
-            if isinstance(childnode, Unknown):
-                self._v_unknown[childname] = None
-            elif isinstance(childnode, Link):
-                self._v_links[childname] = None
-            elif isinstance(childnode, Leaf):
-                self._v_leaves[childname] = None
-            elif isinstance(childnode, Group):
-                self._v_groups[childname] = None
+            # Children kinds are only updated if already loaded
+            if '_v_groups' in self.__dict__:
+                if isinstance(childnode, Unknown):
+                    self._v_unknown[childname] = None
+                elif isinstance(childnode, Link):
+                    self._v_links[childname] = None
+                elif isinstance(childnode, Leaf):
+                    self._v_leaves[childname] = None
+                elif isinstance(childnode, Group):
+                    self._v_groups[childname] = None
         else:
             # Hidden node.
             self._v_hidden[childname] = None  # insert node
@@ -577,21 +595,20 @@ be ready to see PyTables asking for *lots* of memory and possibly slow I/O."""
                 % (self._v_pathname, childname))
 
         # Update members information, if needed
-        if '_v_children' in self.__dict__:
+        mydict = self.__dict__
+        if '_v_children' in mydict:
             if childname in self._v_children:
                 # Visible node.
-                members = self.__members__
-                memberIndex = members.index(childname)
-                del members[memberIndex]  # disables completion
-
+                self.__members__.remove(childname)  # disables completion
                 del self._v_children[childname]  # remove node
-                self._v_unknown.pop(childname, None)
-                self._v_links.pop(childname, None)
-                self._v_leaves.pop(childname, None)
-                self._v_groups.pop(childname, None)
             else:
                 # Hidden node.
                 del self._v_hidden[childname]  # remove node
+        if '_v_groups' in mydict:
+            self._v_unknown.pop(childname, None)
+            self._v_links.pop(childname, None)
+            self._v_leaves.pop(childname, None)
+            self._v_groups.pop(childname, None)
 
     _g_unrefNode = previous_api(_g_unrefnode)
 
@@ -807,9 +824,12 @@ be ready to see PyTables asking for *lots* of memory and possibly slow I/O."""
         mydict = self.__dict__
         if name in mydict:
             return mydict[name]
-        elif name in self._c_lazy_children_attrs:
+        elif name in self._c_lazy_names_attrs:
             self._g_add_children_names()
             return mydict[name]
+        elif name in self._c_lazy_kinds_attrs:
+            self._g_add_children_kinds()
+            return mydict[name]
         return self._f_get_child(name)
 
     def __setattr__(self, name, value):
@@ -839,20 +859,21 @@ be ready to see PyTables asking for *lots* of memory and possibly slow I/O."""
         #   require ``_v_children`` and ``_v_hidden`` to be already set
         #   when the very first attribute assignments are made.
         #   Moreover, this warning is only concerned about clashes with
-        #   names used in natural naming, i.e. those in ``__members__``.
+        #   names used in natural naming, i.e. those in ``__members__``
+        #   (which are the keys of ``_v_children``).
         #
         # ..note::
         #
-        #   The check ``'__members__' in myDict`` allows attribute
+        #   The check ``'_v_children' in myDict`` allows attribute
         #   assignment to happen before calling `Group.__init__()`, by
-        #   avoiding to look into the still not assigned ``__members__``
+        #   avoiding to look into the still not assigned ``_v_children``
         #   attribute.  This allows subclasses to set up some attributes
         #   and then call the constructor of the superclass.  If the
         #   check above is disabled, that results in Python entering an
         #   endless loop on exit!
 
         mydict = self.__dict__
-        if '__members__' in mydict and name in self.__members__:
+        if '_v_children' in mydict and name in mydict['_v_children']:
             warnings.warn(
                 "group ``%s`` already has a child node named ``%s``; "
                 "you will not be able to use natural naming "
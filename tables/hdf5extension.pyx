@@ -49,18 +49,21 @@ from tables.atom import Atom
 
 from tables.description import descr_from_dtype
 
+from tables.path import isvisiblepath
+from tables.registry import class_id_dict
+
 from tables.utilsextension import (encode_filename, set_blosc_max_threads,
   atom_to_hdf5_type, atom_from_hdf5_type, hdf5_to_np_ext_type, create_nested_type,
   pttype_to_hdf5, pt_special_kinds, npext_prefixes_to_ptkinds, hdf5_class_to_string,
-  platform_byteorder)
+  platform_byteorder, get_filters, which_class)
 
 from tables._past import previous_api
 
 
 # Types, constants, functions, classes & other objects from everywhere
 from libc.stdlib cimport malloc, free
-from libc.string cimport strdup, strlen
-from numpy cimport import_array, ndarray, npy_intp
+from libc.string cimport strdup, strlen, memcpy
+from numpy cimport import_array, ndarray, npy_intp, npy_int64
 from cpython cimport (PyBytes_AsString, PyBytes_FromStringAndSize,
     PyBytes_Check)
 from cpython.unicode cimport PyUnicode_DecodeUTF8
@@ -80,7 +83,10 @@ from definitions cimport (const_char, uintptr_t, hid_t, herr_t, hsize_t, hvl_t,
   H5Gcreate, H5Gopen, H5Gclose, H5Ldelete, H5Lmove,
   H5Dopen, H5Dclose, H5Dread, H5Dwrite, H5Dget_type,
   H5Dget_space, H5Dvlen_reclaim, H5Dget_storage_size, H5Dvlen_get_buf_size,
-  H5Tclose, H5Tis_variable_str, H5Tget_sign,
+  H5Dget_create_plist, H5D_CHUNKED, H5Pget_layout, H5Pget_chunk,
+  H5Sget_simple_extent_ndims, H5Sget_simple_extent_dims,
+  H5Tclose, H5Tis_variable_str, H5Tget_sign, H5Tget_class, H5T_COMPOUND,
+  H5Tget_nmembers, H5Tget_member_name, H5Tget_member_type, is_complex,
   H5Adelete, H5T_BITFIELD, H5T_INTEGER, H5T_FLOAT, H5T_STRING, H5Tget_order,
   H5Pcreate, H5Pset_cache, H5Pclose, H5Pget_userblock, H5Pset_userblock,
   H5Pset_fapl_sec2, H5Pset_fapl_log, H5Pset_fapl_stdio, H5Pset_fapl_core,
@@ -92,7 +98,8 @@ from definitions cimport (const_char, uintptr_t, hid_t, herr_t, hsize_t, hvl_t,
   H5ATTRget_attribute_vlen_string_array,
   H5ATTRfind_attribute, H5ATTRget_type_ndims, H5ATTRget_dims,
   H5ARRAYget_ndims, H5ARRAYget_info,
-  set_cache_size, get_objinfo, get_linkinfo, Giterate, Aiterate, H5UIget_info,
+  set_cache_size, get_objinfo, get_linkinfo, Giterate, Gnames, Gvisit,
+  Aiterate, H5UIget_info,
   get_len_of_range, conv_float64_timeval32, truncate_dset,
   H5_HAVE_DIRECT_DRIVER, pt_H5Pset_fapl_direct,
   H5_HAVE_WINDOWS_DRIVER, pt_H5Pset_fapl_windows,
@@ -100,7 +107,8 @@ from definitions cimport (const_char, uintptr_t, hid_t, herr_t, hsize_t, hvl_t,
 
 cdef int H5T_CSET_DEFAULT = 16
 
-from utilsextension cimport malloc_dims, get_native_type, cstr_to_pystr
+from utilsextension cimport (malloc_dims, get_native_type, cstr_to_pystr,
+                             PyThreadState, release_gil, restore_gil)
 
 
 #-------------------------------------------------------------------
@@ -154,6 +162,10 @@ cdef extern from "H5VLARRAY.h" nogil:
                                   int nobjects, hsize_t nrecords,
                                   void *data )
 
+  herr_t H5VLARRAYappend_many_records( hid_t dataset_id, hid_t type_id,
+                                       hsize_t nrows, hsize_t nrecords,
+                                       hvl_t *wdata )
+
   herr_t H5VLARRAYmodify_records( hid_t dataset_id, hid_t type_id,
                                   hsize_t nrow, int nobjects,
                                   void *data )
@@ -201,6 +213,47 @@ cdef object getshape(int rank, hsize_t *dims):
   return tuple(shape)
 
 
+# Helper functions for getting the NumPy dtype of a dataset type
+cdef object get_dtype(hid_t type_id):
+  """Returns the NumPy dtype matching the HDF5 `type_id`."""
+
+  cdef hid_t member_type_id
+  cdef int i, nfields
+  cdef char *c_colname
+  cdef object fields, colname
+
+  if H5Tget_class(type_id) == H5T_COMPOUND and not is_complex(type_id):
+    # Fields are packed, like in the rows read from tables
+    fields = []
+    nfields = H5Tget_nmembers(type_id)
+    for i from 0 <= i < nfields:
+      c_colname = H5Tget_member_name(type_id, i)
+      colname = cstr_to_pystr(c_colname)
+      free(c_colname)
+      member_type_id = H5Tget_member_type(type_id, i)
+      try:
+        fields.append((colname, get_dtype(member_type_id)))
+      finally:
+        H5Tclose(member_type_id)
+    return numpy.dtype(fields)
+  return atom_from_hdf5_type(type_id).dtype
+
+
+cdef object get_dtype_or_none(hid_t type_id):
+  """Returns the NumPy dtype matching the HDF5 `type_id`.
+
+  The base type of variable length types is used, and enumerated and
+  time types give the dtype used for their values, like in atoms.
+  ``None`` is returned for unsupported types.
+
+  """
+
+  try:
+    return get_dtype(type_id)
+  except TypeError:
+    return None
+
+
 # Helper function for quickly fetch an attribute string
 cdef object get_attribute_string_or_none(hid_t node_id, char* attr_name):
   """Returns a string/unicode attribute if it exists in node_id.
@@ -985,6 +1038,101 @@ cdef class Group(Node):
 
   _g_listGroup = previous_api(_g_list_group)
 
+  def _g_list_names(self):
+    """Return a list with the names of the nodes hanging from self."""
+
+    return Gnames(self.group_id)
+
+  def _g_walk_info(self, sysattrs=True):
+    """Return a list with metadata about the visible nodes under self.
+
+    Nodes are walked recursively in a single pass, without creating
+    node objects.  For every node, a tuple of (path, kind, CLASS, shape,
+    dtype, chunkshape, filters) is returned, where `path` is relative to
+    self and `kind` is one of 'Group', 'Leaf', 'SoftLink', 'ExternalLink'
+    or 'Unknown'.  The rest of values are only provided for leaves
+    (``None`` otherwise, like the missing ``CLASS`` attributes).  The
+    filters are returned as a dictionary of filter names and values.
+
+    ``CLASS`` attributes are only read if `sysattrs` is true.  Like when
+    loading leaves, the class of leaves with a missing or unknown
+    ``CLASS`` is guessed with ``which_class()``.
+
+    """
+
+    cdef hid_t node_id, space_id, type_id, plist_id
+    cdef int ltype, otype, rank, i
+    cdef hsize_t *dims
+    cdef bytes encoded_path
+    cdef object info, path, kind, classid, shape, dtype, chunkshape, filters
+
+    info = []
+    for (path, ltype, otype) in Gvisit(self.group_id):
+      if not isvisiblepath('/' + path):
+        continue
+      classid = shape = dtype = chunkshape = filters = None
+      if ltype == H5L_TYPE_SOFT:
+        kind = 'SoftLink'
+      elif ltype == H5L_TYPE_EXTERNAL:
+        kind = 'ExternalLink'
+      elif ltype == H5L_TYPE_HARD and otype == H5O_TYPE_GROUP:
+        kind = 'Group'
+      elif ltype == H5L_TYPE_HARD and otype == H5O_TYPE_DATASET:
+        kind = 'Leaf'
+      else:
+        kind = 'Unknown'
+      encoded_path = path.encode('utf-8')
+
+      if kind == 'Group':
+        if sysattrs:
+          node_id = H5Gopen(self.group_id, encoded_path, H5P_DEFAULT)
+          if node_id < 0:
+            raise HDF5ExtError("Can't open the group: '%s'." % path)
+          try:
+            classid = get_attribute_string_or_none(node_id, "CLASS")
+          finally:
+            H5Gclose(node_id)
+      elif kind == 'Leaf':
+        node_id = H5Dopen(self.group_id, encoded_path, H5P_DEFAULT)
+        if node_id < 0:
+          raise HDF5ExtError("Non-existing node ``%s`` under ``%s``" %
+                             (path, self._v_pathname))
+        dims = NULL
+        try:
+          if sysattrs:
+            classid = get_attribute_string_or_none(node_id, "CLASS")
+          # The shape of the dataset
+          space_id = H5Dget_space(node_id)
+          rank = H5Sget_simple_extent_ndims(space_id)
+          dims = <hsize_t *>malloc(max(rank, 1) * sizeof(hsize_t))
+          H5Sget_simple_extent_dims(space_id, dims, NULL)
+          H5Sclose(space_id)
+          shape = getshape(rank, dims)
+          # The type of the dataset
+          type_id = H5Dget_type(node_id)
+          try:
+            dtype = get_dtype_or_none(type_id)
+          finally:
+            H5Tclose(type_id)
+          # The chunkshape of the dataset
+          plist_id = H5Dget_create_plist(node_id)
+          if H5Pget_layout(plist_id) == H5D_CHUNKED:
+            H5Pget_chunk(plist_id, rank, dims)
+            chunkshape = getshape(rank, dims)
+          H5Pclose(plist_id)
+        finally:
+          free(dims)
+          H5Dclose(node_id)
+        filters = get_filters(self.group_id, path)
+      if classid is not None and not isinstance(classid, str):
+        classid = classid.decode('utf-8')
+      if kind == 'Leaf' and classid not in class_id_dict:
+        # Unknown or no ``CLASS`` attribute, guess the class like
+        # when loading the leaf
+        classid = which_class(self.group_id, path)
+      info.append((path, kind, classid, shape, dtype, chunkshape, filters))
+    return info
+
   def _g_get_gchild_attr(self, group_name, attr_name):
     """Return an attribute of a child `Group`.
 
@@ -1144,7 +1292,7 @@ cdef class Leaf(Node):
       raise HDF5ExtError("Problems truncating the leaf: %s" % self)
 
     classname = self.__class__.__name__
-    if classname in ('EArray', 'CArray'):
+    if classname in ('EArray', 'CArray', 'CacheArray', 'IndexArray'):
       # Update the new dimensionality
       self.dims[self.maindim] = size
       # Update the shape
@@ -1394,6 +1542,7 @@ cdef class Array(Leaf):
   _openArray = previous_api(_open_array)
 
   def _append(self, ndarray nparr):
+    cdef PyThreadState *tstate
     cdef int ret, extdim
     cdef hsize_t *dims_arr
     cdef void *rbuf
@@ -1409,9 +1558,10 @@ cdef class Array(Leaf):
 
     # Append the records
     extdim = self.extdim
-    with nogil:
-        ret = H5ARRAYappend_records(self.dataset_id, self.type_id, self.rank,
-                                    self.dims, dims_arr, extdim, rbuf)
+    tstate = release_gil()
+    ret = H5ARRAYappend_records(self.dataset_id, self.type_id, self.rank,
+                                self.dims, dims_arr, extdim, rbuf)
+    restore_gil(tstate)
 
     if ret < 0:
       raise HDF5ExtError("Problems appending the elements")
@@ -1424,6 +1574,7 @@ cdef class Array(Leaf):
 
   def _read_array(self, hsize_t start, hsize_t stop, hsize_t step,
                  ndarray nparr):
+    cdef PyThreadState *tstate
     cdef herr_t ret
     cdef void *rbuf
     cdef hsize_t nrows
@@ -1440,9 +1591,10 @@ cdef class Array(Leaf):
       extdim = -1
 
     # Do the physical read
-    with nogil:
-        ret = H5ARRAYread(self.dataset_id, self.type_id, start, nrows, step,
-                          extdim, rbuf)
+    tstate = release_gil()
+    ret = H5ARRAYread(self.dataset_id, self.type_id, start, nrows, step,
+                      extdim, rbuf)
+    restore_gil(tstate)
 
     if ret < 0:
       raise HDF5ExtError("Problems reading the array data.")
@@ -1462,6 +1614,7 @@ cdef class Array(Leaf):
 
   def _g_read_slice(self, ndarray startl, ndarray stopl, ndarray stepl,
                    ndarray nparr):
+    cdef PyThreadState *tstate
     cdef herr_t ret
     cdef hsize_t *start, *stop, *step
     cdef void *rbuf
@@ -1474,9 +1627,10 @@ cdef class Array(Leaf):
     rbuf = nparr.data
 
     # Do the physical read
-    with nogil:
-        ret = H5ARRAYreadSlice(self.dataset_id, self.type_id,
-                               start, stop, step, rbuf)
+    tstate = release_gil()
+    ret = H5ARRAYreadSlice(self.dataset_id, self.type_id,
+                           start, stop, step, rbuf)
+    restore_gil(tstate)
 
     if ret < 0:
       raise HDF5ExtError("Problems reading the array data.")
@@ -1497,6 +1651,7 @@ cdef class Array(Leaf):
   def _g_read_coords(self, ndarray coords, ndarray nparr):
     """Read coordinates in an already created NumPy array."""
 
+    cdef PyThreadState *tstate
     cdef herr_t ret
     cdef hid_t space_id
     cdef hid_t mem_space_id
@@ -1518,9 +1673,10 @@ cdef class Array(Leaf):
     rbuf = nparr.data
 
     # Do the actual read
-    with nogil:
-        ret = H5Dread(self.dataset_id, self.type_id, mem_space_id, space_id,
-                      H5P_DEFAULT, rbuf)
+    tstate = release_gil()
+    ret = H5Dread(self.dataset_id, self.type_id, mem_space_id, space_id,
+                  H5P_DEFAULT, rbuf)
+    restore_gil(tstate)
 
     if ret < 0:
       raise HDF5ExtError("Problems reading the array data.")
@@ -1587,6 +1743,7 @@ cdef class Array(Leaf):
   def _g_read_selection(self, object selection, ndarray nparr):
     """Read a selection in an already created NumPy array."""
 
+    cdef PyThreadState *tstate
     cdef herr_t ret
     cdef hid_t space_id
     cdef hid_t mem_space_id
@@ -1611,9 +1768,10 @@ cdef class Array(Leaf):
     rbuf = nparr.data
 
     # Do the actual read
-    with nogil:
-        ret = H5Dread(self.dataset_id, self.type_id, mem_space_id, space_id,
-                      H5P_DEFAULT, rbuf)
+    tstate = release_gil()
+    ret = H5Dread(self.dataset_id, self.type_id, mem_space_id, space_id,
+                  H5P_DEFAULT, rbuf)
+    restore_gil(tstate)
 
     if ret < 0:
       raise HDF5ExtError("Problems reading the array data.")
@@ -1640,6 +1798,7 @@ cdef class Array(Leaf):
                     ndarray nparr):
     """Write a slice in an already created NumPy array."""
 
+    cdef PyThreadState *tstate
     cdef int ret
     cdef void *rbuf, *temp
     cdef hsize_t *start, *step, *count
@@ -1656,9 +1815,10 @@ cdef class Array(Leaf):
       self._convert_time64(nparr, 0)
 
     # Modify the elements:
-    with nogil:
-        ret = H5ARRAYwrite_records(self.dataset_id, self.type_id, self.rank,
-                                   start, step, count, rbuf)
+    tstate = release_gil()
+    ret = H5ARRAYwrite_records(self.dataset_id, self.type_id, self.rank,
+                               start, step, count, rbuf)
+    restore_gil(tstate)
 
     if ret < 0:
       raise HDF5ExtError("Internal error modifying the elements "
@@ -1671,6 +1831,7 @@ cdef class Array(Leaf):
   def _g_write_coords(self, ndarray coords, ndarray nparr):
     """Write a selection in an already created NumPy array."""
 
+    cdef PyThreadState *tstate
     cdef herr_t ret
     cdef hid_t space_id
     cdef hid_t mem_space_id
@@ -1696,9 +1857,10 @@ cdef class Array(Leaf):
       self._convert_time64(nparr, 0)
 
     # Do the actual write
-    with nogil:
-        ret = H5Dwrite(self.dataset_id, self.type_id, mem_space_id, space_id,
-                       H5P_DEFAULT, rbuf)
+    tstate = release_gil()
+    ret = H5Dwrite(self.dataset_id, self.type_id, mem_space_id, space_id,
+                   H5P_DEFAULT, rbuf)
+    restore_gil(tstate)
 
     if ret < 0:
       raise HDF5ExtError("Problems writing the array data.")
@@ -1715,6 +1877,7 @@ cdef class Array(Leaf):
   def _g_write_selection(self, object selection, ndarray nparr):
     """Write a selection in an already created NumPy array."""
 
+    cdef PyThreadState *tstate
     cdef herr_t ret
     cdef hid_t space_id
     cdef hid_t mem_space_id
@@ -1743,9 +1906,10 @@ cdef class Array(Leaf):
       self._convert_time64(nparr, 0)
 
     # Do the actual write
-    with nogil:
-        ret = H5Dwrite(self.dataset_id, self.type_id, mem_space_id, space_id,
-                       H5P_DEFAULT, rbuf)
+    tstate = release_gil()
+    ret = H5Dwrite(self.dataset_id, self.type_id, mem_space_id, space_id,
+                   H5P_DEFAULT, rbuf)
+    restore_gil(tstate)
 
     if ret < 0:
       raise HDF5ExtError("Problems writing the array data.")
@@ -1882,6 +2046,7 @@ cdef class VLArray(Leaf):
   _openArray = previous_api(_open_array)
 
   def _append(self, ndarray nparr, int nobjects):
+    cdef PyThreadState *tstate
     cdef int ret
     cdef void *rbuf
 
@@ -1895,16 +2060,58 @@ cdef class VLArray(Leaf):
       rbuf = NULL
 
     # Append the records:
-    with nogil:
-        ret = H5VLARRAYappend_records(self.dataset_id, self.type_id,
-                                      nobjects, self.nrecords, rbuf)
+    tstate = release_gil()
+    ret = H5VLARRAYappend_records(self.dataset_id, self.type_id,
+                                  nobjects, self.nrecords, rbuf)
+    restore_gil(tstate)
 
     if ret < 0:
       raise HDF5ExtError("Problems appending the records.")
 
     self.nrecords = self.nrecords + 1
 
+  def _append_many(self, list nparrs, list nobjects):
+    cdef PyThreadState *tstate
+    cdef int ret
+    cdef hsize_t nrows, i
+    cdef hvl_t *wdata
+    cdef ndarray nparr
+    cdef int time64
+
+    nrows = len(nparrs)
+    if nrows == 0:
+      return
+
+    # Describe the rows to be written
+    time64 = self.atom.type == 'time64'
+    wdata = <hvl_t *>malloc(<size_t>nrows*sizeof(hvl_t))
+    try:
+      for i from 0 <= i < nrows:
+        wdata[i].len = nobjects[i]
+        if wdata[i].len:
+          nparr = nparrs[i]
+          # Convert some NumPy types to HDF5 before storing.
+          if time64:
+            self._convert_time64(nparr, 0)
+          wdata[i].p = nparr.data
+        else:
+          wdata[i].p = NULL
+
+      # Append all the records at once:
+      tstate = release_gil()
+      ret = H5VLARRAYappend_many_records(self.dataset_id, self.type_id,
+                                         nrows, self.nrecords, wdata)
+      restore_gil(tstate)
+    finally:
+      free(wdata)
+
+    if ret < 0:
+      raise HDF5ExtError("Problems appending the records.")
+
+    self.nrecords = self.nrecords + nrows
+
   def _modify(self, hsize_t nrow, ndarray nparr, int nobjects):
+    cdef PyThreadState *tstate
     cdef int ret
     cdef void *rbuf
 
@@ -1916,9 +2123,10 @@ cdef class VLArray(Leaf):
         self._convert_time64(nparr, 0)
 
     # Append the records:
-    with nogil:
-        ret = H5VLARRAYmodify_records(self.dataset_id, self.type_id,
-                                      nrow, nobjects, rbuf)
+    tstate = release_gil()
+    ret = H5VLARRAYmodify_records(self.dataset_id, self.type_id,
+                                  nrow, nobjects, rbuf)
+    restore_gil(tstate)
 
     if ret < 0:
       raise HDF5ExtError("Problems modifying the record.")
@@ -1949,6 +2157,7 @@ cdef class VLArray(Leaf):
     return size
 
   def _read_array(self, hsize_t start, hsize_t stop, hsize_t step):
+    cdef PyThreadState *tstate
     cdef int i
     cdef size_t vllen
     cdef herr_t ret
@@ -1966,19 +2175,20 @@ cdef class VLArray(Leaf):
         h5bt=False)
 
     # Now, read the chunk of rows
-    with nogil:
-        # Allocate the necessary memory for keeping the row handlers
-        rdata = <hvl_t *>malloc(<size_t>nrows*sizeof(hvl_t))
-        # Get the dataspace handle
-        space_id = H5Dget_space(self.dataset_id)
-        # Create a memory dataspace handle
-        mem_space_id = H5Screate_simple(1, &nrows, NULL)
-        # Select the data to be read
-        H5Sselect_hyperslab(space_id, H5S_SELECT_SET, &start, &step, &nrows,
-                            NULL)
-        # Do the actual read
-        ret = H5Dread(self.dataset_id, self.type_id, mem_space_id, space_id,
-                      H5P_DEFAULT, rdata)
+    tstate = release_gil()
+    # Allocate the necessary memory for keeping the row handlers
+    rdata = <hvl_t *>malloc(<size_t>nrows*sizeof(hvl_t))
+    # Get the dataspace handle
+    space_id = H5Dget_space(self.dataset_id)
+    # Create a memory dataspace handle
+    mem_space_id = H5Screate_simple(1, &nrows, NULL)
+    # Select the data to be read
+    H5Sselect_hyperslab(space_id, H5S_SELECT_SET, &start, &step, &nrows,
+                        NULL)
+    # Do the actual read
+    ret = H5Dread(self.dataset_id, self.type_id, mem_space_id, space_id,
+                  H5P_DEFAULT, rdata)
+    restore_gil(tstate)
 
     if ret < 0:
       raise HDF5ExtError(
@@ -2031,6 +2241,91 @@ cdef class VLArray(Leaf):
 
   _readArray = previous_api(_read_array)
 
+  def _read_flat(self, hsize_t start, hsize_t stop, hsize_t step):
+    cdef PyThreadState *tstate
+    cdef hsize_t i, nrows
+    cdef size_t rowsize, nbytes
+    cdef herr_t ret
+    cdef hvl_t *rdata
+    cdef hid_t space_id
+    cdef hid_t mem_space_id
+    cdef char *vbuf
+    cdef npy_int64 *obuf
+    cdef ndarray values, offsets
+
+    # Compute the number of rows to read
+    nrows = get_len_of_range(start, stop, step)
+    if start + nrows > self.nrows:
+      raise HDF5ExtError(
+        "Asking for a range of rows exceeding the available ones!.",
+        h5bt=False)
+
+    # Now, read the chunk of rows
+    tstate = release_gil()
+    # Allocate the necessary memory for keeping the row handlers
+    rdata = <hvl_t *>malloc(<size_t>nrows*sizeof(hvl_t))
+    # Get the dataspace handle
+    space_id = H5Dget_space(self.dataset_id)
+    # Create a memory dataspace handle
+    mem_space_id = H5Screate_simple(1, &nrows, NULL)
+    # Select the data to be read
+    H5Sselect_hyperslab(space_id, H5S_SELECT_SET, &start, &step, &nrows,
+                        NULL)
+    # Do the actual read
+    ret = H5Dread(self.dataset_id, self.type_id, mem_space_id, space_id,
+                  H5P_DEFAULT, rdata)
+    restore_gil(tstate)
+
+    if ret < 0:
+      H5Sclose(mem_space_id)
+      H5Sclose(space_id)
+      free(rdata)
+      raise HDF5ExtError(
+        "VLArray._read_flat: Problems reading the array data.")
+
+    # Compute the offsets of rows and pre-size the values buffer
+    offsets = numpy.empty(nrows + 1, dtype=numpy.int64)
+    obuf = <npy_int64 *>offsets.data
+    obuf[0] = 0
+    for i from 0 <= i < nrows:
+      obuf[i+1] = obuf[i] + rdata[i].len
+    values = numpy.empty((obuf[nrows],) + self._atomicshape,
+                         dtype=self._atomicdtype.base)
+
+    # Copy the rows one after the other
+    rowsize = self._atomicsize
+    vbuf = values.data
+    tstate = release_gil()
+    for i from 0 <= i < nrows:
+      nbytes = rdata[i].len * rowsize
+      if nbytes > 0:
+        memcpy(vbuf, rdata[i].p, nbytes)
+        vbuf = vbuf + nbytes
+    restore_gil(tstate)
+
+    # Release resources
+    # Reclaim all the (nested) VL data
+    ret = H5Dvlen_reclaim(self.type_id, mem_space_id, H5P_DEFAULT, rdata)
+    # Terminate access to the memory dataspace
+    H5Sclose(mem_space_id)
+    # Terminate access to the dataspace
+    H5Sclose(space_id)
+    # Free the amount of row pointers to VL row data
+    free(rdata)
+    if ret < 0:
+      raise HDF5ExtError("VLArray._read_flat: error freeing the data buffer.")
+
+    if len(values) > 0:
+      if self.atom.kind == 'time':
+        # Swap the byteorder by hand (this is not currently supported by HDF5)
+        if H5Tget_order(self.type_id) != platform_byteorder:
+          values.byteswap(True)
+      # Convert some HDF5 types to NumPy after reading.
+      if self.atom.type == 'time64':
+        self._convert_time64(values, 1)
+
+    return values, offsets
+
 
 cdef class UnImplemented(Leaf):
 
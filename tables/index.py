@@ -28,7 +28,7 @@ from tables.idxutils import (calc_chunksize, calcoptlevels,
 
 from tables import indexesextension
 from tables.node import NotLoggedMixin
-from tables.atom import UIntAtom, Atom
+from tables.atom import UIntAtom, Int64Atom, Atom
 from tables.earray import EArray
 from tables.carray import CArray
 from tables.leaf import Filters
@@ -36,8 +36,9 @@ from tables.indexes import CacheArray, LastRowArray, IndexArray
 from tables.group import Group
 from tables.path import join_path
 from tables.exceptions import PerformanceWarning
-from tables.utils import is_idx, idx2long, lazyattr
-from tables.lrucacheextension import ObjectCache
+from tables.utils import (is_idx, idx2long, lazyattr, timed_phase,
+                          BackgroundCall)
+from tables.lrucacheextension import ObjectCache, SharedObjectCache
 
 from tables._past import previous_api, previous_api_property
 
@@ -87,6 +88,25 @@ opt_search_types = ("int8", "int16", "int32", "int64",
 max32 = 2**32
 
 
+def _coalesce_ranges(starts, stops):
+    """Merge the overlapping or adjacent ranges in `starts` and `stops`.
+
+    The result is an array of (start, stop) pairs sorted by start.
+
+    """
+
+    order = starts.argsort(kind='mergesort')
+    starts, stops = starts[order], stops[order]
+    ends = numpy.maximum.accumulate(stops)
+    firsts = numpy.ones(len(starts), dtype=bool)
+    firsts[1:] = starts[1:] > ends[:-1]
+    firsts = firsts.nonzero()[0]
+    ranges = numpy.empty((len(firsts), 2), dtype=numpy.int64)
+    ranges[:, 0] = starts[firsts]
+    ranges[:, 1] = numpy.maximum.reduceat(stops, firsts)
+    return ranges
+
+
 def _table_column_pathname_of_index(indexpathname):
     names = indexpathname.split("/")
     for i, name in enumerate(names):
@@ -156,6 +176,11 @@ class Index(NotLoggedMixin, indexesextension.Index, Group):
     _c_classId = previous_api_property('_c_classid')
 
     # <properties>
+    _v_background = property(
+        lambda self: self._v_name.startswith('_shadow_'), None, None,
+        "Whether the index is being built in the background (see "
+        "`tables.table.IndexBuild`).")
+
     kind = property(
         lambda self: {1: 'ultralight', 2: 'light',
                       4: 'medium', 8: 'full'}[self.indsize],
@@ -176,6 +201,9 @@ class Index(NotLoggedMixin, indexesextension.Index, Group):
     def _setdirty(self, dirty):
         wasdirty, isdirty = self.dirty, bool(dirty)
         self._v_attrs.DIRTY = dirty
+        if self._v_background:
+            # The table does not use the index yet
+            return
         # If an *actual* change in dirtiness happens,
         # notify the condition cache by setting or removing a nail.
         conditioncache = self.table._condition_cache
@@ -249,6 +277,11 @@ class Index(NotLoggedMixin, indexesextension.Index, Group):
         lambda self: self.nelements // self.slicesize, None, None,
         "The number of complete slices in index.")
 
+    nremoved = property(
+        lambda self: int(numpy.diff(self.get_tombstones()).sum()), None, None,
+        """The number of positions in index whose table rows have been
+        removed (see :meth:`remove_rows`).""")
+
     nchunks = property(
         lambda self: self.nelements // self.chunksize, None, None,
         "The number of complete chunks in index.")
@@ -392,6 +425,10 @@ class Index(NotLoggedMixin, indexesextension.Index, Group):
         sorted index. -1 means that this number is not computed yet."""
         self.tprof = 0
         """Time counter for benchmarking purposes."""
+        self._tombstones = None
+        """Cache for the ranges of positions of removed rows."""
+        self._kept_starts = None
+        """Cache for the first non removed position of every slice."""
 
         from tables.file import open_file
         self._openFile = open_file
@@ -562,7 +599,28 @@ class Index(NotLoggedMixin, indexesextension.Index, Group):
             tref = time()
         if profile:
             show_stats("Entering initial_append", tref)
-        arr = xarr.pop()
+        arr, idx = self.prepare_slice(xarr.pop(), nrow)
+        larr, arr, idx = self.sort_slice(arr, idx, reduction)
+        # A completely sorted index is not longer possible after an
+        # append of an index with already one slice.
+        if nrow > 0:
+            self._v_attrs.is_csi = False
+        if profile:
+            show_stats("Exiting initial_append", tref)
+        return larr, arr, idx
+
+    def prepare_slice(self, arr, nrow, lastrow=True):
+        """Get the values and indices to be sorted for a slice in `nrow`.
+
+        The values in the last row are fetched in front of `arr` when
+        `lastrow` is true (and they are kept in the index).
+
+        """
+
+        if profile:
+            tref = time()
+        if profile:
+            show_stats("Entering prepare_slice", tref)
         indsize = self.indsize
         slicesize = self.slicesize
         nelementsILR = self.nelementsILR
@@ -604,13 +662,26 @@ class Index(NotLoggedMixin, indexesextension.Index, Group):
                 offset2 = (nrow % self.nslicesblock) * slicesize // lbucket
                 idx += offset2
         # Add the last row at the beginning of arr & idx (if needed)
-        if (indsize == 8 and nelementsILR > 0):
+        if (indsize == 8 and nelementsILR > 0 and lastrow):
             # It is possible that the values in LR are already sorted.
             # Fetch them and override existing values in arr and idx.
             assert len(arr) > nelementsILR
             self.read_slice_lr(self.sortedLR, arr[:nelementsILR])
             self.read_slice_lr(self.indicesLR, idx[:nelementsILR])
-        # In-place sorting
+        if profile:
+            show_stats("Exiting prepare_slice", tref)
+        return arr, idx
+
+    def sort_slice(self, arr, idx, reduction):
+        """Sort `arr` and `idx` in-place and reduce the sorted values.
+
+        No HDF5 call is made here, so several slices can be sorted at
+        the same time in different threads.
+
+        """
+
+        if profile:
+            tref = time()
         if profile:
             show_stats("Before keysort", tref)
         indexesextension.keysort(arr, idx)
@@ -626,12 +697,6 @@ class Index(NotLoggedMixin, indexesextension.Index, Group):
             arr = reduc
             if profile:
                 show_stats("After arr <-- reduc", tref)
-        # A completely sorted index is not longer possible after an
-        # append of an index with already one slice.
-        if nrow > 0:
-            self._v_attrs.is_csi = False
-        if profile:
-            show_stats("Exiting initial_append", tref)
         return larr, arr, idx
 
     def final_idx32(self, idx, offset):
@@ -661,13 +726,54 @@ class Index(NotLoggedMixin, indexesextension.Index, Group):
             tref = time()
         if profile:
             show_stats("Entering append", tref)
+        where, reduction = self._get_append_target(update)
+        nrows = where.sorted.nrows  # before sorted.append()
+        larr, arr, idx = self.initial_append(xarr, nrows, reduction)
+        self._append_sorted(where, reduction, larr, arr, idx)
+        if profile:
+            show_stats("Exiting append", tref)
+
+    def append_slices(self, arrays, update=False, nthreads=1):
+        """Append several complete slices to the index objects.
+
+        Up to `nthreads` slices in `arrays` are sorted at the same time
+        in separate threads.  The result is the same as appending the
+        slices one after another with :meth:`append`.
+
+        """
+
+        where, reduction = self._get_append_target(update)
+        nrows = where.sorted.nrows
+        # Only the first slice takes the values in the last row, as
+        # appending a slice leaves the last row empty
+        prepared = [self.prepare_slice(arr, nrows + i, lastrow=(i == 0))
+                    for (i, arr) in enumerate(arrays)]
+        while prepared:
+            batch, prepared = prepared[:nthreads], prepared[nthreads:]
+            calls = [BackgroundCall(self.sort_slice, arr, idx, reduction)
+                     for (arr, idx) in batch[1:]]
+            results = [self.sort_slice(batch[0][0], batch[0][1], reduction)]
+            results.extend(call.result() for call in calls)
+            del batch, calls
+            for (larr, arr, idx) in results:
+                if where.sorted.nrows > 0:
+                    self._v_attrs.is_csi = False
+                self._append_sorted(where, reduction, larr, arr, idx)
+            del results
+
+    def _get_append_target(self, update):
+        """Get the place where new slices go and their reduction."""
+
         if not update and self.temp_required:
-            where = self.tmp
             # The reduction will take place *after* the optimization process
-            reduction = 1
-        else:
-            where = self
-            reduction = self.reduction
+            return self.tmp, 1
+        return self, self.reduction
+
+    def _append_sorted(self, where, reduction, larr, arr, idx):
+        """Save an already sorted slice in `where`."""
+
+        if profile:
+            tref = time()
         sorted = where.sorted
         indices = where.indices
         ranges = where.ranges
@@ -679,7 +785,6 @@ class Index(NotLoggedMixin, indexesextension.Index, Group):
         sortedLR = where.sortedLR
         indicesLR = where.indicesLR
         nrows = sorted.nrows  # before sorted.append()
-        larr, arr, idx = self.initial_append(xarr, nrows, reduction)
         # Save the sorted array
         sorted.append(arr.reshape(1, arr.size))
         cs = self.chunksize // reduction
@@ -717,7 +822,7 @@ class Index(NotLoggedMixin, indexesextension.Index, Group):
         indicesLR.attrs.nelements = self.nelementsILR
         self.dirtycache = True   # the cache is dirty now
         if profile:
-            show_stats("Exiting append", tref)
+            show_stats("Exiting _append_sorted", tref)
 
     def append_last_row(self, xarr, update=False):
         """Append the array to the last row index objects"""
@@ -728,16 +833,49 @@ class Index(NotLoggedMixin, indexesextension.Index, Group):
             show_stats("Entering appendLR", tref)
         # compute the elements in the last row sorted & bounds array
         nrows = self.nslices
-        if not update and self.temp_required:
-            where = self.tmp
-            # The reduction will take place *after* the optimization process
-            reduction = 1
-        else:
-            where = self
-            reduction = self.reduction
+        where, reduction = self._get_append_target(update)
+        larr, arr, idx = self.initial_append(xarr, nrows, reduction)
+        self._save_last_row(where, reduction, larr, arr, idx)
+        if profile:
+            show_stats("Exiting appendLR", tref)
+
+    appendLastRow = previous_api(append_last_row)
+
+    def merge_last_row(self, xarr, update=False):
+        """Merge the array with the values already in the last row.
+
+        Only the new values are sorted, and they are then merged with
+        the sorted values in the last row, instead of sorting all of
+        them again.  This is only supported for full indexes.
+
+        """
+
+        assert self.indsize == 8, "only full indexes can merge the last row"
+        nrows = self.nslices
+        where, reduction = self._get_append_target(update)
+        arr = xarr.pop()
+        # The new values come after all the positions in index
+        idx = numpy.arange(0, len(arr), dtype="uint64") + self.nelements
+        indexesextension.keysort(arr, idx)
+        nelementsLR = self.nelementsILR
+        sortedlr = numpy.empty(nelementsLR, dtype=self.dtype)
+        indiceslr = numpy.empty(nelementsLR, dtype="uint64")
+        self.read_slice_lr(where.sortedLR, sortedlr)
+        self.read_slice_lr(where.indicesLR, indiceslr)
+        # Both runs are sorted, so a linear merge is enough
+        pos = sortedlr.searchsorted(arr, side='right')
+        arr = numpy.insert(sortedlr, pos, arr)
+        idx = numpy.insert(indiceslr, pos, idx)
+        if nrows > 0:
+            self._v_attrs.is_csi = False
+        self._save_last_row(where, reduction, arr[-1], arr, idx)
+
+    def _save_last_row(self, where, reduction, larr, arr, idx):
+        """Save an already sorted last row in `where`."""
+
+        nrows = self.nslices
         indicesLR = where.indicesLR
         sortedLR = where.sortedLR
-        larr, arr, idx = self.initial_append(xarr, nrows, reduction)
         nelementsSLR = len(arr)
         nelementsILR = len(idx)
         # Build the cache of bounds
@@ -764,20 +902,288 @@ class Index(NotLoggedMixin, indexesextension.Index, Group):
         self.nelementsILR = nelementsILR
         self.nelementsSLR = nelementsSLR
         self.dirtycache = True   # the cache is dirty now
-        if profile:
-            show_stats("Exiting appendLR", tref)
 
-    appendLastRow = previous_api(append_last_row)
+    def get_tombstones(self):
+        """Get the ranges of positions in index whose rows were removed.
+
+        The result is an array of (start, stop) pairs, sorted and not
+        overlapping.  Positions are the row numbers used by the index
+        before any row was removed, so that the table row for a position
+        is found by discounting the removed positions before it.
+
+        """
+
+        if self._tombstones is None:
+            if 'tombstones' in self._v_children:
+                self._tombstones = self.tombstones[:]
+            else:
+                self._tombstones = numpy.empty((0, 2), dtype=numpy.int64)
+        return self._tombstones
+
+    def _set_tombstones(self, tombstones):
+        """Save the ranges in `tombstones` as the removed positions."""
+
+        if 'tombstones' in self._v_children:
+            self.tombstones._f_remove()
+        if len(tombstones) > 0:
+            EArray(self, 'tombstones', Int64Atom(), (0, 2),
+                   "Positions of removed rows", self.filters,
+                   byteorder=self.byteorder, _log=False)
+            self.tombstones.append(tombstones)
+        self._tombstones = tombstones
+        self.dirtycache = True
+
+    def _map_positions(self, positions):
+        """Get the table rows for the `positions` in index.
+
+        A tuple with the rows and a mask of the positions whose rows
+        have been removed is returned.  The row of a removed position is
+        the one of the first position after it that was not removed.
+
+        """
+
+        tombstones = self.get_tombstones()
+        positions = numpy.asarray(positions, dtype=numpy.int64)
+        if len(tombstones) == 0:
+            return positions, numpy.zeros(positions.shape, dtype=bool)
+        starts, stops = tombstones[:, 0], tombstones[:, 1]
+        nremoved = numpy.concatenate(([0], (stops - starts).cumsum()))
+        # The last range starting at or before every position
+        nrange = starts.searchsorted(positions, side='right') - 1
+        prev = numpy.maximum(nrange, 0)
+        removed = (nrange >= 0) & (positions < stops[prev])
+        rows = positions - numpy.where(nrange >= 0, nremoved[prev + 1], 0)
+        rows = numpy.where(removed, starts[prev] - nremoved[prev], rows)
+        return rows, removed
+
+    def _map_rows(self, rows):
+        """Get the positions in index of the (not removed) table `rows`."""
+
+        tombstones = self.get_tombstones()
+        rows = numpy.asarray(rows, dtype=numpy.int64)
+        if len(tombstones) == 0:
+            return rows
+        starts, stops = tombstones[:, 0], tombstones[:, 1]
+        nremoved = numpy.concatenate(([0], (stops - starts).cumsum()))
+        # The table row where every removed range was
+        rowstarts = starts - nremoved[:-1]
+        return rows + nremoved[rowstarts.searchsorted(rows, side='right')]
+
+    def _get_kept_starts(self):
+        """Get the number of non removed positions before every slice.
+
+        The result has an element for every slice, one for the last row
+        and a final one with the total number of non removed positions.
+        Getting it needs reading the indices of all the slices, so it is
+        cached until the index changes.
+
+        """
+
+        tombstones = self.get_tombstones()
+        cached = self._kept_starts
+        if (cached is not None and cached[0] is tombstones
+                and cached[1] == self.nelements):
+            return cached[2]
+        nslices = self.nslices
+        ss = self.slicesize
+        sindices = numpy.empty(ss, dtype="uint64")
+        nkept = numpy.zeros(nslices + 2, dtype=numpy.int64)
+        for n in xrange(nslices + 1):
+            if n < nslices:
+                self.read_slice(self.indices, n, sindices)
+                rindices = sindices
+            else:
+                rindices = sindices[:self.nelementsILR]
+                self.read_slice_lr(self.indicesLR, rindices)
+            removed = self._map_positions(rindices)[1]
+            nkept[n + 1] = len(rindices) - removed.sum()
+        kept_starts = nkept.cumsum()
+        self._kept_starts = (tombstones, self.nelements, kept_starts)
+        return kept_starts
+
+    def _read_kept(self, what, start, stop):
+        """Read the non removed sorted or indices values in a range.
+
+        The `start` and `stop` positions skip the removed ones, and
+        indices are given as table rows.
+
+        """
+
+        kept_starts = self._get_kept_starts()
+        nslices = self.nslices
+        ss = self.slicesize
+        if what == "sorted":
+            buffer_ = numpy.empty(stop - start, dtype=self.dtype)
+        else:
+            buffer_ = numpy.empty(stop - start, dtype="u%d" % self.indsize)
+        ssorted = numpy.empty(ss, dtype=self.dtype)
+        sindices = numpy.empty(ss, dtype="uint64")
+        first = kept_starts.searchsorted(start, side='right') - 1
+        bstart = 0
+        for n in xrange(first, nslices + 1):
+            if kept_starts[n] >= stop:
+                break
+            if n < nslices:
+                rindices = sindices
+                self.read_slice(self.indices, n, rindices)
+            else:
+                rindices = sindices[:self.nelementsILR]
+                self.read_slice_lr(self.indicesLR, rindices)
+            rows, removed = self._map_positions(rindices)
+            kept = ~removed
+            lo = max(start - kept_starts[n], 0)
+            hi = min(stop, kept_starts[n + 1]) - kept_starts[n]
+            if what == "sorted":
+                if n < nslices:
+                    rsorted = ssorted
+                    self.read_slice(self.sorted, n, rsorted)
+                else:
+                    rsorted = ssorted[:self.nelementsSLR]
+                    self.read_slice_lr(self.sortedLR, rsorted)
+                values = rsorted[kept][lo:hi]
+            else:
+                values = rows[kept][lo:hi]
+            buffer_[bstart:bstart + len(values)] = values
+            bstart += len(values)
+        return buffer_
+
+    def remove_rows(self, start, stop):
+        """Forget the table rows in the `start` to `stop` range.
+
+        Rows are given by their number in the table before removing them.
+        Instead of invalidating the index, the positions of the rows are
+        kept as tombstones (see :meth:`get_tombstones`), which are left
+        out in lookups and merged away by :meth:`compact`.  Full indexes
+        can do this with any row.  For other kinds, the last row of the
+        index is emptied when some of its rows are removed, so that it
+        can be filled again from the table.
+
+        """
+
+        nremoved = self.nremoved
+        if self.indsize == 8:
+            # Full indexes know the row of every value
+            limit = self.nelements - nremoved
+        else:
+            limit = self.nslices * self.slicesize - nremoved
+            if stop > limit and self.nelementsILR > 0:
+                self._truncate_last_row()
+        stop = min(stop, limit)
+        if start >= stop:
+            return
+        pstart, plast = self._map_rows([start, stop - 1])
+        tombstones = self.get_tombstones()
+        self._set_tombstones(_coalesce_ranges(
+            numpy.append(tombstones[:, 0], pstart),
+            numpy.append(tombstones[:, 1], plast + 1)))
+
+    def _truncate_last_row(self):
+        """Empty the last row of index."""
+
+        self.sortedLR.attrs.nelements = 0
+        self.indicesLR.attrs.nelements = 0
+        self.nrows = self.nslices
+        self.nelements = self.nrows * self.slicesize
+        self.nelementsILR = 0
+        self.nelementsSLR = 0
+        self.dirtycache = True
+
+    def compact(self):
+        """Merge the tombstones of removed rows away.
+
+        The values of removed rows are taken out of every slice, and the
+        remaining ones are moved to fill the gaps, so that positions in
+        index become table rows again.  This is done without reading the
+        table, but only full indexes (which know the row of every value)
+        can be compacted.  A completely sorted index stays so.
+
+        """
+
+        tombstones = self.get_tombstones()
+        if len(tombstones) == 0 or self.indsize != 8:
+            return
+        self._v_file._check_writable()
+        ss = self.slicesize
+        cs = self.chunksize
+        ncs = self.nchunkslice
+        sorted, indices = self.sorted, self.indices
+        ssorted = numpy.empty(ss, dtype=self.dtype)
+        sindices = numpy.empty(ss, dtype="uint64")
+        csorted = ssorted[:0]
+        cindices = sindices[:0]
+        nslice = 0
+
+        def save_slice(ssorted, sindices):
+            # Slices are always written at or before the ones already read
+            self.write_slice(sorted, nslice, ssorted)
+            self.write_slice(indices, nslice, sindices)
+            self.ranges[nslice] = ssorted[[0, -1]]
+            self.bounds[nslice] = ssorted[cs::cs]
+            self.abounds[nslice * ncs:(nslice + 1) * ncs] = ssorted[0::cs]
+            self.zbounds[nslice * ncs:(nslice + 1) * ncs] = ssorted[cs - 1::cs]
+            smedian = ssorted[cs // 2::cs]
+            self.mbounds[nslice * ncs:(nslice + 1) * ncs] = smedian
+            self.mranges[nslice] = smedian[ncs // 2]
+
+        nslices = self.nslices
+        nelementsLR = self.nelementsILR
+        for n in xrange(nslices + 1):
+            if n < nslices:
+                self.read_slice(sorted, n, ssorted)
+                self.read_slice(indices, n, sindices)
+                rsorted, rindices = ssorted, sindices
+            else:
+                rsorted = ssorted[:nelementsLR]
+                rindices = sindices[:nelementsLR]
+                self.read_slice_lr(self.sortedLR, rsorted)
+                self.read_slice_lr(self.indicesLR, rindices)
+            rows, removed = self._map_positions(rindices)
+            rows = rows.astype("uint64")
+            # Whether the slice has to be written back
+            changed = nslice < n or (rows != rindices).any()
+            if removed.any() or len(csorted) > 0:
+                # Merge the values left with the ones carried over
+                kept = ~removed
+                csorted = numpy.concatenate((csorted, rsorted[kept]))
+                cindices = numpy.concatenate((cindices, rows[kept]))
+                indexesextension.keysort(csorted, cindices)
+                changed = True
+            else:
+                csorted, cindices = rsorted, rows
+            if len(csorted) >= ss:
+                if changed:
+                    save_slice(csorted[:ss], cindices[:ss])
+                nslice += 1
+                csorted, cindices = csorted[ss:].copy(), cindices[ss:].copy()
+        # Shrink the slices and their caches
+        for (array, nitems) in ((sorted, nslice), (indices, nslice),
+                                (self.ranges, nslice), (self.bounds, nslice),
+                                (self.mranges, nslice),
+                                (self.abounds, nslice * ncs),
+                                (self.zbounds, nslice * ncs),
+                                (self.mbounds, nslice * ncs)):
+            array.truncate(nitems)
+        self.nrows = nslice
+        self.nelements = nslice * ss
+        self.nelementsILR = self.nelementsSLR = 0
+        self.sortedLR.attrs.nelements = 0
+        self.indicesLR.attrs.nelements = 0
+        if len(csorted) > 0:
+            self._save_last_row(self, 1, csorted[-1], csorted, cindices)
+        self._set_tombstones(tombstones[:0])
 
     def optimize(self, verbose=False):
         """Optimize an index so as to allow faster searches.
 
+        Removed rows are merged away first (see :meth:`compact`).
+
         verbose
             If True, messages about the progress of the
             optimization process are printed out.
 
         """
 
+        self.compact()
         if not self.temp_required:
             return
 
@@ -1690,9 +2096,13 @@ class Index(NotLoggedMixin, indexesextension.Index, Group):
             return numpy.empty(0, self.dtype)
         # Correction for negative values of step (reverse indices)
         if step < 0:
+            nelements = len(self)
             tmp = start
-            start = self.nelements - stop
-            stop = self.nelements - tmp
+            start = nelements - stop
+            stop = nelements - tmp
+        if len(self.get_tombstones()) > 0:
+            # Removed rows are left out, and positions mapped to rows
+            return self._read_kept(what, start, stop)[::step]
         if what == "sorted":
             values = self.sorted
             valuesLR = self.sortedLR
@@ -1760,7 +2170,7 @@ class Index(NotLoggedMixin, indexesextension.Index, Group):
         else:
             start = idx2long(start)
         if stop is None:
-            stop = idx2long(self.nelements)
+            stop = idx2long(len(self))
         else:
             stop = idx2long(stop)
         if step is None:
@@ -1786,13 +2196,23 @@ class Index(NotLoggedMixin, indexesextension.Index, Group):
         if is_idx(key):
             if key < 0:
                 # To support negative values
-                key += self.nelements
+                key += len(self)
             return self.read_indices(key, key + 1, 1)[0]
         elif isinstance(key, slice):
             return self.read_indices(key.start, key.stop, key.step)
 
     def __len__(self):
-        return self.nelements
+        # Removed rows are not counted
+        return self.nelements - self.nremoved
+
+    def _new_object_cache(self, nslots, maxsize, name):
+        """Create a cache for objects, in the shared cache if enabled."""
+
+        params = self._v_file.params
+        if params['GLOBAL_CACHE_SIZE'] > 0:
+            return SharedObjectCache(nslots, maxsize, name,
+                                     params['GLOBAL_CACHE_SIZE'])
+        return ObjectCache(nslots, maxsize, name, params['CACHE_POLICY'])
 
     def restorecache(self):
         "Clean the limits cache and resize starts and lengths arrays"
@@ -1804,21 +2224,21 @@ class Index(NotLoggedMixin, indexesextension.Index, Group):
         # strong reference will disappear when this Index instance is
         # to be closed.
         self._sorted = self.sorted
-        self._sorted.boundscache = ObjectCache(params['BOUNDS_MAX_SLOTS'],
-                                               params['BOUNDS_MAX_SIZE'],
-                                               'non-opt types bounds')
-        self.sorted.boundscache = ObjectCache(params['BOUNDS_MAX_SLOTS'],
-                                              params['BOUNDS_MAX_SIZE'],
-                                              'non-opt types bounds')
+        self._sorted.boundscache = self._new_object_cache(
+            params['BOUNDS_MAX_SLOTS'], params['BOUNDS_MAX_SIZE'],
+            'non-opt types bounds')
+        self.sorted.boundscache = self._new_object_cache(
+            params['BOUNDS_MAX_SLOTS'], params['BOUNDS_MAX_SIZE'],
+            'non-opt types bounds')
         """A cache for the bounds (2nd hash) data. Only used for
         non-optimized types searches."""
-        self.limboundscache = ObjectCache(params['LIMBOUNDS_MAX_SLOTS'],
-                                          params['LIMBOUNDS_MAX_SIZE'],
-                                          'bounding limits')
+        self.limboundscache = self._new_object_cache(
+            params['LIMBOUNDS_MAX_SLOTS'], params['LIMBOUNDS_MAX_SIZE'],
+            'bounding limits')
         """A cache for bounding limits."""
-        self.sortedLRcache = ObjectCache(params['SORTEDLR_MAX_SLOTS'],
-                                         params['SORTEDLR_MAX_SIZE'],
-                                         'last row chunks')
+        self.sortedLRcache = self._new_object_cache(
+            params['SORTEDLR_MAX_SLOTS'], params['SORTEDLR_MAX_SIZE'],
+            'last row chunks')
         """A cache for the last row chunks. Only used for searches in
         the last row, and mainly useful for small indexes."""
         self.starts = numpy.empty(shape=self.nrows, dtype=numpy.int32)
@@ -1826,6 +2246,25 @@ class Index(NotLoggedMixin, indexesextension.Index, Group):
         self.sorted._init_sorted_slice(self)
         self.dirtycache = False
 
+    def _get_cache_stats(self):
+        """Get the statistics of the caches used in lookups.
+
+        An empty dictionary is returned if no lookup has created them.
+
+        """
+
+        if 'limboundscache' not in self.__dict__:
+            return {}
+        stats = {
+            'limbounds': self.limboundscache.stats(),
+            'last row': self.sortedLRcache.stats(),
+        }
+        stats.update(self._sorted._get_cache_stats())
+        if 'bounds' not in stats:
+            stats['bounds'] = self._sorted.boundscache.stats()
+        return stats
+
+    @timed_phase('search')
     def search(self, item):
         """Do a binary search in this index for an item"""
 
@@ -1926,18 +2365,66 @@ class Index(NotLoggedMixin, indexesextension.Index, Group):
             show_stats("Exiting search", tref)
         return tlen
 
-    # This is an scalar version of search. It works with strings as well.
+    # This is a generic version of search. It works with strings as well.
     def search_scalar(self, item, sorted):
-        """Do a binary search in this index for an item."""
+        """Do a binary search in this index for an item.
 
-        tlen = 0
-        # Do the lookup for values fullfilling the conditions
-        for i in xrange(self.nslices):
-            (start, stop) = sorted._search_bin(i, item)
-            self.starts[i] = start
-            self.lengths[i] = stop - start
-            tlen += stop - start
-        return tlen
+        All the slices are looked up at once: the ranges cache tells
+        which slices hold the limits of `item`, and only those are
+        looked up in their bounds and sorted values.
+
+        """
+
+        item1, item2 = item
+        nslices = self.nslices
+        ss = sorted.slicesize
+        ranges = self.rvcache[:nslices]
+        begins, ends = ranges[:, 0], ranges[:, 1]
+        # Slices not holding a limit start (or stop) at one of their ends
+        starts = numpy.where(item1 <= begins, 0, ss)
+        stops = numpy.where(item2 < begins, 0, ss)
+        rows1 = numpy.flatnonzero((item1 > begins) & (item1 <= ends))
+        rows2 = numpy.flatnonzero((item2 >= begins) & (item2 < ends))
+        rows = numpy.union1d(rows1, rows2)
+        if len(rows) > 0:
+            bounds = self._read_bounds_rows(rows)
+            if len(rows1) > 0:
+                bounds1 = bounds[numpy.searchsorted(rows, rows1)]
+                nchunks = (bounds1 < item1).sum(axis=1)
+                starts[rows1] = sorted._search_sorted_chunks(
+                    rows1, nchunks, item1, False)
+            if len(rows2) > 0:
+                bounds2 = bounds[numpy.searchsorted(rows, rows2)]
+                nchunks = (bounds2 <= item2).sum(axis=1)
+                stops[rows2] = sorted._search_sorted_chunks(
+                    rows2, nchunks, item2, True)
+        lengths = stops - starts
+        self.starts[:nslices] = starts
+        self.lengths[:nslices] = lengths
+        return int(lengths.sum())
+
+    def _read_bounds_rows(self, rows):
+        """Read the rows of bounds with the (increasing) numbers in `rows`.
+
+        Rows close to each other are read together, in blocks of up to
+        ``BOUNDS_MAX_SIZE`` bytes.
+
+        """
+
+        bounds = self.bounds
+        nbounds = bounds.shape[1]
+        dtype = bounds.atom.dtype
+        rowsize = max(nbounds * dtype.itemsize, 1)
+        maxrows = max(self._v_file.params['BOUNDS_MAX_SIZE'] // rowsize, 1)
+        result = numpy.empty((len(rows), nbounds), dtype=dtype)
+        i = 0
+        while i < len(rows):
+            start = rows[i]
+            j = numpy.searchsorted(rows, start + maxrows)
+            block = bounds[start:rows[j - 1] + 1]
+            result[i:j] = block[rows[i:j] - start]
+            i = j
+        return result
 
     def search_last_row(self, item):
         # Variable initialization
@@ -2011,6 +2498,42 @@ class Index(NotLoggedMixin, indexesextension.Index, Group):
 
     searchLastRow = previous_api(search_last_row)
 
+    def read_search_result(self, what='sorted'):
+        """Read the sorted values or indices found by the last search.
+
+        `what` can be 'sorted' or 'indices'.  The values found in every
+        slice come one slice after the other, ending with the last row.
+        This is only supported for indexes without reduction.
+
+        """
+
+        assert self.reduction == 1, "the index values have been reduced"
+        if what == "sorted":
+            values = self.sorted
+            valuesLR = self.sortedLR
+            dtype = self.dtype
+        else:
+            values = self.indices
+            valuesLR = self.indicesLR
+            dtype = "u%d" % self.indsize
+        nslices = self.nslices
+        lengths = self.lengths[:nslices].astype('int_')
+        slices = lengths.nonzero()[0]
+        lengthLR = 0
+        if self.nelementsSLR > 0:
+            lengthLR = int(self.lengths[nslices])
+        buffer_ = numpy.empty(lengths.sum() + lengthLR, dtype=dtype)
+        if len(slices) > 0:
+            starts = self.starts[slices].astype('uint64')
+            stops = starts + lengths[slices].astype('uint64')
+            values._read_index_slices(
+                slices.astype('uint64'), starts, stops, buffer_)
+        if lengthLR > 0:
+            self.read_slice_lr(valuesLR, buffer_[-lengthLR:],
+                               self.starts[nslices])
+        return buffer_
+
+    @timed_phase('chunkmap')
     def get_chunkmap(self):
         """Compute a map with the interesting chunks in index"""
 
@@ -2030,28 +2553,63 @@ class Index(NotLoggedMixin, indexesextension.Index, Group):
         starts = (self.starts - 1) * reduction + 1
         stops = (self.starts + self.lengths) * reduction
         starts[starts < 0] = 0    # All negative values set to zero
-        indices = self.indices
-        for nslice in xrange(self.nrows):
-            start = starts[nslice]
-            stop = stops[nslice]
+        lengths = stops - starts
+        lengths[lengths < 0] = 0
+        # Regular slices with some interesting index
+        slices = lengths[:nslices].nonzero()[0]
+        if len(slices) > 0:
+            rlengths = lengths[slices].astype('int_')
+            rstarts = starts[slices].astype('uint64')
+            rstops = stops[slices].astype('uint64')
+            if indsize == 2:
+                offsets = ((slices // nsb) * bucketsinblock).astype('int_')
+            elif indsize == 1:
+                offsets = (slices * ss) // lbucket
+            # Group the slices in batches fitting in a (reusable) buffer
+            bufsize = max(self._v_file.params['IO_BUFFER_SIZE'] // indsize,
+                          ss)
+            cumlengths = rlengths.cumsum()
+            batches = (cumlengths - rlengths) // bufsize
+            bounds = numpy.searchsorted(
+                batches, numpy.arange(batches[-1] + 2), side='left')
+            buf = numpy.empty(shape=bufsize + ss, dtype='u%d' % indsize)
+            irows = slices.astype('uint64')
+            indices = self.indices
+            for b1, b2 in zip(bounds[:-1], bounds[1:]):
+                if b1 == b2:
+                    continue
+                nidx = cumlengths[b2 - 1] - cumlengths[b1] + rlengths[b1]
+                indices._read_index_slices(
+                    irows[b1:b2], rstarts[b1:b2], rstops[b1:b2], buf)
+                idx = buf[:nidx]
+                if indsize == 8:
+                    idx = idx // lbucket
+                elif indsize in (2, 1):
+                    # The chunkmap size cannot be never larger than 'int_'
+                    idx = idx.astype("int_")
+                    # Offsets are non-decreasing, so avoid the expansion
+                    # when they are the same for the whole batch
+                    if offsets[b1] == offsets[b2 - 1]:
+                        idx += offsets[b1]
+                    else:
+                        idx += numpy.repeat(offsets[b1:b2],
+                                            rlengths[b1:b2])
+                chunkmap[idx] = True
+        # The last row (if any) lives in its own array
+        if self.nrows > nslices:
+            start = starts[nslices]
+            stop = stops[nslices]
             if stop > start:
                 idx = numpy.empty(shape=stop - start, dtype='u%d' % indsize)
-                if nslice < nslices:
-                    indices._read_index_slice(nslice, start, stop, idx)
-                else:
-                    self.indicesLR._read_index_slice(start, stop, idx)
+                self.indicesLR._read_index_slice(start, stop, idx)
                 if indsize == 8:
                     idx //= lbucket
                 elif indsize == 2:
-                    # The chunkmap size cannot be never larger than 'int_'
                     idx = idx.astype("int_")
-                    offset = long((nslice // nsb) * bucketsinblock)
-                    idx += offset
+                    idx += long((nslices // nsb) * bucketsinblock)
                 elif indsize == 1:
-                    # The chunkmap size cannot be never larger than 'int_'
                     idx = idx.astype("int_")
-                    offset = (nslice * ss) // lbucket
-                    idx += offset
+                    idx += (nslices * ss) // lbucket
                 chunkmap[idx] = True
         # The case lbucket < nrowsinchunk should only happen in tests
         nrowsinchunk = self.nrowsinchunk
@@ -2059,18 +2617,41 @@ class Index(NotLoggedMixin, indexesextension.Index, Group):
             # Map the 'coarse grain' chunkmap into the 'true' chunkmap
             nelements = self.nelements
             tnchunks = long(math.ceil(float(nelements) / nrowsinchunk))
-            tchunkmap = numpy.zeros(shape=tnchunks, dtype="bool")
             ratio = float(lbucket) / nrowsinchunk
             idx = chunkmap.nonzero()[0]
             starts = (idx * ratio).astype('int_')
             stops = numpy.ceil((idx + 1) * ratio).astype('int_')
-            for i in range(len(idx)):
-                tchunkmap[starts[i]:stops[i]] = True
-            chunkmap = tchunkmap
+            starts = numpy.minimum(starts, tnchunks)
+            stops = numpy.minimum(stops, tnchunks)
+            # Mark the beginning and end of every range and accumulate
+            marks = (numpy.bincount(starts, minlength=tnchunks + 1) -
+                     numpy.bincount(stops, minlength=tnchunks + 1))
+            chunkmap = marks.cumsum()[:tnchunks] > 0
+        if len(self.get_tombstones()) > 0:
+            chunkmap = self._map_chunkmap(chunkmap)
         if profile:
             show_stats("Exiting get_chunkmap", tref)
         return chunkmap
 
+    def _map_chunkmap(self, chunkmap):
+        """Map the chunks of positions in `chunkmap` into table chunks."""
+
+        nrowsinchunk = self.nrowsinchunk
+        nelements = self.nelements
+        tnchunks = long(math.ceil(float(nelements - self.nremoved) /
+                                  nrowsinchunk))
+        pstarts = chunkmap.nonzero()[0] * nrowsinchunk
+        pstops = numpy.minimum(pstarts + nrowsinchunk, nelements)
+        # The rows left in every chunk of positions are contiguous
+        starts = self._map_positions(pstarts)[0]
+        stops = self._map_positions(pstops)[0]
+        selected = stops > starts
+        starts = starts[selected] // nrowsinchunk
+        stops = (stops[selected] - 1) // nrowsinchunk + 1
+        marks = (numpy.bincount(starts, minlength=tnchunks + 1) -
+                 numpy.bincount(stops, minlength=tnchunks + 1))
+        return marks.cumsum()[:tnchunks] > 0
+
     def get_lookup_range(self, ops, limits):
         assert len(ops) in [1, 2]
         assert len(limits) in [1, 2]
@@ -44,7 +44,8 @@ from numpy cimport (import_array, ndarray,
 ctypedef npy_uint16 npy_float16
 
 from definitions cimport hid_t, herr_t, hsize_t, H5Screate_simple, H5Sclose
-from lrucacheextension cimport NumCache
+from lrucacheextension cimport NumCache, SharedNumCache
+from utilsextension cimport PyThreadState, release_gil, restore_gil
 
 from tables._past import previous_api
 
@@ -60,6 +61,9 @@ cdef extern from "H5ARRAY-opt.h" nogil:
   herr_t H5ARRAYOread_readSlice(
     hid_t dataset_id, hid_t type_id,
     hsize_t irow, hsize_t start, hsize_t stop, void *data)
+  herr_t H5ARRAYOread_readSlices(
+    hid_t dataset_id, hid_t type_id, hsize_t nslices,
+    hsize_t *irows, hsize_t *starts, hsize_t *stops, void *data)
   herr_t H5ARRAYOread_readSortedSlice(
     hid_t dataset_id, hid_t mem_space_id, hid_t type_id,
     hsize_t irow, hsize_t start, hsize_t stop, void *data)
@@ -132,45 +136,67 @@ def keysort(ndarray array1, ndarray array2):
   array1 can be of any type, except complex or string.  array2 may be made of
   elements on any size.
 
+  The GIL is released during the sort, so several arrays can be sorted at
+  the same time from different threads.
+
   """
 
   cdef npy_intp size
-  cdef int elsize1, elsize2
+  cdef int elsize1, elsize2, ret
+  cdef char *data1
+  cdef char *data2
 
   size = array1.size
   elsize1 = array1.itemsize
   elsize2 = array2.itemsize
+  data1 = array1.data
+  data2 = array2.data
   if array1.dtype == "float64":
-    return keysort_f64(<npy_float64 *>array1.data, array2.data, size, elsize2)
+    with nogil:
+      ret = keysort_f64(<npy_float64 *>data1, data2, size, elsize2)
   elif array1.dtype == "float32":
-    return keysort_f32(<npy_float32 *>array1.data, array2.data, size, elsize2)
+    with nogil:
+      ret = keysort_f32(<npy_float32 *>data1, data2, size, elsize2)
   # elif array1.dtype == "float16": # raises an error if float16 is not defined
   elif array1.dtype.name == "float16":
-    return keysort_f16(<npy_float16 *>array1.data, array2.data, size, elsize2)
+    with nogil:
+      ret = keysort_f16(<npy_float16 *>data1, data2, size, elsize2)
   elif array1.dtype.name == "float96":
-    return keysort_f96(<npy_float96 *>array1.data, array2.data, size, elsize2)
+    with nogil:
+      ret = keysort_f96(<npy_float96 *>data1, data2, size, elsize2)
   elif array1.dtype.name == "float128":
-    return keysort_f128(<npy_float128 *>array1.data, array2.data, size, elsize2)
+    with nogil:
+      ret = keysort_f128(<npy_float128 *>data1, data2, size, elsize2)
   elif array1.dtype == "int64":
-    return keysort_i64(<npy_int64 *>array1.data, array2.data, size, elsize2)
+    with nogil:
+      ret = keysort_i64(<npy_int64 *>data1, data2, size, elsize2)
   elif array1.dtype == "uint64":
-    return keysort_u64(<npy_uint64 *>array1.data, array2.data, size, elsize2)
+    with nogil:
+      ret = keysort_u64(<npy_uint64 *>data1, data2, size, elsize2)
   elif array1.dtype == "int32":
-    return keysort_i32(<npy_int32 *>array1.data, array2.data, size, elsize2)
+    with nogil:
+      ret = keysort_i32(<npy_int32 *>data1, data2, size, elsize2)
   elif array1.dtype == "uint32":
-    return keysort_u32(<npy_uint32 *>array1.data, array2.data, size, elsize2)
+    with nogil:
+      ret = keysort_u32(<npy_uint32 *>data1, data2, size, elsize2)
   elif array1.dtype == "int16":
-    return keysort_i16(<npy_int16 *>array1.data, array2.data, size, elsize2)
+    with nogil:
+      ret = keysort_i16(<npy_int16 *>data1, data2, size, elsize2)
   elif array1.dtype == "uint16":
-    return keysort_u16(<npy_uint16 *>array1.data, array2.data, size, elsize2)
+    with nogil:
+      ret = keysort_u16(<npy_uint16 *>data1, data2, size, elsize2)
   elif array1.dtype == "int8":
-    return keysort_i8(<npy_int8 *>array1.data, array2.data, size, elsize2)
+    with nogil:
+      ret = keysort_i8(<npy_int8 *>data1, data2, size, elsize2)
   elif array1.dtype == "uint8":
-    return keysort_u8(<npy_uint8 *>array1.data, array2.data, size, elsize2)
+    with nogil:
+      ret = keysort_u8(<npy_uint8 *>data1, data2, size, elsize2)
   elif array1.dtype == "bool":
-    return keysort_u8(<npy_uint8 *>array1.data, array2.data, size, elsize2)
+    with nogil:
+      ret = keysort_u8(<npy_uint8 *>data1, data2, size, elsize2)
   elif array1.dtype.char == "S":
-    return keysort_S(array1.data, elsize1, array2.data, size, elsize2)
+    with nogil:
+      ret = keysort_S(data1, elsize1, data2, size, elsize2)
     # As it turns out, an indirect sort is always faster, and much faster on
     # new processors.  See
     # http://www.mail-archive.com/numpy-discussion@scipy.org/msg06639.html
@@ -184,6 +210,7 @@ def keysort(ndarray array1, ndarray array2):
     #return 0
   else:
     raise ValueError("This shouldn't happen!")
+  return ret
 
 
 # Classes
@@ -235,18 +262,45 @@ cdef class IndexArray(Array):
 
   def _read_index_slice(self, hsize_t irow, hsize_t start, hsize_t stop,
                       ndarray idx):
+    cdef PyThreadState *tstate
     cdef herr_t ret
 
     # Do the physical read
-    with nogil:
-        ret = H5ARRAYOread_readSlice(self.dataset_id, self.type_id,
-                                     irow, start, stop, idx.data)
+    tstate = release_gil()
+    ret = H5ARRAYOread_readSlice(self.dataset_id, self.type_id,
+                                 irow, start, stop, idx.data)
+    restore_gil(tstate)
 
     if ret < 0:
       raise HDF5ExtError("Problems reading the index indices.")
 
   _readIndexSlice = previous_api(_read_index_slice)
 
+  def _read_index_slices(self, ndarray irows, ndarray starts, ndarray stops,
+                         ndarray idx):
+    """Read the `starts`-`stops` ranges of several `irows` slices.
+
+    The ranges are stored one after the other in the `idx` buffer.  All
+    the coordinate arrays must be contiguous and of 'uint64' type, and
+    `irows` must be strictly increasing.
+
+    """
+
+    cdef PyThreadState *tstate
+    cdef herr_t ret
+    cdef hsize_t nslices = irows.shape[0]
+
+    # Do the physical read
+    tstate = release_gil()
+    ret = H5ARRAYOread_readSlices(self.dataset_id, self.type_id, nslices,
+                                  <hsize_t *>irows.data,
+                                  <hsize_t *>starts.data,
+                                  <hsize_t *>stops.data, idx.data)
+    restore_gil(tstate)
+
+    if ret < 0:
+      raise HDF5ExtError("Problems reading the index indices.")
+
   def _init_sorted_slice(self, index):
     """Initialize the structures for doing a binary search."""
 
@@ -290,18 +344,30 @@ cdef class IndexArray(Array):
       # already bound to the boundscache attribute. This way, the cache will
       # not be duplicated (I know, this smells badly, but anyway).
       params = self._v_file.params
+      globalsize = params['GLOBAL_CACHE_SIZE']
       rowsize = (self.bounds_ext._v_chunkshape[1] * dtype.itemsize)
-      maxslots = params['BOUNDS_MAX_SIZE'] / rowsize
-      self.boundscache = <NumCache>NumCache(
-        (maxslots, self.nbounds), dtype, 'non-opt types bounds')
+      if globalsize > 0:
+        # Keep the data in the cache shared by all tables and indexes
+        self.boundscache = <NumCache>SharedNumCache(
+          (globalsize / rowsize, self.nbounds), dtype,
+          'non-opt types bounds', globalsize)
+      else:
+        maxslots = params['BOUNDS_MAX_SIZE'] / rowsize
+        self.boundscache = <NumCache>NumCache(
+          (maxslots, self.nbounds), dtype, 'non-opt types bounds',
+          params['CACHE_POLICY'])
       self.bufferbc = numpy.empty(dtype=dtype, shape=self.nbounds)
       # Get the pointer for the internal buffer for 2nd level cache
       self.rbufbc = self.bufferbc.data
       # Another NumCache for the sorted values
       rowsize = (self.chunksize*dtype.itemsize)
-      maxslots = params['SORTED_MAX_SIZE'] / (self.chunksize*dtype.itemsize)
-      self.sortedcache = <NumCache>NumCache(
-        (maxslots, self.chunksize), dtype, 'sorted')
+      if globalsize > 0:
+        self.sortedcache = <NumCache>SharedNumCache(
+          (globalsize / rowsize, self.chunksize), dtype, 'sorted', globalsize)
+      else:
+        maxslots = params['SORTED_MAX_SIZE'] / rowsize
+        self.sortedcache = <NumCache>NumCache(
+          (maxslots, self.chunksize), dtype, 'sorted', params['CACHE_POLICY'])
 
 
   _initSortedSlice = previous_api(_init_sorted_slice)
@@ -310,10 +376,13 @@ cdef class IndexArray(Array):
                                 hsize_t stop):
     """Read the sorted part of an index."""
 
-    with nogil:
-        ret = H5ARRAYOread_readSortedSlice(
-          self.dataset_id, self.mem_space_id, self.type_id,
-          irow, start, stop, self.rbuflb)
+    cdef PyThreadState *tstate
+
+    tstate = release_gil()
+    ret = H5ARRAYOread_readSortedSlice(
+      self.dataset_id, self.mem_space_id, self.type_id,
+      irow, start, stop, self.rbuflb)
+    restore_gil(tstate)
 
     if ret < 0:
       raise HDF5ExtError("Problems reading the array data.")
@@ -332,6 +401,33 @@ cdef class IndexArray(Array):
 
   _readSortedSlice = previous_api(_read_sorted_slice)
 
+  def _search_sorted_chunks(self, ndarray rows, ndarray nchunks, object item,
+                            int right):
+    """Look up `item` in a chunk of sorted values of several slices.
+
+    For every slice number in `rows`, its chunk in `nchunks` is read and
+    bisected for `item` (to the right if `right` is true, or to the
+    left).  The positions found are returned as an array of offsets
+    from the start of each slice.  This works for every type.
+
+    """
+
+    cdef long i, nrows
+    cdef hsize_t cs, nchunk
+    cdef ndarray result, buffer
+    cdef object side
+
+    cs = self.l_chunksize
+    buffer = self.bufferlb
+    side = 'right' if right else 'left'
+    nrows = len(rows)
+    result = numpy.empty(nrows, dtype=numpy.int64)
+    for i from 0 <= i < nrows:
+      nchunk = nchunks[i]
+      self._g_read_sorted_slice(rows[i], cs*nchunk, cs*(nchunk+1))
+      result[i] = buffer.searchsorted(item, side) + cs*nchunk
+    return result
+
 # This has been copied from the standard module bisect.
 # Checks for the values out of limits has been added at the beginning
 # because I forsee that this should be a very common case.
@@ -1008,6 +1104,16 @@ cdef class IndexArray(Array):
 
   _searchBinNA_g = previous_api(_search_bin_na_g)
 
+  def _get_cache_stats(self):
+    """Get the statistics of the caches for optimized searches."""
+
+    stats = {}
+    if self.boundscache is not None:
+      stats['bounds'] = self.boundscache.stats()
+    if self.sortedcache is not None:
+      stats['sorted'] = self.sortedcache.stats()
+    return stats
+
   def _g_close(self):
     super(Array, self)._g_close()
     # Release specific resources of this class
@@ -1023,9 +1129,12 @@ cdef class LastRowArray(Array):
   def _read_index_slice(self, hsize_t start, hsize_t stop, ndarray idx):
     """Read the reverse index part of an LR index."""
 
-    with nogil:
-        ret = H5ARRAYOreadSliceLR(self.dataset_id, self.type_id,
-                                  start, stop, idx.data)
+    cdef PyThreadState *tstate
+
+    tstate = release_gil()
+    ret = H5ARRAYOreadSliceLR(self.dataset_id, self.type_id,
+                              start, stop, idx.data)
+    restore_gil(tstate)
 
     if ret < 0:
       raise HDF5ExtError("Problems reading the index data in Last Row.")
@@ -1035,12 +1144,14 @@ cdef class LastRowArray(Array):
   def _read_sorted_slice(self, IndexArray sorted, hsize_t start, hsize_t stop):
     """Read the sorted part of an LR index."""
 
+    cdef PyThreadState *tstate
     cdef void  *rbuflb
 
     rbuflb = sorted.rbuflb  # direct access to rbuflb: very fast.
-    with nogil:
-        ret = H5ARRAYOreadSliceLR(self.dataset_id, self.type_id,
-                                  start, stop, rbuflb)
+    tstate = release_gil()
+    ret = H5ARRAYOreadSliceLR(self.dataset_id, self.type_id,
+                              start, stop, rbuflb)
+    restore_gil(tstate)
 
     if ret < 0:
       raise HDF5ExtError("Problems reading the index data.")
@@ -15,10 +15,10 @@ from numpy cimport ndarray
 # Declaration of instance variables for shared classes
 # The NodeCache class is useful for caching general objects (like Nodes).
 cdef class NodeCache:
-  cdef long nextslot, nslots
-  cdef object nodes, paths
+  cdef long nslots
+  cdef object nodes, prevpaths, nextpaths, firstpath, lastpath
+  cdef object unlink(self, object path)
   cdef object setitem(self, object path, object node)
-  cdef long getslot(self, object path)
   cdef object cpop(self, object path)
 
 
@@ -29,14 +29,26 @@ cdef class BaseCache:
   cdef long disablecyclecount, disableeverycycles
   cdef long enablecyclecount, enableeverycycles
   cdef double nprobes, hitratio
-  cdef long seqn_, nextslot, nslots
-  cdef long *ratimes
+  cdef long long nhits, nmisses, nevictions
+  cdef long nused, nslots
+  cdef int policy
+  cdef long mruslot, lruslot, freeslot, hand
+  cdef long *rprevs
+  cdef long *rnexts
+  cdef signed char *rrefs
   cdef double lowesthr
-  cdef ndarray atimes
+  cdef ndarray prevs, nexts, refs
   cdef object name
   cdef int checkhitratio(self)
   cdef int couldenablecache_(self)
-  cdef long incseqn(self)
+  cdef clearslots_(self)
+  cdef long popfreeslot_(self)
+  cdef linkslot_(self, long nslot)
+  cdef unlinkslot_(self, long nslot)
+  cdef touchslot_(self, long nslot)
+  cdef long victimslot_(self)
+  cdef long nentries_(self)
+  cdef long long datasize_(self)
 
 
 #  Helper class for ObjectCache
@@ -54,6 +66,7 @@ cdef class ObjectCache(BaseCache):
   cdef ObjectNode mrunode
   cdef removeslot_(self, long nslot)
   cdef clearcache_(self)
+  cdef long getfreeslot_(self)
   cdef updateslot_(self, long nslot, long size, object key, object value)
   cdef long setitem_(self, object key, object value, long size)
   cdef long getslot_(self, object key)
@@ -75,6 +88,40 @@ cdef class NumCache(BaseCache):
   cdef void *getitem1_(self, long nslot)
 
 
+# Entries of the SharedCache class
+cdef class SharedEntry:
+  cdef object key, value, name
+  cdef long long size
+  cdef SharedEntry prev, next
+
+
+# The SharedCache class keeps the data of several caches in a single budget
+cdef class SharedCache:
+  cdef readonly long long maxsize, size
+  cdef long long hits, misses, evictions
+  cdef long long nowners
+  cdef object entries, ownerkeys, namestats
+  cdef SharedEntry mruentry, lruentry
+  cdef long long newowner_(self)
+  cdef SharedEntry get_(self, object key)
+  cdef put_(self, object key, object value, long long size, object name)
+  cdef remove_(self, SharedEntry entry)
+  cdef dropowner_(self, long long owner)
+
+
+# Versions of ObjectCache and NumCache keeping their data in the SharedCache
+cdef class SharedObjectCache(ObjectCache):
+  cdef SharedCache shared
+  cdef long long owner
+  cdef object lastkey, lastvalue
+
+
+cdef class SharedNumCache(NumCache):
+  cdef SharedCache shared
+  cdef long long owner
+  cdef ndarray lastslot
+
+
 ## Local Variables:
 ## mode: python
 ## py-indent-offset: 2
@@ -17,21 +17,20 @@ Classes (type extensions):
     NodeCache
     ObjectCache
     NumCache
+    SharedCache
+    SharedObjectCache
+    SharedNumCache
 
 Functions:
 
 Misc variables:
 
-"""
-
-cdef extern from "Python.h":
-    int PyUnicode_Compare(object, object)
+    shared_cache
 
-import sys
+"""
 
 import numpy
-from libc.string cimport memcpy, strcmp
-from cpython.unicode cimport PyUnicode_Check
+from libc.string cimport memcpy
 from numpy cimport import_array, ndarray
 
 from tables.parameters import (DISABLE_EVERY_CYCLES, ENABLE_EVERY_CYCLES,
@@ -54,7 +53,10 @@ import_array()
 # "A node cannot be alive and dead at the same time."
 
 # Thanks to the above behaviour, the next code has been stripped down
-# to a bare minimum (the info in cache is kept in just 2 lists).
+# to a bare minimum: nodes are kept in a dictionary keyed by path, and
+# their order of arrival in a doubly linked list of paths (also kept in
+# dictionaries), so that looking up, removing and preempting nodes does
+# not depend on the number of nodes in the cache.
 
 #*********************** Important note! *****************************
 # The code behind has been carefully tuned to serve the needs of
@@ -81,9 +83,11 @@ cdef class NodeCache:
     if nslots < 0:
       raise ValueError("Negative number (%s) of slots!" % nslots)
     self.nslots = nslots
-    self.nextslot = 0
-    self.nodes = []
-    self.paths = []
+    self.nodes = {}
+    self.prevpaths = {}
+    self.nextpaths = {}
+    self.firstpath = None
+    self.lastpath = None
 
   def __len__(self):
     return len(self.nodes)
@@ -91,91 +95,97 @@ cdef class NodeCache:
   def __setitem__(self, path, node):
     self.setitem(path, node)
 
+  cdef object unlink(self, object path):
+    """Take the node under `path` out of the cache and return it."""
+
+    node = self.nodes.pop(path)
+    prevpath = self.prevpaths.pop(path)
+    nextpath = self.nextpaths.pop(path)
+    if prevpath is None:
+      self.firstpath = nextpath
+    else:
+      self.nextpaths[prevpath] = nextpath
+    if nextpath is None:
+      self.lastpath = prevpath
+    else:
+      self.prevpaths[nextpath] = prevpath
+    return node
+
   cdef setitem(self, object path, object node):
     """Puts a new node in the node list."""
 
+    cdef object lrunode
+
     if self.nslots == 0:   # Oops, the cache is set to empty
       return
-    # Check if we are growing out of space
-    if self.nextslot == self.nslots:
-      # It is critical to reduce nextslot *before* the preemption of
-      # the LRU node.  If not, this can lead with problems in situations
-      # with very small caches (length 1 or so).
-      # F. Alted 2008-10-22
-      self.nextslot = self.nextslot - 1
-      # Remove the LRU node and path (the start of the lists)
-      del self.nodes[0]
-      del self.paths[0]
-    # The equality protection has been put for situations in which a
-    # node is being preempted and added simultaneously (with very small
-    # caches).
-    if len(self.nodes) == len(self.paths):
-      # Add the node and path to the end of its lists
-      self.nodes.append(node)
-      self.paths.append(path)
-      self.nextslot = self.nextslot + 1
-
-  def __contains__(self, path):
-    if self.getslot(path) == -1:
-      return 0
+    lrunode = None
+    if path in self.nodes:
+      lrunode = self.unlink(path)
+    elif len(self.nodes) >= self.nslots:
+      # Remove the LRU node and path (the start of the list).  The
+      # node is released only when the new one is in place, since
+      # closing it may use the cache again.
+      lrunode = self.unlink(self.firstpath)
+    # Add the node and path to the end of the list
+    self.nodes[path] = node
+    self.prevpaths[path] = self.lastpath
+    self.nextpaths[path] = None
+    if self.lastpath is None:
+      self.firstpath = path
     else:
-      return 1
+      self.nextpaths[self.lastpath] = path
+    self.lastpath = path
 
-  cdef long getslot(self, object path):
-    """Checks whether path is in this cache or not."""
-
-    cdef long i, nslot
-
-    nslot = -1  # -1 means not found
-    if PyUnicode_Check(path):
-        # Start looking from the trailing values (most recently used)
-        for i from self.nextslot > i >= 0:
-          #if strcmp(<char *>encoded_path, <char *>self.paths[i]) == 0:
-          if PyUnicode_Compare(path, self.paths[i]) == 0:
-            nslot = i
-            break
-    else:
-        # Start looking from the trailing values (most recently used)
-        for i from self.nextslot > i >= 0:
-          if strcmp(<char *>path, <char *>self.paths[i]) == 0:
-            nslot = i
-            break
+  def __contains__(self, path):
+    return path in self.nodes
 
-    return nslot
+  # Get a node without removing it from the cache
+  def __getitem__(self, path):
+    return self.nodes[path]
 
   def pop(self, path):
     return self.cpop(path)
 
   cdef object cpop(self, object path):
-    cdef long nslot
-
-    nslot = self.getslot(path)
-    node = self.nodes[nslot]
-    del self.nodes[nslot];  del self.paths[nslot]
-    self.nextslot = self.nextslot - 1
-    return node
+    return self.unlink(path)
 
   def __iter__(self):
-    # Do a copy of the paths list because it can be modified in the middle of
+    # Do a copy of the paths because they can be modified in the middle of
     # the iterator!
-    copy = self.paths[:]
-    return iter(copy)
+    cdef list paths = []
+    path = self.firstpath
+    while path is not None:
+      paths.append(path)
+      path = self.nextpaths[path]
+    return iter(paths)
 
   def __repr__(self):
-    return "<%s (%d elements)>" % (str(self.__class__), len(self.paths))
+    return "<%s (%d elements)>" % (str(self.__class__), len(self.nodes))
 
 
 ########################################################################
 # Common code for other LRU cache classes
 ########################################################################
 
+# The replacement policies for slots in caches
+cdef enum:
+  LRU_POLICY = 0
+  CLOCK_POLICY = 1
+
+_cache_policies = {'lru': LRU_POLICY, 'clock': CLOCK_POLICY}
+
+
 cdef class BaseCache:
   """Base class that implements automatic probing/disabling of the cache."""
 
-  def __init__(self, long nslots, object name):
+  def __init__(self, long nslots, object name, object policy='lru'):
 
     if nslots < 0:
       raise ValueError("Negative number (%s) of slots!" % nslots)
+    if policy not in _cache_policies:
+      raise ValueError("unknown cache replacement policy: %r (use one of %s)"
+                       % (policy, ", ".join(sorted(_cache_policies))))
+    self.policy = _cache_policies[policy]
     self.setcount = 0;  self.getcount = 0;  self.containscount = 0
     self.enablecyclecount = 0;  self.disablecyclecount = 0
     self.iscachedisabled = False  # Cache is enabled by default
@@ -183,13 +193,21 @@ cdef class BaseCache:
     self.enableeverycycles = ENABLE_EVERY_CYCLES
     self.lowesthr = LOWEST_HIT_RATIO
     self.nprobes = 0.0;  self.hitratio = 0.0
+    self.nhits = 0;  self.nmisses = 0;  self.nevictions = 0
     self.nslots = nslots
-    self.seqn_ = 0;  self.nextslot = 0
     self.name = name
     self.incsetcount = False
-    # The array for keeping the access times (using long ints here)
-    self.atimes = <ndarray>numpy.zeros(shape=nslots, dtype=numpy.int_)
-    self.ratimes = <long *>self.atimes.data
+    # The links of the slots in use, from the most recently used to the
+    # least recently used one.  Free slots are kept in a separate list,
+    # linked through the `nexts` array too.
+    self.prevs = <ndarray>numpy.empty(shape=nslots, dtype=numpy.int_)
+    self.rprevs = <long *>self.prevs.data
+    self.nexts = <ndarray>numpy.empty(shape=nslots, dtype=numpy.int_)
+    self.rnexts = <long *>self.nexts.data
+    # The reference bits of slots (-1 for free slots)
+    self.refs = <ndarray>numpy.empty(shape=nslots, dtype=numpy.int8)
+    self.rrefs = <signed char *>self.refs.data
+    self.clearslots_()
 
   def __len__(self):
     return self.nslots
@@ -254,16 +272,141 @@ cdef class BaseCache:
     else:
       return True
 
-  # Increase the access time (implemented as a C long sequence)
-  cdef long incseqn(self):
+  # Machinery for choosing the slots to be replaced.  All the operations
+  # take constant time.  With the LRU policy, the slots in use are kept
+  # in a doubly linked list (by means of the `prevs` and `nexts` arrays)
+  # sorted by access time, so that the least recently used one is at its
+  # tail.  With the CLOCK policy, slots get their reference bit set when
+  # accessed, and a hand sweeps them (clearing the bits) until it finds
+  # a slot that has not been referenced since the last sweep.
+
+  # Mark all the slots as free
+  cdef clearslots_(self):
+    cdef long nslot
+
+    for nslot from 0 <= nslot < self.nslots:
+      self.rnexts[nslot] = nslot + 1
+      self.rrefs[nslot] = -1
+    if self.nslots > 0:
+      self.rnexts[self.nslots-1] = -1
+      self.freeslot = 0
+    else:
+      self.freeslot = -1
+    self.mruslot = -1;  self.lruslot = -1
+    self.nused = 0;  self.hand = 0
+
+  # Take a slot out of the list of free ones.  -1 is returned if there is
+  # no free slot.
+  cdef long popfreeslot_(self):
+    cdef long nslot
+
+    nslot = self.freeslot
+    if nslot >= 0:
+      self.freeslot = self.rnexts[nslot]
+    return nslot
+
+  # Start using a slot (just taken from the free ones).  The reference bit
+  # is only set on later accesses, so that slots used just once are the
+  # first to go.
+  cdef linkslot_(self, long nslot):
+
+    self.rrefs[nslot] = 0
+    self.nused = self.nused + 1
+    if self.policy == LRU_POLICY:
+      self.rprevs[nslot] = -1
+      self.rnexts[nslot] = self.mruslot
+      if self.mruslot >= 0:
+        self.rprevs[self.mruslot] = nslot
+      self.mruslot = nslot
+      if self.lruslot < 0:
+        self.lruslot = nslot
+
+  # Stop using a slot and put it in the list of free ones
+  cdef unlinkslot_(self, long nslot):
+    cdef long prev, next
+
+    if self.policy == LRU_POLICY:
+      prev = self.rprevs[nslot];  next = self.rnexts[nslot]
+      if prev >= 0:
+        self.rnexts[prev] = next
+      else:
+        self.mruslot = next
+      if next >= 0:
+        self.rprevs[next] = prev
+      else:
+        self.lruslot = prev
+    self.rrefs[nslot] = -1
+    self.rnexts[nslot] = self.freeslot
+    self.freeslot = nslot
+    self.nused = self.nused - 1
+
+  # Record an access to a slot in use
+  cdef touchslot_(self, long nslot):
+    cdef long prev, next
+
+    if self.policy != LRU_POLICY:
+      self.rrefs[nslot] = 1
+      return
+    if nslot == self.mruslot:
+      return
+    # Move the slot to the head of the list
+    prev = self.rprevs[nslot];  next = self.rnexts[nslot]
+    self.rnexts[prev] = next
+    if next >= 0:
+      self.rprevs[next] = prev
+    else:
+      self.lruslot = prev
+    self.rprevs[nslot] = -1
+    self.rnexts[nslot] = self.mruslot
+    self.rprevs[self.mruslot] = nslot
+    self.mruslot = nslot
+
+  # Choose the slot in use to be replaced.  -1 is returned if no slot is
+  # in use.
+  cdef long victimslot_(self):
+    cdef long nslot
+
+    if self.nused == 0:
+      return -1
+    if self.policy == LRU_POLICY:
+      return self.lruslot
+    while True:
+      nslot = self.hand
+      self.hand = self.hand + 1
+      if self.hand == self.nslots:
+        self.hand = 0
+      if self.rrefs[nslot] > 0:
+        # Give the slot a second chance
+        self.rrefs[nslot] = 0
+      elif self.rrefs[nslot] == 0:
+        return nslot
+
+  # The number of entries in cache
+  cdef long nentries_(self):
+    return self.nused
+
+  # The size of the data in cache (in bytes)
+  cdef long long datasize_(self):
+    return 0
+
+  def stats(self):
+    """Get a dictionary with statistics about the cache.
+
+    Its keys are 'name', 'nslots', 'nentries', 'size' (the bytes taken by
+    cached data), 'hits' and 'misses' (of lookups), 'evictions' (the
+    number of entries replaced to make room for others) and 'disabled'
+    (whether the cache is disabled because of a low hit ratio).  Counts
+    are kept since the creation of the cache.
+
+    """
 
-    self.seqn_ = self.seqn_ + 1
-    if self.seqn_ < 0:
-      # Ooops, the counter has run out of range! Reset all the access times.
-      self.atimes[:] = sys.maxint
-      # Set the counter to 1 (to indicate that it is newer than existing ones)
-      self.seqn_ = 1
-    return self.seqn_
+    return {
+      'name': self.name, 'nslots': self.nslots,
+      'nentries': self.nentries_(), 'size': self.datasize_(),
+      'hits': self.nhits, 'misses': self.nmisses,
+      'evictions': self.nevictions,
+      'disabled': bool(self.iscachedisabled),
+    }
 
   def __repr__(self):
     return "<%s(%s) (%d elements)>" % (self.name, str(self.__class__),
@@ -296,7 +439,8 @@ cdef class ObjectNode:
 cdef class ObjectCache(BaseCache):
   """Least-Recently-Used (LRU) cache specific for python objects."""
 
-  def __init__(self, long nslots, long maxcachesize, object name):
+  def __init__(self, long nslots, long maxcachesize, object name,
+               object policy='lru'):
     """Maximum size of the cache.
 
     If more than 'nslots' elements are added to the cache,
@@ -305,10 +449,11 @@ cdef class ObjectCache(BaseCache):
     Parameters:
     nslots - The number of slots in cache
     name - A descriptive name for this cache
+    policy - The replacement policy ('lru' or 'clock')
 
     """
 
-    super(ObjectCache, self).__init__(nslots, name)
+    super(ObjectCache, self).__init__(nslots, name, policy)
     self.cachesize = 0
     self.maxcachesize = maxcachesize
     # maxobjsize will be the same as the maximum cache size
@@ -326,8 +471,8 @@ cdef class ObjectCache(BaseCache):
     self.__dict = {}
     self.mrunode = <ObjectNode>None
     self.cachesize = 0
-    self.nextslot = 0
-    self.seqn_ = 0
+    self.sizes[:] = 0
+    self.clearslots_()
 
   # Remove a slot (if it exists in cache)
   cdef removeslot_(self, long nslot):
@@ -342,35 +487,32 @@ cdef class ObjectCache(BaseCache):
       self.rsizes[nslot] = 0
       if self.mrunode and self.mrunode.nslot == nslot:
         self.mrunode = <ObjectNode>None
-    # The next slot to be updated will be this one
-    self.nextslot = nslot
+      self.unlinkslot_(nslot)
+
+  # Get a free slot, replacing the one chosen by the policy if needed
+  cdef long getfreeslot_(self):
+    cdef long nslot
+
+    nslot = self.popfreeslot_()
+    if nslot < 0:
+      self.removeslot_(self.victimslot_())
+      self.nevictions = self.nevictions + 1
+      nslot = self.popfreeslot_()
+    return nslot
 
   # Update a slot
   cdef updateslot_(self, long nslot, long size, object key, object value):
-    cdef ObjectNode node, oldnode
-    cdef long nslot1, nslot2
-    cdef object lruidx
+    cdef ObjectNode node
 
     assert nslot < self.nslots, "Number of nodes exceeding cache capacity."
-    # Remove the previous nslot
-    self.removeslot_(nslot)
-    # Protection against too large data cache size
-    while size + self.cachesize > self.maxcachesize:
-      # Remove the LRU node among the 10 largest ones
-      largidx = self.sizes.argsort()[-10:]
-      nslot1 = self.atimes[largidx].argmin()
-      nslot2 = largidx[nslot1]
-      self.removeslot_(nslot2)
     # Insert the new one
     node = ObjectNode(key, value, nslot)
-    self.ratimes[nslot] = self.incseqn()
+    self.linkslot_(nslot)
     self.rsizes[nslot] = size
     self.__list[nslot] = node
     self.__dict[key] = node
     self.mrunode = node
     self.cachesize = self.cachesize + size
-    # The next slot to update will be the LRU
-    self.nextslot = self.atimes.argmin()
 
   # Put the object to the data in cache (for Python calls)
   def setitem(self, object key, object value, object size):
@@ -380,6 +522,7 @@ cdef class ObjectCache(BaseCache):
   # size can be the exact size of the value object or an estimation.
   cdef long setitem_(self, object key, object value, long size):
     cdef long nslot
+    cdef ObjectNode node
 
     if self.nslots == 0:   # The cache has been set to empty
       return -1
@@ -392,7 +535,15 @@ cdef class ObjectCache(BaseCache):
     if size > self.maxobjsize:  # Check if the object is too large
       return -1
     if self.checkhitratio():
-      nslot = self.nextslot
+      # Remove a previous value for the key
+      node = self.__dict.get(key)
+      if node is not None:
+        self.removeslot_(node.nslot)
+      # Protection against too large data cache size
+      while size + self.cachesize > self.maxcachesize:
+        self.removeslot_(self.victimslot_())
+        self.nevictions = self.nevictions + 1
+      nslot = self.getfreeslot_()
       self.updateslot_(nslot, size, key, value)
     else:
       # Empty the cache because it is not effective and it is taking space
@@ -417,13 +568,19 @@ cdef class ObjectCache(BaseCache):
     # Give a chance to the MRU node
     node = self.mrunode
     if node and node.key == key:
+      self.nhits = self.nhits + 1
       return node.nslot
     # No luck. Look in the dictionary.
     node = self.__dict.get(key)
     if node is <ObjectNode>None:
+      self.nmisses = self.nmisses + 1
       return -1
+    self.nhits = self.nhits + 1
     return node.nslot
 
+  cdef long long datasize_(self):
+    return self.cachesize
+
   # Return the object to the data in cache (for Python calls)
   def getitem(self, object nslot):
     return self.getitem_(nslot)
@@ -434,7 +591,7 @@ cdef class ObjectCache(BaseCache):
 
     self.getcount = self.getcount + 1
     node = self.__list[nslot]
-    self.ratimes[nslot] = self.incseqn()
+    self.touchslot_(nslot)
     self.mrunode = node
     return node.obj
 
@@ -446,7 +603,7 @@ cdef class ObjectCache(BaseCache):
     return """<%s(%s)
   (%d maxslots, %d slots used, %.3f KB cachesize,
   hit ratio: %.3f, disabled? %s)>
-  """ % (self.name, str(self.__class__), self.nslots, self.nextslot,
+  """ % (self.name, str(self.__class__), self.nslots, self.nused,
          self.cachesize / 1024., hitratio, self.iscachedisabled)
 
 
@@ -466,7 +623,8 @@ cdef class ObjectCache(BaseCache):
 cdef class NumCache(BaseCache):
   """Least-Recently-Used (LRU) cache specific for Numerical data."""
 
-  def __init__(self, object shape, object dtype, object name):
+  def __init__(self, object shape, object dtype, object name,
+               object policy='lru'):
     """Maximum size of the cache.
 
     If more than 'nslots' elements are added to the cache,
@@ -476,16 +634,14 @@ cdef class NumCache(BaseCache):
     shape - The rectangular shape of the cache (nslots, nelemsperslot)
     itemsize - The size of the element base in cache
     name - A descriptive name for this cache
+    policy - The replacement policy ('lru' or 'clock')
 
     """
 
     cdef long nslots
 
     nslots = shape[0];  self.slotsize = shape[1]
-    if nslots >= 1<<16:
-      # nslots can't be higher than 2**16. Will silently trunk the number.
-      nslots = <long>((1<<16)-1)  # Cast makes cython happy here
-    super(NumCache, self).__init__(nslots, name)
+    super(NumCache, self).__init__(nslots, name, policy)
     self.itemsize = dtype.itemsize
     self.__dict = {}
     # The cache object where all data will go
@@ -515,8 +671,7 @@ cdef class NumCache(BaseCache):
     nslot = self.setitem1_(key)
     if nslot >= 0:
       # Copy the data to cache
-      memcpy(<char *>self.rcache + nslot * self.slotsize * self.itemsize,
-             <char *>data + start * self.itemsize,
+      memcpy(self.getaddrslot_(nslot), <char *>data + start * self.itemsize,
              self.slotsize * self.itemsize)
     return nslot
 
@@ -527,7 +682,7 @@ cdef class NumCache(BaseCache):
   # aware that data in nslot cannot be overwritten!
   cdef long setitem1_(self, long long key):
     cdef long nslot
-    cdef object key2
+    cdef object nslot2
 
     if self.nslots == 0:   # Oops, the cache is set to empty
       return -1
@@ -538,29 +693,30 @@ cdef class NumCache(BaseCache):
       self.incsetcount = False
     nslot = -1
     if self.checkhitratio():
-      # Check if we are growing out of space
-      if self.nextslot == self.nslots:
-        # Get the least recently used slot
-        nslot = self.atimes.argmin()
+      # Reuse the slot of a previous value for the key
+      nslot2 = self.__dict.pop(key, None)
+      if nslot2 is not None:
+        self.unlinkslot_(nslot2)
+      nslot = self.popfreeslot_()
+      if nslot < 0:
+        # We are out of space.  Replace the slot chosen by the policy.
+        nslot = self.victimslot_()
+        self.nevictions = self.nevictions + 1
         # Remove the slot from the dict
-        key2 = self.keys[nslot]
-        del self.__dict[key2]
-        self.nextslot = self.nextslot - 1
-      else:
-        # Get the next slot available
-        nslot = self.nextslot
+        del self.__dict[self.rkeys[nslot]]
+        self.unlinkslot_(nslot)
+        nslot = self.popfreeslot_()
       # Insert the slot in the dictionary
       self.__dict[key] = nslot
-      self.keys[nslot] = key
-      self.ratimes[nslot] = self.incseqn()
-      self.nextslot = self.nextslot + 1
+      self.rkeys[nslot] = key
+      self.linkslot_(nslot)
       # The next reduces the performance of the cache in scenarios where
       # the efficicency is near to zero.  I don't understand exactly why.
       # F. Alted 24-03-2008
-    elif self.nextslot > 0:
+    elif self.nused > 0:
       # Empty the cache if needed
       self.__dict.clear()
-      self.nextslot = 0
+      self.clearslots_()
     return nslot
 
   def getslot(self, long long key):
@@ -571,14 +727,20 @@ cdef class NumCache(BaseCache):
     cdef object nslot
 
     self.containscount = self.containscount + 1
-    if self.nextslot == 0:   # No chances for finding a slot
+    if self.nused == 0:   # No chances for finding a slot
+      self.nmisses = self.nmisses + 1
       return -1
     try:
       nslot = self.__dict[key]
     except KeyError:
+      self.nmisses = self.nmisses + 1
       return -1
+    self.nhits = self.nhits + 1
     return nslot
 
+  cdef long long datasize_(self):
+    return <long long>self.nused * self.slotsize * self.itemsize
+
   def getitem(self, long nslot, ndarray nparr, long start):
     self.getitem_(nslot, nparr.data, start)
 
@@ -599,7 +761,7 @@ cdef class NumCache(BaseCache):
   cdef void *getitem1_(self, long nslot):
 
     self.getcount = self.getcount + 1
-    self.ratimes[nslot] = self.incseqn()
+    self.touchslot_(nslot)
     return <char *>self.rcache + nslot * self.slotsize * self.itemsize
 
   def __repr__(self):
@@ -611,10 +773,377 @@ cdef class NumCache(BaseCache):
     return """<%s(%s)
   (%d maxslots, %d slots used, %.3f KB cachesize,
   hit ratio: %.3f, disabled? %s)>
-  """ % (self.name, str(self.__class__), self.nslots, self.nextslot,
+  """ % (self.name, str(self.__class__), self.nslots, self.nused,
          cachesize, hitratio, self.iscachedisabled)
 
 
+
+########################################################################
+#  Cache shared by the whole process
+########################################################################
+# Every table and index has its own caches, which are sized independently
+# (see TABLE_MAX_SIZE, SORTED_MAX_SIZE...).  With GLOBAL_CACHE_SIZE, the
+# data of these caches is kept instead in a single cache with a single
+# budget of memory, and the least recently used entries are replaced no
+# matter which table or index they belong to.  This way, the memory goes
+# to the objects which are actually being used.
+
+cdef class SharedEntry:
+  """Entry of the shared cache. Not for public consumption."""
+
+  def __repr__(self):
+    return "<%s %s (%d bytes)>" % (self.__class__, self.key, self.size)
+
+
+cdef class SharedCache:
+  """Least-Recently-Used (LRU) cache shared by several caches.
+
+  Entries are kept in a doubly linked list sorted by access time, so that
+  lookups and replacements take constant time.  The keys of entries
+  are tuples of (owner, key), where `owner` identifies the cache which the
+  entry belongs to.
+
+  """
+
+  def __init__(self, long long maxsize):
+    """Maximum size of the cache (in bytes)."""
+
+    self.maxsize = maxsize
+    self.size = 0
+    self.hits = 0;  self.misses = 0;  self.evictions = 0
+    self.nowners = 0
+    self.entries = {}
+    # The keys of entries of every owner
+    self.ownerkeys = {}
+    # The number of entries and bytes for every cache name
+    self.namestats = {}
+    self.mruentry = None;  self.lruentry = None
+
+  def __len__(self):
+    return len(self.entries)
+
+  def __contains__(self, object key):
+    return key in self.entries
+
+  # Get a new identifier for the entries of a cache
+  cdef long long newowner_(self):
+    self.nowners = self.nowners + 1
+    return self.nowners
+
+  # Get the entry for a key (and make it the most recently used one).
+  # If not found, None is returned.
+  cdef SharedEntry get_(self, object key):
+    cdef SharedEntry entry
+
+    entry = self.entries.get(key)
+    if entry is None:
+      self.misses = self.misses + 1
+      return None
+    self.hits = self.hits + 1
+    if entry is not self.mruentry:
+      # Move the entry to the head of the list
+      entry.prev.next = entry.next
+      if entry.next is not None:
+        entry.next.prev = entry.prev
+      else:
+        self.lruentry = entry.prev
+      entry.prev = None
+      entry.next = self.mruentry
+      self.mruentry.prev = entry
+      self.mruentry = entry
+    return entry
+
+  # Put a value in cache.  `size` can be the exact size of the value or an
+  # estimation.  Values larger than the cache are not kept.
+  cdef put_(self, object key, object value, long long size, object name):
+    cdef SharedEntry entry
+    cdef object owner, stats
+
+    entry = self.entries.get(key)
+    if entry is not None:
+      self.remove_(entry)
+    if size > self.maxsize:
+      return
+    while self.size + size > self.maxsize:
+      self.remove_(self.lruentry)
+      self.evictions = self.evictions + 1
+    entry = SharedEntry()
+    entry.key = key;  entry.value = value
+    entry.size = size;  entry.name = name
+    entry.prev = None
+    entry.next = self.mruentry
+    if self.mruentry is not None:
+      self.mruentry.prev = entry
+    self.mruentry = entry
+    if self.lruentry is None:
+      self.lruentry = entry
+    self.entries[key] = entry
+    owner = key[0]
+    if owner not in self.ownerkeys:
+      self.ownerkeys[owner] = set()
+    self.ownerkeys[owner].add(key)
+    stats = self.namestats.get(name)
+    if stats is None:
+      stats = self.namestats[name] = [0, 0]
+    stats[0] = stats[0] + 1
+    stats[1] = stats[1] + size
+    self.size = self.size + size
+
+  # Remove an entry from cache
+  cdef remove_(self, SharedEntry entry):
+    cdef object owner, stats
+
+    if entry.prev is not None:
+      entry.prev.next = entry.next
+    else:
+      self.mruentry = entry.next
+    if entry.next is not None:
+      entry.next.prev = entry.prev
+    else:
+      self.lruentry = entry.prev
+    entry.prev = None;  entry.next = None
+    del self.entries[entry.key]
+    owner = entry.key[0]
+    keys = self.ownerkeys[owner]
+    keys.discard(entry.key)
+    if not keys:
+      del self.ownerkeys[owner]
+    stats = self.namestats[entry.name]
+    stats[0] = stats[0] - 1
+    stats[1] = stats[1] - entry.size
+    if stats[0] == 0:
+      del self.namestats[entry.name]
+    self.size = self.size - entry.size
+
+  # Remove all the entries of an owner
+  cdef dropowner_(self, long long owner):
+    cdef object key
+
+    for key in list(self.ownerkeys.get(owner, ())):
+      self.remove_(self.entries[key])
+
+  def resize(self, long long maxsize):
+    """Change the maximum size of the cache (in bytes).
+
+    If the cache is shrunk, the least recently used entries are removed
+    until the data fits in it.
+
+    """
+
+    if maxsize < 0:
+      raise ValueError("Negative size (%s) of cache!" % maxsize)
+    self.maxsize = maxsize
+    while self.size > self.maxsize:
+      self.remove_(self.lruentry)
+      self.evictions = self.evictions + 1
+
+  def clear(self):
+    """Remove all the entries in the cache."""
+
+    while self.mruentry is not None:
+      self.remove_(self.mruentry)
+
+  def stats(self):
+    """Get a dictionary with statistics about the cache.
+
+    Its keys are 'maxsize' and 'size' (in bytes), 'nentries', 'hits',
+    'misses', 'evictions' (the number of entries removed to make room
+    for others) and 'caches', a dictionary with the number of entries
+    and bytes (as a tuple) for every kind of cache (like ``'table chunk
+    cache'`` or ``'sorted'``).
+
+    """
+
+    return {
+      'maxsize': self.maxsize, 'size': self.size,
+      'nentries': len(self.entries),
+      'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+      'caches': dict([(name, tuple(stats))
+                      for (name, stats) in self.namestats.iteritems()]),
+    }
+
+  def __repr__(self):
+    return """<%s
+  (%.3f KB maxsize, %.3f KB used, %d entries,
+  %d hits, %d misses, %d evictions)>
+  """ % (str(self.__class__), self.maxsize / 1024., self.size / 1024.,
+         len(self.entries), self.hits, self.misses, self.evictions)
+
+
+shared_cache = SharedCache(0)
+"""The cache shared by the tables and indexes in the process.
+
+Its size is set from the ``GLOBAL_CACHE_SIZE`` parameter of the files
+using it.
+
+"""
+
+
+cdef class SharedObjectCache(ObjectCache):
+  """ObjectCache keeping its objects in the shared cache."""
+
+  def __init__(self, long nslots, long maxobjsize, object name,
+               long long maxsize):
+    """Create a cache in the shared cache.
+
+    Parameters:
+    nslots - The number of entries in a cycle of hit ratio checks
+    maxobjsize - The maximum size of objects kept
+    name - A descriptive name for this cache
+    maxsize - The size for the shared cache
+
+    """
+
+    super(SharedObjectCache, self).__init__(nslots, maxobjsize, name)
+    self.shared = shared_cache
+    if self.shared.maxsize != maxsize:
+      self.shared.resize(maxsize)
+    self.owner = self.shared.newowner_()
+
+  def __dealloc__(self):
+    if self.shared is not None:
+      self.shared.dropowner_(self.owner)
+
+  cdef clearcache_(self):
+    self.shared.dropowner_(self.owner)
+
+  # The slot of the last object looked up is the only one in use
+  cdef removeslot_(self, long nslot):
+    cdef SharedEntry entry
+
+    entry = self.shared.entries.get((self.owner, self.lastkey))
+    if entry is not None:
+      self.shared.remove_(entry)
+
+  cdef long setitem_(self, object key, object value, long size):
+
+    if self.nslots == 0:   # The cache has been set to empty
+      return -1
+    # Perhaps setcount has been already incremented in couldenablecache()
+    if not self.incsetcount:
+      self.setcount = self.setcount + 1
+    else:
+      self.incsetcount = False
+    if size > self.maxobjsize:  # Check if the object is too large
+      return -1
+    if not self.checkhitratio():
+      return -1
+    self.shared.put_((self.owner, key), value, size, self.name)
+    self.lastkey = key;  self.lastvalue = value
+    return 0
+
+  def __contains__(self, object key):
+    return (self.owner, key) in self.shared.entries
+
+  # Entries found get the slot 0, which is valid until the next lookup
+  cdef long getslot_(self, object key):
+    cdef SharedEntry entry
+
+    if self.nslots == 0:   # The cache has been set to empty
+      return -1
+    self.containscount = self.containscount + 1
+    entry = self.shared.get_((self.owner, key))
+    if entry is None:
+      self.nmisses = self.nmisses + 1
+      return -1
+    self.nhits = self.nhits + 1
+    self.lastkey = key;  self.lastvalue = entry.value
+    return 0
+
+  cdef object getitem_(self, long nslot):
+    self.getcount = self.getcount + 1
+    return self.lastvalue
+
+  # Entries replaced are counted in the shared cache
+  cdef long nentries_(self):
+    return len(self.shared.ownerkeys.get(self.owner, ()))
+
+  cdef long long datasize_(self):
+    cdef long long size = 0
+
+    for key in self.shared.ownerkeys.get(self.owner, ()):
+      size = size + (<SharedEntry>self.shared.entries[key]).size
+    return size
+
+
+cdef class SharedNumCache(NumCache):
+  """NumCache keeping its slots in the shared cache."""
+
+  def __init__(self, object shape, object dtype, object name,
+               long long maxsize):
+    """Create a cache in the shared cache.
+
+    Parameters:
+    shape - The shape of the cache (nslots, nelemsperslot), where nslots
+            is the number of slots in a cycle of hit ratio checks
+    dtype - The type of the elements in cache
+    name - A descriptive name for this cache
+    maxsize - The size for the shared cache
+
+    """
+
+    # Only the scratch slot is allocated here
+    super(SharedNumCache, self).__init__((0, shape[1]), dtype, name)
+    self.nslots = shape[0]
+    self.shared = shared_cache
+    if self.shared.maxsize != maxsize:
+      self.shared.resize(maxsize)
+    self.owner = self.shared.newowner_()
+
+  def __dealloc__(self):
+    if self.shared is not None:
+      self.shared.dropowner_(self.owner)
+
+  cdef void *getaddrslot_(self, long nslot):
+    if nslot >= 0:
+      return self.lastslot.data
+    else:
+      return self.rcache
+
+  # The slot of the last key set or looked up is the only one in use, and
+  # it is valid until the next lookup.
+  cdef long setitem1_(self, long long key):
+    cdef ndarray slot
+
+    if self.nslots == 0:   # Oops, the cache is set to empty
+      return -1
+    # Perhaps setcount has been already incremented in couldenablecache()
+    if not self.incsetcount:
+      self.setcount = self.setcount + 1
+    else:
+      self.incsetcount = False
+    if not self.checkhitratio():
+      return -1
+    slot = numpy.empty(shape=self.slotsize, dtype=self.cacheobj.dtype)
+    self.shared.put_((self.owner, key), slot, self.slotsize * self.itemsize,
+                     self.name)
+    self.lastslot = slot
+    return 0
+
+  cdef long getslot_(self, long long key):
+    cdef SharedEntry entry
+
+    self.containscount = self.containscount + 1
+    entry = self.shared.get_((self.owner, key))
+    if entry is None:
+      self.nmisses = self.nmisses + 1
+      return -1
+    self.nhits = self.nhits + 1
+    self.lastslot = entry.value
+    return 0
+
+  cdef void *getitem1_(self, long nslot):
+    self.getcount = self.getcount + 1
+    return self.lastslot.data
+
+  # Entries replaced are counted in the shared cache
+  cdef long nentries_(self):
+    return len(self.shared.ownerkeys.get(self.owner, ()))
+
+  cdef long long datasize_(self):
+    return <long long>self.nentries_() * self.slotsize * self.itemsize
+
+
 ## Local Variables:
 ## mode: python
 ## py-indent-offset: 2
@@ -43,6 +43,22 @@ ITERSEQ_MAX_SIZE = 1 * _MB
 ITERSEQ_MAX_SLOTS = 128
 """The maximum number of slots in ITERSEQ cache."""
 
+QUERY_CACHE_SLOTS = 0
+"""The maximum number of query results kept in the persistent query
+cache of each table.
+
+When this is greater than 0, the coordinates of the rows selected by
+:meth:`Table.read_where` and :meth:`Table.get_where_list` are saved in a
+hidden group next to the table (for files opened in a writable mode),
+and are reused by these methods and :meth:`Table.where` for identical
+queries, even from later sessions.  Cached results are dropped whenever
+the table is modified.  When the cache is full, the oldest result is
+removed.  The default (0) disables the cache.
+
+.. versionadded:: 3.1
+
+"""
+
 LIMBOUNDS_MAX_SIZE = 256 * _KB
 """The maximum size for the query limits (for example, ``(lim1, lim2)``
 in conditions like ``lim1 <= col < lim2``) cached during index lookups
@@ -64,6 +80,38 @@ bytes)."""
 SORTEDLR_MAX_SLOTS = 1 * _KB
 """The maximum number of chunks for SORTEDLR cache."""
 
+CACHE_POLICY = 'lru'
+"""The replacement policy of the caches above, and of the table chunk cache
+used in index queries.
+
+It can be ``'lru'`` (replace the least recently used entry) or
+``'clock'`` (replace an entry not used since the last sweep of a clock
+hand, a cheaper approximation to LRU which is more resistant to scans).
+Either way, replacing an entry takes constant time, no matter the size
+of the cache.
+
+.. versionadded:: 3.1
+
+"""
+
+GLOBAL_CACHE_SIZE = 0
+"""The size of the cache shared by all the tables and indexes in the
+process (in bytes).
+
+When this is greater than 0, the table chunks and the index data cached
+during queries (see :data:`TABLE_MAX_SIZE`, :data:`BOUNDS_MAX_SIZE`,
+:data:`SORTED_MAX_SIZE`, :data:`LIMBOUNDS_MAX_SIZE` and
+:data:`SORTEDLR_MAX_SIZE`) are kept in a single LRU cache of this size,
+instead of in separate caches for every table and index.  Memory then
+goes to the tables and indexes that are being used, no matter how many
+of them are open.  The cache is shared by all the files using it, and it
+takes the size given by the last one opening a table or index.  The
+default (0) keeps separate caches.
+
+.. versionadded:: 3.1
+
+"""
+
 
 # Parameters for general cache behaviour
 # --------------------------------------
@@ -189,6 +237,22 @@ BUFFER_TIMES = 100
 :exc:`tables.PerformanceWarning`."""
 
 
+QUERY_PREFETCH = False
+"""Whether in-kernel queries read ahead the next I/O buffer of the table.
+
+When enabled, the next I/O buffer of the table is read (and
+decompressed) in a background thread while the query condition is
+being evaluated over the current one.  This speeds up scans of
+compressed tables on multi-core machines, at the expense of one more
+I/O buffer of memory per query.  Reads are always completed before
+control is returned to the caller, so no HDF5 call overlaps with user
+code.
+
+.. versionadded:: 3.1
+
+"""
+
+
 # Miscellaneous
 # -------------
 
@@ -226,6 +290,57 @@ your machine. In general, it is a good idea to set this to the number of
 cores in your machine or, when your machine has many of them (e.g. > 4),
 perhaps one less than this."""
 
+MAX_INDEX_THREADS = None
+"""The maximum number of threads that PyTables should use for sorting the
+slices of an index while it is being built or updated.  Slices are read
+in groups of this size and sorted at the same time, while all the I/O is
+still done from the calling thread.  If `None`, it is automatically set
+to the number of cores in your machine.  A value of 1 means that slices
+are sorted one after another in the calling thread."""
+
+INDEX_TOMBSTONES = True
+"""Whether removing rows from a table with automatic indexing keeps its
+indexes up to date instead of recomputing them.  The positions of the
+removed rows are kept in the indexes as tombstones, which are left out in
+queries and sorted reads, and merged away when the index is optimized (see
+:meth:`tables.index.Index.compact`).  Bitmap indexes are always recomputed."""
+
+MAX_QUERY_PROCESSES = 1
+"""The maximum number of worker processes used by :meth:`Table.read_where`,
+:meth:`Table.get_where_list` and :meth:`Table.append_where` for in-kernel
+(i.e. not indexed) queries on files opened in read-only mode.  The range
+of rows to be queried is split on chunk boundaries and every worker
+opens the file on its own to query its part.  If `None`, it is
+automatically set to the number of cores in your machine.  A value of 1
+means that queries are run in the calling process.
+
+Worker processes are spawned (not forked), so this requires Python 3.4
+or later (or Windows).  Also, as with any program using
+:mod:`multiprocessing`, the main module must be safely importable (see
+the ``if __name__ == '__main__':`` idiom).
+
+.. versionadded:: 3.1
+
+"""
+
+ZONE_MAPS = False
+"""Whether tables keep zone maps of their columns.
+
+A zone map holds the minimum and maximum values (and the number of NaNs)
+of every column in every chunk of a table.  When this is true, zone maps
+are kept in a hidden group next to every table getting rows appended
+(the rows already in the table are summarized then), and they are kept
+up to date afterwards.  Queries not using indexes skip the chunks whose
+ranges of values can not fulfill the condition, which makes conditions
+over naturally ordered columns (like timestamps) nearly as fast as
+indexed ones.  Only one-dimensional numerical, boolean and string columns
+are summarized.  Existing zone maps are always kept up to date and used
+in queries, no matter the value of this parameter.
+
+.. versionadded:: 3.1
+
+"""
+
 USER_BLOCK_SIZE = 0
 """Sets the user block size of a file.
 
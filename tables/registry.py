@@ -36,27 +36,85 @@ from tables._past import previous_api
 __docformat__ = 'reStructuredText'
 """The format of documentation strings in this module."""
 
-class_name_dict = {}
+
+class _LazyClassDict(dict):
+    """Class mapping which imports the modules of lazy classes on demand.
+
+    Some node classes (like those used for indexing) live in modules
+    which are not imported with PyTables, so as to reduce its import
+    time.  When a key in `lazy_keys` is looked up and it is not
+    registered yet, its module is imported, which registers its
+    classes.
+
+    """
+
+    def __init__(self, lazy_keys):
+        super(_LazyClassDict, self).__init__()
+        self._lazy_keys = lazy_keys
+
+    def _load(self, key):
+        module = self._lazy_keys.get(key)
+        if module is not None:
+            __import__(module)
+
+    def __missing__(self, key):
+        self._load(key)
+        if not dict.__contains__(self, key):
+            raise KeyError(key)
+        return dict.__getitem__(self, key)
+
+    def __contains__(self, key):
+        if not dict.__contains__(self, key):
+            self._load(key)
+        return dict.__contains__(self, key)
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+
+# Classes in modules which are imported on demand, as tuples of
+# (module name, class names, class identifiers).
+_lazy_classes = [
+    ('tables.index',
+     ['Index', 'IndexesDescG', 'IndexesTableG', 'OldIndex'],
+     ['INDEX', 'DINDEX', 'TINDEX', 'CINDEX']),
+    ('tables.indexes',
+     ['CacheArray', 'LastRowArray', 'IndexArray'],
+     ['CACHEARRAY', 'LASTROWARRAY', 'INDEXARRAY']),
+    ('tables.bitmapindex', ['BitmapIndex'], ['BITMAPINDEX']),
+    ('tables.compositeindex', ['CompositeIndex'], ['COMPOSITEINDEX']),
+]
+
+class_name_dict = _LazyClassDict(dict(
+    (name, module) for (module, names, ids) in _lazy_classes
+    for name in names))
 """Node class name to class object mapping.
 
 This dictionary maps class names (e.g. ``'Group'``) to actual class
 objects (e.g. `Group`).  Classes are registered here when they are
 defined, and they are not expected to be unregistered (by now), but they
 can be replaced when the module that defines them is reloaded.
+Classes in modules which are not imported yet are registered when they
+are first looked up.
 
 .. versionchanged:: 3.0
    The *classNameDict* dictionary has been renamed into *class_name_dict*.
 
 """
 
-class_id_dict = {}
+class_id_dict = _LazyClassDict(dict(
+    (cid, module) for (module, names, ids) in _lazy_classes
+    for cid in ids))
 """Class identifier to class object mapping.
 
 This dictionary maps class identifiers (e.g. ``'GROUP'``) to actual
 class objects (e.g. `Group`).  Classes defining a new ``_c_classid``
 attribute are registered here when they are defined, and they are not
 expected to be unregistered (by now), but they can be replaced when the
-module that defines them is reloaded.
+module that defines them is reloaded.  Classes in modules which are not
+imported yet are registered when they are first looked up.
 
 .. versionchanged:: 3.0
    The *classIdDict* dictionary has been renamed into *class_id_dict*.
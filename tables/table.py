@@ -14,34 +14,33 @@
 
 import sys
 import math
+import hashlib
 import warnings
+import threading
+import multiprocessing
 import os.path
 from time import time
 from functools import reduce as _reduce
 
 import numpy
-import numexpr
 
 from tables import tableextension
-from tables.lrucacheextension import ObjectCache, NumCache
-from tables.atom import Atom
-from tables.conditions import compile_condition
-from numexpr.necompiler import (
-    getType as numexpr_getType, double, is_cpu_amd_intel)
-from numexpr.expressions import functions as numexpr_functions
+from tables.lrucacheextension import ObjectCache, NumCache, SharedNumCache
+from tables.atom import Atom, Int64Atom, UInt32Atom
+from tables.filters import Filters
 from tables.flavor import flavor_of, array_as_internal, internal_to_flavor
-from tables.utils import is_idx, lazyattr, SizeType, NailedDict as CacheDict
+from tables.utils import (is_idx, lazyattr, SizeType, BackgroundCall,
+                          NailedDict as CacheDict, detect_number_of_cores,
+                          timed_phase)
 from tables.leaf import Leaf
 from tables.description import (
     IsDescription, Description, Col, descr_from_dtype)
 from tables.exceptions import (NodeError, HDF5ExtError, PerformanceWarning,
                                OldIndexWarning, NoSuchNodeError)
-from tables.utilsextension import get_nested_field
+from tables.utilsextension import (get_nested_field, keep_gil_in_hdf5,
+                                   NoLock)
 
 from tables.path import join_path, split_path
-from tables.index import (
-    OldIndex, default_index_filters, default_auto_index, Index, IndexesDescG,
-    IndexesTableG)
 
 profile = False
 # profile = True  # Uncomment for profiling
@@ -60,49 +59,80 @@ from tables._past import previous_api, previous_api_property
 obversion = "2.7"  # The Table VERSION number
 
 
-try:
-    # int_, long_ are only available in numexpr >= 2.1
-    from numexpr.necompiler import int_, long_
-except ImportError:
-    int_ = int
-    long_ = long
-
-# Maps NumPy types to the types used by Numexpr.
-_nxtype_from_nptype = {
-    numpy.bool_: bool,
-    numpy.int8: int_,
-    numpy.int16: int_,
-    numpy.int32: int_,
-    numpy.int64: long_,
-    numpy.uint8: int_,
-    numpy.uint16: int_,
-    numpy.uint32: long_,
-    numpy.uint64: long_,
-    numpy.float32: float,
-    numpy.float64: double,
-    numpy.complex64: complex,
-    numpy.complex128: complex,
-    numpy.bytes_: bytes,
-}
-
-if sys.version_info[0] > 2:
-    _nxtype_from_nptype[numpy.str_] = str
-
-if hasattr(numpy, 'float16'):
-    _nxtype_from_nptype[numpy.float16] = float    # XXX: check
-if hasattr(numpy, 'float96'):
-    _nxtype_from_nptype[numpy.float96] = double   # XXX: check
-if hasattr(numpy, 'float128'):
-    _nxtype_from_nptype[numpy.float128] = double  # XXX: check
-if hasattr(numpy, 'complec192'):
-    _nxtype_from_nptype[numpy.complex192] = complex  # XXX: check
-if hasattr(numpy, 'complex256'):
-    _nxtype_from_nptype[numpy.complex256] = complex  # XXX: check
+# Maps NumPy types to the types used by Numexpr (see `_get_nxtypes()`).
+_nxtype_from_nptype = None
+
+
+def _get_nxtypes():
+    """Get the mapping from NumPy types to the types used by Numexpr.
+
+    Numexpr (and the ``conditions`` module) are only imported when the
+    first condition is compiled, since it takes a while.
+
+    """
+
+    global _nxtype_from_nptype
+    if _nxtype_from_nptype is not None:
+        return _nxtype_from_nptype
+
+    from numexpr.necompiler import double
+    try:
+        # int_, long_ are only available in numexpr >= 2.1
+        from numexpr.necompiler import int_, long_
+    except ImportError:
+        int_ = int
+        long_ = long
+
+    nxtypes = {
+        numpy.bool_: bool,
+        numpy.int8: int_,
+        numpy.int16: int_,
+        numpy.int32: int_,
+        numpy.int64: long_,
+        numpy.uint8: int_,
+        numpy.uint16: int_,
+        numpy.uint32: long_,
+        numpy.uint64: long_,
+        numpy.float32: float,
+        numpy.float64: double,
+        numpy.complex64: complex,
+        numpy.complex128: complex,
+        numpy.bytes_: bytes,
+    }
+
+    if sys.version_info[0] > 2:
+        nxtypes[numpy.str_] = str
+
+    if hasattr(numpy, 'float16'):
+        nxtypes[numpy.float16] = float    # XXX: check
+    if hasattr(numpy, 'float96'):
+        nxtypes[numpy.float96] = double   # XXX: check
+    if hasattr(numpy, 'float128'):
+        nxtypes[numpy.float128] = double  # XXX: check
+    if hasattr(numpy, 'complec192'):
+        nxtypes[numpy.complex192] = complex  # XXX: check
+    if hasattr(numpy, 'complex256'):
+        nxtypes[numpy.complex256] = complex  # XXX: check
+
+    _nxtype_from_nptype = nxtypes
+    return nxtypes
 
 
 # The NumPy scalar type corresponding to `SizeType`.
 _npsizetype = numpy.array(SizeType(0)).dtype.type
 
+# Worker processes for parallel queries must open files on their own,
+# so they can not be forked from a process already using HDF5.
+if hasattr(multiprocessing, 'get_context'):
+    _query_mp_context = multiprocessing.get_context('spawn')
+elif sys.platform == 'win32':
+    _query_mp_context = multiprocessing  # never forks
+else:
+    _query_mp_context = None
+
+# Pools of worker processes for parallel queries, by number of workers.
+_query_pools = {}
+
 
 def _index_name_of(node):
     return '_i_%s' % node._v_name
@@ -146,6 +176,32 @@ def _index_pathname_of_column_(tablePath, colpathname):
 _indexPathnameOfColumn_ = previous_api(_index_pathname_of_column_)
 
 
+def _composite_index_name_of(colpathnames):
+    return '_p_%s' % '__'.join(colpathnames).replace('/', '_')
+
+
+def _query_cache_name_of(node):
+    return '_p_query_%s' % node._v_name
+
+
+def _query_cache_pathname_of(node):
+    nodeParentPath = split_path(node._v_pathname)[0]
+    return join_path(nodeParentPath, _query_cache_name_of(node))
+
+
+def _zone_map_name_of(node):
+    return '_p_zonemap_%s' % node._v_name
+
+
+def _zone_map_pathname_of(node):
+    nodeParentPath = split_path(node._v_pathname)[0]
+    return join_path(nodeParentPath, _zone_map_name_of(node))
+
+
+def _zone_map_key(colpathname):
+    return colpathname.replace('/', '__')
+
+
 def _table__setautoindex(self, auto):
     auto = bool(auto)
     try:
@@ -170,6 +226,8 @@ _table__setautoIndex = previous_api(_table__setautoindex)
 # F. Alted 2007-04-20
 # **************************************************
 def _table__getautoindex(self):
+    from tables.index import default_auto_index
+
     if self._autoindex is None:
         try:
             indexgroup = self._v_file._get_node(_index_pathname_of(self))
@@ -209,12 +267,22 @@ def restorecache(self):
     # Define a cache for sparse table reads
     params = self._v_file.params
     chunksize = self._v_chunkshape[0]
-    nslots = params['TABLE_MAX_SIZE'] / (chunksize * self._v_dtype.itemsize)
-    self._chunkcache = NumCache((nslots, chunksize), self._v_dtype,
-                                'table chunk cache')
+    rowsize = chunksize * self._v_dtype.itemsize
+    if params['GLOBAL_CACHE_SIZE'] > 0:
+        # Keep the chunks in the cache shared by all tables and indexes
+        nslots = params['GLOBAL_CACHE_SIZE'] / rowsize
+        self._chunkcache = SharedNumCache((nslots, chunksize), self._v_dtype,
+                                          'table chunk cache',
+                                          params['GLOBAL_CACHE_SIZE'])
+    else:
+        nslots = params['TABLE_MAX_SIZE'] / rowsize
+        self._chunkcache = NumCache((nslots, chunksize), self._v_dtype,
+                                    'table chunk cache',
+                                    params['CACHE_POLICY'])
     self._seqcache = ObjectCache(params['ITERSEQ_MAX_SLOTS'],
                                  params['ITERSEQ_MAX_SIZE'],
-                                 'Iter sequence cache')
+                                 'Iter sequence cache',
+                                 params['CACHE_POLICY'])
     self._dirtycache = False
 
 
@@ -255,6 +323,26 @@ def _table__where_indexed(self, compiled, condition, condvars,
         # removed there.
         self._nslotseq = self._seqcache.setitem(seqkey, [], 1)
 
+    chunkmap = _table__chunkmap_indexed(self, compiled, condvars)
+    if chunkmap is None:
+        # No candidates found in the indexes, so leave now
+        return iter([])
+
+    if profile:
+        show_stats("Exiting table_whereIndexed", tref)
+    return chunkmap
+
+_table__whereIndexed = previous_api(_table__where_indexed)
+
+
+def _table__chunkmap_indexed(self, compiled, condvars):
+    """Get the map of table chunks selected by the indexed expressions.
+
+    The result is a boolean array with one element per chunk of the
+    table, or `None` when the indexes yield no candidates at all.
+
+    """
+
     # Compute the chunkmap for every index in indexed expression
     idxexprs = compiled.index_expressions
     strexpr = compiled.string_expression
@@ -282,25 +370,283 @@ def _table__where_indexed(self, compiled, condition, condvars,
         # Assign the chunkmap to the cmvars dictionary
         cmvars["e%d" % i] = chunkmap
 
-    if index.reduction == 1 and tcoords == 0:
-        # No candidates found in any indexed expression component, so leave now
-        return iter([])
+    if idxexprs and index.reduction == 1 and tcoords == 0:
+        # No candidates found in any indexed expression component
+        return None
 
     # Compute the final chunkmap
-    chunkmap = numexpr.evaluate(strexpr, cmvars)
+    chunkmap = None
+    if idxexprs:
+        import numexpr
+        chunkmap = numexpr.evaluate(strexpr, cmvars)
+    for (columns, cmps, lims, cmpvars) in compiled.composite_expressions:
+        index = self._get_composite_index(columns)
+        assert not index.dirty, "the chosen composite index is dirty"
+        ncoords = index.search(index.get_lookup_range(cmps, lims))
+        if index.reduction == 1 and ncoords == 0:
+            # The composite expression is and'ed with the rest
+            return None
+        if chunkmap is None:
+            chunkmap = index.get_chunkmap()
+        else:
+            chunkmap &= index.get_chunkmap()
+    if compiled.bitmap_expressions:
+        bitmap = _table__bitmap_indexed(self, compiled, condvars)
+        bmchunkmap = _bitmap_to_chunkmap(bitmap, self.chunkshape[0])
+        if chunkmap is not None:
+            chunkmap &= bmchunkmap[:len(chunkmap)]
+        else:
+            chunkmap = bmchunkmap
     # Method .any() is twice as faster than method .sum()
     if not chunkmap.any():
         # The chunkmap is empty
-        return iter([])
+        return None
+    return chunkmap
 
-    if profile:
-        show_stats("Exiting table_whereIndexed", tref)
+
+def _table__bitmap_indexed(self, compiled, condvars):
+    """Get the bitmap of rows selected by the bitmap indexed expressions.
+
+    The result is an array of bytes with the bits of the selected rows
+    set (the most significant bit first) for all the indexed rows.
+
+    """
+
+    bmvars = {}
+    for i, bmexpr in enumerate(compiled.bitmap_expressions):
+        var, ops, lims = bmexpr
+        index = condvars[var].index
+        assert index is not None, "the chosen column is not indexed"
+        assert not index.dirty, "the chosen column has a dirty index"
+        bmvars["e%d" % i] = index.get_bitmap(ops, lims)
+    # The expression is just made of bitwise operators and variables
+    from tables.conditions import combine_bitwise
+    return combine_bitwise(compiled.bitmap_string_expression, bmvars)
+
+
+def _bitmap_to_chunkmap(bitmap, nrowsinchunk):
+    """Get the map of table chunks with some row selected in `bitmap`."""
+
+    if nrowsinchunk % 8 == 0:
+        nbytes = nrowsinchunk // 8
+        nchunks = -(-len(bitmap) // nbytes)
+        padded = numpy.zeros(nchunks * nbytes, dtype='uint8')
+        padded[:len(bitmap)] = bitmap
+        return padded.reshape(nchunks, nbytes).any(axis=1)
+    nchunks = -(-len(bitmap) * 8 // nrowsinchunk)
+    chunkmap = numpy.zeros(nchunks, dtype='bool')
+    chunkmap[_bitmap_to_coords(bitmap) // nrowsinchunk] = True
     return chunkmap
 
-_table__whereIndexed = previous_api(_table__where_indexed)
+
+def _bitmap_to_coords(bitmap, start=0, stop=None, step=1):
+    """Get the coordinates of the rows selected in `bitmap`.
+
+    Only the coordinates in the `start`, `stop` and `step` range are
+    returned.
+
+    """
+
+    if stop is None:
+        stop = len(bitmap) * 8
+    offset = start // 8
+    bitmap = bitmap[offset:-(-stop // 8)]
+    nzbytes = bitmap.nonzero()[0]
+    bits = numpy.unpackbits(bitmap[nzbytes]).nonzero()[0]
+    coords = (nzbytes[bits >> 3] + offset) * 8 + (bits & 7)
+    coords = coords[(coords >= start) & (coords < stop)]
+    if step > 1:
+        coords = coords[(coords - start) % step == 0]
+    return coords.astype(SizeType)
+
+
+def _zone_summaries(values, offsets):
+    """Get the minimum, maximum and number of NaNs of zones in `values`.
+
+    Zones start at the positions in `offsets` (in increasing order).
+    NaNs are left out of the minimum and maximum values, and their
+    number is `None` for non floating point values.
+
+    """
+
+    kind = values.dtype.kind
+    if kind == 'S':
+        # Strings can not be reduced with NumPy ufuncs
+        stops = numpy.append(offsets[1:], len(values))
+        zones = [numpy.sort(values[o:s]) for (o, s) in zip(offsets, stops)]
+        mins = numpy.array([zone[0] for zone in zones], dtype=values.dtype)
+        maxs = numpy.array([zone[-1] for zone in zones], dtype=values.dtype)
+        return (mins, maxs, None)
+    if kind == 'f':
+        mins = numpy.fmin.reduceat(values, offsets)
+        maxs = numpy.fmax.reduceat(values, offsets)
+        nans = numpy.add.reduceat(numpy.isnan(values), offsets,
+                                  dtype='uint32')
+        return (mins, maxs, nans)
+    return (numpy.minimum.reduceat(values, offsets),
+            numpy.maximum.reduceat(values, offsets), None)
+
+
+def _zone_candidates(mins, maxs, nans, op, limit):
+    """Get the zones which may have values fulfilling ``value <op> limit``.
+
+    `mins`, `maxs` and `nans` are the summaries of the zones, as
+    returned by `_zone_summaries()`.
+
+    """
+
+    if op == 'lt':
+        return mins < limit
+    if op == 'le':
+        return mins <= limit
+    if op == 'gt':
+        return maxs > limit
+    if op == 'ge':
+        return maxs >= limit
+    if op == 'eq':
+        return (mins <= limit) & (maxs >= limit)
+    # ``ne`` only discards zones with every value equal to the limit
+    equal = (mins == limit) & (maxs == limit)
+    if nans is not None:
+        equal &= (nans == 0)
+    return ~equal
+
+
+def _table__chunkmap_zoned(self, compiled, condvars):
+    """Get the map of table chunks selected by the zone maps.
+
+    The result is a boolean array with one element per chunk of the
+    table, or `None` when zone maps can not discard any chunk.  Chunks
+    not summarized in the zone maps are always selected.
+
+    """
+
+    if not compiled.zonemap_expressions:
+        return None
+    zmgroup = self._get_zone_maps()
+    if zmgroup is None:
+        return None
+    nrowsinchunk = self.chunkshape[0]
+    nchunks = -(-self.nrows // nrowsinchunk)
+    zonerows = long(zmgroup._v_attrs.ZONEROWS)
+    if zonerows < self.nrows:
+        # The last zone may not cover its whole chunk
+        nzones = zonerows // nrowsinchunk
+    else:
+        nzones = nchunks
+    if nzones == 0:
+        return None
+    zmvars = {}
+    for i, zmexpr in enumerate(compiled.zonemap_expressions):
+        var, ops, lims = zmexpr
+        key = _zone_map_key(condvars[var].pathname)
+        bounds = zmgroup.bounds._f_get_child(key).read(0, nzones)
+        nans = None
+        if key in zmgroup.nans:
+            nans = zmgroup.nans._f_get_child(key).read(0, nzones)
+        chunkmap = numpy.ones(nchunks, dtype=bool)
+        for op, limit in zip(ops, lims):
+            chunkmap[:nzones] &= _zone_candidates(
+                bounds[:, 0], bounds[:, 1], nans, op, limit)
+        zmvars["e%d" % i] = chunkmap
+    # The expression is just made of bitwise operators and variables
+    import numexpr
+    chunkmap = numexpr.evaluate(compiled.zonemap_string_expression, zmvars)
+    if chunkmap.all():
+        return None
+    return chunkmap
+
+
+def _table__where_exact(self, compiled, condvars, start, stop, step):
+    """Get the coordinates fulfilling a condition from bitmap indexes.
+
+    Full composite indexes are used as well.  `None` is returned unless
+    the whole condition is computable from bitmap or composite indexes
+    covering all the rows in the table.
+
+    """
+
+    if not compiled.exact or compiled.index_expressions:
+        return None
+    compexprs = compiled.composite_expressions
+    if not compiled.bitmap_expressions and not compexprs:
+        return None
+    for bmexpr in compiled.bitmap_expressions:
+        if condvars[bmexpr[0]].index.nelements != self.nrows:
+            return None
+    indexes = [self._get_composite_index(compexpr[0])
+               for compexpr in compexprs]
+    for index in indexes:
+        if (index.kind != 'full' or index.nelements != self.nrows
+                or index.nremoved):
+            return None
+    if compiled.bitmap_expressions:
+        bitmap = _table__bitmap_indexed(self, compiled, condvars)
+        coords = _bitmap_to_coords(bitmap, start, stop, step)
+    else:
+        coords = numpy.arange(start, stop, step, dtype=SizeType)
+    for (index, (columns, cmps, lims, cmpvars)) in zip(indexes, compexprs):
+        index.search(index.get_lookup_range(cmps, lims))
+        icoords = index.read_search_result('indices').astype(SizeType)
+        coords = numpy.intersect1d(coords, icoords)
+    return coords
+
+
+def _get_query_pool(nprocs):
+    """Get a pool of `nprocs` worker processes for parallel queries."""
+
+    pool = _query_pools.get(nprocs)
+    if pool is None:
+        pool = _query_mp_context.Pool(nprocs, _init_query_worker)
+        _query_pools[nprocs] = pool
+    return pool
+
+
+def _close_query_pools():
+    """Terminate the worker processes of parallel queries."""
+
+    for pool in _query_pools.values():
+        pool.terminate()
+        pool.join()
+    _query_pools.clear()
+
+
+def _init_query_worker():
+    import numexpr
+
+    # Parallelism comes from the pool, not from each worker
+    numexpr.set_num_threads(1)
+
+
+def _where_worker(args):
+    """Get the coordinates fulfilling a condition in a part of a table.
+
+    This is run by the worker processes of parallel queries, which
+    open the file on their own.
+
+    """
+
+    from tables.file import open_file
+
+    (filename, tablepath, condition, colvars, othervars,
+     start, stop, step) = args
+    h5file = open_file(filename, 'r', max_query_processes=1,
+                       max_blosc_threads=1)
+    try:
+        table = h5file._get_node(tablepath)
+        condvars = dict(othervars)
+        for (var, colpathname) in colvars.iteritems():
+            condvars[var] = table.cols._f_col(colpathname)
+        coords = [row.nrow for row in
+                  table._where(condition, condvars, start, stop, step)]
+        return numpy.array(coords, dtype=SizeType)
+    finally:
+        h5file.close()
 
 
 def create_indexes_table(table):
+    from tables.index import IndexesTableG
+
     itgroup = IndexesTableG(
         table._v_parent, _index_name_of(table),
         "Indexes container for table " + table._v_pathname, new=True)
@@ -310,6 +656,8 @@ createIndexesTable = previous_api(create_indexes_table)
 
 
 def create_indexes_descr(igroup, dname, iname, filters):
+    from tables.index import IndexesDescG
+
     idgroup = IndexesDescG(
         igroup, iname,
         "Indexes container for sub-description " + dname,
@@ -320,7 +668,8 @@ createIndexesDescr = previous_api(create_indexes_descr)
 
 
 def _column__create_index(self, optlevel, kind, filters, tmp_dir,
-                          blocksizes, verbose):
+                          blocksizes, verbose, background=False,
+                          replace=False):
     name = self.name
     table = self.table
     dtype = self.dtype
@@ -329,10 +678,13 @@ def _column__create_index(self, optlevel, kind, filters, tmp_dir,
     get_node = table._v_file._get_node
 
     # Warn if the index already exists
-    if index:
+    if index and not replace:
         raise ValueError("%s for column '%s' already exists. If you want to "
                          "re-create it, please, try with reindex() method "
                          "better" % (str(index), str(self.pathname)))
+    if background and table._get_index_build(self.pathname) is not None:
+        raise ValueError("an index for column '%s' is already being built "
+                         "in the background" % self.pathname)
 
     # Check that the datatype is indexable.
     if dtype.str[1:] == 'u8':
@@ -343,6 +695,8 @@ def _column__create_index(self, optlevel, kind, filters, tmp_dir,
         raise TypeError("complex columns can not be indexed")
     if dtype.shape != ():
         raise TypeError("multidimensional columns can not be indexed")
+    if kind == 'bitmap' and dtype.kind == 'f':
+        raise TypeError("floating point columns can not have bitmap indexes")
 
     # Get the indexes group for table, and if not exists, create it
     try:
@@ -366,27 +720,13 @@ def _column__create_index(self, optlevel, kind, filters, tmp_dir,
             except NoSuchNodeError:
                 idgroup = create_indexes_descr(idgroup, dname, iname, filters)
 
-    # Create the atom
-    assert dtype.shape == ()
-    atom = Atom.from_dtype(numpy.dtype((dtype, (0,))))
-
-    # Protection on tables larger than the expected rows (perhaps the
-    # user forgot to pass this parameter to the Table constructor?)
-    expectedrows = table._v_expectedrows
-    if table.nrows > expectedrows:
-        expectedrows = table.nrows
+    if background:
+        return IndexBuild(self, idgroup, optlevel, kind, filters, tmp_dir,
+                          blocksizes, verbose)
 
     # Create the index itself
-    index = Index(
-        idgroup, name, atom=atom,
-        title="Index for %s column" % name,
-        kind=kind,
-        optlevel=optlevel,
-        filters=filters,
-        tmp_dir=tmp_dir,
-        expectedrows=expectedrows,
-        byteorder=table.byteorder,
-        blocksizes=blocksizes)
+    index = _column__new_index(self, idgroup, name, optlevel, kind, filters,
+                               tmp_dir, blocksizes)
 
     table._set_column_indexing(self.pathname, True)
 
@@ -415,6 +755,214 @@ def _column__create_index(self, optlevel, kind, filters, tmp_dir,
 _column__createIndex = previous_api(_column__create_index)
 
 
+def _column__new_index(self, idgroup, name, optlevel, kind, filters, tmp_dir,
+                       blocksizes):
+    """Create an empty index for the column as node `name` of `idgroup`."""
+
+    from tables.index import Index
+    from tables.bitmapindex import BitmapIndex
+
+    table = self.table
+    dtype = self.dtype
+
+    # Create the atom
+    assert dtype.shape == ()
+    atom = Atom.from_dtype(numpy.dtype((dtype, (0,))))
+
+    # Protection on tables larger than the expected rows (perhaps the
+    # user forgot to pass this parameter to the Table constructor?)
+    expectedrows = table._v_expectedrows
+    if table.nrows > expectedrows:
+        expectedrows = table.nrows
+
+    if kind == 'bitmap':
+        return BitmapIndex(
+            idgroup, name, atom=atom,
+            title="Index for %s column" % self.name,
+            optlevel=optlevel,
+            filters=filters,
+            expectedrows=expectedrows,
+            byteorder=table.byteorder,
+            blocksizes=blocksizes)
+    return Index(
+        idgroup, name, atom=atom,
+        title="Index for %s column" % self.name,
+        kind=kind,
+        optlevel=optlevel,
+        filters=filters,
+        tmp_dir=tmp_dir,
+        expectedrows=expectedrows,
+        byteorder=table.byteorder,
+        blocksizes=blocksizes)
+
+
+class IndexBuild(object):
+    """A handle for an index being built in the background.
+
+    Instances of this class are returned by :meth:`Column.create_index`
+    and :meth:`Column.reindex` (and their relatives) when called with
+    ``background=True``.  The new index is built by a separate thread
+    in a hidden node next to the index of the column, so that the
+    table can still be queried meanwhile, using the old index if there
+    is a usable one, or scanning the table otherwise.
+
+    Once built, the new index takes the place of the old one when the
+    next query over the table is compiled, when :meth:`result` is
+    called or when the file is closed.  Rows appended during the build
+    are indexed at that moment.  If rows are modified or removed during
+    the build, it starts over.
+
+    HDF5 calls from different threads must never overlap, so the GIL is
+    kept during HDF5 I/O while some index is being built (see
+    ``tables.utilsextension.keep_gil_in_hdf5()``).  Besides, accesses
+    to the node cache and I/O on tables take the lock of the file,
+    which is only a real one while some index is being built.  The new
+    index is only used by the build until it is put in place, so
+    sorting and optimizing it run in parallel with other threads, like
+    the evaluation of query conditions.
+
+    """
+
+    def __init__(self, column, idgroup, optlevel, kind, filters, tmp_dir,
+                 blocksizes, verbose):
+        self._table = column.table
+        self._colpathname = column.pathname
+        self._idgroup = idgroup
+        self._name = column.name
+        self._args = (optlevel, kind, filters, tmp_dir, blocksizes)
+        self._verbose = verbose
+        self._stale = False
+        self._indexedrows = None
+        self._start()
+        self._table._v_file._index_builds.append(self)
+
+    def _start(self):
+        table = self._table
+        column = table.cols._g_col(self._colpathname)
+        idgroup = self._idgroup
+        shadowname = '_shadow_' + self._name
+        if not table._v_file._index_builds:
+            # The file is going to be used by another thread
+            table._v_file._lock = threading.RLock()
+        with table._v_file._lock:
+            if shadowname in idgroup:
+                # Leftover of an interrupted build
+                idgroup._f_get_child(shadowname)._f_remove()
+            self._index = _column__new_index(column, idgroup, shadowname,
+                                             *self._args)
+            self._stale = False
+            keep_gil_in_hdf5(True)
+            self._call = BackgroundCall(self._build, table.nrows)
+
+    def _build(self, nrows):
+        index = self._index
+        try:
+            if nrows > 0:
+                self._table._add_rows_to_index(
+                    self._colpathname, 0, nrows, lastrow=True, update=False,
+                    index=index)
+            index.optimize(verbose=self._verbose)
+        except Exception:
+            if getattr(index, 'tmpfilename', None) is not None:
+                # Do not leave the temporaries of a failed optimization
+                index.tmp = None
+                index.tmpfile.close()
+                os.remove(index.tmpfilename)
+                index.tmpfilename = None
+            raise
+        finally:
+            keep_gil_in_hdf5(False)
+
+    def done(self):
+        """Whether the build has finished (or failed)."""
+
+        return self._indexedrows is not None or not self._call.is_alive()
+
+    def wait(self, timeout=None):
+        """Wait for the build to finish, for at most `timeout` seconds.
+
+        The result of :meth:`done` is returned.
+
+        """
+
+        self._call.join(timeout)
+        return self.done()
+
+    def result(self):
+        """Wait for the index to be built and put it in place.
+
+        The number of indexed rows is returned.  Errors raised while
+        building the index are raised again here.
+
+        """
+
+        while not self._finish():
+            pass
+        return SizeType(self._indexedrows)
+
+    def _finish(self):
+        """Put the built index in place (waiting for it if needed).
+
+        False is returned if the build had to start over.
+
+        """
+
+        if self._indexedrows is not None:
+            return True
+        table = self._table
+        self._call.join()
+        if self._stale:
+            # Some rows have changed meanwhile (the build may even have
+            # failed because of that)
+            self._index._f_remove()
+            self._start()
+            return False
+        try:
+            self._call.result()
+        except Exception:
+            self._unregister()
+            self._index._f_remove()
+            raise
+
+        self._unregister()
+        column = table.cols._g_col(self._colpathname)
+        oldindex = column.index
+        if oldindex is not None:
+            # Unnail the condition cache before removing the old index
+            oldindex.dirty = False
+            oldindex._f_remove()
+        self._index._f_rename(self._name)
+        self._index = None
+        table._set_column_indexing(self._colpathname, True)
+        table._condition_cache.clear()
+        # Index the rows appended during the build
+        indexedrows = table._add_rows_to_index(
+            self._colpathname, 0, table.nrows, lastrow=True, update=True)
+        table._indexedrows = indexedrows
+        table._unsaved_indexedrows = table.nrows - indexedrows
+        self._indexedrows = indexedrows
+        return True
+
+    def _unregister(self):
+        """Forget about this (finished) build in the file."""
+
+        file_ = self._table._v_file
+        file_._index_builds.remove(self)
+        if not file_._index_builds:
+            # No other thread uses the file now
+            file_._lock = NoLock()
+
+    def _close(self):
+        """Finish the build before closing the table or its file."""
+
+        try:
+            self.result()
+        except Exception:
+            # Nothing was put in place, errors are only reported by
+            # `result()`
+            pass
+
+
 class _ColIndexes(dict):
     """Provides a nice representation of column indexes."""
 
@@ -627,6 +1175,19 @@ class Table(tableextension.Table, Leaf):
 
         return self._get_container(self.nrowsinbuf)
 
+    @lazyattr
+    def _v_readrow(self):
+        """A Row instance for reading columns."""
+
+        return tableextension.Row(self)
+
+    @lazyattr
+    def _v_projectedfields(self):
+        """Whether reading each field by itself is worth it (see
+        `_is_projected_field()`)."""
+
+        return {}
+
     @lazyattr
     def _v_wdflts(self):
         """The defaults for writing in recarray format."""
@@ -692,6 +1253,11 @@ class Table(tableextension.Table, Leaf):
         None, None,
         """A dictionary with the indexes of the indexed columns.""")
 
+    composite_indexes = property(
+        lambda self: self._get_composite_indexes(), None, None,
+        """A dictionary with the composite indexes of the table, keyed by
+        the tuples of the pathnames of their columns.""")
+
     _dirtyindexes = property(
         lambda self: self._condition_cache._nailcount > 0,
         None, None,
@@ -771,6 +1337,8 @@ class Table(tableextension.Table, Leaf):
         """Maps the name of a column to its default value."""
         self.colindexed = {}
         """Is the column which name is used as a key indexed?"""
+        self._compositeindexed = set()
+        """The tuples of columns having a composite index."""
 
         self._use_index = False
         """Whether an index can be used or not in a search.  Boolean."""
@@ -894,6 +1462,9 @@ class Table(tableextension.Table, Leaf):
         # Do the indexes group exist?
         indexesgrouppath = _index_pathname_of(self)
         igroup = indexesgrouppath in self._v_file
+        if igroup:
+            from tables.index import Index, OldIndex
+            from tables.compositeindex import CompositeIndex
         oldindexes = False
         for colobj in self.description._f_walk(type="Col"):
             colname = colobj._v_pathname
@@ -919,6 +1490,16 @@ class Table(tableextension.Table, Leaf):
                 self.colindexed[colname] = False
             if indexed:
                 self.indexed = True
+        if igroup:
+            itgroup = self._v_file._get_node(indexesgrouppath)
+            for name in itgroup._v_hidden.keys():
+                indexobj = itgroup._f_get_child(name)
+                if not isinstance(indexobj, CompositeIndex):
+                    continue
+                self._compositeindexed.add(indexobj.columns)
+                self.indexed = True
+                if indexobj.dirty:
+                    self._condition_cache.nail()
 
         if oldindexes:  # this should only appear under 2.x Pro
             warnings.warn(
@@ -935,6 +1516,8 @@ class Table(tableextension.Table, Leaf):
         # the same number of elements.
         if self.indexed:
             self._indexedrows = indexobj.nelements
+            if isinstance(indexobj, Index):
+                self._indexedrows -= indexobj.nremoved
             self._unsaved_indexedrows = self.nrows - self._indexedrows
             # Put the autoindex value in a cache variable
             self._autoindex = self.autoindex
@@ -1200,6 +1783,8 @@ class Table(tableextension.Table, Leaf):
 
         """
 
+        from numexpr.expressions import functions as numexpr_functions
+
         # Get the names of variables used in the expression.
         exprvarscache = self._exprvars_cache
         if not expression in exprvarscache:
@@ -1292,6 +1877,8 @@ class Table(tableextension.Table, Leaf):
 
         """
 
+        from numexpr.necompiler import getType as numexpr_getType
+
         # Variable names for column and normal variables.
         colnames, varnames = [], []
         # Column paths and types for each of the previous variable.
@@ -1316,6 +1903,7 @@ class Table(tableextension.Table, Leaf):
 
     _getConditionKey = previous_api(_get_condition_key)
 
+    @timed_phase('compile')
     def _compile_condition(self, condition, condvars):
         """Compile the `condition` and extract usable index conditions.
 
@@ -1327,6 +1915,10 @@ class Table(tableextension.Table, Leaf):
 
         """
 
+        # Indexes built in the background may be ready for use
+        if self._v_file._index_builds:
+            self._finish_index_builds()
+
         # Look up the condition in the condition cache.
         condcache = self._condition_cache
         condkey = self._get_condition_key(condition, condvars)
@@ -1338,24 +1930,57 @@ class Table(tableextension.Table, Leaf):
         # Fortunately, the key provides some valuable information. ;)
         (condition, colnames, varnames, colpaths, vartypes) = condkey
 
+        # Numexpr may have been loaded after opening the file
+        import numexpr
+        numexpr.set_vml_num_threads(
+            self._v_file.params['MAX_NUMEXPR_THREADS'])
+
         # Extract more information from referenced columns.
+        nxtypes = _get_nxtypes()
         typemap = dict(zip(varnames, vartypes))  # start with normal variables
         indexedcols = []
+        bitmapcols = []
+        zonemapcols = []
+        zmcolumns = self._get_zone_map_columns()
         for colname in colnames:
             col = condvars[colname]
 
             # Extract types from *all* the given variables.
             coltype = col.dtype.type
-            typemap[colname] = _nxtype_from_nptype[coltype]
+            typemap[colname] = nxtypes[coltype]
 
             # Get the set of columns with usable indexes.
             if (self._enabled_indexing_in_queries  # not test in-kernel searches
                and self.colindexed[col.pathname] and not col.index.dirty):
                 indexedcols.append(colname)
+                if col.index.kind == 'bitmap':
+                    bitmapcols.append(colname)
+
+            # Get the set of columns which may have zone maps.
+            if (self._enabled_indexing_in_queries
+               and col.pathname in zmcolumns):
+                zonemapcols.append(colname)
 
         indexedcols = frozenset(indexedcols)
+        bitmapcols = frozenset(bitmapcols)
+        zonemapcols = frozenset(zonemapcols)
+
+        # Get the composite indexes starting with a referenced column.
+        composites = []
+        if self._enabled_indexing_in_queries:
+            colvars = dict((condvars[colname].pathname, colname)
+                           for colname in colnames)
+            for (columns, index) in self._get_composite_indexes().iteritems():
+                if columns[0] in colvars and not index.dirty:
+                    composites.append(
+                        (columns, tuple(colvars.get(c) for c in columns)))
+            composites.sort()
+
         # Now let ``compile_condition()`` do the Numexpr-related job.
-        compiled = compile_condition(condition, typemap, indexedcols)
+        from tables.conditions import compile_condition
+        compiled = compile_condition(condition, typemap, indexedcols,
+                                     bitmapcols, composites, zonemapcols,
+                                     frozenset(colnames))
 
         # Check that there actually are columns in the condition.
         if not set(compiled.parameters).intersection(set(colnames)):
@@ -1499,6 +2124,12 @@ class Table(tableextension.Table, Leaf):
 
         """
 
+        if self._v_file.params['QUERY_CACHE_SLOTS']:
+            condvars = self._required_expr_vars(condition, condvars, depth=2)
+            coords = self._get_cached_where(condition, condvars,
+                                            start, stop, step)
+            if coords is not None:
+                return self.itersequence(coords)
         return self._where(condition, condvars, start, stop, step)
 
     def _where(self, condition, condvars, start=None, stop=None, step=None):
@@ -1519,8 +2150,16 @@ class Table(tableextension.Table, Leaf):
         condvars = self._required_expr_vars(condition, condvars, depth=3)
         compiled = self._compile_condition(condition, condvars)
 
+        # Can we get the result right from bitmap indexes?
+        coords = _table__where_exact(self, compiled, condvars,
+                                     start, stop, step)
+        if coords is not None:
+            self._use_index = False
+            self._where_condition = None
+            return self.itersequence(coords)
+
         # Can we use indexes?
-        if compiled.index_expressions:
+        if compiled.index_variables:
             chunkmap = _table__where_indexed(
                 self, compiled, condition, condvars, start, stop, step)
             if not isinstance(chunkmap, numpy.ndarray):
@@ -1531,14 +2170,516 @@ class Table(tableextension.Table, Leaf):
                 # ...and return the iterator
                 return chunkmap
         else:
-            chunkmap = None  # default to an in-kernel query
+            # Zone maps may discard some chunks
+            chunkmap = _table__chunkmap_zoned(self, compiled, condvars)
+            if chunkmap is not None:
+                if not chunkmap.any():
+                    self._where_condition = None
+                    return iter([])
+                self._use_index = True
+                self._nslotseq = -1  # nothing to keep in the sequence cache
+                if self._dirtycache:
+                    restorecache(self)
 
         args = [condvars[param] for param in compiled.parameters]
         self._where_condition = (compiled.function, args)
         row = tableextension.Row(self)
         if profile:
             show_stats("Exiting table._where", tref)
-        return row._iter(start, stop, step, chunkmap=chunkmap)
+        rows = row._iter(start, stop, step, chunkmap=chunkmap)
+        timer = self._v_file._timer
+        if timer is not None:
+            rows = timer.iterate('iterate', rows)
+        return rows
+
+    def where_blocks(self, condition, condvars=None, fields=None,
+                     start=None, stop=None, step=None, blocksize=None):
+        """Iterate over blocks of rows fulfilling a condition.
+
+        This method works like :meth:`Table.where`, but instead of
+        returning a Row iterator it yields structured arrays (of the
+        current flavor) holding all the selected rows of a block of
+        the table at once.  This avoids the per-row overhead of the
+        Row iterator, which makes it the fastest way of consuming the
+        results of a query from NumPy code.
+
+        The blocksize argument sets the maximum number of table rows
+        scanned to produce each yielded block; it defaults to the
+        number of rows in the table I/O buffer (see
+        :attr:`Table.nrowsinbuf`).  Blocks without any matching row
+        are skipped, so every yielded array has at least one row.
+
+        If fields is supplied, only the named columns are included in
+        the yielded arrays.  Columns under a nested column can be
+        specified by using a slash character (/) as a separator (e.g.
+        'position/x').
+
+        The meaning of the other arguments is the same as in the
+        :meth:`Table.where` method.  When possible, indexed columns
+        participating in the condition (or zone maps, see
+        :data:`parameters.ZONE_MAPS`) are used to skip the table chunks
+        that cannot hold any matching row.
+
+        Examples
+        --------
+
+        ::
+
+            total = 0.0
+            for block in table.where_blocks('(col1 > 0) & (col2 <= 20)',
+                                            fields=['col3']):
+                total += block['col3'].sum()
+
+        .. versionadded:: 3.1
+
+        """
+
+        self._g_check_open()
+        if fields is not None:
+            if isinstance(fields, basestring):
+                fields = [fields]
+            for field in fields:
+                self._check_column(field)
+        if blocksize is None:
+            blocksize = self.nrowsinbuf
+        elif blocksize < 1:
+            raise ValueError("blocksize must be a positive integer, "
+                             "not %r" % (blocksize,))
+
+        (start, stop, step) = self._process_range_read(start, stop, step)
+        if start >= stop:
+            return iter([])
+
+        # Compile the condition and extract usable index conditions.
+        condvars = self._required_expr_vars(condition, condvars, depth=2)
+        compiled = self._compile_condition(condition, condvars)
+
+        # Can we use indexes (or zone maps)?
+        if compiled.index_variables:
+            chunkmap = _table__chunkmap_indexed(self, compiled, condvars)
+            if chunkmap is None:
+                return iter([])
+        else:
+            chunkmap = _table__chunkmap_zoned(self, compiled, condvars)
+            if chunkmap is not None and not chunkmap.any():
+                return iter([])
+        if chunkmap is not None:
+            ranges = self._chunkmap_ranges(
+                chunkmap, start, stop, step, blocksize)
+        else:
+            ranges = ((bstart, min(bstart + blocksize * step, stop))
+                      for bstart in xrange(start, stop, blocksize * step))
+
+        args = [condvars[param] for param in compiled.parameters]
+        return self._iter_where_blocks(
+            compiled.function, args, ranges, step, fields)
+
+    def _chunkmap_ranges(self, chunkmap, start, stop, step, blocksize):
+        """Get the row ranges of the chunks selected in `chunkmap`.
+
+        Consecutive selected chunks are coalesced and then split into
+        ranges of at most `blocksize` rows to be read with `step`.  The
+        start of every range is aligned with the `start`/`step` grid.
+
+        """
+
+        nrowsinchunk = self.chunkshape[0]
+        chunks = numpy.flatnonzero(chunkmap)
+        # Split the selected chunks into runs of consecutive ones
+        breaks = numpy.flatnonzero(numpy.diff(chunks) != 1) + 1
+        for run in numpy.split(chunks, breaks):
+            rstart = max(long(run[0]) * nrowsinchunk, start)
+            rstop = min((long(run[-1]) + 1) * nrowsinchunk, stop)
+            # Align the run start with the step grid
+            rstart += -(rstart - start) % step
+            for bstart in xrange(rstart, rstop, blocksize * step):
+                yield (bstart, min(bstart + blocksize * step, rstop))
+
+    def _iter_where_blocks(self, condfunc, condargs, ranges, step, fields):
+        """Iterator counterpart of `self.where_blocks()`."""
+
+        from tables.conditions import call_on_recarr
+
+        prefetch = self._v_file.params['QUERY_PREFETCH']
+        ranges = iter(ranges)
+        nextrange = next(ranges, None)
+        nextcall = None
+        while nextrange is not None:
+            (bstart, bstop) = nextrange
+            if nextcall is not None:
+                block = nextcall.result()
+                nextcall = None
+            else:
+                block = self._read(bstart, bstop, step)
+            nextrange = next(ranges, None)
+            if prefetch and nextrange is not None:
+                # Read the next block while the condition is evaluated
+                nextcall = BackgroundCall(
+                    self._read, nextrange[0], nextrange[1], step)
+            valid = call_on_recarr(condfunc, condargs, block)
+            if nextcall is not None:
+                # Do not let the read ahead run beyond this point
+                nextcall.join()
+            if not valid.any():
+                continue
+            block = block[valid]
+            if fields is not None:
+                cols = [get_nested_field(block, field) for field in fields]
+                dtype = [(field, col.dtype, col.shape[1:])
+                         for (field, col) in zip(fields, cols)]
+                selected = numpy.empty(len(block), dtype=dtype)
+                for (field, col) in zip(fields, cols):
+                    selected[field] = col
+                block = selected
+            yield internal_to_flavor(block, self.flavor)
+
+    def _where_coords(self, condition, condvars, start, stop, step,
+                      lazy=False):
+        """Get the coordinates of the rows fulfilling `condition`.
+
+        The coordinates are taken from the persistent query cache when
+        possible, and otherwise computed in parallel or by iterating
+        over `self._where()`, in which case the cache is updated.  If
+        `lazy` is true, `None` is returned instead of iterating, so that
+        the caller can iterate over `self._where()` by itself.
+
+        """
+
+        condvars = self._required_expr_vars(condition, condvars, depth=3)
+        # Bitmap indexes may give the result without reading the table
+        compiled = self._compile_condition(condition, condvars)
+        (pstart, pstop, pstep) = self._process_range_read(start, stop, step)
+        coords = _table__where_exact(self, compiled, condvars,
+                                     pstart, pstop, pstep)
+        if coords is not None:
+            return coords
+        coords = self._get_cached_where(condition, condvars,
+                                        start, stop, step)
+        if coords is not None:
+            return coords
+        coords = self._where_parallel(condition, condvars, start, stop, step)
+        if coords is None:
+            if lazy:
+                return None
+            coords = [p.nrow for p in
+                      self._where(condition, condvars, start, stop, step)]
+            coords = numpy.array(coords, dtype=SizeType)
+        self._where_condition = None  # reset the conditions
+        self._cache_where(condition, condvars, start, stop, step, coords)
+        return coords
+
+    def _query_cache_key(self, condition, condvars, start, stop, step):
+        """Get the key identifying a query in the persistent cache."""
+
+        (start, stop, step) = self._process_range_read(start, stop, step)
+        variables = []
+        for (var, val) in sorted(condvars.iteritems()):
+            if hasattr(val, 'pathname'):  # column
+                variables.append((var, val.pathname))
+            else:
+                val = numpy.asarray(val)
+                variables.append((var, val.dtype.str, val.tolist()))
+        return repr((condition, variables, (start, stop, step)))
+
+    def _get_cached_where(self, condition, condvars, start, stop, step):
+        """Get the coordinates of a query from the persistent cache.
+
+        `None` is returned if the cache is disabled or has no valid
+        result for the query.
+
+        """
+
+        if not self._v_file.params['QUERY_CACHE_SLOTS']:
+            return None
+        cachename = _query_cache_name_of(self)
+        if cachename not in self._v_parent:
+            return None
+        cachegroup = self._v_file._get_node(_query_cache_pathname_of(self))
+        key = self._query_cache_key(condition, condvars, start, stop, step)
+        name = 'q' + hashlib.md5(key.encode('utf-8')).hexdigest()
+        if name not in cachegroup:
+            return None
+        entry = cachegroup._f_get_child(name)
+        # Results for tables which changed behind our back are not valid
+        if entry.attrs.QUERY != key or entry.attrs.NROWS != self.nrows:
+            return None
+        return entry.read()
+
+    def _cache_where(self, condition, condvars, start, stop, step, coords):
+        """Save the coordinates of a query in the persistent cache.
+
+        Nothing is done if the cache is disabled, the file is read-only
+        or undo is enabled (changes to the cache are not to be logged).
+        When the cache is full, the oldest result is removed.
+
+        """
+
+        maxslots = self._v_file.params['QUERY_CACHE_SLOTS']
+        if (not maxslots or self._v_file.mode == 'r' or
+                self._v_file.is_undo_enabled()):
+            return
+        key = self._query_cache_key(condition, condvars, start, stop, step)
+        name = 'q' + hashlib.md5(key.encode('utf-8')).hexdigest()
+        cachename = _query_cache_name_of(self)
+        if cachename in self._v_parent:
+            cachegroup = self._v_file._get_node(
+                _query_cache_pathname_of(self))
+        else:
+            cachegroup = self._v_file.create_group(
+                self._v_parent, cachename,
+                "Query results cache for table " + self._v_pathname)
+            cachegroup._v_attrs.SEQNO = 0
+        if name in cachegroup:
+            cachegroup._f_get_child(name)._f_remove()
+        entries = cachegroup._v_children.values()
+        if len(entries) >= maxslots:
+            entries.sort(key=lambda entry: entry.attrs.SEQNO)
+            for entry in entries[:len(entries) - maxslots + 1]:
+                entry._f_remove()
+        seqno = cachegroup._v_attrs.SEQNO + 1
+        cachegroup._v_attrs.SEQNO = seqno
+        entry = self._v_file.create_earray(
+            cachegroup, name, Int64Atom(), (0,),
+            filters=Filters(complevel=1, complib='zlib', shuffle=True),
+            expectedrows=max(len(coords), 1))
+        entry.append(coords)
+        entry.attrs.QUERY = key
+        entry.attrs.NROWS = self.nrows
+        entry.attrs.SEQNO = seqno
+
+    def _invalidate_query_cache(self):
+        """Remove the persistent query cache of this table (if any).
+
+        The removal is never logged, so that undoing later actions does
+        not bring back results which are not valid anymore.
+
+        """
+
+        if _query_cache_name_of(self) in self._v_parent:
+            cachegroup = self._v_file._get_node(
+                _query_cache_pathname_of(self))
+            cachegroup._g_remove(recursive=True)
+
+    def _get_zone_map_columns(self):
+        """Get the path names of the columns which can have zone maps."""
+
+        coldtypes = self.coldtypes
+        return [colname for colname in self.colpathnames
+                if coldtypes[colname].shape == ()
+                and coldtypes[colname].kind in 'biufS']
+
+    def _get_zone_maps(self):
+        """Get the group with the zone maps of this table (or `None`)."""
+
+        if _zone_map_name_of(self) not in self._v_parent:
+            return None
+        return self._v_file._get_node(_zone_map_pathname_of(self))
+
+    def _create_zone_maps(self):
+        """Create the (empty) zone maps of this table."""
+
+        zmgroup = self._v_file.create_group(
+            self._v_parent, _zone_map_name_of(self),
+            "Zone maps for table " + self._v_pathname)
+        zmgroup._v_attrs.ZONEROWS = 0
+        bgroup = self._v_file.create_group(zmgroup, 'bounds')
+        ngroup = self._v_file.create_group(zmgroup, 'nans')
+        expectedrows = max(self.nrows // self.chunkshape[0], 1)
+        for colname in self._get_zone_map_columns():
+            dtype = self.coldtypes[colname]
+            key = _zone_map_key(colname)
+            self._v_file.create_earray(
+                bgroup, key, Atom.from_dtype(dtype), (0, 2),
+                filters=self.filters, expectedrows=expectedrows)
+            if dtype.kind == 'f':
+                self._v_file.create_earray(
+                    ngroup, key, UInt32Atom(), (0,),
+                    filters=self.filters, expectedrows=expectedrows)
+        return zmgroup
+
+    def _merge_zones(self, zmgroup, rows, coords):
+        """Widen the summaries in zone maps with the values in `rows`.
+
+        `coords` has the (increasing) positions of the `rows` in the
+        table, which must belong to zones already in the zone maps.
+
+        """
+
+        zones = coords // self.chunkshape[0]
+        offsets = numpy.flatnonzero(numpy.concatenate(
+            ([True], zones[1:] != zones[:-1])))
+        zones = zones[offsets]
+        zstart, zstop = zones[0], zones[-1] + 1
+        zones -= zstart
+        # Every zone is summarized along with its new values
+        stacked = numpy.arange(0, 4 * len(zones), 4)
+        for colname in self._get_zone_map_columns():
+            key = _zone_map_key(colname)
+            mins, maxs, nans = _zone_summaries(
+                get_nested_field(rows, colname), offsets)
+            barray = zmgroup.bounds._f_get_child(key)
+            bounds = barray.read(zstart, zstop)
+            values = numpy.empty(4 * len(zones), dtype=bounds.dtype)
+            values[0::4] = bounds[zones, 0]
+            values[1::4] = bounds[zones, 1]
+            values[2::4] = mins
+            values[3::4] = maxs
+            mins, maxs = _zone_summaries(values, stacked)[:2]
+            bounds[zones, 0] = mins
+            bounds[zones, 1] = maxs
+            barray[zstart:zstop] = bounds
+            if nans is not None:
+                narray = zmgroup.nans._f_get_child(key)
+                znans = narray.read(zstart, zstop)
+                znans[zones] += nans
+                narray[zstart:zstop] = znans
+
+    def _summarize_zones(self, zmgroup, rows, start):
+        """Add the `rows` appended at row `start` to the zone maps."""
+
+        nrowsinchunk = self.chunkshape[0]
+        nrows = len(rows)
+        # Rows completing the last zone are merged with it
+        head = min(-start % nrowsinchunk, nrows)
+        if head:
+            self._merge_zones(zmgroup, rows[:head],
+                              numpy.arange(start, start + head))
+        if head < nrows:
+            offsets = numpy.arange(head, nrows, nrowsinchunk)
+            for colname in self._get_zone_map_columns():
+                key = _zone_map_key(colname)
+                mins, maxs, nans = _zone_summaries(
+                    get_nested_field(rows, colname), offsets)
+                zmgroup.bounds._f_get_child(key).append(
+                    numpy.column_stack((mins, maxs)))
+                if nans is not None:
+                    zmgroup.nans._f_get_child(key).append(nans)
+        zmgroup._v_attrs.ZONEROWS = start + nrows
+
+    def _update_zone_maps(self, rows, start):
+        """Summarize the `rows` to be appended at row `start`.
+
+        The zone maps are created if needed (see
+        `parameters.ZONE_MAPS`), and the rows in the table not
+        summarized yet are read back and summarized first.
+
+        """
+
+        zmgroup = self._get_zone_maps()
+        if zmgroup is None:
+            if not self._v_file.params['ZONE_MAPS']:
+                return
+            zmgroup = self._create_zone_maps()
+        zonerows = long(zmgroup._v_attrs.ZONEROWS)
+        if zonerows > start:
+            # Some failed append left summaries of missing rows
+            self._truncate_zone_maps(start)
+            zonerows = long(zmgroup._v_attrs.ZONEROWS)
+        bufsize = self.nrowsinbuf
+        for bstart in xrange(zonerows, start, bufsize):
+            bstop = min(bstart + bufsize, start)
+            self._summarize_zones(zmgroup, self._read(bstart, bstop, 1),
+                                  bstart)
+        self._summarize_zones(zmgroup, rows, start)
+
+    def _widen_zone_maps(self, rows, start=0, step=1, coords=None):
+        """Widen the zone maps with the `rows` replacing some others.
+
+        The rows replace the ones at the `coords` positions if given,
+        or in the range of rows starting at `start` with `step`
+        otherwise.  Summaries are only widened, so they stay valid for
+        the old values as well.
+
+        """
+
+        zmgroup = self._get_zone_maps()
+        if zmgroup is None or len(rows) == 0:
+            return
+        if coords is None:
+            coords = numpy.arange(start, start + len(rows) * step, step,
+                                  dtype=SizeType)
+        else:
+            order = numpy.argsort(coords, kind='mergesort')
+            coords = numpy.asarray(coords, dtype=SizeType)[order]
+            rows = rows[order]
+        # Rows not summarized yet will be summarized on the next append
+        nrows = numpy.searchsorted(coords, long(zmgroup._v_attrs.ZONEROWS))
+        if nrows > 0:
+            self._merge_zones(zmgroup, rows[:nrows], coords[:nrows])
+
+    def _truncate_zone_maps(self, start):
+        """Forget the summaries of the zones from row `start` on.
+
+        The rows in those zones are summarized again on the next append.
+
+        """
+
+        zmgroup = self._get_zone_maps()
+        if zmgroup is None or start >= zmgroup._v_attrs.ZONEROWS:
+            return
+        nzones = start // self.chunkshape[0]
+        for array in (zmgroup.bounds._f_list_nodes() +
+                      zmgroup.nans._f_list_nodes()):
+            array.truncate(nzones)
+        zmgroup._v_attrs.ZONEROWS = nzones * self.chunkshape[0]
+
+    def _where_parallel(self, condition, condvars, start, stop, step):
+        """Get the coordinates fulfilling `condition` in parallel.
+
+        The range of rows is split on chunk boundaries and every part
+        is queried by a different worker process (see
+        `parameters.MAX_QUERY_PROCESSES`).  The coordinates are returned
+        in increasing order as an array, or `None` if the query can not
+        be run in parallel, in which case the caller should fall back to
+        `self._where()`.
+
+        """
+
+        params = self._v_file.params
+        nprocs = params['MAX_QUERY_PROCESSES']
+        if nprocs is None:
+            nprocs = detect_number_of_cores()
+        # Workers open the file on their own, so it must be read-only
+        # and live on disk.
+        if (nprocs < 2 or _query_mp_context is None
+                or self._v_file.mode != 'r'
+                or params['DRIVER'] not in (None, 'H5FD_SEC2')):
+            return None
+
+        (start, stop, step) = self._process_range_read(start, stop, step)
+        nrowsinchunk = self.chunkshape[0]
+        firstchunk = start // nrowsinchunk
+        lastchunk = (stop - 1) // nrowsinchunk + 1
+        nparts = min(nprocs, lastchunk - firstchunk)
+        if start >= stop or nparts < 2:
+            return None
+
+        # Compile the condition; queries using indexes are left alone.
+        condvars = self._required_expr_vars(condition, condvars, depth=3)
+        compiled = self._compile_condition(condition, condvars)
+        if compiled.index_variables:
+            return None
+        colvars, othervars = {}, {}
+        for (var, val) in condvars.iteritems():
+            if hasattr(val, 'pathname'):  # column
+                colvars[var] = val.pathname
+            else:
+                othervars[var] = val
+
+        # Split the range on chunk boundaries aligned with the step.
+        bounds = numpy.linspace(firstchunk, lastchunk, nparts + 1)
+        bounds = [long(bound) * nrowsinchunk for bound in bounds]
+        bounds[0], bounds[-1] = start, stop
+        tasks = []
+        for (pstart, pstop) in zip(bounds[:-1], bounds[1:]):
+            pstart += -(pstart - start) % step
+            if pstart < pstop:
+                tasks.append((self._v_file.filename, self._v_pathname,
+                              condition, colvars, othervars,
+                              pstart, pstop, step))
+
+        pool = _get_query_pool(nprocs)
+        return numpy.concatenate(pool.map(_where_worker, tasks))
 
     def read_where(self, condition, condvars=None, field=None,
                    start=None, stop=None, step=None):
@@ -1554,21 +2695,77 @@ class Table(tableextension.Table, Leaf):
         """
 
         self._g_check_open()
-        coords = [p.nrow for p in
-                  self._where(condition, condvars, start, stop, step)]
-        self._where_condition = None  # reset the conditions
+        condvars = self._required_expr_vars(condition, condvars, depth=2)
+        if field is not None:
+            # The values may come straight from the index of the field
+            values = self._read_where_indexed(condition, condvars, field,
+                                              start, stop, step)
+            if values is not None:
+                return internal_to_flavor(values, self.flavor)
+        coords = self._where_coords(condition, condvars, start, stop, step)
         if len(coords) > 1:
             cstart, cstop = coords[0], coords[-1] + 1
             if cstop - cstart == len(coords):
                 # Chances for monotonically increasing row values. Refine.
                 inc_seq = numpy.alltrue(
-                    numpy.arange(cstart, cstop) == numpy.array(coords))
+                    numpy.arange(cstart, cstop) == coords)
                 if inc_seq:
                     return self.read(cstart, cstop, field=field)
         return self.read_coordinates(coords, field)
 
     readWhere = previous_api(read_where)
 
+    def _read_where_indexed(self, condition, condvars, field,
+                            start, stop, step, sort=False):
+        """Read the values of `field` fulfilling `condition` from its index.
+
+        The values are taken from the sorted values of the full index of
+        the `field` column, so the table is not read at all.  They are
+        returned in table order, or sorted if `sort` is true.  `None` is
+        returned if the condition is not just a comparison over an
+        indexed `field` (in which case the index does not have the
+        answer).
+
+        """
+
+        compiled = self._compile_condition(condition, condvars)
+        if not compiled.exact or len(compiled.index_expressions) != 1:
+            return None
+        var, ops, lims = compiled.index_expressions[0]
+        col = condvars[var]
+        index = col.index
+        # Only full indexes keep every value and its row number
+        if (col.pathname != field or index.kind != 'full'
+                or index.nelements - index.nremoved != self.nrows):
+            return None
+        index.search(index.get_lookup_range(ops, lims))
+        values = index.read_search_result('sorted')
+        # The lookup range may be wider than the condition (e.g. for
+        # booleans), so check the values found
+        args = [values if param == var else condvars[param]
+                for param in compiled.parameters]
+        selected = compiled.function(*args)
+        coords = None
+        if index.nremoved:
+            # Leave out the values of removed rows
+            coords, removed = index._map_positions(
+                index.read_search_result('indices'))
+            selected &= ~removed
+        (start, stop, step) = self._process_range_read(start, stop, step)
+        if sort and (start, stop, step) == (0, self.nrows, 1):
+            # Every slice is already sorted, so merge them
+            return numpy.sort(values[selected], kind='mergesort')
+        if coords is None:
+            coords = index.read_search_result('indices')
+        if (start, stop, step) != (0, self.nrows, 1):
+            selected &= (coords >= start) & (coords < stop)
+            if step > 1:
+                selected &= (coords - start) % step == 0
+        coords, values = coords[selected], values[selected]
+        if sort:
+            return numpy.sort(values, kind='mergesort')
+        return values[coords.argsort()]
+
     def append_where(self, dstTable, condition, condvars=None,
                      start=None, stop=None, step=None):
         """Append rows fulfilling the condition to the dstTable table.
@@ -1596,7 +2793,13 @@ class Table(tableextension.Table, Leaf):
         colNames = [colName for colName in self.colpathnames]
         dstRow = dstTable.row
         nrows = 0
-        for srcRow in self._where(condition, condvars, start, stop, step):
+        coords = self._where_coords(condition, condvars, start, stop, step,
+                                    lazy=True)
+        if coords is None:
+            srcRows = self._where(condition, condvars, start, stop, step)
+        else:
+            srcRows = self.itersequence(coords)
+        for srcRow in srcRows:
             for colName in colNames:
                 dstRow[colName] = srcRow[colName]
             dstRow.append()
@@ -1621,11 +2824,7 @@ class Table(tableextension.Table, Leaf):
 
         self._g_check_open()
 
-        coords = [p.nrow for p in
-                  self._where(condition, condvars, start, stop, step)]
-        coords = numpy.array(coords, dtype=SizeType)
-        # Reset the conditions
-        self._where_condition = None
+        coords = self._where_coords(condition, condvars, start, stop, step)
         if sort:
             coords = numpy.sort(coords)
         return internal_to_flavor(coords, self.flavor)
@@ -1658,10 +2857,30 @@ class Table(tableextension.Table, Leaf):
         (start, stop, step) = self._process_range(None, None, None)
         if (start > stop) or (len(sequence) == 0):
             return iter([])
+        if self._dirtycache:
+            restorecache(self)
         row = tableextension.Row(self)
-        return row._iter(start, stop, step, coords=sequence)
+        rows = row._iter(start, stop, step, coords=sequence)
+        timer = self._v_file._timer
+        if timer is not None:
+            rows = timer.iterate('iterate', rows)
+        return rows
 
     def _check_sortby_csi(self, sortby, checkCSI):
+        if isinstance(sortby, (tuple, list)):
+            # The columns of a composite index
+            columns = tuple(self._composite_columns(sortby))
+            index = self._get_composite_index(columns)
+            if index is None or index.kind != "full":
+                raise ValueError(
+                    "Fields %s must have associated a 'full' composite "
+                    "index in table `%s`." % (columns, self))
+            if checkCSI and not index.is_csi:
+                raise ValueError(
+                    "Fields %s must have associated a CSI composite index "
+                    "in table `%s`, but the existing one is not. "
+                    % (columns, self))
+            return index
         if isinstance(sortby, Column):
             icol = sortby
         elif isinstance(sortby, str):
@@ -1693,7 +2912,9 @@ class Table(tableextension.Table, Leaf):
         The sortby column must have associated a full index.  If you want to
         ensure a fully sorted order, the index must be a CSI one.  You may want
         to use the checkCSI argument in order to explicitly check for the
-        existence of a CSI index.
+        existence of a CSI index.  A tuple of columns can also be given
+        for following the order of their full composite index (see
+        :meth:`Table.create_composite_index`).
 
         The meaning of the start, stop and step arguments is the same as in
         :meth:`Table.read`.
@@ -1722,7 +2943,8 @@ class Table(tableextension.Table, Leaf):
         The sortby column must have associated a full index.  If you want to
         ensure a fully sorted order, the index must be a CSI one.  You may want
         to use the checkCSI argument in order to explicitly check for the
-        existence of a CSI index.
+        existence of a CSI index.  As in :meth:`Table.itersorted`, a tuple
+        of columns with a full composite index can be given as well.
 
         If field is supplied only the named column will be selected.  If the
         column is not nested, an *array* of the current flavor will be
@@ -1740,6 +2962,12 @@ class Table(tableextension.Table, Leaf):
 
         self._g_check_open()
         index = self._check_sortby_csi(sortby, checkCSI)
+        if (isinstance(sortby, (Column, str)) and not index.dirty
+                and field == index.column.pathname
+                and index.nelements == self.nrows):
+            # The sorted values of the index are the values of the field
+            values = index.read_sorted(start, stop, step)
+            return internal_to_flavor(values, self.flavor)
         coords = index[start:stop:step]
         return self.read_coordinates(coords, field)
 
@@ -1877,21 +3105,38 @@ class Table(tableextension.Table, Leaf):
             # This optimization works three times faster than
             # the row._fill_col method (up to 170 MB/s on a pentium IV @ 2GHz)
             self._read_records(start, stop - start, result)
-        # Warning!: _read_field_name should not be used until
-        # H5TBread_fields_name in tableextension will be finished
-        # F. Alted 2005/05/26
-        # XYX Ho implementem per a PyTables 2.0??
-        elif field and step > 15 and 0:
-            # For step>15, this seems to work always faster than row._fill_col.
+        elif (field and step > 0 and result.flags['C_CONTIGUOUS'] and
+              self._is_projected_field(field)):
+            # Only the values of the field are converted and copied to
+            # the result (whole rows are read otherwise, like in queries)
             self._read_field_name(result, start, stop, step, field)
         else:
-            self.row._fill_col(result, start, stop, step, field)
+            # Use a row of its own, since ``self.row`` may be in use by
+            # an iteration, and a new one in threads building indexes
+            row = self._v_readrow
+            if self._v_file._index_builds:
+                row = tableextension.Row(self)
+            row._fill_col(result, start, stop, step, field)
 
         if select_field:
             return result[select_field]
         else:
             return result
 
+    def _is_projected_field(self, field):
+        """Whether `field` is better read by itself than with whole rows.
+
+        The same rule as for the columns read by queries is used (see
+        ``_get_projection_dtype()``).
+
+        """
+
+        projected = self._v_projectedfields
+        if field not in projected:
+            projected[field] = (
+                self._get_projection_dtype((field,)) is not None)
+        return projected[field]
+
     def read(self, start=None, stop=None, step=None, field=None, out=None):
         """Get data in the table as a (record) array.
 
@@ -1980,6 +3225,9 @@ class Table(tableextension.Table, Leaf):
 
         # Do the real read
         if ncoords > 0:
+            # Isolated chunks are read through the chunk cache
+            if self._dirtycache:
+                restorecache(self)
             # Turn coords into an array of coordinate indexes, if necessary
             if not (isinstance(coords, numpy.ndarray) and
                     coords.dtype.type is _npsizetype and
@@ -2193,6 +3441,8 @@ class Table(tableextension.Table, Leaf):
     def _save_buffered_rows(self, wbufRA, lenrows):
         """Update the indexes after a flushing of rows"""
 
+        # Rows are summarized before being converted for storage
+        self._update_zone_maps(wbufRA[:lenrows], self.nrows)
         self._open_append(wbufRA)
         self._append_records(lenrows)
         self._close_append()
@@ -2568,39 +3818,91 @@ class Table(tableextension.Table, Leaf):
                     if nrows > 0 and not col.index.dirty:
                         rowsadded = self._add_rows_to_index(
                             colname, start, nrows, _lastrow, update=True)
+            for (columns, index) in self._get_composite_indexes().iteritems():
+                if nrows > 0 and not index.dirty:
+                    rowsadded = self._add_rows_to_index(
+                        columns, start, nrows, _lastrow, update=True)
             self._unsaved_indexedrows -= rowsadded
             self._indexedrows += rowsadded
         return rowsadded
 
     flushRowsToIndex = previous_api(flush_rows_to_index)
 
-    def _add_rows_to_index(self, colname, start, nrows, lastrow, update):
-        """Add more elements to the existing index"""
+    def _add_rows_to_index(self, colname, start, nrows, lastrow, update,
+                           index=None):
+        """Add more elements to the existing index.
+
+        `colname` can also be a tuple with the columns of a composite
+        index.  The elements are added to `index` if given, instead of
+        the index of the column.
+
+        """
+
+        from tables.index import Index
 
         # This method really belongs to Column, but since it makes extensive
         # use of the table, it gets dangerous when closing the file, since the
         # column may be accessing a table which is being destroyed.
-        index = self.cols._g_col(colname).index
+        if isinstance(colname, tuple):
+            if index is None:
+                index = self._get_composite_index(colname)
+
+            def read(start, stop):
+                return index.pack_keys([self._read(start, stop, 1, name)
+                                        for name in colname])
+        else:
+            if index is None:
+                index = self.cols._g_col(colname).index
+
+            def read(start, stop):
+                return self._read(start, stop, 1, colname)
         slicesize = index.slicesize
+        nthreads = self._v_file.params['MAX_INDEX_THREADS']
+        nremoved = nlr = 0
+        if isinstance(index, Index):
+            nremoved = index.nremoved
+            if index.indsize == 8:
+                # Full indexes keep the values of the last row themselves
+                nlr = index.nelementsILR
+        else:
+            nthreads = 1
         # The next loop does not rely on xrange so that it can
         # deal with long ints (i.e. more than 32-bit integers)
         # This allows to index columns with more than 2**31 rows
         # F. Alted 2005-05-09
-        startLR = index.sorted.nrows * slicesize
+        startLR = index.nslices * slicesize - nremoved
         indexedrows = startLR - start
         stop = start + nrows - slicesize + 1
         while startLR < stop:
-            index.append(
-                [self._read(startLR, startLR + slicesize, 1, colname)],
-                update=update)
-            indexedrows += slicesize
-            startLR += slicesize
-        # index the remaining rows in last row
-        if lastrow and startLR < self.nrows:
-            index.append_last_row(
-                [self._read(startLR, self.nrows, 1, colname)],
-                update=update)
-            indexedrows += self.nrows - startLR
+            nslices = 1
+            if nthreads > 1:
+                # Sort a group of slices in parallel
+                nslices = min(nthreads, (stop - startLR - 1) // slicesize + 1)
+            starts = [startLR + i * slicesize for i in xrange(nslices)]
+            arrays = [read(max(s, startLR + nlr), s + slicesize)
+                      for s in starts]
+            if nlr > 0:
+                # Leave room for the values in the last row
+                arrays[0] = numpy.concatenate(
+                    (numpy.empty(nlr, dtype=arrays[0].dtype), arrays[0]))
+                nlr = 0
+            if nslices > 1:
+                index.append_slices(arrays, update=update, nthreads=nthreads)
+            else:
+                index.append(arrays, update=update)
+            indexedrows += nslices * slicesize
+            startLR += nslices * slicesize
+        # index the remaining rows in last row (rows appended meanwhile
+        # by other threads are left for later)
+        stop = start + nrows
+        if lastrow and startLR < stop:
+            if nlr == 0:
+                index.append_last_row([read(startLR, stop)], update=update)
+            elif startLR + nlr < stop:
+                # Just merge the new rows with the ones in the last row
+                index.merge_last_row([read(startLR + nlr, stop)],
+                                     update=update)
+            indexedrows += stop - startLR
         return indexedrows
 
     _addRowsToIndex = previous_api(_add_rows_to_index)
@@ -2659,13 +3961,57 @@ class Table(tableextension.Table, Leaf):
                                       'underlying HDF5 library. Sorry!' %
                                       self._v_pathname)
         nrows = self._remove_rows(start, stop, step)
-        # remove_rows is a invalidating index operation
-        self._reindex(self.colpathnames)
+        self._remove_rows_from_indexes(start, stop, step)
 
         return SizeType(nrows)
 
     removeRows = previous_api(remove_rows)
 
+    def _remove_rows_from_indexes(self, start, stop, step):
+        """Update the indexes after removing rows from the table.
+
+        With automatic indexing and the :data:`parameters.INDEX_TOMBSTONES`
+        parameter on, indexes (other than bitmap ones) keep the removed
+        rows as tombstones instead of being recomputed.  Otherwise,
+        removing rows invalidates the indexes.
+
+        """
+
+        from tables.index import Index
+
+        self._invalidate_index_builds(self.colpathnames)
+        if not self.indexed:
+            return
+        if (step != 1 or not self.autoindex or
+                not self._v_file.params['INDEX_TOMBSTONES']):
+            # remove_rows is a invalidating index operation
+            self._reindex(self.colpathnames)
+            return
+        indexes = [index for index in self._get_composite_indexes().values()
+                   if not index.dirty]
+        for (colname, colindexed) in self.colindexed.iteritems():
+            if not colindexed:
+                continue
+            index = self.cols._g_col(colname).index
+            if index.dirty:
+                continue
+            if isinstance(index, Index):
+                indexes.append(index)
+            else:
+                index.dirty = True
+        for index in indexes:
+            index.remove_rows(start, stop)
+        if indexes:
+            # Some indexes may need to refill their last row
+            self._indexedrows = min(index.nelements - index.nremoved
+                                    for index in indexes)
+            self._unsaved_indexedrows = self.nrows - self._indexedrows
+            self.flush_rows_to_index(_lastrow=True)
+        if self._dirtyindexes:
+            self._do_reindex(dirty=True)
+        # The table caches for indexed queries are dirty now
+        self._dirtycache = True
+
     def remove_row(self, n):
         """Removes a row from the table.
 
@@ -2694,6 +4040,7 @@ class Table(tableextension.Table, Leaf):
         # Update the new path in the Row instance, if cached.  Fixes #224.
         if 'row' in self.__dict__:
             self.__dict__['row'] = tableextension.Row(self)
+        self.__dict__.pop('_v_readrow', None)
 
     _g_updateDependent = previous_api(_g_update_dependent)
 
@@ -2705,6 +4052,8 @@ class Table(tableextension.Table, Leaf):
         """
 
         itgpathname = _index_pathname_of(self)
+        qcgpathname = _query_cache_pathname_of(self)
+        zmgpathname = _zone_map_pathname_of(self)
 
         # First, move the table to the new location.
         super(Table, self)._g_move(newparent, newname)
@@ -2719,6 +4068,27 @@ class Table(tableextension.Table, Leaf):
             newiname = _index_name_of(self)
             itgroup._g_move(newigroup, newiname)
 
+        # And the query cache group (if any).
+        try:
+            qcgroup = self._v_file._get_node(qcgpathname)
+        except NoSuchNodeError:
+            pass
+        else:
+            qcgroup._g_move(self._v_parent, _query_cache_name_of(self))
+
+        # And the zone maps group (if any).
+        try:
+            zmgroup = self._v_file._get_node(zmgpathname)
+        except NoSuchNodeError:
+            pass
+        else:
+            zmgroup._g_move(self._v_parent, _zone_map_name_of(self))
+
+    def _g_truncate(self, size):
+        # Summaries of rows going away are not valid anymore
+        self._truncate_zone_maps(size)
+        super(Table, self)._g_truncate(size)
+
     def _g_remove(self, recursive=False, force=False):
         # Remove the associated index group (if any).
         itgpathname = _index_pathname_of(self)
@@ -2730,6 +4100,14 @@ class Table(tableextension.Table, Leaf):
             itgroup._f_remove(recursive=True)
             self.indexed = False   # there are indexes no more
 
+        # Remove the query cache group (if any).
+        self._invalidate_query_cache()
+
+        # And the zone maps group (if any).
+        zmgroup = self._get_zone_maps()
+        if zmgroup is not None:
+            zmgroup._f_remove(recursive=True)
+
         # Remove the leaf itself from the hierarchy.
         super(Table, self)._g_remove(recursive, force)
 
@@ -2744,7 +4122,8 @@ class Table(tableextension.Table, Leaf):
         # Changing the set of indexed columns invalidates the condition cache
         self._condition_cache.clear()
         colindexed[colpathname] = isindexed
-        self.indexed = max(colindexed.values())  # this is an OR :)
+        self.indexed = (max(colindexed.values())  # this is an OR :)
+                        or bool(self._compositeindexed))
 
     _setColumnIndexing = previous_api(_set_column_indexing)
 
@@ -2759,12 +4138,15 @@ class Table(tableextension.Table, Leaf):
                 if colindexed[colname]:
                     col = cols._g_col(colname)
                     col.index.dirty = True
+            for index in self._get_composite_indexes(colnames).itervalues():
+                index.dirty = True
 
     _markColumnsAsDirty = previous_api(_mark_columns_as_dirty)
 
     def _reindex(self, colnames):
         """Re-index columns in `colnames` if automatic indexing is true."""
 
+        self._invalidate_index_builds(colnames)
         if self.indexed:
             colindexed, cols = self.colindexed, self.cols
             colstoindex = []
@@ -2774,6 +4156,9 @@ class Table(tableextension.Table, Leaf):
                     col = cols._g_col(colname)
                     col.index.dirty = True
                     colstoindex.append(colname)
+            for index in self._get_composite_indexes(colnames).itervalues():
+                index.dirty = True
+                colstoindex.append(index.columns)
             # Now, re-index the dirty ones
             if self.autoindex and colstoindex:
                 self._do_reindex(dirty=True)
@@ -2790,6 +4175,18 @@ class Table(tableextension.Table, Leaf):
             if colindexed:
                 indexcol = self.cols._g_col(colname)
                 indexedrows = indexcol._do_reindex(dirty)
+        for (columns, index) in self._get_composite_indexes().iteritems():
+            if dirty and not index.dirty:
+                continue
+            self._v_file._check_writable()
+            # Get the old index parameters
+            kind = index.kind
+            optlevel = index.optlevel
+            filters = index.filters
+            index.dirty = False
+            index._f_remove()
+            indexedrows = self.create_composite_index(
+                columns, kind=kind, optlevel=optlevel, filters=filters)
         # Update counters in case some column has been updated
         if indexedrows > 0:
             self._indexedrows = indexedrows
@@ -2826,6 +4223,203 @@ class Table(tableextension.Table, Leaf):
 
     reIndexDirty = previous_api(reindex_dirty)
 
+    def _composite_columns(self, columns):
+        """Get the pathnames of `columns` (names or Column objects)."""
+
+        for column in columns:
+            if not isinstance(column, Column):
+                column = self.cols._f_col(column)
+                if not isinstance(column, Column):
+                    raise TypeError("nested columns can not be indexed")
+            elif (column._table_file is not self._v_file
+                  or column._table_path != self._v_pathname):
+                raise ValueError("column ``%s`` is not part of table ``%s``"
+                                 % (column.pathname, self._v_pathname))
+            yield column.pathname
+
+    def _get_composite_index(self, columns):
+        """Get the composite index over `columns` (or `None`)."""
+
+        from tables.compositeindex import CompositeIndex
+
+        indexpathname = join_path(_index_pathname_of(self),
+                                  _composite_index_name_of(columns))
+        try:
+            index = self._v_file._get_node(indexpathname)
+        except NoSuchNodeError:
+            return None
+        # Different sets of columns may share the same node name
+        if not isinstance(index, CompositeIndex) or index.columns != columns:
+            return None
+        return index
+
+    def _get_composite_indexes(self, colnames=None):
+        """Get the composite indexes of the table by their columns.
+
+        If `colnames` is given, only the indexes including some of the
+        columns in it are returned.
+
+        """
+
+        indexes = {}
+        for columns in self._compositeindexed:
+            if colnames is None or set(columns).intersection(colnames):
+                indexes[columns] = self._get_composite_index(columns)
+        return indexes
+
+    def _get_index_build(self, colpathname):
+        """Get the background build of an index for `colpathname` (or
+        `None`)."""
+
+        for build in self._v_file._index_builds:
+            if build._table is self and build._colpathname == colpathname:
+                return build
+        return None
+
+    def _finish_index_builds(self, wait=False):
+        """Put in place the indexes built in the background.
+
+        Only the builds that have already finished successfully are
+        considered, unless `wait` is true.
+
+        """
+
+        for build in list(self._v_file._index_builds):
+            if build._table is not self:
+                continue
+            if wait:
+                build._close()
+            elif build.done() and build._call._error is None:
+                build._finish()
+
+    def _invalidate_index_builds(self, colnames):
+        """Tell the background builds of indexes for `colnames` that rows
+        have been modified or removed."""
+
+        for build in self._v_file._index_builds:
+            if build._table is self and build._colpathname in colnames:
+                build._stale = True
+
+    def create_composite_index(self, columns, optlevel=6, kind="medium",
+                               filters=None, tmp_dir=None,
+                               _blocksizes=None, _verbose=False):
+        """Create an index over the values of several columns.
+
+        The values of the given *columns* (a sequence of column names or
+        :class:`Column` objects) in every row are indexed together, in
+        such a way that queries comparing the first columns for equality,
+        and optionally the next one with a range, like::
+
+            table.where('(sym == b"X") & (ts > t0)')
+
+        for an index over ``["sym", "ts"]``, only look at the rows with
+        matching values of all those columns.  When the index is of the
+        'full' kind and the comparisons are the whole condition, the
+        matching rows are found without reading the table, and the
+        index can also be used for iterating the table in the order of
+        the columns (see :meth:`Table.itersorted`).
+
+        Floating point columns with an extended precision are not
+        supported.  The meaning of the other arguments is the same as
+        in :meth:`Column.create_index` ('bitmap' is not a valid *kind*
+        here).  The number of indexed rows is returned.
+
+        """
+
+        from tables.index import default_index_filters
+        from tables.compositeindex import CompositeIndex
+
+        self._g_check_open()
+        self._v_file._check_writable()
+        columns = tuple(self._composite_columns(columns))
+        if len(columns) < 2 or len(set(columns)) != len(columns):
+            raise ValueError("composite indexes need two or more "
+                             "different columns")
+        dtypes = [self.coldtypes[colname] for colname in columns]
+        for (colname, dtype) in zip(columns, dtypes):
+            if (dtype.shape != () or dtype.kind not in 'biufS'
+                    or (dtype.kind == 'f' and dtype.itemsize > 8)):
+                raise TypeError("column ``%s`` of type ``%s`` can not be "
+                                "part of a composite index"
+                                % (colname, dtype))
+        kinds = ['ultralight', 'light', 'medium', 'full']
+        if kind not in kinds:
+            raise ValueError("Kind must have any of these values: %s" % kinds)
+        if (not isinstance(optlevel, (int, long)) or
+            (optlevel < 0 or optlevel > 9)):
+            raise ValueError("Optimization level must be an integer in the "
+                             "range 0-9")
+        if filters is None:
+            filters = default_index_filters
+        if tmp_dir is None:
+            tmp_dir = os.path.dirname(self._v_file.filename)
+        elif not os.path.isdir(tmp_dir):
+            raise ValueError("Temporary directory '%s' does not exist" %
+                             tmp_dir)
+
+        # Get the indexes group for table, and if not exists, create it
+        try:
+            itgroup = self._v_file._get_node(_index_pathname_of(self))
+        except NoSuchNodeError:
+            itgroup = create_indexes_table(self)
+        if _composite_index_name_of(columns) in itgroup:
+            raise ValueError("a composite index for columns %s already "
+                             "exists" % (columns,))
+
+        # Protection on tables larger than the expected rows
+        expectedrows = max(self._v_expectedrows, self.nrows)
+
+        # Create the index itself
+        index = CompositeIndex(
+            itgroup, _composite_index_name_of(columns),
+            columns=columns, dtypes=dtypes,
+            title="Composite index for %s columns" % ", ".join(columns),
+            kind=kind,
+            optlevel=optlevel,
+            filters=filters,
+            tmp_dir=tmp_dir,
+            expectedrows=expectedrows,
+            byteorder=self.byteorder,
+            blocksizes=_blocksizes)
+        # Changing the set of indexes invalidates the condition cache
+        self._condition_cache.clear()
+        self._compositeindexed.add(columns)
+        self.indexed = True
+
+        # Feed the index with values
+        if self.nrows > 0:
+            indexedrows = self._add_rows_to_index(
+                columns, 0, self.nrows, lastrow=True, update=False)
+        else:
+            indexedrows = 0
+        index.dirty = False
+        self._indexedrows = indexedrows
+        self._unsaved_indexedrows = self.nrows - indexedrows
+
+        # Optimize the index that has been already filled-up
+        index.optimize(verbose=_verbose)
+
+        return SizeType(indexedrows)
+
+    def remove_composite_index(self, columns):
+        """Remove the composite index over the given *columns*.
+
+        This method does nothing if there is no such index.
+
+        """
+
+        self._g_check_open()
+        self._v_file._check_writable()
+        columns = tuple(self._composite_columns(columns))
+        index = self._get_composite_index(columns)
+        if index is not None:
+            index.dirty = False  # release the condition cache
+            index._f_remove()
+            self._condition_cache.clear()
+            self._compositeindexed.discard(columns)
+            self.indexed = (max(self.colindexed.values())
+                            or bool(self._compositeindexed))
+
     def _g_copy_rows(self, object, start, stop, step, sortby, checkCSI):
         "Copy rows from self to object"
         if sortby is None:
@@ -2886,6 +4480,10 @@ class Table(tableextension.Table, Leaf):
                     newcol.create_index(
                         kind=oldcolindex.kind, optlevel=oldcolindex.optlevel,
                         filters=oldcolindex.filters, tmp_dir=None)
+        for (columns, index) in self._get_composite_indexes().iteritems():
+            other.create_composite_index(
+                columns, kind=index.kind, optlevel=index.optlevel,
+                filters=index.filters, tmp_dir=None)
 
     _g_propIndexes = previous_api(_g_prop_indexes)
 
@@ -3010,6 +4608,18 @@ class Table(tableextension.Table, Leaf):
 
     _g_preKillHook = previous_api(_g_pre_kill_hook)
 
+    def _get_cache_stats(self):
+        """Get the statistics of the caches used in queries.
+
+        An empty dictionary is returned if no query has created them.
+
+        """
+
+        if '_chunkcache' not in self.__dict__:
+            return {}
+        return {'chunks': self._chunkcache.stats(),
+                'sequences': self._seqcache.stats()}
+
     def _f_close(self, flush=True):
         if not self._v_isopen:
             return  # the node is already closed
@@ -3021,6 +4631,10 @@ class Table(tableextension.Table, Leaf):
         #   to first close ``Table`` objects and then ``Index`` hierarchies.
         #
 
+        # Indexes being built in the background need the table open.
+        if self._v_file._index_builds:
+            self._finish_index_builds(wait=True)
+
         # Flush right now so the row object does not get in the middle.
         if flush:
             self.flush()
@@ -3594,9 +5208,42 @@ class Column(object):
         else:
             raise ValueError("Non-valid index or slice: %s" % key)
 
+    def read_where_indexed(self, condition, condvars=None, sort=False,
+                           start=None, stop=None, step=None):
+        """Read the values of this column fulfilling the given *condition*.
+
+        The values are read from the full index of this column, without
+        touching the table at all, so the *condition* must be a comparison
+        (or a range like ``(3 < x) & (x <= 5)``) over this column only.  A
+        ValueError is raised otherwise.
+
+        The values are returned in an *array* of the current flavor,
+        following the order of the rows in the table, or sorted if *sort*
+        is true (which is faster, as the row numbers are not read).
+
+        The meaning of the other arguments is the same as in the
+        :meth:`Table.where` method.
+
+        """
+
+        table = self.table
+        table._g_check_open()
+        condvars = table._required_expr_vars(condition, condvars, depth=2)
+        if not self.is_indexed or self.index.dirty:
+            raise ValueError("column ``%s`` does not have a usable index"
+                             % (self.pathname,))
+        values = table._read_where_indexed(condition, condvars, self.pathname,
+                                           start, stop, step, sort)
+        if values is None:
+            raise ValueError(
+                "condition ``%s`` can not be computed from the index of "
+                "column ``%s``; it must be a comparison over this column, "
+                "which must have a 'full' index" % (condition, self.pathname))
+        return internal_to_flavor(values, table.flavor)
+
     def create_index(self, optlevel=6, kind="medium", filters=None,
-                     tmp_dir=None, _blocksizes=None, _testmode=False,
-                     _verbose=False):
+                     tmp_dir=None, background=False, _blocksizes=None,
+                     _testmode=False, _verbose=False):
         """Create an index for this column.
 
         .. warning::
@@ -3615,12 +5262,13 @@ class Column(object):
             resources for creating the index.
         kind : str
             The kind of the index to be built.  It can take the 'ultralight',
-            'light', 'medium' or 'full' values.  Lighter kinds ('ultralight'
-            and 'light') mean that the index takes less space on disk, but will
-            perform queries slower.  Heavier kinds ('medium' and 'full') mean
-            better chances for reducing the entropy of the index (increasing
-            the query speed) at the price of using more disk space as well as
-            more CPU, memory and I/O resources for creating the index.
+            'light', 'medium', 'full' or 'bitmap' values.  Lighter kinds
+            ('ultralight' and 'light') mean that the index takes less space on
+            disk, but will perform queries slower.  Heavier kinds ('medium'
+            and 'full') mean better chances for reducing the entropy of the
+            index (increasing the query speed) at the price of using more disk
+            space as well as more CPU, memory and I/O resources for creating
+            the index.
 
             Note that selecting a full kind with an optlevel of 9 (the maximum)
             guarantees the creation of an index with zero entropy, that is, a
@@ -3628,6 +5276,15 @@ class Column(object):
             the table does not exceed the 2**48 figure (that is more than 100
             trillions of rows).  See :meth:`Column.create_csindex` method for a
             more direct way to create a CSI index.
+
+            The 'bitmap' kind is meant for (non floating point) columns with
+            few distinct values, like enumerated types, status flags or
+            codes.  It keeps a compressed bitmap of the rows holding every
+            value, so that conditions combining bitmap indexed columns with
+            the ``&``, ``|`` and ``~`` operators (plus comparisons,
+            including ``!=``) get their exact results without reading the
+            table.  The optlevel and tmp_dir arguments are ignored for this
+            kind.
         filters : Filters
             Specify the Filters instance used to compress the index.  If None,
             default index filters will be used (currently, zlib level 1 with
@@ -3638,10 +5295,20 @@ class Column(object):
             to specify the directory for this temporary file.  The default is
             to create it in the same directory as the file containing the
             original table.
+        background : bool
+            If true, the index is built in a separate thread, and an
+            :class:`IndexBuild` handle is returned instead of the number
+            of indexed rows.  The column is not indexed until the build
+            finishes, but the table can still be used meanwhile.
+
+        .. versionchanged:: 3.1
+           The *background* argument has been added.
 
         """
 
-        kinds = ['ultralight', 'light', 'medium', 'full']
+        from tables.index import default_index_filters
+
+        kinds = ['ultralight', 'light', 'medium', 'full', 'bitmap']
         if kind not in kinds:
             raise ValueError("Kind must have any of these values: %s" % kinds)
         if (not isinstance(optlevel, (int, long)) or
@@ -3660,13 +5327,18 @@ class Column(object):
             (not isinstance(_blocksizes, tuple) or len(_blocksizes) != 4)):
             raise ValueError("_blocksizes must be a tuple with exactly 4 "
                              "elements")
+        if background:
+            self._table_file._check_writable()
         idxrows = _column__create_index(self, optlevel, kind, filters,
-                                       tmp_dir, _blocksizes, _verbose)
+                                       tmp_dir, _blocksizes, _verbose,
+                                       background)
+        if background:
+            return idxrows
         return SizeType(idxrows)
 
     createIndex = previous_api(create_index)
 
-    def create_csindex(self, filters=None, tmp_dir=None,
+    def create_csindex(self, filters=None, tmp_dir=None, background=False,
                        _blocksizes=None, _testmode=False, _verbose=False):
         """Create a completely sorted index (CSI) for this column.
 
@@ -3677,7 +5349,7 @@ class Column(object):
         :meth:`Table.itersorted` or :meth:`Table.read_sorted`) in order to
         ensure completely sorted results.
 
-        For the meaning of filters and tmp_dir arguments see
+        For the meaning of filters, tmp_dir and background arguments see
         :meth:`Column.create_index`.
 
         Notes
@@ -3689,11 +5361,12 @@ class Column(object):
 
         return self.create_index(
             kind='full', optlevel=9, filters=filters, tmp_dir=tmp_dir,
-            _blocksizes=_blocksizes, _testmode=_testmode, _verbose=_verbose)
+            background=background, _blocksizes=_blocksizes,
+            _testmode=_testmode, _verbose=_verbose)
 
     createCSIndex = previous_api(create_csindex)
 
-    def _do_reindex(self, dirty):
+    def _do_reindex(self, dirty, background=False):
         """Common code for reindex() and reindex_dirty() codes."""
 
         index = self.index
@@ -3706,6 +5379,12 @@ class Column(object):
             kind = index.kind
             optlevel = index.optlevel
             filters = index.filters
+            if background:
+                # The old index is replaced when the new one is built
+                tmp_dir = os.path.dirname(self._table_file.filename)
+                return _column__create_index(
+                    self, optlevel, kind, filters, tmp_dir, None, False,
+                    background=True, replace=True)
             # We *need* to tell the index that it is going to be undirty.
             # This is needed here so as to unnail() the condition cache.
             index.dirty = False
@@ -3715,36 +5394,53 @@ class Column(object):
             return SizeType(self.create_index(
                 kind=kind, optlevel=optlevel, filters=filters))
         else:
+            if background:
+                return None
             return SizeType(0)  # The column is not intended for indexing
 
     _doReIndex = previous_api(_do_reindex)
 
-    def reindex(self):
+    def reindex(self, background=False):
         """Recompute the index associated with this column.
 
         This can be useful when you suspect that, for any reason,
         the index information is no longer valid and you want to rebuild it.
 
-        This method does nothing if the column is not indexed.
+        This method does nothing if the column is not indexed.  If
+        *background* is true, the index is rebuilt in a separate thread
+        and an :class:`IndexBuild` handle is returned (see
+        :meth:`Column.create_index`).  The old index stays in place
+        until the new one is ready.
+
+        .. versionchanged:: 3.1
+           The *background* argument has been added.
 
         """
 
-        self._do_reindex(dirty=False)
+        build = self._do_reindex(dirty=False, background=background)
+        if background:
+            return build
 
     reIndex = previous_api(reindex)
 
-    def reindex_dirty(self):
+    def reindex_dirty(self, background=False):
         """Recompute the associated index only if it is dirty.
 
         This can be useful when you have set :attr:`Table.autoindex` to false
         for the table and you want to update the column's index after an
         invalidating index operation (like :meth:`Table.remove_rows`).
 
-        This method does nothing if the column is not indexed.
+        This method does nothing if the column is not indexed.  See
+        :meth:`Column.reindex` for the meaning of *background*.
+
+        .. versionchanged:: 3.1
+           The *background* argument has been added.
 
         """
 
-        self._do_reindex(dirty=True)
+        build = self._do_reindex(dirty=True, background=background)
+        if background:
+            return build
 
     reIndexDirty = previous_api(reindex_dirty)
 
@@ -29,14 +29,14 @@ from time import time
 
 from tables.description import Col
 from tables.exceptions import HDF5ExtError
-from tables.conditions import call_on_recarr
 from tables.utilsextension import (get_nested_field, atom_from_hdf5_type,
   create_nested_type, hdf5_to_np_ext_type, create_nested_type, platform_byteorder,
   pttype_to_hdf5, pt_special_kinds, npext_prefixes_to_ptkinds, hdf5_class_to_string,
   H5T_STD_I64)
-from tables.utils import SizeType
+from tables.utils import SizeType, BackgroundCall
 
-from utilsextension cimport get_native_type, cstr_to_pystr
+from utilsextension cimport (get_native_type, cstr_to_pystr,
+                             PyThreadState, release_gil, restore_gil)
 
 # numpy functions & objects
 from hdf5extension cimport Leaf
@@ -56,6 +56,7 @@ from definitions cimport (hid_t, herr_t, hsize_t, htri_t,
   H5Sget_simple_extent_ndims, H5Sget_simple_extent_dims, H5Sclose,
   H5T_class_t, H5Tget_size, H5Tset_size, H5Tcreate, H5Tcopy, H5Tclose,
   H5Tget_nmembers, H5Tget_member_name, H5Tget_member_type, H5Tget_native_type,
+  H5Tget_member_index, H5Tequal,
   H5Tget_member_value, H5Tinsert, H5Tget_class, H5Tget_super, H5Tget_offset,
   H5T_cset_t, H5T_CSET_ASCII, H5T_CSET_UTF8,
   H5ATTRset_attribute_string, H5ATTRset_attribute,
@@ -82,6 +83,10 @@ cdef extern from "H5TB-opt.h" nogil:
   herr_t H5TBOread_records( hid_t dataset_id, hid_t mem_type_id,
                             hsize_t start, hsize_t nrecords, void *data )
 
+  herr_t H5TBOread_records_step( hid_t dataset_id, hid_t mem_type_id,
+                                 hsize_t start, hsize_t nrecords,
+                                 hsize_t step, void *data )
+
   herr_t H5TBOread_elements( hid_t dataset_id, hid_t mem_type_id,
                              hsize_t nrecords, void *coords, void *data )
 
@@ -110,6 +115,10 @@ cdef extern from "H5TB-opt.h" nogil:
 # using any numpy facilities in an extension module.
 import_array()
 
+# The minimum fraction of the rows in the touched chunks that a set of
+# coordinates must select for reading whole chunks instead of points
+coords_chunk_density = 0.002
+
 #-------------------------------------------------------------
 
 
@@ -143,11 +152,34 @@ cdef join_path(object parent, object name):
     return parent + '/' + name
 
 
+cdef projection_dtype(object dtype, object colpathnames):
+  """Return the part of the (maybe nested) `dtype` holding `colpathnames`.
+
+  Fields are kept in the order they have in `dtype` and packed without gaps.
+
+  """
+
+  cdef object fields, name, subnames, prefix
+
+  fields = []
+  for name in dtype.names:
+    if name in colpathnames:
+      fields.append((name, dtype.fields[name][0]))
+      continue
+    prefix = name + '/'
+    subnames = [colpathname[len(prefix):] for colpathname in colpathnames
+                if colpathname.startswith(prefix)]
+    if subnames:
+      fields.append((name, projection_dtype(dtype[name], subnames)))
+  return numpy.dtype(fields)
+
+
 # Public classes
 
 cdef class Table(Leaf):
   # instance variables
   cdef void     *wbuf
+  cdef object   projection_types
 
   def _create_table(self, title, complib, obversion):
     cdef int     offset
@@ -466,23 +498,26 @@ cdef class Table(Leaf):
     self.wbuf = recarr.data
 
   def _append_records(self, int nrecords):
+    cdef PyThreadState *tstate
     cdef int ret
     cdef hsize_t nrows
 
-    # Convert some NumPy types to HDF5 before storing.
-    self._convert_types(self._v_recarray, nrecords, 0)
+    with self._v_file._lock:
+      # Convert some NumPy types to HDF5 before storing.
+      self._convert_types(self._v_recarray, nrecords, 0)
 
-    nrows = self.nrows
-    # release GIL (allow other threads to use the Python interpreter)
-    with nogil:
-        # Append the records:
-        ret = H5TBOappend_records(self.dataset_id, self.type_id,
-                                  nrecords, nrows, self.wbuf)
+      nrows = self.nrows
+      # release GIL (allow other threads to use the Python interpreter)
+      tstate = release_gil()
+      # Append the records:
+      ret = H5TBOappend_records(self.dataset_id, self.type_id,
+                                nrecords, nrows, self.wbuf)
+      restore_gil(tstate)
 
-    if ret < 0:
-      raise HDF5ExtError("Problems appending the records.")
+      if ret < 0:
+        raise HDF5ExtError("Problems appending the records.")
 
-    self.nrows = self.nrows + nrecords
+      self.nrows = self.nrows + nrecords
 
   def _close_append(self):
     cdef hsize_t nrows
@@ -497,176 +532,490 @@ cdef class Table(Leaf):
     # Set the caches to dirty (in fact, and for the append case,
     # it should be only the caches based on limits, but anyway)
     self._dirtycache = True
+    self._invalidate_query_cache()
     # Delete the reference to recarray as we doesn't need it anymore
     self._v_recarray = None
 
   def _update_records(self, hsize_t start, hsize_t stop,
                       hsize_t step, ndarray recarr):
+    cdef PyThreadState *tstate
     cdef herr_t ret
     cdef void *rbuf
     cdef hsize_t nrecords, nrows
 
-    # Get the pointer to the buffer data area
-    rbuf = recarr.data
+    with self._v_file._lock:
+      # Get the pointer to the buffer data area
+      rbuf = recarr.data
+
+      # Compute the number of records to update
+      nrecords = len(recarr)
+      nrows = get_len_of_range(start, stop, step)
+      if nrecords > nrows:
+        nrecords = nrows
+
+      # Summarize the new values before converting them
+      self._widen_zone_maps(recarr[:nrecords], start, step)
+      # Convert some NumPy types to HDF5 before storing.
+      self._convert_types(recarr, nrecords, 0)
+      # Update the records:
+      tstate = release_gil()
+      ret = H5TBOwrite_records(self.dataset_id, self.type_id,
+                               start, nrecords, step, rbuf )
+      restore_gil(tstate)
 
-    # Compute the number of records to update
-    nrecords = len(recarr)
-    nrows = get_len_of_range(start, stop, step)
-    if nrecords > nrows:
-      nrecords = nrows
-
-    # Convert some NumPy types to HDF5 before storing.
-    self._convert_types(recarr, nrecords, 0)
-    # Update the records:
-    with nogil:
-        ret = H5TBOwrite_records(self.dataset_id, self.type_id,
-                                 start, nrecords, step, rbuf )
-
-    if ret < 0:
-      raise HDF5ExtError("Problems updating the records.")
+      if ret < 0:
+        raise HDF5ExtError("Problems updating the records.")
 
-    # Set the caches to dirty
-    self._dirtycache = True
+      # Set the caches to dirty
+      self._dirtycache = True
+      self._invalidate_query_cache()
 
   def _update_elements(self, hsize_t nrecords, ndarray coords,
                        ndarray recarr):
+    cdef PyThreadState *tstate
     cdef herr_t ret
     cdef void *rbuf, *rcoords
 
-    # Get the chunk of the coords that correspond to a buffer
-    rcoords = coords.data
+    with self._v_file._lock:
+      # Get the chunk of the coords that correspond to a buffer
+      rcoords = coords.data
 
-    # Get the pointer to the buffer data area
-    rbuf = recarr.data
+      # Get the pointer to the buffer data area
+      rbuf = recarr.data
 
-    # Convert some NumPy types to HDF5 before storing.
-    self._convert_types(recarr, nrecords, 0)
+      # Summarize the new values before converting them
+      self._widen_zone_maps(recarr[:nrecords], coords=coords[:nrecords])
+      # Convert some NumPy types to HDF5 before storing.
+      self._convert_types(recarr, nrecords, 0)
 
-    # Update the records:
-    with nogil:
-        ret = H5TBOwrite_elements(self.dataset_id, self.type_id,
-                                  nrecords, rcoords, rbuf)
+      # Update the records:
+      tstate = release_gil()
+      ret = H5TBOwrite_elements(self.dataset_id, self.type_id,
+                                nrecords, rcoords, rbuf)
+      restore_gil(tstate)
 
-    if ret < 0:
-      raise HDF5ExtError("Problems updating the records.")
+      if ret < 0:
+        raise HDF5ExtError("Problems updating the records.")
 
-    # Set the caches to dirty
-    self._dirtycache = True
+      # Set the caches to dirty
+      self._dirtycache = True
+      self._invalidate_query_cache()
 
   def _read_records(self, hsize_t start, hsize_t nrecords, ndarray recarr):
+    cdef PyThreadState *tstate
     cdef void *rbuf
     cdef int ret
 
-    # Correct the number of records to read, if needed
-    if (start + nrecords) > self.nrows:
-      nrecords = self.nrows - start
+    with self._v_file._lock:
+      # Correct the number of records to read, if needed
+      if (start + nrecords) > self.nrows:
+        nrecords = self.nrows - start
 
-    # Get the pointer to the buffer data area
-    rbuf = recarr.data
+      # Get the pointer to the buffer data area
+      rbuf = recarr.data
+
+      # Read the records from disk
+      tstate = release_gil()
+      ret = H5TBOread_records(self.dataset_id, self.type_id, start,
+                              nrecords, rbuf)
+      restore_gil(tstate)
+
+      if ret < 0:
+        raise HDF5ExtError("Problems reading records.")
+
+      # Convert some HDF5 types to NumPy after reading.
+      self._convert_types(recarr, nrecords, 1)
+
+      return nrecords
+
+  cdef hid_t _create_projection_type(self, hid_t type_id, object dtype):
+    """Create a compound type with the members of `type_id` in `dtype`."""
+
+    cdef hid_t tid, member_type_id, subtype_id
+    cdef int i
+    cdef bytes encoded_name
+
+    tid = H5Tcreate(H5T_COMPOUND, dtype.itemsize)
+    for name in dtype.names:
+      encoded_name = name.encode('utf-8')
+      i = H5Tget_member_index(type_id, encoded_name)
+      member_type_id = H5Tget_member_type(type_id, i)
+      if dtype[name].names is not None:
+        # A nested column: keep only the wanted members
+        subtype_id = self._create_projection_type(member_type_id, dtype[name])
+        H5Tinsert(tid, encoded_name, dtype.fields[name][1], subtype_id)
+        H5Tclose(subtype_id)
+      else:
+        H5Tinsert(tid, encoded_name, dtype.fields[name][1], member_type_id)
+      H5Tclose(member_type_id)
+    return tid
+
+  def _get_projection_dtype(self, object colpathnames):
+    """Get the dtype for reading only the columns in `colpathnames`.
+
+    Buffers with this dtype can be filled with `_read_projection()`.
+    None is returned when reading whole rows is expected to be cheaper,
+    i.e. when HDF5 can copy the rows as they are on disk (no conversion)
+    or when the columns make up a large part of each row.  Whole chunks
+    are read from disk anyway, and HDF5 picks the members of rows
+    needing no conversion slower than copying whole rows and then
+    the columns with NumPy (even for one out of 16 columns).
+
+    """
+
+    if H5Tequal(self.type_id, self.disk_type_id) > 0:
+      return None
+    colpathnames = tuple(colpathnames)
+    dtype = projection_dtype(self._v_dtype, colpathnames)
+    if dtype.itemsize * 2 > self.rowsize:
+      return None
+    self._get_projection_type(dtype, colpathnames)
+    return dtype
+
+  cdef hid_t _get_projection_type(self, object dtype,
+                                  object colpathnames) except -1:
+    """Get the (cached) HDF5 type for reading the columns in `dtype`."""
+
+    cdef hid_t type_id
+
+    if self.projection_types is None:
+      self.projection_types = {}
+    if dtype not in self.projection_types:
+      type_id = self._create_projection_type(self.type_id, dtype)
+      if type_id < 0:
+        raise HDF5ExtError("Problems creating the projection type.")
+      self.projection_types[dtype] = (type_id, colpathnames)
+    return self.projection_types[dtype][0]
+
+  cdef _convert_column_types(self, object colpathname, ndarray column,
+                             hsize_t nrecords):
+    """Convert a time `column` read by itself from HDF5 to NumPy."""
+
+    coltype = self.coltypes[colpathname]
+    if coltype not in ["time32", "time64"]:
+      return
+    colobj = self.coldescrs[colpathname]
+    if hasattr(colobj, "_byteorder"):
+      if colobj._byteorder != platform_byteorder:
+        column.byteswap(True)
+    if coltype == "time64":
+      self._convert_time64_(column, nrecords, 1)
+
+  def _read_projection(self, hsize_t start, hsize_t nrecords,
+                       ndarray recarr):
+    """Read only the columns in the dtype of `recarr` from `start`.
+
+    The dtype of `recarr` must come from `_get_projection_dtype()`.
+
+    """
+
+    cdef PyThreadState *tstate
+    cdef hid_t type_id
+    cdef void *rbuf
+    cdef int ret
+
+    with self._v_file._lock:
+      type_id, colpathnames = self.projection_types[recarr.dtype]
+
+      # Correct the number of records to read, if needed
+      if (start + nrecords) > self.nrows:
+        nrecords = self.nrows - start
+
+      # Get the pointer to the buffer data area
+      rbuf = recarr.data
+
+      # Read the columns from disk
+      tstate = release_gil()
+      ret = H5TBOread_records(self.dataset_id, type_id, start,
+                              nrecords, rbuf)
+      restore_gil(tstate)
+
+      if ret < 0:
+        raise HDF5ExtError("Problems reading records.")
+
+      # Convert the time columns to NumPy after reading.
+      for colpathname in colpathnames:
+        self._convert_column_types(
+          colpathname, get_nested_field(recarr, colpathname), nrecords)
 
-    # Read the records from disk
-    with nogil:
-        ret = H5TBOread_records(self.dataset_id, self.type_id, start,
-                                nrecords, rbuf)
+      return nrecords
+
+  def _read_field_name(self, ndarray result, hsize_t start, hsize_t stop,
+                       long step, object field):
+    """Read the (maybe nested) column `field` straight into `result`.
+
+    Only the values of the column are converted and copied to memory,
+    whatever the `step` is.  `result` must be a contiguous array with
+    room for the selected rows.
+
+    """
+
+    cdef PyThreadState *tstate
+    cdef hid_t type_id
+    cdef hsize_t nrecords
+    cdef void *rbuf
+    cdef int ret
 
-    if ret < 0:
-      raise HDF5ExtError("Problems reading records.")
+    with self._v_file._lock:
+      dtype = projection_dtype(self._v_dtype, (field,))
+      type_id = self._get_projection_type(dtype, (field,))
+      nrecords = len(xrange(start, stop, step))
+
+      # Get the pointer to the buffer data area
+      rbuf = result.data
+
+      # Read the column from disk
+      tstate = release_gil()
+      ret = H5TBOread_records_step(self.dataset_id, type_id, start,
+                                   nrecords, step, rbuf)
+      restore_gil(tstate)
+
+      if ret < 0:
+        raise HDF5ExtError("Problems reading records.")
+
+      # Convert the time columns to NumPy after reading.
+      self._convert_column_types(field, result, nrecords)
+
+      return nrecords
 
-    # Convert some HDF5 types to NumPy after reading.
-    self._convert_types(recarr, nrecords, 1)
+  def _g_close(self):
+    cdef hid_t type_id
 
-    return nrecords
+    # Release the types used for projected reads
+    if self.projection_types is not None:
+      for type_id, _ in self.projection_types.values():
+        H5Tclose(type_id)
+      self.projection_types = None
+    Leaf._g_close(self)
 
   cdef hsize_t _read_chunk(self, hsize_t nchunk, ndarray iobuf, long cstart):
+    cdef PyThreadState *tstate
     cdef long nslot
     cdef hsize_t start, nrecords, chunkshape
     cdef int ret
     cdef void *rbuf
     cdef NumCache chunkcache
 
-    chunkcache = self._chunkcache
-    chunkshape = chunkcache.slotsize
-    # Correct the number of records to read, if needed
-    start = nchunk*chunkshape
-    nrecords = chunkshape
-    if (start + nrecords) > self.nrows:
-      nrecords = self.nrows - start
-    rbuf = <char *>iobuf.data + cstart * chunkcache.itemsize
-    # Try to see if the chunk is in cache
-    nslot = chunkcache.getslot_(nchunk)
-    if nslot >= 0:
-      chunkcache.getitem_(nslot, rbuf, 0)
-    else:
-      # Chunk is not in cache. Read it and put it in the LRU cache.
-      with nogil:
-          ret = H5TBOread_records(self.dataset_id, self.type_id,
-                                  start, nrecords, rbuf)
+    with self._v_file._lock:
+      chunkcache = self._chunkcache
+      chunkshape = chunkcache.slotsize
+      # Correct the number of records to read, if needed
+      start = nchunk*chunkshape
+      nrecords = chunkshape
+      if (start + nrecords) > self.nrows:
+        nrecords = self.nrows - start
+      rbuf = <char *>iobuf.data + cstart * chunkcache.itemsize
+      # Try to see if the chunk is in cache
+      nslot = chunkcache.getslot_(nchunk)
+      if nslot >= 0:
+        chunkcache.getitem_(nslot, rbuf, 0)
+      else:
+        # Chunk is not in cache. Read it and put it in the LRU cache.
+        tstate = release_gil()
+        ret = H5TBOread_records(self.dataset_id, self.type_id,
+                                start, nrecords, rbuf)
+        restore_gil(tstate)
 
-      if ret < 0:
-        raise HDF5ExtError("Problems reading chunk records.")
-      nslot = chunkcache.setitem_(nchunk, rbuf, 0)
-    return nrecords
+        if ret < 0:
+          raise HDF5ExtError("Problems reading chunk records.")
+        nslot = chunkcache.setitem_(nchunk, rbuf, 0)
+      return nrecords
 
   def _read_elements(self, ndarray coords, ndarray recarr):
+    """Read the rows in `coords` into `recarr`, in the order of `coords`.
+
+    The coordinates are sorted and deduplicated, and every chunk holding
+    some of them is read just once: runs of neighbouring chunks with a
+    single hyperslab, and isolated chunks through the chunk cache.  Only
+    selections too sparse for paying the reading of whole chunks are
+    read point by point.
+
+    """
+
+    cdef PyThreadState *tstate
+    cdef long nrecords, nunique, ntouched, chunksize, capacity, itemsize
+    cdef long i, j, k, pos, gstart, start, nrows
+    cdef int ret
+    cdef void *rbuf
+    cdef long long *uchunks_data
+    cdef long long *offsets_data
+    cdef char *isolated_data
+    cdef ndarray ucoords, uchunks, offsets, isolated, stage
+    cdef NumCache chunkcache
+    cdef bint usecache
+
+    with self._v_file._lock:
+      nrecords = coords.size
+      if nrecords == 0:
+        return 0
+      chunksize = self.chunkshape[0]
+      scoords = coords.astype(numpy.int64)
+      order = None
+      if nrecords > 1 and not (scoords[1:] > scoords[:-1]).all():
+        order = scoords.argsort()
+        scoords = scoords[order]
+      newvalue = None
+      if nrecords > 1 and not (scoords[1:] != scoords[:-1]).all():
+        newvalue = numpy.empty(nrecords, dtype=numpy.bool_)
+        newvalue[0] = True
+        numpy.not_equal(scoords[1:], scoords[:-1], newvalue[1:])
+        ucoords = scoords[newvalue]
+      else:
+        ucoords = scoords
+      nunique = len(ucoords)
+      # Get the touched chunks and where their coordinates start
+      chunks = ucoords // chunksize
+      firsts = numpy.concatenate(
+        ([0], numpy.flatnonzero(chunks[1:] != chunks[:-1]) + 1, [nunique]))
+      uchunks = chunks[firsts[:-1]]
+      ntouched = len(uchunks)
+      if (ucoords[0] < 0 or ucoords[-1] >= self.nrows or
+          nunique < ntouched * chunksize * coords_chunk_density):
+        return self._read_points(coords, recarr)
+
+      # Chunks with no touched neighbour are read through the chunk cache
+      isolated = numpy.ones(ntouched, dtype=numpy.bool_)
+      if ntouched > 1:
+        neighbours = (uchunks[1:] - uchunks[:-1]) == 1
+        isolated[1:] &= ~neighbours
+        isolated[:-1] &= ~neighbours
+      usecache = not self._dirtycache
+      if usecache:
+        chunkcache = self._chunkcache
+        usecache = chunkcache.slotsize == chunksize and chunkcache.nslots > 0
+      uchunks_data = <long long *>uchunks.data
+      isolated_data = <char *>isolated.data
+
+      # Read the chunks into a stage buffer, and pick the rows from it
+      if order is None and newvalue is None:
+        # The coordinates are sorted and unique, no need to reorder them
+        values = recarr[:nunique]
+      else:
+        values = numpy.empty(nunique, dtype=recarr.dtype)
+      capacity = max(self.nrowsinbuf // chunksize, 1) * chunksize
+      capacity = min(capacity, ntouched * chunksize)
+      stage = numpy.empty(capacity, dtype=recarr.dtype)
+      itemsize = recarr.dtype.itemsize
+      offsets = numpy.empty(ntouched, dtype=numpy.int64)
+      offsets_data = <long long *>offsets.data
+      i = 0
+      while i < ntouched:
+        pos = 0
+        gstart = i
+        while i < ntouched and pos + chunksize <= capacity:
+          if usecache and isolated_data[i]:
+            self._read_chunk(uchunks_data[i], stage, pos)
+            offsets_data[i] = pos - uchunks_data[i] * chunksize
+            pos = pos + chunksize
+            i = i + 1
+            continue
+          # A run of neighbouring chunks: read as many as fit at once
+          j = i + 1
+          while (j < ntouched and uchunks_data[j] == uchunks_data[j-1] + 1
+                 and pos + (j - i + 1) * chunksize <= capacity):
+            j = j + 1
+          start = uchunks_data[i] * chunksize
+          nrows = (j - i) * chunksize
+          if start + nrows > self.nrows:
+            nrows = self.nrows - start
+          rbuf = <char *>stage.data + pos * itemsize
+          tstate = release_gil()
+          ret = H5TBOread_records(self.dataset_id, self.type_id,
+                                  start, nrows, rbuf)
+          restore_gil(tstate)
+          if ret < 0:
+            raise HDF5ExtError("Problems reading records.")
+          for k from i <= k < j:
+            offsets_data[k] = pos - start
+          pos = pos + (j - i) * chunksize
+          i = j
+        hstart, hstop = firsts[gstart], firsts[i]
+        local = ucoords[hstart:hstop] + numpy.repeat(
+          offsets[gstart:i], numpy.diff(firsts[gstart:i+1]))
+        values[hstart:hstop] = stage[local]
+
+      # Scatter the rows back in the order of the coordinates
+      if newvalue is not None:
+        values = values[newvalue.cumsum() - 1]
+      if order is not None:
+        recarr[order] = values
+      elif newvalue is not None:
+        recarr[:nrecords] = values
+
+      # Convert some HDF5 types to NumPy after reading.
+      self._convert_types(recarr, nrecords, 1)
+
+      return nrecords
+
+  def _read_points(self, ndarray coords, ndarray recarr):
+    """Read the rows in `coords` with an HDF5 point selection."""
+
+    cdef PyThreadState *tstate
     cdef long nrecords
     cdef void *rbuf, *rbuf2
     cdef int ret
 
-    # Get the chunk of the coords that correspond to a buffer
-    nrecords = coords.size
-    # Get the pointer to the buffer data area
-    rbuf = recarr.data
-    # Get the pointer to the buffer coords area
-    rbuf2 = coords.data
+    with self._v_file._lock:
+      # Get the chunk of the coords that correspond to a buffer
+      nrecords = coords.size
+      # Get the pointer to the buffer data area
+      rbuf = recarr.data
+      # Get the pointer to the buffer coords area
+      rbuf2 = coords.data
 
-    with nogil:
-        ret = H5TBOread_elements(self.dataset_id, self.type_id,
-                                 nrecords, rbuf2, rbuf)
+      tstate = release_gil()
+      ret = H5TBOread_elements(self.dataset_id, self.type_id,
+                               nrecords, rbuf2, rbuf)
+      restore_gil(tstate)
 
-    if ret < 0:
-      raise HDF5ExtError("Problems reading records.")
+      if ret < 0:
+        raise HDF5ExtError("Problems reading records.")
 
-    # Convert some HDF5 types to NumPy after reading.
-    self._convert_types(recarr, nrecords, 1)
+      # Convert some HDF5 types to NumPy after reading.
+      self._convert_types(recarr, nrecords, 1)
 
-    return nrecords
+      return nrecords
 
   def _remove_rows(self, hsize_t start, hsize_t stop, long step):
     cdef size_t rowsize
     cdef hsize_t nrecords, nrecords2
     cdef hsize_t i
 
-    if step == 1:
-      nrecords = stop - start
-      rowsize = self.rowsize
-      # Using self.disk_type_id should be faster (i.e. less conversions)
-      if (H5TBOdelete_records(self.dataset_id, self.disk_type_id,
-                              self.nrows, rowsize, start, nrecords,
-                              self.nrowsinbuf) < 0):
-        raise HDF5ExtError("Problems deleting records.")
-
-      self.nrows = self.nrows - nrecords
-      if self._v_file.params['PYTABLES_SYS_ATTRS']:
-        # Attach the NROWS attribute
-        nrecords2 = self.nrows
-        H5ATTRset_attribute(self.dataset_id, "NROWS", H5T_STD_I64,
-                            0, NULL, <char *>&nrecords2)
-      # Set the caches to dirty
-      self._dirtycache = True
-      # Return the number of records removed
-      return nrecords
-    elif step == -1:
-      self._remove_rows(self, stop+1, start+1, 1)
-    elif step >= 1:
-      # always want to go through the space backwards
-      for i in range(stop - step, start - step, -step):
-        self._remove_rows(self, i, i+1, 1)
-    elif step <= -1:
-      # always want to go through the space backwards
-      for i in range(start, stop, step):
-        self._remove_rows(self, i, i+1, 1)
-    else:
-      raise ValueError("step size may not be 0.")
+    with self._v_file._lock:
+      if step == 1:
+        nrecords = stop - start
+        rowsize = self.rowsize
+        # Using self.disk_type_id should be faster (i.e. less conversions)
+        if (H5TBOdelete_records(self.dataset_id, self.disk_type_id,
+                                self.nrows, rowsize, start, nrecords,
+                                self.nrowsinbuf) < 0):
+          raise HDF5ExtError("Problems deleting records.")
+
+        self.nrows = self.nrows - nrecords
+        if self._v_file.params['PYTABLES_SYS_ATTRS']:
+          # Attach the NROWS attribute
+          nrecords2 = self.nrows
+          H5ATTRset_attribute(self.dataset_id, "NROWS", H5T_STD_I64,
+                              0, NULL, <char *>&nrecords2)
+        # Set the caches to dirty
+        self._dirtycache = True
+        self._invalidate_query_cache()
+        # Rows after the removed ones have moved
+        self._truncate_zone_maps(start)
+        # Return the number of records removed
+        return nrecords
+      elif step == -1:
+        self._remove_rows(self, stop+1, start+1, 1)
+      elif step >= 1:
+        # always want to go through the space backwards
+        for i in range(stop - step, start - step, -step):
+          self._remove_rows(self, i, i+1, 1)
+      elif step <= -1:
+        # always want to go through the space backwards
+        for i in range(start, stop, step):
+          self._remove_rows(self, i, i+1, 1)
+      else:
+        raise ValueError("step size may not be 0.")
 
 
 cdef class Row:
@@ -708,6 +1057,8 @@ cdef class Row:
   cdef int     ro_filemode, chunked
   cdef int     _bufferinfo_done, sss_on
   cdef int     iterseq_max_elements
+  cdef int     prefetch, projected
+  cdef long long prefetch_start
   cdef ndarray bufcoords, indexvalid, indexvalues, chunkmap
   cdef hsize_t *bufcoords_data, *index_values_data
   cdef char    *chunkmap_data, *index_valid_data
@@ -716,12 +1067,14 @@ cdef class Row:
   cdef object  wrec, wreccpy
   cdef object  wfields, rfields
   cdef object  coords
-  cdef object  condfunc, condargs
+  cdef object  condfunc, condargs, call_on_recarr
   cdef object  mod_elements, colenums
   cdef object  rfieldscache, wfieldscache
   cdef object  _table_file, _table_path
   cdef object  modified_fields
   cdef object  seq_available
+  cdef object  prefetch_buf, prefetch_call
+  cdef object  condbuf, projbuf
 
   # Deprecated API
   indexChunk = previous_api_property('indexchunk')
@@ -841,6 +1194,9 @@ cdef class Row:
     self._nrow = start - self.step
     self.wherecond = 0
     self.indexed = 0
+    self.prefetch = 0
+    self.prefetch_call = None
+    self.projected = 0
 
     self.nrows = table.nrows   # Update the row counter
 
@@ -859,9 +1215,20 @@ cdef class Row:
       return
 
     if table._where_condition:
+      from tables.conditions import call_on_recarr
       self.wherecond = 1
       self.condfunc, self.condargs = table._where_condition
+      self.call_on_recarr = call_on_recarr
       table._where_condition = None
+      self.condbuf = self.iobuf
+      if not table._use_index:
+        self._init_projection(table)
+      if table._v_file.params['QUERY_PREFETCH'] and step > 0:
+        self.prefetch = 1
+        if (self.prefetch_buf is None or
+            self.prefetch_buf.dtype != self.condbuf.dtype):
+          self.prefetch_buf = numpy.empty(self.nrowsinbuf,
+                                          dtype=self.condbuf.dtype)
 
     if table._use_index:
       self.indexed = 1
@@ -881,6 +1248,23 @@ cdef class Row:
       self.iterseq_max_elements = table._v_file.params['ITERSEQ_MAX_ELEMENTS']
       self.seq_available = True
 
+  cdef _init_projection(self, table):
+    """Read only the columns in the condition, if it is worth it."""
+
+    cdef object colpathnames, dtype
+
+    colpathnames = [arg.pathname for arg in self.condargs
+                    if hasattr(arg, 'pathname')]
+    if not colpathnames:
+      return
+    dtype = table._get_projection_dtype(colpathnames)
+    if dtype is None:
+      return
+    self.projected = 1
+    if self.projbuf is None or self.projbuf.dtype != dtype:
+      self.projbuf = numpy.empty(self.nrowsinbuf, dtype=dtype)
+    self.condbuf = self.projbuf
+
   def __next__(self):
     """next() method for __iter__() that is called on each iteration"""
 
@@ -949,7 +1333,7 @@ cdef class Row:
         iobuf = iobuf[:recout]
 
         self.table._convert_types(iobuf, len(iobuf), 1)
-        self.indexvalid = call_on_recarr(
+        self.indexvalid = self.call_on_recarr(
           self.condfunc, self.condargs, iobuf)
         self.index_valid_data = <char *>self.indexvalid.data
         # Get the valid coordinates
@@ -1065,6 +1449,7 @@ cdef class Row:
     """The version of next() in case of in-kernel conditions"""
 
     cdef hsize_t recout, correct
+    cdef long long startr
     cdef object numexpr_locals, colvar, col
     self.nextelement = self._nrow + self.step
     while self.nextelement < self.stop:
@@ -1078,15 +1463,25 @@ cdef class Row:
           self.stopb = self.nrowsinbuf
         self._row = self.startb - self.step
         # Read a chunk
-        recout = self.table._read_records(self.nextelement, self.nrowsinbuf,
-                                          self.iobuf)
+        startr = self.nextelement
+        if self.prefetch:
+          recout = self._read_prefetched(startr)
+        else:
+          recout = self._read_condbuf(startr)
         self.nrowsread = self.nrowsread + recout
         self.indexchunk = -self.step
+        if self.prefetch:
+          # The next buffer will be read at the first row to be visited
+          # past both the current one and the rows read so far
+          self._start_prefetch(max(self.nrowsread, self.nextelement + 1))
 
         # Evaluate the condition on this table fragment.
-        self.indexvalid = call_on_recarr(
-          self.condfunc, self.condargs, self.iobuf[:recout] )
+        self.indexvalid = self.call_on_recarr(
+          self.condfunc, self.condargs, self.condbuf[:recout] )
         self.index_valid_data = <char *>self.indexvalid.data
+        if self.prefetch_call is not None:
+          # Do not let the read ahead run beyond this call
+          self.prefetch_call.join()
 
         # Is there any interesting information in this buffer?
         if not numpy.sometrue(self.indexvalid):
@@ -1100,6 +1495,8 @@ cdef class Row:
               correct = (self.nextelement - self.start) % self.step
               self.nextelement = self.nextelement - correct
           continue
+        if self.projected:
+          self._read_matches(startr)
       
       self._row = self._row + self.step
       self._nrow = self.nextelement
@@ -1115,6 +1512,61 @@ cdef class Row:
     else:
       self._finish_riterator()
 
+  cdef _start_prefetch(self, long long start):
+    """Start reading the I/O buffer at `start` in a background thread."""
+
+    # Align the start with the rows to be visited by the iterator
+    if self.step > 1:
+      start = start + (-(start - <long long>self.start) % self.step)
+    if start >= self.stop or start >= <long long>self.nrows:
+      return
+    self.prefetch_start = start
+    if self.projected:
+      read = self.table._read_projection
+    else:
+      read = self.table._read_records
+    self.prefetch_call = BackgroundCall(
+      read, start, self.nrowsinbuf, self.prefetch_buf)
+
+  cdef hsize_t _read_prefetched(self, long long start):
+    """Fill the I/O buffer with the rows at `start`, maybe read ahead."""
+
+    cdef hsize_t recout
+
+    if self.prefetch_call is not None:
+      recout = self.prefetch_call.result()
+      self.prefetch_call = None
+      if self.prefetch_start == start:
+        self.condbuf[:recout] = self.prefetch_buf[:recout]
+        return recout
+    # The read ahead missed, so do a regular read
+    return self._read_condbuf(start)
+
+  cdef hsize_t _read_condbuf(self, long long start):
+    """Read the rows at `start` needed for evaluating the condition."""
+
+    if self.projected:
+      return self.table._read_projection(start, self.nrowsinbuf, self.condbuf)
+    return self.table._read_records(start, self.nrowsinbuf, self.iobuf)
+
+  cdef _read_matches(self, long long start):
+    """Read the full rows at `start` fulfilling the condition."""
+
+    cdef object hits
+    cdef long long first, last
+
+    hits = self.indexvalid.nonzero()[0]
+    # Only the rows in the range and the step grid are visited
+    if self.step > 1:
+      hits = hits[hits % self.step == 0]
+    hits = hits[hits < self.stop - start]
+    if len(hits) == 0:
+      return
+    # Read the rows spanning all the matches in a single go
+    first, last = hits[0], hits[-1]
+    self.table._read_records(start + first, last - first + 1,
+                             self.iobuf[first:])
+
   cdef __next__general(self):
     """The version of next() for the general cases"""
     cdef int recout
@@ -1168,6 +1620,10 @@ cdef class Row:
   cdef _finish_riterator(self):
     """Clean-up things after iterator has been done"""
 
+    if self.prefetch_call is not None:
+      # Wait for a pending read ahead and discard it
+      self.prefetch_call.join()
+      self.prefetch_call = None
     self.rfieldscache = {}     # empty rfields cache
     self.wfieldscache = {}     # empty wfields cache
     # Make a copy of the last read row in the private record
@@ -1189,11 +1645,12 @@ cdef class Row:
     cdef long long istop, istep
     cdef object fields
 
-    # We can't reuse existing buffers in this context
-    self._init_loop(start, stop, step, None, None)
-    istart, istop, istep = (self.start, self.stop, self.step)
+    # This is not an iteration, so `self._init_loop()` is not used: it
+    # would take the condition (or index) set up in the table for the
+    # next iteration, which may be about to start in another thread.
+    istart, istop, istep = (start, stop, step)
     inrowsinbuf, inextelement, inrowsread = (self.nrowsinbuf, istart, istart)
-    istartb, startr = (self.startb, 0)
+    istartb, startr = (0, 0)
     i = istart
     if 0 < istep:
       while i < istop:
@@ -1206,9 +1663,13 @@ cdef class Row:
         if istopb > inrowsinbuf:
           istopb = inrowsinbuf
         stopr = startr + ((istopb - istartb - 1) / istep) + 1
-        # Read a chunk
-        inrowsread = inrowsread + self.table._read_records(i, inrowsinbuf,
-                                                           self.iobuf)
+        # Read a chunk (just the rows needed, if this is the last one)
+        if istop - i < inrowsinbuf:
+          inrowsread = inrowsread + self.table._read_records(i, istop - i,
+                                                             self.iobuf)
+        else:
+          inrowsread = inrowsread + self.table._read_records(i, inrowsinbuf,
+                                                             self.iobuf)
         # Assign the correct part to result
         fields = self.iobuf
         if field:
@@ -1256,7 +1717,6 @@ cdef class Row:
         istartb = (i - istartb)%inrowsinbuf 
         inextelement = inextelement + istep
         i = i - inrowsinbuf
-    self._riterator = 0  # out of iterator
     return
 
   _fillCol = previous_api(_fill_col)
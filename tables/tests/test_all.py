@@ -10,7 +10,6 @@ import platform
 
 import numpy
 
-import numexpr
 import tables
 from tables.req_versions import *
 from tables.tests import common
@@ -81,6 +80,8 @@ def suite():
 def print_versions():
     """Print all the versions of software that PyTables relies on."""
 
+    import numexpr
+
     print '-=' * 38
     print "PyTables version:  %s" % tables.__version__
     print "HDF5 version:      %s" % tables.which_lib_version("hdf5")[1]
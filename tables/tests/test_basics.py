@@ -1522,6 +1522,279 @@ class DictNodeCacheOpenFile(OpenFileTestCase):
     nodeCacheSlots = -NODE_CACHE_SLOTS
 
 
+class NodeCacheTestCase(common.TempFileMixin, common.PyTablesTestCase):
+
+    def test00_lru(self):
+        """Checking the order of preemption in the node cache."""
+
+        cache = tables.lrucacheextension.NodeCache(3)
+        for i in range(5):
+            cache['/n%d' % i] = i
+        self.assertEqual(len(cache), 3)
+        self.assertEqual(list(cache), ['/n2', '/n3', '/n4'])
+        self.assertTrue('/n3' in cache)
+        self.assertFalse('/n1' in cache)
+        self.assertEqual(cache.pop('/n3'), 3)
+        self.assertEqual(list(cache), ['/n2', '/n4'])
+        cache['/n5'] = 5
+        cache['/n6'] = 6
+        self.assertEqual(list(cache), ['/n4', '/n5', '/n6'])
+        self.assertRaises(KeyError, cache.pop, '/n3')
+        for path in list(cache):
+            cache.pop(path)
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(list(cache), [])
+
+    def test01_stats(self):
+        """Checking the node cache counters of files."""
+
+        for i in range(10):
+            self.h5file.create_group('/', 'g%d' % i)
+        self._reopen()
+        h5file = self.h5file
+        self.assertEqual(h5file.node_cache_misses, 0)
+        group = h5file.get_node('/g1')
+        self.assertEqual(h5file.node_cache_misses, 1)
+        hits = h5file.node_cache_hits
+        self.assertTrue(h5file.get_node('/g1') is group)
+        self.assertEqual(h5file.node_cache_hits, hits + 1)
+        self.assertEqual(h5file.node_cache_misses, 1)
+
+
+class DataCacheTestCase(common.PyTablesTestCase):
+
+    def _fill(self, cache, keys):
+        data = numpy.zeros(2, dtype='int32')
+        for key in keys:
+            data[:] = key
+            cache.setitem(key, data, 0)
+
+    def _touch(self, cache, key):
+        nslot = cache.getslot(key)
+        self.assertTrue(nslot >= 0)
+        data = numpy.empty(2, dtype='int32')
+        cache.getitem(nslot, data, 0)
+        self.assertEqual(data.tolist(), [key, key])
+
+    def _check(self, policy):
+        cache = tables.lrucacheextension.NumCache(
+            (3, 2), numpy.dtype('int32'), 'test', policy)
+        self._fill(cache, [0, 1, 2])
+        self._touch(cache, 0)
+        self._fill(cache, [3])
+        self.assertEqual(cache.getslot(1), -1)
+        for key in [2, 3]:
+            self._touch(cache, key)
+        self._fill(cache, [4])
+        self.assertEqual(cache.getslot(0), -1)
+        for key in [2, 3, 4]:
+            self._touch(cache, key)
+
+    def test00_lru(self):
+        """Checking the replacement of slots in LRU caches."""
+
+        self._check('lru')
+
+    def test01_clock(self):
+        """Checking the replacement of slots in CLOCK caches."""
+
+        self._check('clock')
+
+    def test02_objectcache(self):
+        """Checking the replacement of objects in caches by size."""
+
+        for policy in ['lru', 'clock']:
+            cache = tables.lrucacheextension.ObjectCache(10, 100, 'test',
+                                                         policy)
+            cache.setitem('a', 1, 60)
+            cache.setitem('b', 2, 30)
+            self.assertEqual(cache.getitem(cache.getslot('a')), 1)
+            cache.setitem('c', 3, 30)
+            self.assertEqual(cache.getslot('b'), -1)
+            self.assertEqual(cache.getitem(cache.getslot('a')), 1)
+            self.assertEqual(cache.getitem(cache.getslot('c')), 3)
+            # Setting a key again replaces its value
+            cache.setitem('c', 4, 30)
+            self.assertEqual(cache.getitem(cache.getslot('c')), 4)
+            self.assertEqual(cache.getitem(cache.getslot('a')), 1)
+
+    def test03_nslots(self):
+        """Checking that the number of slots is not limited."""
+
+        nslots = 2**17
+        cache = tables.lrucacheextension.NumCache(
+            (nslots, 1), numpy.dtype('int32'), 'test')
+        self.assertEqual(len(cache), nslots)
+        data = numpy.zeros(1, dtype='int32')
+        self.assertEqual(cache.setitem(nslots, data, 0), 0)
+        self.assertTrue(cache.getslot(nslots) >= 0)
+
+    def test04_stats(self):
+        """Checking the statistics of caches."""
+
+        cache = tables.lrucacheextension.NumCache(
+            (3, 2), numpy.dtype('int32'), 'test')
+        self._fill(cache, [0, 1, 2])
+        self._touch(cache, 0)
+        self.assertEqual(cache.getslot(5), -1)
+        self._fill(cache, [3])
+        stats = cache.stats()
+        self.assertEqual(stats['name'], 'test')
+        self.assertEqual(stats['nslots'], 3)
+        self.assertEqual(stats['nentries'], 3)
+        self.assertEqual(stats['size'], 3 * 2 * 4)
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['evictions'], 1)
+        self.assertFalse(stats['disabled'])
+
+    def test05_policy(self):
+        """Checking that unknown replacement policies are refused."""
+
+        self.assertRaises(ValueError, tables.lrucacheextension.NumCache,
+                          (3, 2), numpy.dtype('int32'), 'test', 'random')
+
+
+class SharedCacheTestCase(common.TempFileMixin, common.PyTablesTestCase):
+
+    def setUp(self):
+        super(SharedCacheTestCase, self).setUp()
+        self.shared = tables.lrucacheextension.shared_cache
+        self.maxsize = self.shared.maxsize
+        self.shared.clear()
+
+    def tearDown(self):
+        self.shared.clear()
+        self.shared.resize(self.maxsize)
+        super(SharedCacheTestCase, self).tearDown()
+
+    def _new_cache(self, maxsize):
+        return tables.lrucacheextension.SharedNumCache(
+            (10, 2), numpy.dtype('int32'), 'test', maxsize)
+
+    def test00_budget(self):
+        """Checking the replacement of entries across shared caches."""
+
+        # Room for three slots of 8 bytes
+        cache1 = self._new_cache(24)
+        cache2 = self._new_cache(24)
+        data = numpy.zeros(2, dtype='int32')
+        cache1.setitem(0, data, 0)
+        cache1.setitem(1, data, 0)
+        cache2.setitem(0, data, 0)
+        self.assertTrue(cache1.getslot(0) >= 0)
+        cache2.setitem(1, data, 0)
+        self.assertEqual(cache1.getslot(1), -1)
+        self.assertTrue(cache1.getslot(0) >= 0)
+        self.assertTrue(cache2.getslot(0) >= 0)
+        self.assertTrue(cache2.getslot(1) >= 0)
+        stats = self.shared.stats()
+        self.assertEqual(stats['size'], 24)
+        self.assertEqual(stats['nentries'], 3)
+        self.assertEqual(stats['evictions'], 1)
+        self.assertEqual(stats['caches'], {'test': (3, 24)})
+        # The entries of a cache go away with it
+        del cache2
+        self.assertEqual(self.shared.stats()['caches'], {'test': (1, 8)})
+        # Shrinking the cache removes the least recently used entries
+        cache1.setitem(2, data, 0)
+        self.shared.resize(8)
+        self.assertEqual(len(self.shared), 1)
+        self.assertEqual(cache1.getslot(0), -1)
+        self.assertTrue(cache1.getslot(2) >= 0)
+
+    def test01_values(self):
+        """Checking the values kept in shared caches."""
+
+        cache = self._new_cache(1024)
+        for key in range(5):
+            cache.setitem(key, numpy.array([key, -key], dtype='int32'), 0)
+        data = numpy.empty(2, dtype='int32')
+        for key in range(5):
+            cache.getitem(cache.getslot(key), data, 0)
+            self.assertEqual(data.tolist(), [key, -key])
+
+    def test02_queries(self):
+        """Checking queries on tables using the shared cache."""
+
+        self.h5file.close()
+        self.h5file = tables.open_file(self.h5fname, 'w',
+                                       GLOBAL_CACHE_SIZE=1024*1024)
+        table = self.h5file.create_table('/', 'table',
+                                         {'c1': Int32Col(), 'c2': Int32Col()},
+                                         chunkshape=100)
+        nrows = 10000
+        table.append([(i % 100, i) for i in range(nrows)])
+        table.cols.c1.create_index()
+        for i in range(3):
+            for value in [3, 33]:
+                rows = table.read_where('c1 == value')
+                self.assertEqual(rows['c2'].tolist(),
+                                 range(value, nrows, 100))
+        stats = self.shared.stats()
+        self.assertEqual(stats['maxsize'], 1024*1024)
+        self.assertTrue(stats['size'] > 0)
+        self.assertTrue(stats['hits'] > 0)
+        self.assertTrue('table chunk cache' in stats['caches'])
+
+
+class CacheStatsTestCase(common.TempFileMixin, common.PyTablesTestCase):
+
+    def setUp(self):
+        super(CacheStatsTestCase, self).setUp()
+        self.table = self.h5file.create_table(
+            '/', 'table', {'c1': Int32Col(), 'c2': Int32Col()},
+            chunkshape=100)
+        self.nrows = 10000
+        self.table.append([(i % 100, i) for i in range(self.nrows)])
+        self.table.cols.c1.create_index()
+
+    def test00_stats(self):
+        """Checking the cache statistics of files."""
+
+        table = self.table
+        stats = self.h5file.get_cache_stats()
+        self.assertEqual(stats['tables'], {})
+        for i in range(3):
+            rows = [row['c2'] for row in table.where('c1 == 3')]
+        self.assertEqual(rows, range(3, self.nrows, 100))
+
+        stats = self.h5file.get_cache_stats()
+        self.assertEqual(sorted(stats),
+                         ['indexes', 'nodes', 'shared', 'tables'])
+        self.assertTrue(stats['nodes']['nalive'] > 0)
+        self.assertEqual(stats['nodes']['nslots'],
+                         self.h5file.params['NODE_CACHE_SLOTS'])
+        self.assertEqual(list(stats['tables']), ['/table'])
+        tstats = stats['tables']['/table']
+        self.assertEqual(sorted(tstats), ['chunks', 'sequences'])
+        self.assertTrue(tstats['sequences']['hits'] > 0)
+        self.assertEqual(list(stats['indexes']), ['/_i_table/c1'])
+        istats = stats['indexes']['/_i_table/c1']
+        self.assertTrue('bounds' in istats)
+        self.assertTrue('limbounds' in istats)
+        self.assertTrue('last row' in istats)
+
+    def test01_timing(self):
+        """Checking the timing of query phases."""
+
+        table = self.table
+        h5file = self.h5file
+        with h5file.timing() as timer:
+            nrows = len([row['c2'] for row in table.where('c1 < 3')])
+        self.assertEqual(nrows, 3 * self.nrows // 100)
+        self.assertTrue(h5file._timer is None)
+        self.assertEqual(sorted(timer.times),
+                         ['chunkmap', 'compile', 'iterate', 'search'])
+        self.assertEqual(timer.counts['compile'], 1)
+        self.assertEqual(timer.counts['iterate'], nrows)
+        for phase in timer.times:
+            self.assertTrue(timer.times[phase] >= 0)
+        # Queries outside the block are not timed
+        list(table.where('c1 < 3'))
+        self.assertEqual(timer.counts['compile'], 1)
+
+
 class CheckFileTestCase(common.PyTablesTestCase):
 
     def test00_isHDF5File(self):
@@ -2760,6 +3033,51 @@ class TestCol(common.PyTablesTestCase):
         self.assertEqual(cc._v_pos, 2)
 
 
+class LazyImportTestCase(common.TempFileMixin, common.PyTablesTestCase):
+
+    """Test the modules which are imported on demand."""
+
+    lazy_modules = ['numexpr', 'tables.conditions', 'tables.index',
+                    'tables.indexes', 'tables.bitmapindex',
+                    'tables.compositeindex']
+
+    def _run(self, code):
+        p = subprocess.Popen([sys.executable, '-c', code],
+                             stdout=subprocess.PIPE,
+                             stderr=subprocess.PIPE)
+        (stdout, stderr) = p.communicate()
+        self.assertEqual(p.returncode, 0, stderr)
+        return stdout.decode('ascii').split()
+
+    def test00_import(self):
+        """Importing tables does not load the modules used on demand."""
+
+        code = """
+import sys
+import tables
+print(' '.join(m for m in %r if sys.modules.get(m) is not None))
+"""
+        self.assertEqual(self._run(code % self.lazy_modules), [])
+
+    def test01_indexed(self):
+        """Indexes and queries load their modules when needed."""
+
+        table = self.h5file.create_table('/', 'table', {'x': tables.IntCol()})
+        table.append([(i,) for i in range(10)])
+        table.cols.x.create_index()
+        self.h5file.close()
+        code = """
+import sys
+import tables
+h5file = tables.open_file(%r)
+table = h5file.root.table
+print(table.cols.x.index.__class__.__name__)
+print(len(table.get_where_list('x < 3')))
+h5file.close()
+"""
+        self.assertEqual(self._run(code % self.h5fname), ['Index', '3'])
+
+
 class TestSysattrCompatibility(common.PyTablesTestCase):
 
     def test_open_python2(self):
@@ -2786,6 +3104,10 @@ def suite():
         theSuite.addTest(unittest.makeSuite(NodeCacheOpenFile))
         theSuite.addTest(unittest.makeSuite(NoNodeCacheOpenFile))
         theSuite.addTest(unittest.makeSuite(DictNodeCacheOpenFile))
+        theSuite.addTest(unittest.makeSuite(NodeCacheTestCase))
+        theSuite.addTest(unittest.makeSuite(DataCacheTestCase))
+        theSuite.addTest(unittest.makeSuite(SharedCacheTestCase))
+        theSuite.addTest(unittest.makeSuite(CacheStatsTestCase))
         theSuite.addTest(unittest.makeSuite(CheckFileTestCase))
         theSuite.addTest(unittest.makeSuite(PythonAttrsTestCase))
         theSuite.addTest(unittest.makeSuite(StateTestCase))
@@ -2800,6 +3122,7 @@ def suite():
         theSuite.addTest(unittest.makeSuite(TestAtom))
         theSuite.addTest(unittest.makeSuite(TestCol))
         theSuite.addTest(unittest.makeSuite(TestSysattrCompatibility))
+        theSuite.addTest(unittest.makeSuite(LazyImportTestCase))
 
     return theSuite
 
@@ -2466,6 +2466,926 @@ class Issue119Time64ColTestCase(Issue119Time32ColTestCase):
     col_typ = Time64Col
 
 
+class SearchScalarTestCase(TempFileMixin, PyTablesTestCase):
+    """Test the lookup of all the slices of an index at once."""
+
+    nrows = 1000
+
+    def setUp(self):
+        super(SearchScalarTestCase, self).setUp()
+        table = self.h5file.create_table('/', 'table', TDescr)
+        values = numpy.random.RandomState(1).randint(0, 50, self.nrows)
+        table.append([(str(v).encode('ascii'), v % 3 == 0, v, v / 2.)
+                      for v in values])
+        table.flush()
+        self.table = table
+
+    def check_search(self, colname, items):
+        col = self.table.cols._f_col(colname)
+        col.create_index(_blocksizes=small_blocksizes)
+        index = col.index
+        self.assertTrue(index.nslices > 10)
+        for item in items:
+            index.restorecache()
+            tlen = index.search_scalar(item, index.sorted)
+            nslices = index.nslices
+            result = [(start, length) for (start, length)
+                      in zip(index.starts[:nslices], index.lengths[:nslices])
+                      if length > 0]
+            expected = []
+            for nslice in range(nslices):
+                (start, stop) = index.sorted._search_bin(nslice, item)
+                if stop > start:
+                    expected.append((start, stop - start))
+            if verbose:
+                print "Item:", item, "result:", result
+            self.assertEqual(result, expected)
+            self.assertEqual(tlen, sum(l for (s, l) in expected))
+
+    def test00_string(self):
+        """Looking up strings."""
+        self.check_search('var1', [(b"", b""), (b"1", b"1"), (b"25", b"25"),
+                                   (b"3", b"4"), (b"49", b"49"),
+                                   (b"5", b"5"), (b"99", b"99")])
+
+    def test01_bool(self):
+        """Looking up booleans."""
+        self.check_search('var2', [(False, False), (True, True),
+                                   (False, True)])
+
+    def test02_int(self):
+        """Looking up integers (also served by an optimized search)."""
+        self.check_search('var3', [(-1, -1), (0, 0), (17, 17), (10, 20),
+                                   (49, 49), (50, 60)])
+
+
+class ChunkmapTestCase(TempFileMixin, PyTablesTestCase):
+    """Test the computation of the map of interesting chunks."""
+
+    nrows = 1000
+
+    def setUp(self):
+        super(ChunkmapTestCase, self).setUp()
+        table = self.h5file.create_table('/', 'table', TDescr)
+        values = numpy.random.RandomState(1).randint(0, 50, self.nrows)
+        table.append([(str(v).encode('ascii'), v % 3 == 0, v, v / 2.)
+                      for v in values])
+        table.flush()
+        self.table = table
+        self.values = values
+
+    def test00_read_index_slices(self):
+        """Reading several index slices at once."""
+        self.table.cols.var3.create_index(_blocksizes=small_blocksizes)
+        index = self.table.cols.var3.index
+        indices = index.indices
+        nslices = index.nslices
+        irows = numpy.arange(0, nslices, 3, dtype='uint64')
+        starts = (irows * 7) % index.slicesize
+        stops = numpy.minimum(starts + irows % 5, index.slicesize)
+        lengths = (stops - starts).astype('int_')
+        idx = numpy.empty(lengths.sum() + 1, dtype=indices.atom.dtype)
+        indices._read_index_slices(irows, starts, stops, idx)
+        expected = [indices[irow, start:stop] for (irow, start, stop)
+                    in zip(irows, starts, stops)]
+        self.assertTrue(allequal(idx[:-1], numpy.concatenate(expected)))
+
+    def check_chunkmap(self, kind, items):
+        col = self.table.cols.var3
+        col.create_index(kind=kind, _blocksizes=small_blocksizes)
+        index = col.index
+        self.assertTrue(index.nslices > 10)
+        self.assertTrue(index.nrows > index.nslices)   # there is a last row
+        nrowsinchunk = index.nrowsinchunk
+        for item in items:
+            index.search(item)
+            chunkmap = index.get_chunkmap()
+            rows = numpy.where((self.values >= item[0]) &
+                               (self.values <= item[1]))[0]
+            expected = numpy.zeros(len(chunkmap), dtype='bool')
+            expected[rows // nrowsinchunk] = True
+            if verbose:
+                print "Item:", item, "chunks:", chunkmap.nonzero()[0]
+            if kind == 'full':
+                self.assertTrue(allequal(chunkmap, expected))
+            else:
+                # Lighter indexes can select some more chunks
+                self.assertTrue((chunkmap | ~expected).all())
+
+    def test01_ultralight(self):
+        """Chunkmap of an 'ultralight' index."""
+        self.check_chunkmap('ultralight', [(-1, -1), (0, 0), (17, 20),
+                                           (0, 49)])
+
+    def test02_light(self):
+        """Chunkmap of a 'light' index."""
+        self.check_chunkmap('light', [(-1, -1), (0, 0), (17, 20), (0, 49)])
+
+    def test03_medium(self):
+        """Chunkmap of a 'medium' index."""
+        self.check_chunkmap('medium', [(-1, -1), (0, 0), (17, 20), (0, 49)])
+
+    def test04_full(self):
+        """Chunkmap of a 'full' index."""
+        self.check_chunkmap('full', [(-1, -1), (0, 0), (17, 20), (0, 49)])
+
+
+class ParallelIndexTestCase(TempFileMixin, PyTablesTestCase):
+    """Test sorting the slices of indexes in several threads."""
+
+    nrows = 1000
+
+    def setUp(self):
+        super(ParallelIndexTestCase, self).setUp()
+        self.values = numpy.random.RandomState(2).randint(0, 500, self.nrows)
+
+    def build(self, name, kind, nthreads, csi=False):
+        self.h5file.params['MAX_INDEX_THREADS'] = nthreads
+        table = self.h5file.create_table('/', name, TDescr)
+        if csi:
+            table.append([(b"", v % 2, v, v / 3.) for v in self.values])
+            table.cols.var3.create_csindex(_blocksizes=small_blocksizes)
+            return table
+        # Leave some rows in the last row before appending the rest
+        for values in (self.values[:100], self.values[100:]):
+            table.append([(b"", v % 2, v, v / 3.) for v in values])
+            table.flush()
+            if not table.cols.var3.is_indexed:
+                table.cols.var3.create_index(
+                    kind=kind, _blocksizes=small_blocksizes)
+        return table
+
+    def check_kind(self, kind, csi=False):
+        table1 = self.build('table1', kind, 1, csi)
+        table4 = self.build('table4', kind, 4, csi)
+        index1 = table1.cols.var3.index
+        index4 = table4.cols.var3.index
+        self.assertTrue(index4.nslices > 4)
+        self.assertEqual(index1.nelements, index4.nelements)
+        self.assertEqual(index1.is_csi, csi)
+        self.assertEqual(index4.is_csi, csi)
+        self.assertTrue(allequal(index1.sorted[:], index4.sorted[:]))
+        self.assertTrue(allequal(index1.indices[:], index4.indices[:]))
+        for cond in ('var3 < 100', '(var3 > 120) & (var3 <= 121)'):
+            rows = (table4.get_where_list(cond),
+                    table1.get_where_list(cond))
+            expected = eval(cond, {'var3': self.values}).nonzero()[0]
+            if verbose:
+                print "Condition:", cond, "rows:", len(rows[0])
+            self.assertTrue(allequal(numpy.sort(rows[0]), expected))
+            self.assertTrue(allequal(numpy.sort(rows[1]), expected))
+
+    def test00_ultralight(self):
+        """Building an 'ultralight' index in several threads."""
+        self.check_kind('ultralight')
+
+    def test01_light(self):
+        """Building a 'light' index in several threads."""
+        self.check_kind('light')
+
+    def test02_medium(self):
+        """Building a 'medium' index in several threads."""
+        self.check_kind('medium')
+
+    def test03_full(self):
+        """Building a 'full' index in several threads."""
+        self.check_kind('full')
+
+    def test04_csi(self):
+        """Building a completely sorted index in several threads."""
+        self.check_kind('full', csi=True)
+
+
+class TombstonesTestCase(TempFileMixin, PyTablesTestCase):
+    """Test removing rows from indexed tables without reindexing."""
+
+    nrows = 500
+    removals = [(10, 30), (0, 5), (480, 490), (100, 101), (470, 480)]
+    conditions = ['var3 < 50', '(var3 >= 100) & (var3 < 104)', 'var4 < 20']
+
+    def setUp(self):
+        super(TombstonesTestCase, self).setUp()
+        self.random = numpy.random.RandomState(3)
+        self.table = self.h5file.create_table('/', 'table', TDescr)
+        self.values = numpy.empty(0, dtype='int32')
+        self.append(self.nrows)
+
+    def append(self, nrows):
+        values = self.random.randint(0, 300, nrows).astype('int32')
+        self.table.append([(b"", v % 2, v, v / 3.) for v in values])
+        self.table.flush()
+        self.values = numpy.concatenate((self.values, values))
+
+    def remove(self, start, stop):
+        self.table.remove_rows(start, stop)
+        self.values = numpy.delete(self.values, numpy.arange(start, stop))
+
+    def check_queries(self):
+        table = self.h5file.root.table
+        values = self.values
+        self.assertEqual(table.nrows, len(values))
+        for cond in self.conditions:
+            rows = table.get_where_list(cond)
+            expected = eval(cond, {'var3': values,
+                                   'var4': values / 3.}).nonzero()[0]
+            if verbose:
+                print "Condition:", cond, "rows:", len(rows)
+            self.assertTrue(allequal(numpy.sort(rows), expected))
+
+    def check_kind(self, kind):
+        table = self.table
+        table.cols.var3.create_index(kind=kind, _blocksizes=small_blocksizes)
+        table.cols.var4.create_index(kind='full', _blocksizes=small_blocksizes)
+        for (start, stop) in self.removals:
+            self.remove(start, stop)
+            self.assertFalse(table.cols.var3.index.dirty)
+            self.assertFalse(table.cols.var4.index.dirty)
+            self.check_queries()
+            # Appends after removals must keep working
+            self.append(37)
+            self.check_queries()
+        nremoved = sum(stop - start for (start, stop) in self.removals)
+        self.assertEqual(table.cols.var4.index.nremoved, nremoved)
+        self.assertEqual(table._indexedrows, table.nrows)
+        # Tombstones are kept on disk
+        self._reopen('a')
+        table = self.h5file.root.table
+        self.check_queries()
+        self.assertEqual(table.cols.var4.index.nremoved, nremoved)
+        # Compaction is transparent for queries
+        table.cols.var4.index.compact()
+        self.assertEqual(table.cols.var4.index.nremoved, 0)
+        self.check_queries()
+        sorted = table.read_sorted('var4', field='var4')
+        self.assertTrue(allequal(numpy.sort(sorted),
+                                 numpy.sort(self.values) / 3.))
+
+    def test00_ultralight(self):
+        """Removing rows with an 'ultralight' index."""
+        self.check_kind('ultralight')
+
+    def test01_light(self):
+        """Removing rows with a 'light' index."""
+        self.check_kind('light')
+
+    def test02_medium(self):
+        """Removing rows with a 'medium' index."""
+        self.check_kind('medium')
+
+    def test03_full(self):
+        """Removing rows with a 'full' index."""
+        self.check_kind('full')
+
+    def test04_csi(self):
+        """Removing rows with a completely sorted index."""
+        table = self.table
+        table.cols.var3.create_csindex(_blocksizes=small_blocksizes)
+        for (start, stop) in self.removals:
+            self.remove(start, stop)
+        self.assertTrue(table.cols.var3.index.nremoved > 0)
+        self.assertTrue(table.cols.var3.index.is_csi)
+        nremoved = table.cols.var3.index.nremoved
+        sorted = table.read_sorted('var3', checkCSI=True, field='var3')
+        self.assertTrue(allequal(sorted, numpy.sort(self.values)))
+        sorted = [row['var3'] for row in table.itersorted('var3')]
+        self.assertTrue(allequal(numpy.array(sorted, dtype='int32'),
+                                 numpy.sort(self.values)))
+        # Sorted reads do not modify the index
+        self.assertEqual(table.cols.var3.index.nremoved, nremoved)
+        # Compaction keeps the index completely sorted
+        table.cols.var3.index.compact()
+        self.assertEqual(table.cols.var3.index.nremoved, 0)
+        self.assertTrue(table.cols.var3.index.is_csi)
+        sorted = table.read_sorted('var3', checkCSI=True, field='var3')
+        self.assertTrue(allequal(sorted, numpy.sort(self.values)))
+
+    def test05_last_row(self):
+        """Merging small appends into the last row of a full index."""
+        table = self.table
+        table.cols.var4.create_index(kind='full', _blocksizes=small_blocksizes)
+        index = table.cols.var4.index
+        for i in range(5):
+            self.append(3)
+            self.check_queries()
+        self.remove(len(self.values) - 10, len(self.values) - 4)
+        self.append(3)
+        self.check_queries()
+        self.assertFalse(index.dirty)
+
+    def test06_no_tombstones(self):
+        """Disabling tombstones reindexes after removing rows."""
+        self.h5file.params['INDEX_TOMBSTONES'] = False
+        table = self.table
+        table.cols.var4.create_index(kind='full', _blocksizes=small_blocksizes)
+        self.remove(10, 30)
+        self.assertEqual(table.cols.var4.index.nremoved, 0)
+        self.check_queries()
+
+    def test07_read_only(self):
+        """Sorted reads of indexes with removed rows in read-only files."""
+        table = self.table
+        table.cols.var3.create_csindex(_blocksizes=small_blocksizes)
+        for (start, stop) in self.removals:
+            self.remove(start, stop)
+        nremoved = table.cols.var3.index.nremoved
+        self.assertTrue(nremoved > 0)
+        self._reopen('r')
+        table = self.h5file.root.table
+        index = table.cols.var3.index
+        order = numpy.argsort(self.values, kind='mergesort')
+        svalues = self.values[order]
+        self.assertEqual(len(index), len(self.values))
+        sorted = table.read_sorted('var3', checkCSI=True, field='var3')
+        self.assertTrue(allequal(sorted, svalues))
+        sorted = table.read_sorted('var3', field='var4',
+                                   start=7, stop=300, step=3)
+        self.assertTrue(allequal(sorted, svalues[7:300:3] / 3.))
+        sorted = table.read_sorted('var3', field='var3', step=-2)
+        self.assertTrue(allequal(sorted, svalues[::-2]))
+        sorted = [row['var3'] for row in table.itersorted('var3')]
+        self.assertTrue(allequal(numpy.array(sorted, dtype='int32'),
+                                 svalues))
+        # The rows of equal values may come in any order
+        rows = index.read_indices()
+        self.assertTrue(allequal(self.values[rows], svalues))
+        self.assertTrue(allequal(numpy.sort(rows).astype("int64"),
+                                 numpy.arange(len(self.values))))
+        self.assertEqual(index.nremoved, nremoved)
+
+
+class BackgroundIndexTestCase(TempFileMixin, PyTablesTestCase):
+    """Test building indexes in the background."""
+
+    nrows = 2000
+    condition = '(var3 >= 10) & (var3 < 30)'
+
+    def setUp(self):
+        super(BackgroundIndexTestCase, self).setUp()
+        self.table = self.h5file.create_table('/', 'table', TDescr)
+        self.values = numpy.random.RandomState(1).randint(
+            0, 500, self.nrows).astype('int32')
+        self.append(self.values)
+
+    def append(self, values):
+        self.table.append([(b"", v % 2, v, v / 3.) for v in values])
+        self.table.flush()
+
+    def check_queries(self):
+        table = self.h5file.root.table
+        values = table.col('var3')
+        rows = table.get_where_list(self.condition)
+        expected = eval(self.condition, {'var3': values}).nonzero()[0]
+        self.assertTrue(allequal(numpy.sort(rows), expected))
+
+    def build(self, kind):
+        column = self.table.cols.var3
+        build = column.create_index(kind=kind, background=True,
+                                    _blocksizes=small_blocksizes)
+        self.assertTrue(isinstance(build, IndexBuild))
+        # Queries keep working while the index is being built
+        self.assertFalse(column.is_indexed)
+        self.check_queries()
+        self.assertEqual(build.result(), self.nrows)
+        self.assertTrue(build.done())
+        self.assertTrue(column.is_indexed)
+        self.assertEqual(column.index.kind, kind)
+        self.assertFalse(column.index.dirty)
+        self.assertEqual(self.table.will_query_use_indexing(self.condition),
+                         frozenset(['var3']))
+        self.check_queries()
+
+    def test00_full(self):
+        """Building a 'full' index in the background."""
+        self.build('full')
+
+    def test01_medium(self):
+        """Building a 'medium' index in the background."""
+        self.build('medium')
+
+    def test02_bitmap(self):
+        """Building a 'bitmap' index in the background."""
+        self.build('bitmap')
+
+    def test03_append(self):
+        """Rows appended during the build are indexed."""
+        build = self.table.cols.var3.create_index(
+            kind='full', background=True, _blocksizes=small_blocksizes)
+        self.append(range(5, 50))
+        build.wait()
+        # The index is put in place by the next query
+        self.check_queries()
+        self.assertTrue(self.table.cols.var3.is_indexed)
+        self.assertEqual(build.result(), self.nrows + 45)
+        self.assertEqual(self.table.cols.var3.index.nelements,
+                         self.table.nrows)
+
+    def test04_modify(self):
+        """Modifying rows during the build starts it over."""
+        build = self.table.cols.var3.create_index(
+            kind='full', background=True, _blocksizes=small_blocksizes)
+        self.table.cols.var3[:10] = numpy.arange(10, 20)
+        self.table.remove_rows(100, 200)
+        self.assertEqual(build.result(), self.nrows - 100)
+        self.check_queries()
+
+    def test05_reindex(self):
+        """Rebuilding an index in the background."""
+        column = self.table.cols.var3
+        column.create_index(kind='medium', _blocksizes=small_blocksizes)
+        oldindex = column.index
+        build = column.reindex(background=True)
+        # The old index is used meanwhile
+        self.assertTrue(column.index is oldindex)
+        self.assertEqual(self.table.will_query_use_indexing(self.condition),
+                         frozenset(['var3']))
+        self.check_queries()
+        self.assertEqual(build.result(), self.nrows)
+        self.assertTrue(column.index is not oldindex)
+        self.check_queries()
+        # Clean indexes are not rebuilt by reindex_dirty()
+        self.assertTrue(column.reindex_dirty(background=True) is None)
+
+    def test06_twice(self):
+        """Building the same index twice in the background."""
+        column = self.table.cols.var3
+        build = column.create_index(background=True)
+        self.assertRaises(ValueError, column.create_index, background=True)
+        build.result()
+        self.assertRaises(ValueError, column.create_index, background=True)
+
+    def test07_close(self):
+        """Closing the file puts the indexes being built in place."""
+        self.table.cols.var3.create_index(background=True)
+        self.table.cols.var4.create_index(background=True)
+        self._reopen()
+        table = self.h5file.root.table
+        self.assertTrue(table.cols.var3.is_indexed)
+        self.assertTrue(table.cols.var4.is_indexed)
+        self.assertEqual(sorted(self.h5file.root._i_table._v_children),
+                         ['var3', 'var4'])
+        self.check_queries()
+
+    def test08_concurrent(self):
+        """Querying and appending while the index is being built."""
+        self.h5file.params['QUERY_PREFETCH'] = True
+        build = self.table.cols.var3.create_index(
+            kind='full', background=True, _blocksizes=small_blocksizes)
+        for i in range(20):
+            self.append(self.values[:100])
+            self.check_queries()
+            values = self.table.col('var3')
+            matches = [row['var3'] for row in self.table.where(
+                self.condition)]
+            self.assertEqual(len(matches), ((values >= 10) &
+                                            (values < 30)).sum())
+            self.assertTrue(self.h5file.get_node('/table') is self.table)
+        build.result()
+        self.assertTrue(self.table.cols.var3.is_indexed)
+        self.assertEqual(self.table.cols.var3.index.nelements,
+                         self.nrows + 2000)
+        self.check_queries()
+
+    def test09_not_dirty(self):
+        """The index being built does not make the table dirty."""
+        build = self.table.cols.var3.create_index(
+            kind='full', background=True, _blocksizes=small_blocksizes)
+        build.wait()
+        # As it happens while the new index is optimized
+        build._index.dirty = True
+        self.assertFalse(self.table._dirtyindexes)
+        self.append(self.values[:10])
+        build._index.dirty = False
+        self.assertEqual(build.result(), self.nrows + 10)
+        index = self.table.cols.var3.index
+        self.assertFalse(index._v_background)
+        index.dirty = True
+        self.assertTrue(self.table._dirtyindexes)
+        index.dirty = False
+        self.check_queries()
+
+
+class BitmapIndexTestCase(TempFileMixin, PyTablesTestCase):
+    """Test bitmap indexes and the queries using them."""
+
+    nrows = 1000
+    conditions = [
+        '(var3 == 2)',
+        '(var3 != 2) & var2',
+        '(var1 == b"3") | ~var2',
+        '~((var3 < 2) & (var1 != b"4")) & (var3 <= 3)',
+        '(var3 >= 5) | (var3 == 0)',
+    ]
+
+    def setUp(self):
+        super(BitmapIndexTestCase, self).setUp()
+        table = self.h5file.create_table('/', 'table', TDescr)
+        values = numpy.random.RandomState(1).randint(0, 7, self.nrows)
+        table.append([(str(v).encode('ascii'), v % 3 == 0, v, v / 2.)
+                      for v in values])
+        table.flush()
+        self.table = table
+        for colname in ('var1', 'var2', 'var3'):
+            self.create_index(colname)
+
+    def create_index(self, colname):
+        col = self.table.cols._f_col(colname)
+        col.create_index(kind='bitmap', _blocksizes=small_blocksizes)
+
+    def check_queries(self, conditions=None):
+        table = self.table
+        data = table.read()
+        condvars = dict((name, data[name]) for name in data.dtype.names)
+        for condition in (conditions or self.conditions):
+            expected = numpy.where(eval(condition, {}, condvars))[0]
+            if verbose:
+                print "Condition:", condition, "nmatches:", len(expected)
+            self.assertTrue(allequal(table.get_where_list(condition),
+                                     expected))
+            self.assertEqual([r.nrow for r in table.where(condition)],
+                             expected.tolist())
+            coords = table.get_where_list(condition, start=10, stop=900,
+                                          step=3)
+            self.assertEqual(coords.tolist(), [c for c in expected
+                                               if 10 <= c < 900 and
+                                               (c - 10) % 3 == 0])
+
+    def test00_queries(self):
+        """Querying bitmap indexed columns."""
+
+        index = self.table.cols.var3.index
+        self.assertEqual(index.kind, 'bitmap')
+        self.assertEqual(index.nelements, self.nrows)
+        self.assertEqual(index.cardinality, 7)
+        self.check_queries()
+
+    def test01_exact(self):
+        """Bitmap expressions covering the whole condition."""
+
+        table = self.table
+        condition = '~((var3 < 2) & (var1 != b"4")) & var2'
+        compiled = table._compile_condition(
+            condition, table._required_expr_vars(condition, None, depth=1))
+        self.assertTrue(compiled.exact)
+        self.assertEqual(compiled.index_expressions, [])
+        self.assertEqual(compiled.bitmap_expressions,
+                         [('var3', ('lt',), (2,)), ('var1', ('ne',), (b"4",)),
+                          ('var2', ('eq',), (True,))])
+        self.assertEqual(compiled.bitmap_string_expression, '(~(e0 & e1) & e2)')
+        self.assertEqual(table.will_query_use_indexing(condition),
+                         frozenset(['var1', 'var2', 'var3']))
+
+        # The table is not queried for getting the coordinates
+        def where(*args, **kwargs):
+            raise AssertionError("the table should not be queried")
+        table._where = where
+        try:
+            coords = table.get_where_list(condition)
+        finally:
+            del table._where
+        self.assertTrue(len(coords) > 0)
+        self.check_queries([condition])
+
+    def test02_mixed(self):
+        """Bitmap expressions combined with other conditions."""
+
+        table = self.table
+        table.cols.var4.create_index(_blocksizes=small_blocksizes)
+        condition = '(var3 != 2) & (var4 < 2) & (var4 > 0.5)'
+        compiled = table._compile_condition(
+            condition, table._required_expr_vars(condition, None, depth=1))
+        self.assertFalse(compiled.exact)
+        self.assertEqual(compiled.bitmap_expressions,
+                         [('var3', ('ne',), (2,))])
+        self.assertEqual(compiled.index_expressions,
+                         [('var4', ('gt', 'lt'), (0.5, 2))])
+        self.check_queries([condition, '(var3 == 2) | (var4 > 2)',
+                            '(var1 == b"1") & (var4 * 2 > 1)'])
+        blocks = list(table.where_blocks(condition))
+        self.assertEqual(sum(len(block) for block in blocks),
+                         len(table.get_where_list(condition)))
+
+    def test03_reopen(self):
+        """Querying bitmap indexes in a reopened file."""
+
+        self._reopen()
+        self.table = self.h5file.root.table
+        index = self.table.cols.var3.index
+        self.assertEqual(index.kind, 'bitmap')
+        self.assertEqual(index.nelements, self.nrows)
+        self.check_queries()
+
+    def test04_append(self):
+        """Appending rows to a table with bitmap indexes."""
+
+        table = self.table
+        table.append([(b"7", True, 7, 3.5)] * 10 +
+                      [(b"1", False, 1, .5)] * 45)
+        table.flush()
+        self.assertEqual(table.cols.var3.index.nelements, table.nrows)
+        self.assertEqual(table.cols.var3.index.cardinality, 8)
+        self.check_queries(self.conditions + ['var3 == 7'])
+
+    def test05_modify(self):
+        """Modifying rows of a table with bitmap indexes."""
+
+        table = self.table
+        table.modify_column(0, 10, column=[2] * 10, colname='var3')
+        table.remove_rows(990, 1000)
+        self.assertEqual(table.cols.var3.index.kind, 'bitmap')
+        self.assertFalse(table.cols.var3.index.dirty)
+        self.check_queries()
+
+    def test06_float(self):
+        """Bitmap indexes are not supported for floating point columns."""
+
+        self.assertRaises(TypeError, self.table.cols.var4.create_index,
+                          kind='bitmap')
+
+
+class CoveringIndexTestCase(TempFileMixin, PyTablesTestCase):
+    """Test reading column values straight from their full indexes."""
+
+    nrows = 1003
+    conditions = [
+        ('var3 > 500', 'var3'),
+        ('(var3 >= 10) & (var3 < 20)', 'var3'),
+        ('~(var3 > 3)', 'var3'),
+        ('var3 == -1', 'var3'),
+        ('var4 <= 100.5', 'var4'),
+        ('var1 == b"7"', 'var1'),
+    ]
+
+    def setUp(self):
+        super(CoveringIndexTestCase, self).setUp()
+        table = self.h5file.create_table('/', 'table', TDescr)
+        values = numpy.random.RandomState(1).randint(0, 1000, self.nrows)
+        table.append([(str(v % 50).encode('ascii'), v % 2, v, v / 2.)
+                      for v in values])
+        table.flush()
+        self.table = table
+        for colname in ('var1', 'var3', 'var4'):
+            col = table.cols._f_col(colname)
+            col.create_index(kind='full', _blocksizes=small_blocksizes)
+
+    def check_read_where(self, start=None, stop=None, step=None):
+        table = self.table
+        # The table is not queried for getting the values
+        def where(*args, **kwargs):
+            raise AssertionError("the table should not be queried")
+        table._where = where
+        try:
+            results = [table.read_where(condition, field=field,
+                                        start=start, stop=stop, step=step)
+                       for (condition, field) in self.conditions]
+        finally:
+            del table._where
+        data = table.read(start, stop, step)
+        condvars = dict((name, data[name]) for name in data.dtype.names)
+        for ((condition, field), values) in zip(self.conditions, results):
+            expected = data[field][eval(condition, {}, condvars)]
+            if verbose:
+                print "Condition:", condition, "nmatches:", len(expected)
+            self.assertEqual(values.tolist(), expected.tolist())
+
+    def test00_read_where(self):
+        """Reading the indexed field with read_where()."""
+
+        self.check_read_where()
+
+    def test01_read_where_range(self):
+        """Reading the indexed field with read_where() in a range."""
+
+        self.check_read_where(start=7, stop=900, step=3)
+
+    def test02_read_where_indexed(self):
+        """Reading values with Column.read_where_indexed()."""
+
+        table = self.table
+        data = table.read()
+        for (condition, field) in self.conditions:
+            col = table.cols._f_col(field)
+            expected = data[field][eval(condition, {}, {field: data[field]})]
+            self.assertEqual(col.read_where_indexed(condition).tolist(),
+                             expected.tolist())
+            self.assertEqual(
+                col.read_where_indexed(condition, sort=True).tolist(),
+                sorted(expected.tolist()))
+        limit = 10
+        self.assertEqual(
+            table.cols.var3.read_where_indexed('var3 < limit').tolist(),
+            data['var3'][data['var3'] < limit].tolist())
+
+    def test03_not_covered(self):
+        """Conditions which can not be computed from the index."""
+
+        table = self.table
+        var3 = table.cols.var3
+        self.assertRaises(ValueError, var3.read_where_indexed,
+                          '(var3 > 3) & (var4 < 2)')
+        self.assertRaises(ValueError, var3.read_where_indexed,
+                          'var3 * 2 > 3')
+        self.assertRaises(ValueError, table.cols.var2.read_where_indexed,
+                          'var2')
+        var3.remove_index()
+        var3.create_index(kind='medium', _blocksizes=small_blocksizes)
+        self.assertRaises(ValueError, var3.read_where_indexed, 'var3 > 3')
+        # Reading the table still works
+        data = table.read()
+        self.assertEqual(table.read_where('var3 > 3', field='var3').tolist(),
+                         data['var3'][data['var3'] > 3].tolist())
+        self.assertEqual(
+            table.read_where('(var3 > 3) & (var4 < 200)',
+                             field='var4').tolist(),
+            data['var4'][(data['var3'] > 3) & (data['var4'] < 200)].tolist())
+
+    def test04_removed(self):
+        """Reading values from indexes with removed rows."""
+
+        table = self.table
+        table.remove_rows(100, 200)
+        table.remove_row(5)
+        self.assertTrue(table.cols.var3.index.nremoved > 0)
+        self.check_read_where()
+        self.check_read_where(start=7, stop=800, step=3)
+        self.test02_read_where_indexed()
+
+    def test04_read_sorted(self):
+        """Reading the sorted field with read_sorted()."""
+
+        table = self.table
+        table.cols.var3.reindex()
+        index = table.cols.var3.index
+        for (start, stop, step) in [(None, None, None), (5, 500, 7),
+                                    (None, None, -1), (10, 800, -3)]:
+            expected = table.read_coordinates(index[start:stop:step],
+                                              field='var3')
+            values = table.read_sorted('var3', field='var3',
+                                       start=start, stop=stop, step=step)
+            self.assertEqual(values.tolist(), expected.tolist())
+
+
+class CompositeIndexTestCase(TempFileMixin, PyTablesTestCase):
+    """Test indexes over several columns."""
+
+    nrows = 1003
+    conditions = [
+        '(var1 == b"7") & (var3 > 500)',
+        '(var1 == b"7") & (var3 >= 100) & (var3 < 600)',
+        '(var3 < 600) & (var1 == b"12")',
+        'var1 == b"3"',
+        '(var1 == b"7") & (var3 == 7)',
+        '(var1 == b"7") & (var3 > 500) & (var4 < 400)',
+        '(var1 > b"3") & (var3 > 500)',
+        '(var1 == b"70") & (var3 > 500)',
+    ]
+
+    def setUp(self):
+        super(CompositeIndexTestCase, self).setUp()
+        table = self.h5file.create_table('/', 'table', TDescr)
+        values = numpy.random.RandomState(2).randint(0, 1000, self.nrows)
+        table.append([(str(v % 50).encode('ascii'), v % 2, v, v / 2.)
+                      for v in values])
+        table.flush()
+        self.table = table
+
+    def check_conditions(self):
+        table = self.table
+        data = table.read()
+        condvars = dict((name, data[name]) for name in data.dtype.names)
+        for condition in self.conditions:
+            expected = eval(condition, {}, condvars).nonzero()[0]
+            if verbose:
+                print "Condition:", condition, "nmatches:", len(expected)
+            self.assertTrue(table.will_query_use_indexing(condition))
+            self.assertEqual(table.get_where_list(condition).tolist(),
+                             expected.tolist())
+            self.assertEqual(
+                [row.nrow for row in table.where(condition)],
+                expected.tolist())
+
+    def test00_queries(self):
+        """Querying with composite indexes."""
+
+        for kind in ['ultralight', 'medium', 'full']:
+            if verbose:
+                print "Index kind:", kind
+            self.table.create_composite_index(
+                ['var1', 'var3'], kind=kind, _blocksizes=small_blocksizes)
+            self.check_conditions()
+            self.table.remove_composite_index(['var1', 'var3'])
+        self.assertFalse(self.table.indexed)
+
+    def test01_exact(self):
+        """Getting coordinates from a full composite index only."""
+
+        table = self.table
+        table.create_composite_index(
+            ['var1', 'var3'], kind='full', _blocksizes=small_blocksizes)
+        # The table is not read for getting the coordinates
+        def where(*args, **kwargs):
+            raise AssertionError("the table should not be queried")
+        table._where = where
+        try:
+            coords = table.get_where_list('(var1 == b"7") & (var3 > 500)')
+        finally:
+            del table._where
+        data = table.read()
+        expected = ((data['var1'] == b"7") & (data['var3'] > 500)).nonzero()
+        self.assertEqual(coords.tolist(), expected[0].tolist())
+
+    def test02_update(self):
+        """Keeping composite indexes in sync with the table."""
+
+        table = self.table
+        table.create_composite_index(
+            ['var1', 'var4'], kind='medium', _blocksizes=small_blocksizes)
+        table.create_composite_index(
+            ['var1', 'var3'], kind='full', _blocksizes=small_blocksizes)
+        table.append([(b"7", True, 999, -1.)] * 20)
+        table.flush()
+        self.check_conditions()
+        table.cols.var3[:100] = numpy.arange(100)
+        self.check_conditions()
+        table.remove_rows(10, 30)
+        self.check_conditions()
+        self._reopen(mode='a')
+        self.table = self.h5file.root.table
+        self.assertTrue(self.table.indexed)
+        self.assertEqual(sorted(self.table.composite_indexes.keys()),
+                         [('var1', 'var3'), ('var1', 'var4')])
+        self.check_conditions()
+
+    def test03_copy(self):
+        """Copying composite indexes along with the table."""
+
+        self.table.create_composite_index(
+            ['var1', 'var3'], kind='full', _blocksizes=small_blocksizes)
+        self.table = self.table.copy('/', 'table2', propindexes=True)
+        self.assertEqual(list(self.table.composite_indexes.keys()),
+                         [('var1', 'var3')])
+        self.check_conditions()
+
+    def test04_read_sorted(self):
+        """Sorting the table by several columns."""
+
+        table = self.table
+        table.create_composite_index(
+            ['var1', 'var4'], kind='full', optlevel=9,
+            _blocksizes=small_blocksizes)
+        data = table.read()
+        order = numpy.lexsort((data['var4'], data['var1']))
+        values = table.read_sorted(('var1', 'var4'), checkCSI=True)
+        self.assertEqual(values[['var1', 'var4']].tolist(),
+                         data[order][['var1', 'var4']].tolist())
+        self.assertEqual(
+            [row['var4'] for row in table.itersorted(['var1', 'var4'])],
+            data['var4'][order].tolist())
+
+    def test05_errors(self):
+        """Invalid composite indexes."""
+
+        table = self.table
+        create = table.create_composite_index
+        self.assertRaises(ValueError, create, ['var1'])
+        self.assertRaises(ValueError, create, ['var1', 'var1'])
+        self.assertRaises(KeyError, create, ['var1', 'foo'])
+        self.assertRaises(ValueError, create, ['var1', 'var3'], kind='bitmap')
+        create(['var1', 'var3'])
+        self.assertRaises(ValueError, create, ['var1', 'var3'])
+        self.assertRaises(ValueError, table.read_sorted, ('var1', 'var3'))
+        self.assertRaises(ValueError, table.read_sorted, ('var3', 'var1'))
+
+    def test06_zero_keys(self):
+        """Querying composite indexes with keys ending in zero bytes."""
+
+        table = self.h5file.create_table('/', 'zeros', {
+            'a': Int32Col(pos=0), 'b': Float64Col(pos=1),
+            'c': StringCol(3, pos=2), 'd': UInt8Col(pos=3)})
+        values = numpy.random.RandomState(3).randint(0, 6, self.nrows)
+        table.append([(v % 2, v * 0.5, [b"", b"zzz", b"a"][v % 3], v)
+                      for v in values])
+        table.flush()
+        self.table = table
+        self.conditions = [
+            '(a == 1) & (b == 0.5)',
+            '(a == 0) & (b == 0)',
+            '(a == 1) & (b >= 0)',
+            '(a == 0) & (b <= 0)',
+            '(c == b"zzz") & (d < 3)',
+            '(c == b"") & (d == 0)',
+            '(c == b"") & (d <= 0)',
+            '(c <= b"a") & (d > 0)',
+        ]
+        for kind in ['medium', 'full']:
+            if verbose:
+                print "Index kind:", kind
+            table.create_composite_index(['a', 'b'], kind=kind)
+            table.create_composite_index(['c', 'd'], kind=kind)
+            self.check_conditions()
+            table.remove_composite_index(['a', 'b'])
+            table.remove_composite_index(['c', 'd'])
+
+
 #----------------------------------------------------------------------
 
 def suite():
@@ -2493,6 +3413,14 @@ def suite():
         theSuite.addTest(unittest.makeSuite(IndexPropsChangeTestCase))
         theSuite.addTest(unittest.makeSuite(IndexFiltersTestCase))
         theSuite.addTest(unittest.makeSuite(OldIndexTestCase))
+        theSuite.addTest(unittest.makeSuite(SearchScalarTestCase))
+        theSuite.addTest(unittest.makeSuite(ChunkmapTestCase))
+        theSuite.addTest(unittest.makeSuite(ParallelIndexTestCase))
+        theSuite.addTest(unittest.makeSuite(TombstonesTestCase))
+        theSuite.addTest(unittest.makeSuite(BackgroundIndexTestCase))
+        theSuite.addTest(unittest.makeSuite(BitmapIndexTestCase))
+        theSuite.addTest(unittest.makeSuite(CoveringIndexTestCase))
+        theSuite.addTest(unittest.makeSuite(CompositeIndexTestCase))
         theSuite.addTest(unittest.makeSuite(CompletelySortedIndexTestCase))
         theSuite.addTest(unittest.makeSuite(ManyNodesTestCase))
         theSuite.addTest(unittest.makeSuite(ReadSortedIndex0))
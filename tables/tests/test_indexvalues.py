@@ -3313,6 +3313,27 @@ class LastRowReuseBuffers(common.PyTablesTestCase):
         fp.close()
         os.remove(filename)
 
+    def test03_clockcache(self):
+        filename = tempfile.mktemp(".h5")
+        fp = open_file(filename, 'w', CACHE_POLICY='clock')
+        ta = fp.create_table('/', 'table', self.Record, filters=Filters(1))
+        id1 = numpy.random.randint(0, 2**15, self.nelem)
+        ta.append([id1])
+
+        ta.cols.id1.create_index()
+
+        for i in xrange(self.nelem):
+            nrow = random.randint(0, self.nelem-1)
+            value = id1[nrow]
+            idx = ta.get_where_list('id1 == %s' % value)
+            self.assertTrue(len(idx) > 0,
+                            "idx--> %s %s %s %s" % (idx, i, nrow, value))
+            self.assertTrue(nrow in idx,
+                            "nrow not found: %s != %s, %s" % (idx, nrow, value))
+
+        fp.close()
+        os.remove(filename)
+
 
 normal_tests = (
     "SV1aTestCase", "SV2aTestCase", "SV3aTestCase",
@@ -12,15 +12,19 @@
 
 """Test module for queries on datasets"""
 
+import os
 import re
 import sys
 import types
+import tempfile
 import unittest
+import multiprocessing
 
 import numpy
 
 import tables
 from tables.utils import SizeType
+from tables.utilsextension import get_nested_field
 from tables.tests import common
 from tables.tests.common import verbosePrint as vprint
 
@@ -1157,6 +1161,605 @@ class IndexedTableUsage32(IndexedTableUsage):
     str_expr = ''
 
 
+class WhereBlocksTestCase(common.TempFileMixin, common.PyTablesTestCase):
+
+    """Test case for the block-wise query iterator."""
+
+    nrows = 1000
+
+    def setUp(self):
+        super(WhereBlocksTestCase, self).setUp()
+
+        class Record(tables.IsDescription):
+            c_int = tables.Int32Col(pos=0)
+            c_float = tables.Float64Col(pos=1)
+
+            class c_nested(tables.IsDescription):
+                c_int = tables.Int16Col(pos=0)
+
+        self.table = self.h5file.create_table(
+            '/', 'table', Record, chunkshape=(32,))
+        self.table.nrowsinbuf = 64
+        data = numpy.empty(self.nrows, dtype=self.table.dtype)
+        data['c_int'] = numpy.arange(self.nrows) % 100
+        data['c_float'] = numpy.arange(self.nrows) * 0.5
+        data['c_nested']['c_int'] = -numpy.arange(self.nrows)
+        self.table.append(data)
+        self.table.flush()
+
+    def check_blocks(self, condition, **kwargs):
+        table = self.table
+        start, stop, step = [kwargs.get(name) for name in
+                             ('start', 'stop', 'step')]
+        fields = kwargs.get('fields')
+        expected = table.read_where(condition, {}, None, start, stop, step)
+        blocks = list(table.where_blocks(condition, {}, **kwargs))
+        for block in blocks:
+            self.assertTrue(len(block) > 0)
+        if blocks:
+            result = numpy.concatenate(blocks)
+        else:
+            result = expected[:0]
+        if fields is None:
+            self.assertTrue(common.areArraysEqual(result, expected))
+        else:
+            self.assertEqual(result.dtype.names, tuple(fields))
+            self.assertEqual(len(result), len(expected))
+            for field in fields:
+                self.assertTrue(common.areArraysEqual(
+                    result[field],
+                    tables.utilsextension.get_nested_field(expected,
+                                                           field)))
+
+    def test00_inkernel(self):
+        """Blocks of an in-kernel query."""
+        self.check_blocks('c_int < 10')
+        self.check_blocks('c_int < 10', blocksize=7)
+
+    def test01_range(self):
+        """Blocks of an in-kernel query over a range."""
+        self.check_blocks('c_int < 50', start=13, stop=901, step=3)
+        self.check_blocks('c_int < 50', start=13, stop=901, step=3,
+                          blocksize=5)
+
+    def test02_fields(self):
+        """Blocks restricted to some fields."""
+        self.check_blocks('c_int > 90', fields=['c_float', 'c_nested/c_int'])
+        self.check_blocks('c_int > 90', fields=['c_nested'])
+
+    def test03_empty(self):
+        """Queries selecting no rows."""
+        self.check_blocks('c_int > 1000')
+        self.check_blocks('c_int < 10', start=20, stop=20)
+
+    def test04_indexed(self):
+        """Blocks of an indexed query."""
+        self.table.cols.c_float.create_index(_blocksizes=small_blocksizes)
+        condition = '(c_float > 100) & (c_float < 130)'
+        self.assertTrue(self.table.will_query_use_indexing(condition, {}))
+        self.check_blocks(condition)
+        self.check_blocks(condition, blocksize=3)
+        self.check_blocks(condition, start=210, stop=250, step=7)
+        self.check_blocks('c_float > 1000')
+
+    def test05_flavor(self):
+        """Blocks in the flavor of the table."""
+        self.table.flavor = 'python'
+        blocks = list(self.table.where_blocks('c_int == 3', {}))
+        self.assertEqual(sum(len(block) for block in blocks), 10)
+        self.assertTrue(isinstance(blocks[0], list))
+
+    def test06_bad_args(self):
+        """Passing wrong arguments."""
+        self.assertRaises(KeyError, self.table.where_blocks,
+                          'c_int < 10', {}, ['c_foo'])
+        self.assertRaises(ValueError, self.table.where_blocks,
+                          'c_int < 10', {}, blocksize=0)
+
+
+class WhereBlocksPrefetchTestCase(WhereBlocksTestCase):
+
+    """Test case for the block-wise query iterator with read ahead."""
+
+    def setUp(self):
+        super(WhereBlocksPrefetchTestCase, self).setUp()
+        self.h5file.params['QUERY_PREFETCH'] = True
+
+
+class PrefetchTestCase(common.TempFileMixin, common.PyTablesTestCase):
+
+    """Test case for in-kernel queries with read ahead of I/O buffers."""
+
+    nrows = 1000
+
+    def setUp(self):
+        super(PrefetchTestCase, self).setUp()
+        self.table = self.h5file.create_table(
+            '/', 'table', {'c_int': tables.Int32Col()},
+            filters=tables.Filters(complevel=1), chunkshape=(32,))
+        self.table.nrowsinbuf = 64
+        self.table.append([(i % 100,) for i in xrange(self.nrows)])
+        self.table.flush()
+
+    def check_where(self, condition, *range_):
+        params = self.h5file.params
+        params['QUERY_PREFETCH'] = False
+        expected = [(row.nrow, row['c_int'])
+                    for row in self.table.where(condition, {}, *range_)]
+        params['QUERY_PREFETCH'] = True
+        result = [(row.nrow, row['c_int'])
+                  for row in self.table.where(condition, {}, *range_)]
+        self.assertEqual(result, expected)
+
+    def test00_full(self):
+        """Read ahead in full table scans."""
+        self.check_where('c_int < 10')
+        self.check_where('c_int > 1000')
+        self.check_where('c_int >= 0')
+
+    def test01_range(self):
+        """Read ahead in table scans over a range."""
+        self.check_where('c_int < 10', 50, 900)
+        self.check_where('c_int < 50', 3, 997, 3)
+        self.check_where('c_int % 2 == 0', 0, 1000, 70)
+        self.check_where('c_int < 10', 0, 1000, 200)
+
+    def test02_break(self):
+        """Leaving a query with read ahead before it is exhausted."""
+        self.h5file.params['QUERY_PREFETCH'] = True
+        for row in self.table.where('c_int == 42', {}):
+            break
+        self.assertEqual(row.nrow, 42)
+        result = self.table.read_where('c_int == 42', {})
+        self.assertEqual(result['c_int'].tolist(), [42] * 10)
+
+
+class ProjectionTestCase(common.TempFileMixin, common.PyTablesTestCase):
+
+    """Test case for in-kernel queries reading only the condition columns."""
+
+    nrows = 1000
+
+    def setUp(self):
+        super(ProjectionTestCase, self).setUp()
+        description = {
+            'c_int': tables.Int32Col(pos=0),
+            'c_float': tables.Float64Col(shape=(2,), pos=1),
+            'c_time': tables.Time64Col(pos=2),
+            'c_string': tables.StringCol(32, pos=3),
+            'c_nested': {'c_short': tables.Int16Col(pos=0),
+                         'c_double': tables.Float64Col(pos=1)},
+        }
+        # A non-native byteorder forces conversions when reading the rows
+        byteorder = {'little': 'big', 'big': 'little'}[sys.byteorder]
+        self.table = self.h5file.create_table(
+            '/', 'table', description, byteorder=byteorder, chunkshape=(32,))
+        self.table.nrowsinbuf = 64
+        self.table.append([(i, (i, -i), i + 0.5, str(i), (i % 7, i * 2.))
+                           for i in xrange(self.nrows)])
+        self.table.flush()
+        self.nreads = 0
+
+        read_projection = self.table._read_projection
+
+        def counting_read_projection(*args):
+            self.nreads += 1
+            return read_projection(*args)
+        self.table._read_projection = counting_read_projection
+
+    def check_where(self, condition, condvars, *range_):
+        data = self.table.read(*range_)
+        values = dict((name, get_nested_field(data, col.pathname))
+                      for (name, col) in condvars.items())
+        coords = numpy.arange(self.nrows)[slice(*(range_ or (None,)))]
+        expected = coords[eval(condition, {}, values)].tolist()
+        result = []
+        for row in self.table.where(condition, condvars, *range_):
+            i = row.nrow
+            result.append(i)
+            self.assertEqual(row['c_int'], i)
+            self.assertEqual(row['c_float'].tolist(), [i, -i])
+            self.assertEqual(row['c_time'], i + 0.5)
+            self.assertEqual(row['c_string'], str(i).encode('ascii'))
+            self.assertEqual(row['c_nested/c_short'], i % 7)
+            self.assertEqual(row['c_nested/c_double'], i * 2.)
+        self.assertEqual(result, expected)
+        self.assertTrue(self.nreads > 0)
+
+    def test00_columns(self):
+        """Conditions on plain columns."""
+        condvars = {'c_int': self.table.cols.c_int}
+        self.check_where('(c_int > 100) & (c_int < 110)', condvars)
+        self.check_where('c_int % 10 == 3', condvars)
+        self.check_where('c_int > 1000', condvars)
+
+    def test01_time(self):
+        """Conditions on time columns."""
+        self.check_where('c_time < 20', {'c_time': self.table.cols.c_time})
+
+    def test02_nested(self):
+        """Conditions on nested columns."""
+        condvars = {'c_short': self.table.cols.c_nested.c_short,
+                    'c_int': self.table.cols.c_int}
+        self.check_where('(c_short == 3) & (c_int > 500)', condvars)
+
+    def test03_range(self):
+        """Conditions on a range of rows."""
+        condvars = {'c_int': self.table.cols.c_int}
+        self.check_where('c_int % 5 == 0', condvars, 10, 900, 3)
+        self.check_where('c_int < 500', condvars, 0, 1000, 70)
+
+    def test04_prefetch(self):
+        """Conditions on plain columns with read ahead."""
+        self.h5file.params['QUERY_PREFETCH'] = True
+        condvars = {'c_int': self.table.cols.c_int}
+        self.check_where('c_int % 10 == 3', condvars, 0, 1000, 2)
+
+    def test05_native(self):
+        """No projection when rows need no conversion."""
+        table = self.h5file.create_table(
+            '/', 'native', {'c_int': tables.Int32Col(),
+                            'c_string': tables.StringCol(32)})
+        table.append([(i, str(i)) for i in xrange(self.nrows)])
+        table.flush()
+        self.assertTrue(table._get_projection_dtype(['c_int']) is None)
+        nreads = []
+        read_projection = table._read_projection
+        table._read_projection = lambda *args: nreads.append(args)
+        self.assertEqual([row['c_int'] for row in table.where('c_int < 5')],
+                         range(5))
+        self.assertEqual(nreads, [])
+        table._read_projection = read_projection
+
+    def test06_field(self):
+        """Reading a column only converts its values if needed."""
+        native = self.h5file.create_table(
+            '/', 'native', {'c_int': tables.Int32Col(),
+                            'c_string': tables.StringCol(32)})
+        native.append([(i, str(i)) for i in xrange(self.nrows)])
+        native.flush()
+        for (table, projected) in [(self.table, True), (native, False)]:
+            nreads = []
+            read_field_name = table._read_field_name
+
+            def counting_read_field_name(*args):
+                nreads.append(args)
+                return read_field_name(*args)
+            table._read_field_name = counting_read_field_name
+            self.assertEqual(table.read(10, 100, 3, field='c_int').tolist(),
+                             range(10, 100, 3))
+            self.assertEqual(table.cols.c_int[5:8].tolist(), [5, 6, 7])
+            self.assertEqual(bool(nreads), projected)
+
+
+class QueryCacheTestCase(common.TempFileMixin, common.PyTablesTestCase):
+
+    """Test case for the persistent cache of query results."""
+
+    nrows = 1000
+
+    def setUp(self):
+        super(QueryCacheTestCase, self).setUp()
+        self.h5file.params['QUERY_CACHE_SLOTS'] = 2
+        table = self.h5file.create_table(
+            '/', 'table', {'c_int': tables.Int32Col()})
+        table.append([(i % 100,) for i in xrange(self.nrows)])
+        table.flush()
+
+    def _reopen(self, mode='r'):
+        super(QueryCacheTestCase, self)._reopen(mode)
+        self.h5file.params['QUERY_CACHE_SLOTS'] = 2
+
+    def cache_entries(self):
+        cachegroup = self.h5file.get_node('/_p_query_table')
+        return len(cachegroup._v_children)
+
+    def test00_reuse(self):
+        """Reusing a result in a later session."""
+        table = self.h5file.root.table
+        limit = 3
+        expected = table.get_where_list('c_int < limit')
+        self.assertEqual(self.cache_entries(), 1)
+        self._reopen()
+        table = self.h5file.root.table
+        table._where = None  # the query must not be run again
+        limit = 3
+        self.assertEqual(table.get_where_list('c_int < limit').tolist(),
+                         expected.tolist())
+        self.assertEqual(table.read_where('c_int < limit')['c_int'].tolist(),
+                         [i % 100 for i in expected])
+        self.assertEqual([row.nrow for row in table.where('c_int < limit')],
+                         expected.tolist())
+
+    def test01_key(self):
+        """Results for different variables and ranges are kept apart."""
+        table = self.h5file.root.table
+        for limit in (3, 5):
+            self.assertEqual(
+                len(table.get_where_list('c_int < limit', {'limit': limit})),
+                10 * limit)
+        self.assertEqual(len(table.get_where_list('c_int < 3', start=500,
+                                                stop=1000)), 15)
+        self.assertEqual(self.cache_entries(), 2)  # the oldest is gone
+        self.assertEqual(len(table.get_where_list('c_int < 3')), 30)
+
+    def test02_modify(self):
+        """Modifications of the table drop the cached results."""
+        table = self.h5file.root.table
+        self.assertEqual(len(table.get_where_list('c_int < 3')), 30)
+        table.modify_column(0, 1, column=[50], colname='c_int')
+        self.assertFalse('_p_query_table' in self.h5file.root._v_hidden)
+        self.assertEqual(len(table.get_where_list('c_int < 3')), 29)
+        table.append([(1,)])
+        self.assertEqual(len(table.get_where_list('c_int < 3')), 30)
+        table.remove_rows(0, 10)
+        self.assertEqual(len(table.read_where('c_int < 3')), 28)
+
+    def test03_rename(self):
+        """The cached results follow the table."""
+        table = self.h5file.root.table
+        table.get_where_list('c_int < 3')
+        table.rename('table2')
+        self.assertTrue('_p_query_table2' in self.h5file.root._v_hidden)
+        table.remove()
+        self.assertEqual(len(self.h5file.root._v_hidden), 0)
+
+    def test04_disabled(self):
+        """No results are cached unless enabled."""
+        self.h5file.params['QUERY_CACHE_SLOTS'] = 0
+        table = self.h5file.root.table
+        table.get_where_list('c_int < 3')
+        self.assertEqual(len(self.h5file.root._v_hidden), 0)
+
+    def test05_undo(self):
+        """Changes to the cache are not logged."""
+        table = self.h5file.root.table
+        table.get_where_list('c_int < 3')
+        self.h5file.enable_undo()
+        self.h5file.mark()
+        # No results are cached while undo is enabled
+        self.assertEqual(len(table.get_where_list('c_int < 5')), 50)
+        self.assertEqual(self.cache_entries(), 1)
+        # Results which are not valid anymore are not brought back
+        table.modify_column(0, 1, column=[50], colname='c_int')
+        self.assertFalse('_p_query_table' in self.h5file.root._v_hidden)
+        self.h5file.undo()
+        self.assertFalse('_p_query_table' in self.h5file.root._v_hidden)
+        self.assertEqual(len(table.get_where_list('c_int < 3')), 29)
+        self.h5file.disable_undo()
+
+
+class ZoneMapTestCase(common.TempFileMixin, common.PyTablesTestCase):
+
+    """Test case for the zone maps of tables."""
+
+    nrows = 1000
+
+    def setUp(self):
+        super(ZoneMapTestCase, self).setUp()
+        self.h5file.params['ZONE_MAPS'] = True
+        self.table = self.h5file.create_table(
+            '/', 'table', {'c_int': tables.Int32Col(pos=0),
+                           'c_float': tables.Float64Col(pos=1),
+                           'c_string': tables.StringCol(4, pos=2),
+                           'c_bool': tables.BoolCol(pos=3)},
+            chunkshape=(32,))
+        # Append the rows in several pieces, not aligned with chunks
+        for start in xrange(0, self.nrows, 77):
+            stop = min(start + 77, self.nrows)
+            self.table.append([
+                (i, numpy.nan if i % 10 == 0 else i * 0.5,
+                 str(i % 100), i % 3 == 0) for i in xrange(start, stop)])
+
+    def selected_chunks(self, condition):
+        from tables.table import _table__chunkmap_zoned
+        table = self.table
+        condvars = table._required_expr_vars(condition, None, depth=2)
+        compiled = table._compile_condition(condition, condvars)
+        chunkmap = _table__chunkmap_zoned(table, compiled, condvars)
+        if chunkmap is None:
+            return -(-table.nrows // table.chunkshape[0])
+        return chunkmap.sum()
+
+    def check_query(self, condition, *range_):
+        table = self.table
+        coords = table.get_where_list(condition, None, False, *range_)
+        table._enabled_indexing_in_queries = False
+        try:
+            expected = table.get_where_list(condition, None, False, *range_)
+        finally:
+            table._enabled_indexing_in_queries = True
+        self.assertEqual(coords.tolist(), expected.tolist())
+        return len(coords)
+
+    def test00_queries(self):
+        """Queries skipping chunks through zone maps."""
+        self.assertEqual(self.check_query('(c_int >= 100) & (c_int < 130)'),
+                         30)
+        self.assertEqual(self.selected_chunks(
+            '(c_int >= 100) & (c_int < 130)'), 2)
+        self.assertEqual(self.check_query('(c_int < 10) | (c_int >= 990)'),
+                         20)
+        self.assertEqual(self.selected_chunks(
+            '(c_int < 10) | (c_int >= 990)'), 3)
+        self.assertEqual(self.selected_chunks('c_float > 490'), 2)
+        self.assertEqual(self.selected_chunks('c_int != 3'), 32)
+        self.assertEqual(self.selected_chunks(
+            '(c_int < 40) & (c_string == b"5")'), 2)
+        for condition in ['c_int == 500', 'c_int != 3', 'c_float > 490',
+                          'c_float != 0', 'c_string == b"42"',
+                          'c_bool & (c_int < 100)', '~(c_int > 200)',
+                          '(c_int < 200) & (c_float < 50)', 'c_int > 5000']:
+            self.check_query(condition)
+        self.check_query('(c_int >= 100) & (c_int < 530)', 50, 900, 7)
+
+    def test01_where_blocks(self):
+        """Blocks of rows are only read from selected chunks."""
+        blocks = list(self.table.where_blocks('c_int < 40', blocksize=32))
+        self.assertEqual([len(block) for block in blocks], [32, 8])
+        self.assertEqual(list(self.table.where_blocks('c_int > 5000')), [])
+
+    def test02_modify(self):
+        """Modified rows are taken into account."""
+        table = self.table
+        table.modify_column(500, 501, column=[-7], colname='c_int')
+        self.assertEqual(self.check_query('c_int < 0'), 1)
+        table.cols.c_float[900] = 5000.
+        self.assertEqual(self.check_query('c_float > 4000'), 1)
+        for row in table.where('c_int == 20'):
+            row['c_int'] = 10000
+            row.update()
+        self.assertEqual(self.check_query('c_int > 9000'), 1)
+        table.modify_coordinates([3, 200], [(-1, 0., b"", False),
+                                            (-2, 0., b"", False)])
+        self.assertEqual(self.check_query('c_int < 0'), 3)
+
+    def test03_remove(self):
+        """Removing rows summarizes the moved rows again."""
+        table = self.table
+        table.remove_rows(100, 150)
+        zmgroup = table._get_zone_maps()
+        self.assertEqual(zmgroup._v_attrs.ZONEROWS, 96)
+        self.assertEqual(self.check_query('(c_int >= 150) & (c_int < 160)'),
+                         10)
+        table.append([(5, 0., b"", False)])
+        self.assertEqual(zmgroup._v_attrs.ZONEROWS, table.nrows)
+        self.assertEqual(self.check_query('c_int == 5'), 2)
+        self.assertEqual(self.selected_chunks('c_int == 5'), 2)
+        table.truncate(10)
+        table.truncate(100)
+        self.assertEqual(self.check_query('c_int == 0'), 91)
+
+    def test04_existing(self):
+        """Rows appended without zone maps are summarized later."""
+        self.table.remove()
+        self.h5file.params['ZONE_MAPS'] = False
+        table = self.h5file.create_table(
+            '/', 'table', {'c_int': tables.Int32Col()}, chunkshape=(32,))
+        table.append([(i,) for i in xrange(self.nrows)])
+        self.assertEqual(len(self.h5file.root._v_hidden), 0)
+        self._reopen('a')
+        self.h5file.params['ZONE_MAPS'] = True
+        self.table = table = self.h5file.root.table
+        table.append([(i,) for i in xrange(self.nrows, self.nrows + 10)])
+        self.assertEqual(table._get_zone_maps()._v_attrs.ZONEROWS,
+                         table.nrows)
+        self.assertEqual(self.check_query('c_int == 1005'), 1)
+        self.assertEqual(self.selected_chunks('c_int == 1005'), 1)
+
+    def test05_rename(self):
+        """The zone maps follow the table."""
+        table = self.table
+        table.rename('table2')
+        self.assertTrue('_p_zonemap_table2' in self.h5file.root._v_hidden)
+        self._reopen('a')
+        self.table = self.h5file.root.table2
+        self.assertEqual(self.selected_chunks('c_int < 40'), 2)
+        self.table.remove()
+        self.assertEqual(len(self.h5file.root._v_hidden), 0)
+
+    def test06_columns(self):
+        """Comparisons between columns are not pruned with zone maps."""
+        for condition in ['c_float < c_int', 'c_int == c_int',
+                          'c_string != c_string',
+                          '(c_int < 100) & (c_float >= c_int)']:
+            self.check_query(condition)
+        self.assertEqual(self.selected_chunks(
+            '(c_int < 40) & (c_float < c_int)'), 2)
+        limit = 40
+        self.assertEqual(self.selected_chunks('c_int < limit'), 2)
+
+
+class ParallelQueryTestCase(common.TempFileMixin, common.PyTablesTestCase):
+
+    """Test case for in-kernel queries run by several processes."""
+
+    nrows = 1000
+    nprocs = 4
+
+    def setUp(self):
+        from tables import table as tablemod
+        self.tablemod = tablemod
+        self.context = tablemod._query_mp_context
+        if self.context is None:
+            # Worker processes can not be spawned, so fork them before
+            # this process opens any file
+            tablemod._query_mp_context = multiprocessing
+            tablemod._get_query_pool(self.nprocs)
+        super(ParallelQueryTestCase, self).setUp()
+        table = self.h5file.create_table(
+            '/', 'table', {'c_int': tables.Int32Col(pos=0),
+                           'c_float': tables.Float64Col(pos=1)},
+            chunkshape=(32,))
+        table.append([(i % 100, i * 0.5) for i in xrange(self.nrows)])
+        self.h5file.close()
+        self.h5file = tables.open_file(self.h5fname, 'r',
+                                       max_query_processes=self.nprocs)
+        self.table = self.h5file.root.table
+
+    def tearDown(self):
+        super(ParallelQueryTestCase, self).tearDown()
+        self.tablemod._close_query_pools()
+        self.tablemod._query_mp_context = self.context
+
+    def check_queries(self, condition, condvars, *range_):
+        table = self.table
+        params = self.h5file.params
+        params['MAX_QUERY_PROCESSES'] = 1
+        coords = table.get_where_list(condition, condvars, False, *range_)
+        rows = table.read_where(condition, condvars, None, *range_)
+        params['MAX_QUERY_PROCESSES'] = self.nprocs
+        self.assertEqual(
+            table.get_where_list(condition, condvars, False, *range_).tolist(),
+            coords.tolist())
+        self.assertTrue(common.areArraysEqual(
+            table.read_where(condition, condvars, None, *range_), rows))
+
+        (fd, dstfname) = tempfile.mkstemp(suffix='.h5')
+        os.close(fd)
+        dstfile = tables.open_file(dstfname, 'w')
+        try:
+            dsttable = dstfile.create_table('/', 'dst', table.description)
+            nrows = table.append_where(dsttable, condition, condvars, *range_)
+            self.assertEqual(nrows, len(rows))
+            self.assertTrue(common.areArraysEqual(dsttable.read(), rows))
+        finally:
+            dstfile.close()
+            os.remove(dstfname)
+
+    def check_all(self):
+        self.check_queries('c_int < 10', {})
+        self.check_queries('c_int < bound', {'bound': 33})
+        self.check_queries('(c_int > 10) & (c_float < 400)', {}, 3, 997, 3)
+        self.check_queries('c_int < 10', {}, 50, 90)
+        self.check_queries('c_int > 1000', {})
+
+    def test00_queries(self):
+        """Queries with several worker processes."""
+        self.assertFalse(self.table._where_parallel(
+            'c_int < 10', {}, None, None, None) is None)
+        self.check_all()
+
+    def test01_close_pools(self):
+        """Worker processes are terminated like at exit."""
+        self.check_queries('c_int < 10', {})
+        pool = self.tablemod._query_pools[self.nprocs]
+        workers = list(pool._pool)
+        self.assertEqual(len(workers), self.nprocs)
+        self.tablemod._close_query_pools()
+        self.assertEqual(self.tablemod._query_pools, {})
+        self.assertFalse(any(worker.is_alive() for worker in workers))
+
+    def test02_not_parallel(self):
+        """Queries which are not run in parallel."""
+        table = self.table
+        self.assertTrue(table._where_parallel(
+            'c_int < 10', {}, 0, 32, 1) is None)
+        self.h5file.params['MAX_QUERY_PROCESSES'] = 1
+        self.assertTrue(table._where_parallel(
+            'c_int < 10', {}, None, None, None) is None)
+
+
 # Main part
 # ---------
 def suite():
@@ -1218,6 +1821,13 @@ def suite():
         testSuite.addTest(unittest.makeSuite(IndexedTableUsage30))
         testSuite.addTest(unittest.makeSuite(IndexedTableUsage31))
         testSuite.addTest(unittest.makeSuite(IndexedTableUsage32))
+        testSuite.addTest(unittest.makeSuite(WhereBlocksTestCase))
+        testSuite.addTest(unittest.makeSuite(WhereBlocksPrefetchTestCase))
+        testSuite.addTest(unittest.makeSuite(PrefetchTestCase))
+        testSuite.addTest(unittest.makeSuite(ProjectionTestCase))
+        testSuite.addTest(unittest.makeSuite(QueryCacheTestCase))
+        testSuite.addTest(unittest.makeSuite(ZoneMapTestCase))
+        testSuite.addTest(unittest.makeSuite(ParallelQueryTestCase))
 
     return testSuite
 
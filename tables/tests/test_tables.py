@@ -1806,6 +1806,11 @@ class NonNestedTableReadTestCase(unittest.TestCase):
         output = self.table.read(1, 64, field='f1')
         npt.assert_array_equal(output, self.array['f1'][1:64])
 
+    def test_read_specified_field_with_steps(self):
+        for step in (2, 7, 16, 99, 1000):
+            output = self.table.read(3, 100, step, field='f7')
+            npt.assert_array_equal(output, self.array['f7'][3:100:step])
+
     def test_out_arg_with_non_numpy_flavor(self):
         output = np.empty(self.shape, self.dtype)
         self.table.flavor = 'python'
@@ -6227,6 +6232,69 @@ class PointSelectionTestCase(common.PyTablesTestCase):
                 a, b, "NumPy array and PyTables modifications does not match.")
 
 
+class CoordinatesReadTestCase(common.TempFileMixin, common.PyTablesTestCase):
+    """Reading rows by coordinates grouped by chunk."""
+
+    nrows = 10050
+
+    def setUp(self):
+        super(CoordinatesReadTestCase, self).setUp()
+        self.recarr = recarr = np.zeros(self.nrows, dtype="i8,f8,S3")
+        recarr['f0'] = np.arange(self.nrows)
+        recarr['f1'] = np.arange(self.nrows) / 2.
+        recarr['f2'] = 'abc'
+        self.table = self.h5file.create_table('/', 'table', recarr,
+                                              chunkshape=100)
+
+    def check_coords(self, coords):
+        table = self.table
+        expected = self.recarr[coords]
+        npt.assert_array_equal(table.read_coordinates(coords), expected)
+        npt.assert_array_equal(table.read_coordinates(coords, field='f1'),
+                               expected['f1'])
+        self.assertEqual([row['f0'] for row in table.itersequence(coords)],
+                         expected['f0'].tolist())
+
+    def test00_dense(self):
+        """Reading dense sets of coordinates."""
+
+        rng = np.random.RandomState(0)
+        self.check_coords(np.arange(self.nrows))
+        self.check_coords(np.arange(0, self.nrows, 3))
+        self.check_coords(rng.randint(0, self.nrows, 5000))
+        self.check_coords(np.arange(self.nrows)[::-1])
+
+    def test01_sparse(self):
+        """Reading sparse sets of coordinates."""
+
+        rng = np.random.RandomState(1)
+        self.check_coords(rng.randint(0, self.nrows, 3))
+        self.check_coords([self.nrows - 1, 0, self.nrows - 1, 5])
+        self.check_coords([7])
+
+    def test02_duplicates(self):
+        """Reading coordinates with duplicates."""
+
+        self.check_coords(np.repeat(np.arange(100, 400), 3))
+        self.check_coords(np.arange(2000) % 1000)
+
+    def test03_modified(self):
+        """Reading coordinates after modifying the table."""
+
+        table = self.table
+        coords = [5, 6, 5000, 5001, 7000]
+        table.read_coordinates(coords)
+        table.cols.f0[5001] = -1
+        self.recarr['f0'][5001] = -1
+        self.check_coords(coords)
+
+    def test04_out_of_range(self):
+        """Reading coordinates out of the table."""
+
+        self.assertRaises(HDF5ExtError, self.table.read_coordinates,
+                          [0, self.nrows + 5])
+
+
 # Test for building very large MD columns without defaults
 class MDLargeColTestCase(common.TempFileMixin, common.PyTablesTestCase):
     def test01_create(self):
@@ -6686,6 +6754,7 @@ def suite():
         theSuite.addTest(unittest.makeSuite(TruncateClose1))
         theSuite.addTest(unittest.makeSuite(TruncateClose2))
         theSuite.addTest(unittest.makeSuite(PointSelectionTestCase))
+        theSuite.addTest(unittest.makeSuite(CoordinatesReadTestCase))
         theSuite.addTest(unittest.makeSuite(MDLargeColNoReopen))
         theSuite.addTest(unittest.makeSuite(MDLargeColReopen))
         theSuite.addTest(unittest.makeSuite(ExhaustedIter))
@@ -1003,6 +1003,150 @@ class CreateParentsTestCase(common.TempFileMixin, common.PyTablesTestCase):
             self.assertEqual(self.filters, group._v_filters)
 
 
+class LazyChildrenTestCase(common.TempFileMixin, common.PyTablesTestCase):
+
+    """Test the lazy listing of the children of groups."""
+
+    def setUp(self):
+        super(LazyChildrenTestCase, self).setUp()
+        self.h5file.create_group('/', 'group')
+        self.h5file.create_array('/', 'array', [1])
+        self.h5file.create_array('/', '_p_hidden', [1])
+        self.h5file.create_soft_link('/', 'link', '/array')
+        self._reopen('a')
+
+    def test00_get_node(self):
+        """Getting a child does not list its siblings."""
+
+        root = self.h5file.root
+        self.h5file.get_node('/array')
+        self.assertTrue('group' in root)
+        self.assertFalse('_v_children' in root.__dict__)
+        self.assertFalse('_v_groups' in root.__dict__)
+
+    def test01_names(self):
+        """Listing the names of children does not look at their kind."""
+
+        root = self.h5file.root
+        self.assertEqual(sorted(root._v_children), ['array', 'group', 'link'])
+        self.assertEqual(sorted(root.__members__), ['array', 'group', 'link'])
+        self.assertEqual(list(root._v_hidden), ['_p_hidden'])
+        self.assertFalse('_v_groups' in root.__dict__)
+        self.assertEqual(list(root._v_groups), ['group'])
+        self.assertEqual(list(root._v_leaves), ['array'])
+        self.assertEqual(list(root._v_links), ['link'])
+        self.assertEqual(list(root._v_unknown), [])
+
+    def test02_create(self):
+        """Creating a child only updates the loaded children lists."""
+
+        root = self.h5file.root
+        self.h5file.create_group('/', 'group2')
+        self.assertFalse('_v_groups' in root.__dict__)
+        self.assertEqual(sorted(root._v_children),
+                         ['array', 'group', 'group2', 'link'])
+        self.assertEqual(sorted(root._v_groups), ['group', 'group2'])
+        self.h5file.create_array('/', 'array2', [1])
+        self.assertEqual(sorted(root._v_leaves), ['array', 'array2'])
+        self.h5file.create_hard_link('/', 'hlink', '/group')
+        self.assertEqual(sorted(root._v_groups), ['group', 'group2', 'hlink'])
+
+    def test03_remove(self):
+        """Removing a child updates the loaded children lists."""
+
+        root = self.h5file.root
+        self.assertEqual(list(root._v_groups), ['group'])
+        self.h5file.remove_node('/array')
+        self.assertEqual(sorted(root._v_children), ['group', 'link'])
+        self.assertEqual(list(root._v_leaves), [])
+        self.h5file.remove_node('/group')
+        self.assertEqual(list(root._v_groups), [])
+        self.assertEqual(root._v_nchildren, 1)
+
+
+class WalkNodeInfoTestCase(common.TempFileMixin, common.PyTablesTestCase):
+
+    """Test the metadata walk over the nodes of a file."""
+
+    def setUp(self):
+        super(WalkNodeInfoTestCase, self).setUp()
+        h5file = self.h5file
+        group = h5file.create_group('/', 'group')
+        h5file.create_table('/', 'table', Record)
+        h5file.create_carray(group, 'carray', Float64Atom(), (10, 20),
+                             filters=Filters(complevel=1), chunkshape=(5, 5))
+        h5file.create_earray(group, 'earray', Int32Atom(), (0, 3))
+        h5file.create_vlarray(group, 'vlarray', Int16Atom())
+        h5file.create_array('/', '_p_hidden', [1])
+        h5file.create_soft_link('/', 'link', '/group/carray')
+        self._reopen()
+
+    def test00_nodes(self):
+        """The nodes and their metadata are the ones of open nodes."""
+
+        infos = list(self.h5file.walk_node_info())
+        self.assertEqual(sorted(info.pathname for info in infos),
+                         sorted(node._v_pathname
+                                for node in self.h5file.walk_nodes()))
+        for info in infos:
+            node = self.h5file.get_node(info.pathname)
+            self.assertEqual(info.classname, node.__class__.__name__)
+            if isinstance(node, Leaf):
+                self.assertEqual(info.shape, node.shape)
+                self.assertEqual(info.chunkshape, node.chunkshape)
+                self.assertEqual(info.filters, node.filters)
+                self.assertEqual(info.dtype, node.atom.dtype
+                                 if isinstance(node, VLArray)
+                                 else node.dtype)
+            else:
+                self.assertEqual(info.shape, None)
+                self.assertEqual(info.dtype, None)
+                self.assertEqual(info.chunkshape, None)
+                self.assertEqual(info.filters, None)
+        # No node has been opened while walking
+        self.h5file.close()
+        self.h5file = open_file(self.h5fname)
+        list(self.h5file.walk_node_info())
+        self.assertEqual(len(self.h5file._aliveNodes), 0)
+        self.assertEqual(len(self.h5file._deadNodes), 0)
+
+    def test01_classname(self):
+        """Only the nodes of the given class are walked."""
+
+        infos = self.h5file.walk_node_info(classname='Leaf')
+        self.assertEqual(sorted(info.pathname for info in infos),
+                         ['/group/carray', '/group/earray',
+                          '/group/vlarray', '/table'])
+        infos = self.h5file.walk_node_info(classname='Group')
+        self.assertEqual([info.pathname for info in infos], ['/', '/group'])
+
+    def test02_where(self):
+        """Only the nodes under the given group are walked."""
+
+        infos = list(self.h5file.walk_node_info('/group', 'Array'))
+        self.assertEqual(sorted(info.pathname for info in infos),
+                         ['/group/carray', '/group/earray'])
+        info = [info for info in infos if info.classname == 'CArray'][0]
+        self.assertEqual(info.shape, (10, 20))
+        self.assertEqual(info.chunkshape, (5, 5))
+        self.assertEqual(info.filters.complevel, 1)
+
+    def test03_class_attrs(self):
+        """Classes are guessed like when loading nodes."""
+
+        self.h5file.close()
+        self.h5file = open_file(self.h5fname, 'a')
+        self.h5file.root.group.earray.attrs.CLASS = 'UNKNOWN'
+        self.h5file.root.table.attrs.CLASS = 'UNKNOWN'
+        for sysattrs in (True, False):
+            self.h5file.close()
+            self.h5file = open_file(self.h5fname,
+                                    PYTABLES_SYS_ATTRS=sysattrs)
+            for info in self.h5file.walk_node_info():
+                node = self.h5file.get_node(info.pathname)
+                self.assertEqual(info.classname, node.__class__.__name__)
+
+
 #----------------------------------------------------------------------
 def suite():
     theSuite = unittest.TestSuite()
@@ -1015,6 +1159,8 @@ def suite():
         theSuite.addTest(unittest.makeSuite(WideTreeTestCase))
         theSuite.addTest(unittest.makeSuite(HiddenTreeTestCase))
         theSuite.addTest(unittest.makeSuite(CreateParentsTestCase))
+        theSuite.addTest(unittest.makeSuite(LazyChildrenTestCase))
+        theSuite.addTest(unittest.makeSuite(WalkNodeInfoTestCase))
 
     return theSuite
 
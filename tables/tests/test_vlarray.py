@@ -4330,6 +4330,156 @@ class AccessClosedTestCase(common.TempFileMixin, common.PyTablesTestCase):
         self.assertRaises(ClosedNodeError, self.array.append, 'xxxxxxxxx')
 
 
+class AppendManyTestCase(common.TempFileMixin, common.PyTablesTestCase):
+
+    def setUp(self):
+        super(AppendManyTestCase, self).setUp()
+        self.rows = [numpy.arange(i % 7, dtype='int32') for i in range(50)]
+
+    def test00_append_many(self):
+        """Appending several rows at once."""
+
+        vlarray = self.h5file.create_vlarray('/', 'vlarray', Int32Atom())
+        vlarray.append([-1])
+        vlarray.append_many(self.rows)
+        vlarray.append_many([])
+        self.assertEqual(vlarray.nrows, 51)
+        self._reopen()
+        vlarray = self.h5file.root.vlarray
+        self.assertEqual(vlarray.nrows, 51)
+        self.assertTrue(allequal(vlarray[0], numpy.array([-1], 'int32')))
+        for row, expected in zip(vlarray[1:], self.rows):
+            self.assertTrue(allequal(row, expected))
+
+    def test01_pseudo_atoms(self):
+        """Appending several rows at once with pseudo-atoms."""
+
+        vlstr = self.h5file.create_vlarray('/', 'vlstr', VLStringAtom())
+        vlstr.append_many([b"ab", b"", b"cde"])
+        vlobj = self.h5file.create_vlarray('/', 'vlobj', ObjectAtom())
+        vlobj.append_many([{'a': 1}, [1, 2], None])
+        vltime = self.h5file.create_vlarray('/', 'vltime', Time64Atom())
+        vltime.append_many([[1.5, 2.25], [3.0]])
+        self._reopen()
+        root = self.h5file.root
+        self.assertEqual(root.vlstr[:], [b"ab", b"", b"cde"])
+        self.assertEqual(root.vlobj[:], [{'a': 1}, [1, 2], None])
+        self.assertEqual([list(row) for row in root.vltime[:]],
+                         [[1.5, 2.25], [3.0]])
+
+    def test02_buffered(self):
+        """Buffered appends are written on flush."""
+
+        vlarray = self.h5file.create_vlarray('/', 'vlarray', Int32Atom())
+        for row in self.rows:
+            vlarray.append(row, buffered=True)
+        self.assertEqual(vlarray.nrows, 0)
+        vlarray.flush()
+        self.assertEqual(vlarray.nrows, 50)
+        for row, expected in zip(vlarray[:], self.rows):
+            self.assertTrue(allequal(row, expected))
+
+    def test03_buffered_order(self):
+        """Buffered rows keep their order with other appends."""
+
+        vlarray = self.h5file.create_vlarray('/', 'vlarray', Int32Atom())
+        vlarray.append([1], buffered=True)
+        vlarray.append([2])
+        vlarray.append([3], buffered=True)
+        vlarray.append_many([[4], [5]])
+        vlarray.append([6], buffered=True)
+        self._reopen()
+        self.assertEqual([list(row) for row in self.h5file.root.vlarray],
+                         [[1], [2], [3], [4], [5], [6]])
+
+    def test04_buffer_size(self):
+        """Buffered rows are written when the buffer fills up."""
+
+        self.h5file.params['IO_BUFFER_SIZE'] = 1024
+        vlarray = self.h5file.create_vlarray('/', 'vlarray', Int32Atom())
+        for i in range(100):
+            vlarray.append(numpy.arange(10), buffered=True)
+        self.assertTrue(0 < vlarray.nrows < 100)
+        vlarray.flush()
+        self.assertEqual(vlarray.nrows, 100)
+
+
+class ReadFlatTestCase(common.TempFileMixin, common.PyTablesTestCase):
+
+    def setUp(self):
+        super(ReadFlatTestCase, self).setUp()
+        self.rows = [numpy.arange(i % 5, dtype='int32') for i in range(30)]
+        vlarray = self.h5file.create_vlarray('/', 'vlarray', Int32Atom())
+        vlarray.append_many(self.rows)
+
+    def check_flat(self, values, offsets, rows):
+        self.assertEqual(offsets.dtype, numpy.int64)
+        self.assertEqual(len(offsets), len(rows) + 1)
+        self.assertEqual(offsets[0], 0)
+        for i, row in enumerate(rows):
+            self.assertTrue(allequal(values[offsets[i]:offsets[i+1]], row))
+        self.assertEqual(offsets[-1], len(values))
+
+    def test00_all(self):
+        """Reading all the rows as flat values and offsets."""
+
+        values, offsets = self.h5file.root.vlarray.read_flat()
+        self.assertEqual(values.dtype, numpy.int32)
+        self.check_flat(values, offsets, self.rows)
+
+    def test01_range(self):
+        """Reading ranges of rows as flat values and offsets."""
+
+        vlarray = self.h5file.root.vlarray
+        for (start, stop, step) in [(3, 17, 1), (1, 30, 4), (5, None, 1),
+                                    (None, 7, 3), (29, 30, 1)]:
+            values, offsets = vlarray.read_flat(start, stop, step)
+            self.check_flat(values, offsets, self.rows[start:stop:step])
+
+    def test02_empty(self):
+        """Reading empty ranges and rows as flat values and offsets."""
+
+        vlarray = self.h5file.create_vlarray('/', 'empty', Int16Atom((2,)))
+        values, offsets = vlarray.read_flat()
+        self.assertEqual(values.shape, (0, 2))
+        self.assertEqual(values.dtype, numpy.int16)
+        self.assertEqual(list(offsets), [0])
+        vlarray.append_many([[], []])
+        values, offsets = vlarray.read_flat()
+        self.assertEqual(values.shape, (0, 2))
+        self.assertEqual(list(offsets), [0, 0, 0])
+
+    def test03_multidim(self):
+        """Reading rows of multidimensional atoms as flat values."""
+
+        vlarray = self.h5file.create_vlarray('/', 'md', Int32Atom((2,)))
+        rows = [[[1, 2], [3, 4]], [], [[5, 6]]]
+        vlarray.append_many(rows)
+        values, offsets = vlarray.read_flat()
+        expected = numpy.arange(1, 7, dtype='int32').reshape(3, 2)
+        self.assertTrue(allequal(values, expected))
+        self.assertEqual(list(offsets), [0, 2, 2, 3])
+
+    def test04_pseudo_atoms(self):
+        """Reading pseudo-atoms gives the values of their base atom."""
+
+        vlarray = self.h5file.create_vlarray('/', 'vlstr', VLStringAtom())
+        vlarray.append_many([b"ab", b"", b"cde"])
+        values, offsets = vlarray.read_flat()
+        self.assertEqual(values.tostring(), b"abcde")
+        self.assertEqual(list(offsets), [0, 2, 2, 5])
+
+    def test05_time64(self):
+        """Reading Time64 rows as flat values."""
+
+        vlarray = self.h5file.create_vlarray('/', 'time', Time64Atom())
+        vlarray.append_many([[1.5, 2.25], [], [3.0]])
+        self._reopen()
+        values, offsets = self.h5file.root.time.read_flat()
+        self.assertEqual(list(values), [1.5, 2.25, 3.0])
+        self.assertEqual(list(offsets), [0, 2, 2, 3])
+
+
 class TestCreateVLArrayArgs(common.TempFileMixin, common.PyTablesTestCase):
     obj = numpy.array([1, 2, 3])
     where = '/'
@@ -4535,6 +4685,8 @@ def suite():
         theSuite.addTest(unittest.makeSuite(SizeInMemoryPropertyTestCase))
         theSuite.addTest(unittest.makeSuite(SizeOnDiskPropertyTestCase))
         theSuite.addTest(unittest.makeSuite(AccessClosedTestCase))
+        theSuite.addTest(unittest.makeSuite(AppendManyTestCase))
+        theSuite.addTest(unittest.makeSuite(ReadFlatTestCase))
         theSuite.addTest(unittest.makeSuite(TestCreateVLArrayArgs))
 
     return theSuite
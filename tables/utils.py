@@ -15,6 +15,7 @@
 import os
 import sys
 import subprocess
+import threading
 from time import time
 
 import numpy
@@ -241,6 +242,85 @@ def lazyattr(fget):
     return property(newfget, None, None, fget.__doc__)
 
 
+class PhaseTimer(object):
+    """Accumulate the time spent in the phases of some operations.
+
+    While used as a context manager, the timer is set as the ``_timer``
+    attribute of `target` (a :class:`File`), where the code of every
+    phase finds it.  The total time (in seconds) spent in every phase is
+    kept in the `times` dictionary, and the number of times that the
+    phase has been entered (or of items produced, for iterations) in
+    `counts`.
+
+    """
+
+    def __init__(self, target):
+        self.target = target
+        self.times = {}
+        """The total time spent in every phase (in seconds)."""
+        self.counts = {}
+        """The number of times that every phase has been entered."""
+        self._previous = None
+
+    def __enter__(self):
+        self._previous = self.target._timer
+        self.target._timer = self
+        return self
+
+    def __exit__(self, *exc_info):
+        self.target._timer = self._previous
+        self._previous = None
+        return False
+
+    def add(self, phase, elapsed, count=1):
+        """Add `elapsed` seconds to the time spent in `phase`."""
+
+        self.times[phase] = self.times.get(phase, 0.0) + elapsed
+        self.counts[phase] = self.counts.get(phase, 0) + count
+
+    def iterate(self, phase, iterator):
+        """Iterate over `iterator`, adding the time taken by every item to
+        `phase`."""
+
+        iterator = iter(iterator)
+        while True:
+            tref = time()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add(phase, time() - tref, 0)
+                return
+            self.add(phase, time() - tref)
+            yield item
+
+
+def timed_phase(phase):
+    """Make the time spent in a node method count for `phase`.
+
+    This function is intended to be used as a *method decorator*.  The
+    time is only measured while a :class:`PhaseTimer` is active for the
+    file of the node.
+
+    """
+
+    def decorator(method):
+        def newmethod(self, *args, **kwargs):
+            timer = self._v_file._timer
+            if timer is None:
+                return method(self, *args, **kwargs)
+            tref = time()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                timer.add(phase, time() - tref)
+
+        newmethod.__name__ = method.__name__
+        newmethod.__doc__ = method.__doc__
+        return newmethod
+
+    return decorator
+
+
 def show_stats(explain, tref, encoding=None):
     """Show the used memory (only works for Linux 2.6.x)."""
 
@@ -410,6 +490,43 @@ class NailedDict(object):
         cache[key] = value
 
 
+class BackgroundCall(threading.Thread):
+    """Run ``func(*args)`` in a separate thread.
+
+    The call starts as soon as the instance is created.  Its result is
+    obtained with the `result()` method, which waits for the call to
+    finish and re-raises any exception raised by it.
+
+    This is meant for overlapping HDF5 reads (which release the GIL)
+    with computations in the calling thread.  The caller must make
+    sure that the call has finished before issuing other HDF5 calls.
+
+    """
+
+    def __init__(self, func, *args):
+        super(BackgroundCall, self).__init__()
+        self.daemon = True
+        self._func = func
+        self._args = args
+        self._result = None
+        self._error = None
+        self.start()
+
+    def run(self):
+        try:
+            self._result = self._func(*self._args)
+        except Exception, exc:
+            self._error = exc
+
+    def result(self):
+        """Wait for the call to finish and return its result."""
+
+        self.join()
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
 def detect_number_of_cores():
     """Detects the number of cores on a system. Cribbed from pp."""
 
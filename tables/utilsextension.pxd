@@ -18,6 +18,12 @@ be shared with other extensions.
 from definitions cimport hsize_t, hid_t, const_char
 
 
+cdef extern from "Python.h":
+  ctypedef struct PyThreadState
+
+
 cdef hsize_t *malloc_dims(object)
 cdef hid_t get_native_type(hid_t) nogil
 cdef str cstr_to_pystr(const_char*)
+cdef PyThreadState *release_gil()
+cdef void restore_gil(PyThreadState *) nogil
@@ -13,6 +13,7 @@
 """Cython utilities for PyTables and HDF5 library."""
 
 import sys
+import time
 import warnings
 
 try:
@@ -192,6 +193,12 @@ cdef extern from "blosc.h" nogil:
   int blosc_set_nthreads(int nthreads)
 
 
+# Releasing and taking back the GIL around HDF5 calls
+cdef extern from "Python.h":
+  PyThreadState *PyEval_SaveThread()
+  void PyEval_RestoreThread(PyThreadState *tstate) nogil
+
+
 # @TODO: use the c_string_type and c_string_encoding global directives
 #        (new in cython 0.19)
 cdef str cstr_to_pystr(const_char* cstring):
@@ -382,6 +389,75 @@ silenceHDF5Messages = previous_api(silence_hdf5_messages)
 silence_hdf5_messages()
 
 
+# The number of requests for keeping the GIL during HDF5 calls
+cdef int keep_gil_requests = 0
+# The number of HDF5 calls running without the GIL right now
+cdef int nogil_calls = 0
+
+
+def keep_gil_in_hdf5(keep=True):
+  """keep_gil_in_hdf5(keep=True)
+
+  Keep the GIL during HDF5 I/O calls (or stop keeping it if `keep` is
+  false).
+
+  HDF5 calls reading or writing data normally release the GIL, so that
+  other threads can run Python code meanwhile.  This is only safe as long
+  as those threads do not use HDF5 themselves.  While some thread
+  using HDF5 runs in the background (like a background index build),
+  the GIL is kept so that HDF5 calls from different threads never
+  overlap.  Requests are counted, so every call with a true `keep`
+  must be balanced by a call with a false one.
+
+  When the GIL starts to be kept, this waits for the HDF5 calls which
+  other threads may have started without the GIL to finish.
+
+  """
+
+  global keep_gil_requests
+  if keep:
+    keep_gil_requests += 1
+    while nogil_calls > 0:
+      time.sleep(0.0001)
+  elif keep_gil_requests > 0:
+    keep_gil_requests -= 1
+
+
+cdef PyThreadState *release_gil():
+  """Release the GIL before an HDF5 call, unless it must be kept."""
+
+  global nogil_calls
+  if keep_gil_requests > 0:
+    return NULL
+  nogil_calls += 1
+  return PyEval_SaveThread()
+
+
+cdef void restore_gil(PyThreadState *tstate) nogil:
+  """Take back the GIL released by `release_gil()`, if any."""
+
+  global nogil_calls
+  if tstate != NULL:
+    PyEval_RestoreThread(tstate)
+    nogil_calls -= 1
+
+
+cdef class NoLock:
+  """A context manager doing nothing, used in place of a lock.
+
+  Files only need a real lock while some other thread uses them (see
+  `tables.table.IndexBuild`), and this is much cheaper to enter and
+  exit than a ``threading.RLock`` in the meanwhile.
+
+  """
+
+  def __enter__(self):
+    pass
+
+  def __exit__(self, *exc_info):
+    pass
+
+
 # Helper functions
 cdef hsize_t *malloc_dims(object pdims):
   """Return a malloced hsize_t dims from a python pdims."""
@@ -13,6 +13,7 @@
 """Here is defined the VLArray class"""
 
 import sys
+import warnings
 
 import numpy
 
@@ -22,6 +23,7 @@ from tables.utils import (convert_to_np_atom, convert_to_np_atom2, idx2long,
 
 
 from tables.atom import ObjectAtom, VLStringAtom, VLUnicodeAtom
+from tables.exceptions import PerformanceWarning
 from tables.flavor import internal_to_flavor
 from tables.leaf import Leaf, calc_chunksize
 from tables._past import previous_api, previous_api_property
@@ -486,20 +488,10 @@ class VLArray(hdf5extension.VLArray, Leaf):
 
     getEnum = previous_api(get_enum)
 
-    def append(self, sequence):
-        """Add a sequence of data to the end of the dataset.
-
-        This method appends the objects in the sequence to a *single row* in
-        this array. The type and shape of individual objects must be compliant
-        with the atoms in the array. In the case of serialized objects and
-        variable length strings, the object or string to append is itself the
-        sequence.
-
+    def _convert_row(self, sequence):
+        """Convert `sequence` into the array and number of objects to save.
         """
 
-        self._g_check_open()
-        self._v_file._check_writable()
-
         # Prepare the sequence to convert it into a NumPy object
         atom = self.atom
         if not hasattr(atom, 'size'):  # it is a pseudo-atom
@@ -520,9 +512,94 @@ class VLArray(hdf5extension.VLArray, Leaf):
         else:
             nobjects = 0
             nparr = None
+        return nparr, nobjects
+
+    def append(self, sequence, buffered=False):
+        """Add a sequence of data to the end of the dataset.
+
+        This method appends the objects in the sequence to a *single row* in
+        this array. The type and shape of individual objects must be compliant
+        with the atoms in the array. In the case of serialized objects and
+        variable length strings, the object or string to append is itself the
+        sequence.
+
+        If buffered is true, the row is kept in an internal buffer and
+        written, together with the other buffered rows, when the buffer
+        fills up (see the IO_BUFFER_SIZE parameter), when the array is
+        flushed or closed, or before the next unbuffered append.  This is
+        much faster when appending lots of small rows.  Like rows appended
+        with :meth:`Table.row.append`, buffered rows are not part of the
+        array (nor counted in :attr:`VLArray.nrows`) until they are
+        written.
+
+        .. versionchanged:: 3.1
+           The *buffered* parameter has been added.
+
+        """
+
+        self._g_check_open()
+        self._v_file._check_writable()
+
+        nparr, nobjects = self._convert_row(sequence)
+        if not buffered:
+            if '_v_iobuf' in self.__dict__:
+                # Keep the order of rows
+                self._flush_buffered_rows()
+            self._append(nparr, nobjects)
+            self.nrows += 1
+            return
+
+        if '_v_iobuf' not in self.__dict__:
+            self._v_iobuf = ([], [])
+            self._v_iobufsize = 0
+        nparrs, nobjs = self._v_iobuf
+        nparrs.append(nparr)
+        nobjs.append(nobjects)
+        # Account for the row descriptor too
+        self._v_iobufsize += 2 * numpy.dtype(numpy.intp).itemsize
+        if nparr is not None:
+            self._v_iobufsize += nparr.nbytes
+        if self._v_iobufsize >= self._v_file.params['IO_BUFFER_SIZE']:
+            self._flush_buffered_rows()
+
+    def append_many(self, sequences):
+        """Add several rows to the end of the dataset.
+
+        Every item in sequences is converted into a row like in
+        :meth:`VLArray.append`, but all the rows are written at once,
+        which is much faster than appending them one by one.  Any rows
+        kept by buffered appends are written first.
+
+        .. versionadded:: 3.1
+
+        """
+
+        self._g_check_open()
+        self._v_file._check_writable()
+
+        nparrs, nobjs = self.__dict__.pop('_v_iobuf', ([], []))
+        for sequence in sequences:
+            nparr, nobjects = self._convert_row(sequence)
+            nparrs.append(nparr)
+            nobjs.append(nobjects)
+        self._append_many(nparrs, nobjs)
+        self.nrows += len(nparrs)
+
+    def _flush_buffered_rows(self):
+        """Write the rows kept by buffered appends (if any)."""
+
+        if '_v_iobuf' not in self.__dict__:
+            return
+        nparrs, nobjs = self.__dict__.pop('_v_iobuf')
+        self._append_many(nparrs, nobjs)
+        self.nrows += len(nparrs)
 
-        self._append(nparr, nobjects)
-        self.nrows += 1
+    def _get_unsaved_nrows(self):
+        """Get the number of rows kept by buffered appends."""
+
+        if '_v_iobuf' not in self.__dict__:
+            return 0
+        return len(self._v_iobuf[0])
 
     def iterrows(self, start=None, stop=None, step=None):
         """Iterate over the rows of the array.
@@ -805,6 +882,38 @@ class VLArray(hdf5extension.VLArray, Leaf):
             outlistarr = [internal_to_flavor(arr, flavor) for arr in listarr]
         return outlistarr
 
+    def read_flat(self, start=None, stop=None, step=1):
+        """Get data in the array as a flat array of values and row offsets.
+
+        Returns a tuple of (values, offsets).  values is a NumPy array
+        with the atoms of all the selected rows, one row after the other,
+        and offsets is an array of ``int64`` with as many entries as
+        selected rows plus one, so that row i is
+        ``values[offsets[i]:offsets[i+1]]``.  This is the layout used by
+        compressed sparse row matrices and Apache Arrow lists, and is much
+        faster than :meth:`VLArray.read` for lots of short rows, since no
+        Python object is created per row.
+
+        For pseudo-atoms, the values of their base atom (e.g. the bytes of
+        strings) are returned.  The start, stop and step parameters have
+        the same meaning as in :meth:`VLArray.read`.  The flavor of the
+        array is not used, NumPy arrays are always returned.
+
+        .. versionadded:: 3.1
+
+        """
+
+        self._g_check_open()
+        start, stop, step = self._process_range_read(start, stop, step)
+        if start == stop:
+            atom = self.atom
+            if not hasattr(atom, 'size'):  # it is a pseudo-atom
+                atom = atom.base
+            values = numpy.empty((0,) + atom.shape, dtype=atom.dtype.base)
+            offsets = numpy.zeros(1, dtype=numpy.int64)
+            return values, offsets
+        return self._read_flat(start, stop, step)
+
     def _read_coordinates(self, coords):
         """Read rows specified in `coords`."""
         rows = []
@@ -851,6 +960,29 @@ class VLArray(hdf5extension.VLArray, Leaf):
 
     _g_copyWithStats = previous_api(_g_copy_with_stats)
 
+    def flush(self):
+        """Flush pending data to disk.
+
+        Besides the behavior described in :meth:`Leaf.flush`, this writes
+        the rows kept by buffered appends (see :meth:`VLArray.append`).
+
+        """
+
+        self._flush_buffered_rows()
+        super(VLArray, self).flush()
+
+    def _g_pre_kill_hook(self):
+        """Code to be called before killing the node."""
+
+        # Buffered rows are kept, and will be written when the node is
+        # finally closed.
+        if self._get_unsaved_nrows() > 0:
+            warnings.warn(("vlarray ``%s`` is being preempted from alive "
+                           "nodes without its buffers being flushed.  "
+                           "Please do a call to the .flush() method on "
+                           "this vlarray before start using other nodes.")
+                          % (self._v_pathname), PerformanceWarning)
+
     def __repr__(self):
         """This provides more metainfo in addition to standard __str__"""
 